@@ -0,0 +1,146 @@
+"""
+控制策略收敛基准测试
+
+用简化的称量过程模型代替机器人和天平，让各控制策略（core.controller中注册的策略）
+从空瓶开始逐周期计算抖动参数，直到剩余重量不超过容差、超过目标或达到周期上限，统计：
+    - 达标率和过冲率（超过目标+容差）
+    - 抖动次数、周期数和耗时（按模型估算的机器人动作和等待稳定时间）
+    - 最终误差（mg）和相对误差
+
+称量过程由core.simulator.DispensingSimulator模拟（大/中/小勺与RAPID端T_ROB_R一致，落料量带随机波动、
+结块和勺中物料限制，读数带天平噪声），耗时按模拟器的时钟计算，每周期另加settle_time秒等待天平稳定。
+指定--material-models时按tools/fit_material_models.py拟合的物料模型缩放各物料的落料量和落料波动。
+最后输出每秒模拟的称量次数。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_controllers.py [--strategies threshold,fuzzy] [--trials 200] [--targets 0.2,0.5,1.0]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.controller import CONTROLLERS, get_controller
+from core.material_models import get_material_models
+from core.simulator import DispensingSimulator
+
+# 测试物料: (名称, 密度, 颗粒大小)
+MATERIALS = [
+    ('Sugar', 1.59, 2.0),
+    ('CaCO3', 2.71, 1.0),
+    ('Al2O3', 3.95, 3.0),
+    ('Pectin', 0.8, 1.5),
+]
+
+
+def run_dispense(controller, material, target_weight, args, simulator):
+    """
+    用一个控制策略完成一次称量
+
+    返回:
+        dict: 抖动次数、周期数、耗时、最终重量和是否达标/过冲
+    """
+    name, density, particle_size = material
+    model = (args.models.get(name) if args.models else None) or {}
+    simulator.reset(target_weight, density, particle_size, model.get('flow_scale', 1.0), model.get('noise_scale', 1.0))
+    start_clock, start_shakes = simulator.clock, simulator.shakes
+    current = simulator.read()
+    cycles = 0
+    while target_weight - current > args.tolerance and cycles < args.max_cycles:
+        amplitude, angle = controller.compute(target_weight, current, density, particle_size)
+        simulator.cycle(amplitude, angle, target_weight - current)
+        simulator.wait(args.settle_time)
+        cycles += 1
+        current = simulator.read()
+
+    error = simulator.mass - target_weight
+    return {
+        'shakes': simulator.shakes - start_shakes,
+        'cycles': cycles,
+        'time': simulator.clock - start_clock,
+        'error': error,
+        'reached': abs(error) <= args.tolerance,
+        'overshoot': error > args.tolerance
+    }
+
+
+def summarize(results, target_weights):
+    """
+    汇总多次称量的结果
+    """
+    relative = [abs(result['error']) / target for result, target in zip(results, target_weights)]
+    return {
+        'reached': sum(result['reached'] for result in results) / len(results),
+        'overshoot': sum(result['overshoot'] for result in results) / len(results),
+        'shakes': statistics.mean(result['shakes'] for result in results),
+        'cycles': statistics.mean(result['cycles'] for result in results),
+        'time': statistics.mean(result['time'] for result in results),
+        'time_p95': sorted(result['time'] for result in results)[int(0.95 * (len(results) - 1))],
+        'error_mg': statistics.mean(abs(result['error']) for result in results) * 1000,
+        'relative': statistics.mean(relative)
+    }
+
+
+def print_row(label, summary):
+    print(f"{label:<22} {summary['reached']:>6.1%} {summary['overshoot']:>6.1%} {summary['shakes']:>8.1f} "
+          f"{summary['cycles']:>6.1f} {summary['time']:>8.1f} {summary['time_p95']:>8.1f} "
+          f"{summary['error_mg']:>8.2f} {summary['relative']:>8.3%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="控制策略收敛基准测试")
+    parser.add_argument('--strategies', default=','.join(sorted(CONTROLLERS)), help="逗号分隔的策略名称")
+    parser.add_argument('--targets', default='0.2,0.5,1.0', help="逗号分隔的目标重量（g）")
+    parser.add_argument('--trials', type=int, default=200, help="每个物料和目标重量的称量次数")
+    parser.add_argument('--tolerance', type=float, default=0.002, help="达标容差（g）")
+    parser.add_argument('--settle-time', type=float, default=3.0, help="每周期等待天平稳定并读取的耗时（秒，对应calculate_difference）")
+    parser.add_argument('--max-cycles', type=int, default=200, help="每次称量的最大周期数")
+    parser.add_argument('--per-material', action='store_true', help="按物料分别输出")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子，各策略使用相同的随机序列")
+    parser.add_argument('--material-models', action='store_true',
+                        help="按 resources/material_models.json 中拟合的物料模型缩放落料量和落料波动")
+    parser.add_argument('--debug-log', action='store_true', help="保留控制策略的调试日志（写日志文件，明显变慢）")
+    args = parser.parse_args()
+    if not args.debug_log:
+        logging.disable(logging.DEBUG)
+    args.models = get_material_models() if args.material_models else None
+
+    targets = [float(value) for value in args.targets.split(',')]
+    print(f"物料 {len(MATERIALS)} 种 x 目标重量 {len(targets)} 个 x {args.trials} 次，容差 {args.tolerance * 1000:.1f} mg")
+    print(f"{'策略':<20} {'达标':>6} {'过冲':>6} {'抖动次数':>6} {'周期':>5} {'耗时/s':>7} {'P95/s':>8} "
+          f"{'误差/mg':>6} {'相对误差':>5}")
+
+    dispenses, elapsed = 0, 0.0
+    for name in args.strategies.split(','):
+        controller = get_controller(name)
+        if controller is None:
+            print(f"未知的控制策略: {name}")
+            continue
+        simulator = DispensingSimulator(args.seed)
+        by_material = {}
+        start = time.perf_counter()
+        for material in MATERIALS:
+            for target in targets:
+                for _ in range(args.trials):
+                    result = run_dispense(controller, material, target, args, simulator)
+                    by_material.setdefault(material[0], []).append((result, target))
+        elapsed += time.perf_counter() - start
+        dispenses += simulator.dispenses
+
+        if args.per_material:
+            for material_name, entries in by_material.items():
+                print_row(f"{name}/{material_name}", summarize(*zip(*entries)))
+        entries = [entry for values in by_material.values() for entry in values]
+        print_row(name, summarize(*zip(*entries)))
+        if args.per_material:
+            print()
+    if elapsed > 0:
+        print(f"共模拟 {dispenses} 次称量，{dispenses / elapsed:.0f} 次/秒")
+
+
+if __name__ == '__main__':
+    main()
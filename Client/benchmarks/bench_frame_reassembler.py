@@ -0,0 +1,170 @@
+"""
+帧重组器基准测试
+
+模拟RAPID端在高负载下被TCP合并/拆分的消息流，对比旧的“一次recv即一条消息”处理方式
+与FrameReassembler的分帧结果，并统计每秒帧数和每帧净分配的内存块数。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_frame_reassembler.py [--messages 200000] [--seed 1]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.frame_reassembler import FrameReassembler
+
+
+def build_stream(mode, count, rng):
+    """
+    生成模拟消息流
+
+    参数:
+        mode: 'control' 或 'data'
+        count: 消息条数
+        rng: 随机数生成器
+
+    返回:
+        tuple: (消息字节流, 期望的消息列表)
+    """
+    messages = []
+    for _ in range(count):
+        if mode == 'control':
+            roll = rng.random()
+            if roll < 0.85:
+                messages.append('executing')
+            elif roll < 0.95 or (messages and messages[-1][0].isdigit()):
+                # 两条瓶重数值连续发送时RAPID端本身也无法区分，这里与真实流程一致，瓶重后总跟随指令
+                messages.append('new_target')
+            else:
+                messages.append(f"{rng.uniform(8, 11):.3f}")
+        else:
+            if rng.random() < 0.9:
+                messages.append('9 9 9')
+            else:
+                # "9 9 9"后紧跟以数字开头的结果时无法与以"9 9 9"开头的数值帧区分；真实流程中客户端每秒轮询一次，
+                # 两次应答不会合并到达，这里"9 9 9"之后的结果取负的精度，以符号开头
+                accuracy = rng.uniform(0, 0.1)
+                if messages and messages[-1] == '9 9 9':
+                    accuracy = -accuracy
+                messages.append(f"{accuracy:.5f} {rng.uniform(0, 0.05):.4f} "
+                                f"{rng.choice([0.02, 0.2, 0.5, 1.0])} {rng.uniform(20, 200):.1f} ")
+    return ''.join(messages).encode('ascii'), [m.strip() for m in messages]
+
+
+def split_chunks(stream, rng, max_chunk):
+    """
+    按随机长度切分字节流，模拟TCP分片与合并
+
+    参数:
+        stream: 字节流
+        rng: 随机数生成器
+        max_chunk: 最大分片长度
+
+    返回:
+        list: 分片列表
+    """
+    chunks = []
+    offset = 0
+    while offset < len(stream):
+        size = rng.randint(1, max_chunk)
+        chunks.append(stream[offset:offset + size])
+        offset += size
+    return chunks
+
+
+def run_legacy(chunks):
+    """
+    旧实现：每次recv得到的数据直接解码并作为一条消息
+
+    返回:
+        list: 回调收到的消息列表
+    """
+    received = []
+    for chunk in chunks:
+        received.append(chunk.decode('ascii'))
+    return received
+
+
+def run_reassembler(mode, chunks, capacity):
+    """
+    新实现：模拟recv_into写入环形缓冲区后逐帧回调
+
+    返回:
+        tuple: (回调收到的消息列表, 帧重组器)
+    """
+    reassembler = FrameReassembler(mode=mode, capacity=capacity)
+    received = []
+    callback = received.append
+    for chunk in chunks:
+        target = reassembler.write_buffer()
+        size = len(chunk)
+        if size > len(target):
+            for frame in reassembler.feed(chunk):
+                callback(frame)
+            continue
+        target[:size] = chunk
+        reassembler.commit(size)
+        for frame in reassembler.frames():
+            callback(frame)
+    for frame in reassembler.flush():
+        callback(frame)
+    return received, reassembler
+
+
+def bench(mode, count, seed, max_chunk, capacity):
+    """
+    执行单个通道的基准测试并打印结果
+    """
+    rng = random.Random(seed)
+    stream, expected = build_stream(mode, count, rng)
+    chunks = split_chunks(stream, rng, max_chunk)
+
+    legacy = run_legacy(chunks)
+    legacy_ok = sum(1 for a, b in zip(legacy, expected) if a.strip() == b)
+
+    # 预热
+    run_reassembler(mode, chunks[:1000], capacity)
+
+    gc.collect()
+    gc.disable()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        received, reassembler = run_reassembler(mode, chunks, capacity)
+        elapsed = time.perf_counter() - start
+        blocks_after = sys.getallocatedblocks()
+    finally:
+        gc.enable()
+
+    # 除结果帧本身外，还需扣除结果列表的内存块
+    net_blocks = blocks_after - blocks_before - 1
+    frames = len(received)
+    correct = received == expected
+
+    print(f"[{mode}] 消息数: {count}, 字节数: {len(stream)}, 分片数: {len(chunks)}")
+    print(f"  旧实现: 回调 {len(legacy)} 次, 其中正确消息 {legacy_ok} 条")
+    print(f"  新实现: 回调 {frames} 次, 与原始消息完全一致: {correct}")
+    print(f"  吞吐量: {frames / elapsed:,.0f} 帧/秒, {len(stream) / elapsed / 1e6:.2f} MB/秒")
+    print(f"  每帧净分配内存块: {net_blocks / max(frames, 1):.3f} (结果字符串本身占 1 块)")
+    print(f"  统计: {reassembler.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FrameReassembler基准测试")
+    parser.add_argument('--messages', type=int, default=200000, help="每个通道的消息条数")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    parser.add_argument('--max-chunk', type=int, default=48, help="最大分片长度（字节）")
+    parser.add_argument('--capacity', type=int, default=10240, help="环形缓冲区容量（字节）")
+    args = parser.parse_args()
+
+    for mode in ('control', 'data'):
+        bench(mode, args.messages, args.seed, args.max_chunk, args.capacity)
+
+
+if __name__ == '__main__':
+    main()
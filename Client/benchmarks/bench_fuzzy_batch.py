@@ -0,0 +1,108 @@
+"""
+向量化模糊推理基准测试
+
+先检查FuzzyLogicEngine.fuzzy_inference_batch与逐次精确推理（fuzzylogic规则库）的结果一致：
+随机点、各隶属函数断点附近的点以及超出模糊域的点，统计完全相同的比例和最大绝对误差；
+再对比大批量输入时两者每秒处理的输入对数量。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_fuzzy_batch.py [--pairs 1000000] [--check 20000] [--tolerance 1e-9]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fuzzy_logic import (FuzzyLogicEngine, DIFFERENCE_RANGE, DENSITY_RANGE,
+                              DIFFERENCE_SETS, DENSITY_SETS)
+
+
+def breakpoints(sets):
+    """
+    各隶属函数的断点，以及断点两侧最近的浮点数
+    """
+    values = set()
+    for _, params in sets.values():
+        for value in params:
+            values.update((value, np.nextafter(value, -np.inf), np.nextafter(value, np.inf)))
+    return sorted(values)
+
+
+def check_points(count, rng):
+    """
+    生成一致性检查点：随机点、断点组合和超出范围的点
+
+    返回:
+        tuple: (差值数组, 密度数组)
+    """
+    differences = list(rng.uniform(*DIFFERENCE_RANGE, count))
+    densities = list(rng.uniform(*DENSITY_RANGE, count))
+    for difference in breakpoints(DIFFERENCE_SETS) + [DIFFERENCE_RANGE[0] - 1, DIFFERENCE_RANGE[1] + 1]:
+        for density in breakpoints(DENSITY_SETS) + [DENSITY_RANGE[0] - 1, DENSITY_RANGE[1] + 1]:
+            differences.append(difference)
+            densities.append(density)
+    return np.array(differences), np.array(densities)
+
+
+def check_equivalence(engine, differences, densities, tolerance):
+    """
+    逐点比较批量推理与精确推理的结果
+
+    返回:
+        tuple: (完全相同的点数, 最大绝对误差)
+    """
+    batch = engine.fuzzy_inference_batch(differences, densities)
+    identical = 0
+    max_error = 0.0
+    for difference, density, value in zip(differences.tolist(), densities.tolist(), batch.tolist()):
+        exact = engine.fuzzy_inference_exact(difference, density)
+        if exact is None:
+            assert np.isnan(value), (difference, density, value)
+            identical += 1
+            continue
+        error = abs(value - exact)
+        assert error <= tolerance, (difference, density, exact, value)
+        identical += value == exact
+        max_error = max(max_error, error)
+    return identical, max_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化模糊推理基准测试")
+    parser.add_argument('--pairs', type=int, default=1000000, help="批量推理的输入对数量")
+    parser.add_argument('--check', type=int, default=20000, help="一致性检查的随机点数量")
+    parser.add_argument('--tolerance', type=float, default=1e-9, help="允许的最大绝对误差")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    engine = FuzzyLogicEngine(use_lut=False)
+
+    differences, densities = check_points(args.check, rng)
+    identical, max_error = check_equivalence(engine, differences, densities, args.tolerance)
+    print(f"一致性: {identical}/{len(differences)} 点完全相同，最大绝对误差 {max_error:.3g}")
+
+    differences = rng.uniform(*DIFFERENCE_RANGE, args.pairs)
+    densities = rng.uniform(*DENSITY_RANGE, args.pairs)
+    engine.fuzzy_inference_batch(differences[:1000], densities[:1000])  # 预热
+
+    start = time.perf_counter()
+    engine.fuzzy_inference_batch(differences, densities)
+    batch_rate = args.pairs / (time.perf_counter() - start)
+
+    count = max(1, args.pairs // 200)
+    start = time.perf_counter()
+    for difference, density in zip(differences[:count].tolist(), densities[:count].tolist()):
+        engine.fuzzy_inference_exact(difference, density)
+    exact_rate = count / (time.perf_counter() - start)
+
+    print(f"逐次推理: {exact_rate:,.0f} 对/秒")
+    print(f"批量推理: {batch_rate:,.0f} 对/秒（{args.pairs} 对），加速比 {batch_rate / exact_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+模糊控制器查找表缓存冷启动基准测试
+
+在新的Python进程中计时"导入core.fuzzy_logic + 创建FuzzyLogicEngine + 第一次计算抖动参数"：
+    - 重新编译: 不使用缓存，每次启动都创建模糊系统、编译并检查查找表
+    - 缓存命中: 从缓存目录内存映射加载查找表，不创建模糊系统（也不导入fuzzylogic.classes及其依赖的matplotlib）
+并检查缓存加载的查找表与重新编译的结果完全相同。
+子进程在临时目录中运行，日志、配置和缓存文件都写在临时目录下。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_fuzzy_cache.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的启动过程，输出耗时和第一次计算的结果
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from core.fuzzy_logic import FuzzyLogicEngine
+engine = FuzzyLogicEngine(use_lut=True, cache_dir=sys.argv[2])
+amplitude, angle = engine.calculate_shaking(0.5, 1.1)
+elapsed = time.perf_counter() - start
+print(elapsed, engine.rules is not None, 'matplotlib' in sys.modules, repr(engine.lut.table.sum()))
+"""
+
+
+def start_once(work_dir, cache_dir):
+    """
+    在新进程中启动一次
+
+    返回:
+        tuple: (耗时秒数, 是否创建了模糊系统, 是否导入了matplotlib, 查找表校验和)
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP, CLIENT_DIR, cache_dir],
+        cwd=work_dir, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), output[1] == 'True', output[2] == 'True', output[3]
+
+
+def measure(work_dir, cache_dir, runs):
+    """
+    多次启动取中位数
+
+    返回:
+        tuple: (耗时中位数, 最后一次启动的结果)
+    """
+    results = [start_once(work_dir, cache_dir) for _ in range(runs)]
+    return statistics.median(result[0] for result in results), results[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模糊控制器查找表缓存冷启动基准测试")
+    parser.add_argument('--runs', type=int, default=5, help="每种方式的启动次数，取中位数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_dir = os.path.join(work_dir, 'cache')
+
+        rebuild_time, (_, rebuilt, rebuild_matplotlib, rebuild_sum) = measure(work_dir, '', args.runs)
+        start_once(work_dir, cache_dir)  # 编译并写入缓存
+        cached_time, (_, cached_rebuilt, cached_matplotlib, cached_sum) = measure(work_dir, cache_dir, args.runs)
+
+        assert rebuilt and not cached_rebuilt
+        assert rebuild_sum == cached_sum, (rebuild_sum, cached_sum)
+        print(f"缓存文件: {', '.join(sorted(os.listdir(cache_dir)))}")
+
+    print(f"重新编译: {rebuild_time * 1e3:8.1f} 毫秒（导入matplotlib: {rebuild_matplotlib}）")
+    print(f"缓存命中: {cached_time * 1e3:8.1f} 毫秒（导入matplotlib: {cached_matplotlib}），"
+          f"加速比 {rebuild_time / cached_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+模糊推理查找表基准测试
+
+对比FuzzyLogicEngine的精确推理（fuzzylogic规则库逐次推理）与预编译查找表（双线性插值）：
+    - 查找表编译耗时和大小
+    - 网格中点（插值误差最大的位置）和随机点上与精确推理的最大误差
+    - 每秒推理次数
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_fuzzy_lut.py [--difference-step 0.005] [--density-step 0.02] [--calls 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fuzzy_logic import FuzzyLogicEngine, FuzzyLookupTable, DIFFERENCE_RANGE, DENSITY_RANGE
+
+
+def midpoints(lut, stride):
+    """
+    生成查找表网格单元的中点
+
+    参数:
+        lut: 查找表
+        stride: 每隔多少个网格单元取一个中点
+
+    返回:
+        list: [(差值, 密度), ...]
+    """
+    dx = (lut.x1 - lut.x0) / (lut.nx - 1)
+    dy = (lut.y1 - lut.y0) / (lut.ny - 1)
+    return [(lut.x0 + (i + 0.5) * dx, lut.y0 + (j + 0.5) * dy)
+            for i in range(0, lut.nx - 1, stride) for j in range(0, lut.ny - 1, stride)]
+
+
+def calls_per_second(fn, points):
+    """
+    计算每秒调用次数
+    """
+    start = time.perf_counter()
+    for difference, density in points:
+        fn(difference, density)
+    return len(points) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模糊推理查找表基准测试")
+    parser.add_argument('--difference-step', type=float, default=0.005, help="差值方向的采样间隔")
+    parser.add_argument('--density-step', type=float, default=0.02, help="密度方向的采样间隔")
+    parser.add_argument('--calls', type=int, default=100000, help="查找表的推理次数（精确推理为其1/50）")
+    parser.add_argument('--stride', type=int, default=1, help="误差检查时每隔多少个网格单元取一个中点")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    engine = FuzzyLogicEngine(use_lut=False)
+    exact = engine.fuzzy_inference_exact
+
+    start = time.perf_counter()
+    lut = FuzzyLookupTable.compile(engine, args.difference_step, args.density_step)
+    compile_time = time.perf_counter() - start
+    print(f"查找表: {lut.nx} x {lut.ny}，编译耗时 {compile_time * 1e3:.1f} 毫秒，{lut.table.nbytes / 1024:.0f} KB")
+
+    grid_points = midpoints(lut, args.stride)
+    rng = random.Random(args.seed)
+    random_points = [(rng.uniform(*DIFFERENCE_RANGE), rng.uniform(*DENSITY_RANGE)) for _ in range(len(grid_points))]
+    print(f"最大误差: 网格中点 {lut.check(exact, grid_points):.4g}（{len(grid_points)} 点），"
+          f"随机点 {lut.check(exact, random_points):.4g}（{len(random_points)} 点）")
+
+    points = [(rng.uniform(*DIFFERENCE_RANGE), rng.uniform(*DENSITY_RANGE)) for _ in range(args.calls)]
+    exact_rate = calls_per_second(exact, points[:max(1, args.calls // 50)])
+    lut_rate = calls_per_second(lut, points)
+    print(f"精确推理: {exact_rate:,.0f} 次/秒，{1e6 / exact_rate:.2f} 微秒/次")
+    print(f"查找表:   {lut_rate:,.0f} 次/秒，{1e6 / lut_rate:.2f} 微秒/次，加速比 {lut_rate / exact_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""
+ProtocolHandler.parse_response 基准测试
+
+按消息类型对比旧实现（strip/比较/split并构造嵌套dict）与新解析器：
+    - 控制通道: 旧实现与新实现（parse_message）的输入均为字符串帧
+    - 数据通道: 帧直接在接收缓冲区上解析。旧实现先把缓冲区中的帧解码为字符串再解析，
+      新实现(buffer)用parse_buffer在缓冲区上直接解析，"9 9 9"和称量结果不解码为字符串；
+      另外对比从字节流到解析结果的完整过程（帧重组 + 解析，按最长48字节的接收分片）
+    - result(poll)为轮询模式下重复回复的同一条结果，result(push)为每条都不同的结果
+统计每秒解析条数和每条消息净分配的内存块数。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_parse_response.py [--messages 200000] [--repeat 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.frame_reassembler import FrameReassembler
+from core.protocol_handler import parse_buffer, parse_message
+
+# 控制通道各类消息样本
+CASES = [
+    ('new_target', ['new_target']),
+    ('executing', ['executing']),
+    ('executing(v2)', ['@1234 executing']),
+    ('vial_weight', ['8.4031', '10.2', '9.87654']),
+    ('unknown', ['garbage', 'hello world']),
+]
+
+# 控制通道典型混合流：约90% executing，其余为new_target和瓶重
+MIXED = ['executing'] * 17 + ['new_target', '8.4031']
+
+# 数据通道的字节流样本：v1结果之间以空格分隔（按字段个数分帧），v2结果以换行结束
+DATA_CASES = [
+    ('not_ready', ['9 9 9']),
+    ('result(poll)', ['0.00213 0.0011 0.5 37.2 ']),
+    ('result(push)', ['0.00213 0.0011 0.5 37.2 ', '-0.0041 -0.002 0.2 65.9 ']),
+    ('result(v2)', ['@17 0.00213 0.0011 0.5 37.2\n', '@18 -0.0041 -0.002 0.2 65.9\n']),
+    # 轮询模式典型混合流：称量过程中回复"9 9 9"，称量结束后重复回复同一条结果
+    ('mixed(data)', ['9 9 9'] * 9 + ['-0.0041 -0.002 0.2 65.9 ']),
+]
+
+
+def legacy_parse_response(response):
+    """
+    旧实现（改写前的ProtocolHandler.parse_response），作为基准
+    """
+    try:
+        response = response.strip()
+        if response == 'new_target':
+            return {'command': 'new_target', 'data': None}
+        elif response == 'target':
+            return {'command': 'target', 'data': None}
+        elif 'executing' in response:
+            return {'command': 'executing', 'data': response}
+        elif response.endswith('#'):
+            response = response[:-1]
+            data_parts = response.split()
+            if len(data_parts) >= 4:
+                return {
+                    'command': 'data',
+                    'data': {
+                        'target_weight': float(data_parts[0]),
+                        'shaking_amplitude': float(data_parts[1]),
+                        'current_weight': float(data_parts[2]),
+                        'shaking_angle': float(data_parts[3])
+                    }
+                }
+            else:
+                return {'command': 'unknown', 'data': response}
+    except Exception as e:
+        return {'command': 'error', 'data': str(e)}
+
+
+def legacy_parse_result(frame):
+    """
+    旧实现中数据通道对称量结果的解析（Station.handle_data_frame）
+    """
+    if frame != "9 9 9":
+        data_parts = frame.split()
+        if len(data_parts) >= 4:
+            return {
+                'accuracy': float(data_parts[0]),
+                'difference': float(data_parts[1]),
+                'target_weight': float(data_parts[2]),
+                'time': float(data_parts[3])
+            }
+    return None
+
+
+def legacy_split_sequence(message):
+    """
+    旧实现中协议v2序号前缀的拆分（改写前的ProtocolHandler.split_sequence）
+    """
+    if not message.startswith('@'):
+        return None, message
+    tag, _, body = message.partition(' ')
+    try:
+        return int(tag[1:]), body.strip()
+    except ValueError:
+        return None, message
+
+
+def legacy_parse_tagged(frame):
+    """
+    协议v2带序号的请求：旧实现先拆分序号前缀再调用parse_response
+    """
+    sequence, body = legacy_split_sequence(frame)
+    return sequence, legacy_parse_response(body)
+
+
+def legacy_parse_tagged_result(frame):
+    """
+    协议v2带序号的结果：旧实现先拆分序号前缀再按结果解析
+    """
+    sequence, body = legacy_split_sequence(frame)
+    return sequence, legacy_parse_result(body)
+
+
+def run_strings(parse, frames, results):
+    """
+    逐帧解析字符串，结果追加到results
+    """
+    append = results.append
+    for frame in frames:
+        append(parse(frame))
+
+
+def build_buffer(samples, count):
+    """
+    把数据通道消息依次写入一个缓冲区，模拟帧重组器中的数据
+
+    返回:
+        tuple: (缓冲区, 每帧的(起始, 结束)位置列表)
+    """
+    buffer = bytearray()
+    spans = []
+    for i in range(count):
+        frame = samples[i % len(samples)].strip().encode('ascii')
+        spans.append((len(buffer), len(buffer) + len(frame)))
+        buffer += frame + b' '
+    return buffer, spans
+
+
+def run_decoded(buffer, spans, parse, results):
+    """
+    逐帧把缓冲区切片解码为字符串后解析，结果追加到results
+    """
+    view = memoryview(buffer)
+    append = results.append
+    for start, stop in spans:
+        append(parse(str(view[start:stop], 'ascii', 'replace')))
+
+
+def run_buffer(buffer, spans, results):
+    """
+    逐帧在缓冲区上直接解析，结果追加到results
+    """
+    view = memoryview(buffer)
+    append = results.append
+    for start, stop in spans:
+        append(parse_buffer(view, start, stop))
+
+
+def build_chunks(samples, count, size=48):
+    """
+    把数据通道消息依次拼接为字节流并按接收长度切分
+
+    返回:
+        list: 分片列表
+    """
+    stream = ''.join(samples[i % len(samples)] for i in range(count)).encode('ascii')
+    return [stream[offset:offset + size] for offset in range(0, len(stream), size)]
+
+
+def run_stream(chunks, parser, parse, results):
+    """
+    模拟接收线程：分片写入帧重组器的缓冲区后逐帧取出，parse不为None时对帧字符串再做解析
+    """
+    reassembler = FrameReassembler(mode='data', capacity=8192, parser=parser)
+    append = results.append
+    for chunk in chunks:
+        offset = 0
+        while offset < len(chunk):
+            target = reassembler.write_buffer()
+            size = min(len(target), len(chunk) - offset)
+            target[:size] = chunk[offset:offset + size]
+            reassembler.commit(size)
+            offset += size
+            if parse is None:
+                for message in reassembler.frames():
+                    append(message)
+            else:
+                for frame in reassembler.frames():
+                    append(parse(frame))
+
+
+def measure(fn, count, repeat):
+    """
+    多次运行取最快一次，并统计每条消息净分配的内存块数
+
+    返回:
+        tuple: (每秒条数, 每条净分配内存块数)
+    """
+    best = None
+    blocks = 0.0
+    for _ in range(repeat):
+        results = []
+        gc.collect()
+        gc.disable()
+        try:
+            blocks_before = sys.getallocatedblocks()
+            start = time.perf_counter()
+            fn(results)
+            elapsed = time.perf_counter() - start
+            blocks_after = sys.getallocatedblocks()
+        finally:
+            gc.enable()
+        # 结果列表本身的内存块不计入
+        blocks = (blocks_after - blocks_before - 1) / count
+        if best is None or elapsed < best:
+            best = elapsed
+        del results
+    return count / best, blocks
+
+
+def bench_case(name, samples, count, repeat, legacy):
+    """
+    执行单个消息类型的基准测试并打印一行结果
+    """
+    frames = [samples[i % len(samples)] for i in range(count)]
+
+    old_rate, old_blocks = measure(lambda results: run_strings(legacy, frames, results), count, repeat)
+    new_rate, new_blocks = measure(lambda results: run_strings(parse_message, frames, results), count, repeat)
+
+    print(f"{name:<14} {old_rate:>12,.0f} {old_blocks:>6.2f} {new_rate:>12,.0f} {new_blocks:>6.2f} "
+          f"{new_rate / old_rate:>7.2f}x")
+
+
+def bench_stream(name, samples, count, repeat, legacy):
+    """
+    执行单个数据通道消息类型的缓冲区解析和帧重组+解析基准测试并打印一行结果
+    """
+    buffer, spans = build_buffer(samples, count)
+    chunks = build_chunks(samples, count)
+
+    old_rate, old_blocks = measure(lambda results: run_decoded(buffer, spans, legacy, results), count, repeat)
+    new_rate, new_blocks = measure(lambda results: run_buffer(buffer, spans, results), count, repeat)
+    old_stream, _ = measure(lambda results: run_stream(chunks, None, legacy, results), count, repeat)
+    new_stream, _ = measure(lambda results: run_stream(chunks, parse_buffer, None, results), count, repeat)
+
+    print(f"{name:<14} {old_rate:>12,.0f} {old_blocks:>6.2f} {new_rate:>12,.0f} {new_blocks:>6.2f} "
+          f"{new_rate / old_rate:>7.2f}x {old_stream:>12,.0f} {new_stream:>12,.0f} {new_stream / old_stream:>7.2f}x")
+
+
+def check_equivalence():
+    """
+    检查新旧实现对各类消息的解析结果一致
+    """
+    for frame in ['new_target', 'executing', ' new_target\n', 'target', '1 2 3 4 #', '1 2 3 4#', 'xx executing']:
+        old = legacy_parse_response(frame)
+        new = parse_message(frame)
+        assert old['command'] == new.kind, (frame, old, new)
+    for frame in ['0.00213 0.0011 0.5 37.2', '9 9 9']:
+        old = legacy_parse_result(frame)
+        new = parse_message(frame)
+        assert (old is None) == (new.kind != 'result'), (frame, old, new)
+        if old is not None:
+            assert list(old.values()) == list(new.values), (frame, old, new)
+    # 缓冲区解析与字符串解析的结果一致
+    for frame in ['9 9 9', '0.00213 0.0011 0.5 37.2', '@17 -0.0041 -0.002 0.2 65.9', '@17 9 9 9', '8.4031',
+                  'protocol 2', 'subscribed 10', 'unsubscribed', '1 2 3 4#', 'garbage', '@x 1 2 3 4', '']:
+        buffer = memoryview(bytearray(b'\n' + frame.encode('ascii') + b'\n'))
+        assert repr(parse_buffer(buffer, 1, len(buffer) - 1)) == repr(parse_message(frame)), frame
+    # 旧实现对无法识别的消息返回None，新实现给出明确的unknown
+    assert legacy_parse_response('garbage') is None
+    assert parse_message('garbage').kind == 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parse_response基准测试")
+    parser.add_argument('--messages', type=int, default=200000, help="每种消息类型的解析条数")
+    parser.add_argument('--repeat', type=int, default=5, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    check_equivalence()
+    print("单位: 条/秒，块 = 每条消息净分配的内存块数（含结果对象本身）")
+    print("控制通道（字符串帧）")
+    print(f"{'消息类型':<10} {'旧实现':>12} {'块':>6} {'新实现':>12} {'块':>6} {'加速比':>8}")
+    for name, samples in CASES:
+        legacy = legacy_parse_tagged if name == 'executing(v2)' else legacy_parse_response
+        bench_case(name, samples, args.messages, args.repeat, legacy)
+    bench_case('mixed(ctrl)', MIXED, args.messages, args.repeat, legacy_parse_response)
+    print("注: 旧实现不解析瓶重和无法识别的消息（返回None），新实现给出瓶重数值和明确的unknown")
+
+    print()
+    print("数据通道（缓冲区中的帧 / 帧重组 + 解析）")
+    print(f"{'消息类型':<10} {'旧实现':>12} {'块':>6} {'新实现(buffer)':>12} {'块':>6} {'加速比':>8} "
+          f"{'旧实现(重组)':>10} {'新实现(重组)':>10} {'加速比':>8}")
+    for name, samples in DATA_CASES:
+        legacy = legacy_parse_tagged_result if name == 'result(v2)' else legacy_parse_result
+        bench_stream(name, samples, args.messages, args.repeat, legacy)
+
+
+if __name__ == '__main__':
+    main()
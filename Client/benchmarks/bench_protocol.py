@@ -0,0 +1,150 @@
+"""
+控制协议编解码基准测试
+
+对比协议v1（ASCII，"t a c ang #"）与协议v2（20字节定长二进制）控制指令的
+编码（客户端ProtocolHandler）和解码（RAPID端Parsemsg / ReceiveCommand的Python等价实现）开销，
+并统计每条消息的字节数。v1另外对比旧的f-string编码（浮点数完整表示）。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_protocol.py [--messages 200000] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.protocol_handler import ProtocolHandler, PROTOCOL_V1, PROTOCOL_V2
+from tools.rapid_stand_in import parse_msg
+
+
+def build_commands(count, rng):
+    """
+    生成模拟控制指令参数，数值范围与Excel中的工艺参数一致
+
+    参数:
+        count: 指令条数
+        rng: 随机数生成器
+
+    返回:
+        list: (目标重量, 抖动幅度, 当前重量, 抖动角度) 列表
+    """
+    commands = []
+    for _ in range(count):
+        # 当前重量由天平读数换算而来，不做舍入
+        commands.append((rng.choice([0.02, 0.2, 0.5, 1.0]), rng.randint(1, 10),
+                         rng.uniform(0, 1.0), rng.randint(0, 90)))
+    return commands
+
+
+def legacy_encode_all(commands):
+    """
+    旧实现的v1编码（f-string，浮点数完整表示）
+
+    返回:
+        tuple: (数据包列表, 耗时)
+    """
+    start = time.perf_counter()
+    packets = [f"{t} {a} {c} {ang} #" for t, a, c, ang in commands]
+    return packets, time.perf_counter() - start
+
+
+def encode_all(handler, commands):
+    """
+    编码全部指令
+
+    返回:
+        tuple: (数据包列表, 耗时)
+    """
+    encode = handler.format_control_packet
+    start = time.perf_counter()
+    packets = [encode(*command) for command in commands]
+    return packets, time.perf_counter() - start
+
+
+def decode_v1(packets):
+    """
+    按RAPID的Parsemsg解码v1指令（数据包为客户端发送的字符串）
+
+    返回:
+        tuple: (解码结果列表, 耗时)
+    """
+    decoded = []
+    start = time.perf_counter()
+    for packet in packets:
+        command = [0.0] * 4
+        parse_msg(packet, command)
+        decoded.append(command)
+    return decoded, time.perf_counter() - start
+
+
+def decode_v2(packets):
+    """
+    按ReceiveCommand解码v2指令
+
+    返回:
+        tuple: (解码结果列表, 耗时)
+    """
+    decode = ProtocolHandler.decode_control_v2
+    decoded = []
+    start = time.perf_counter()
+    for packet in packets:
+        message = decode(packet)
+        decoded.append([message['target_weight'], message['shaking_amplitude'],
+                        message['current_weight'], message['shaking_angle']])
+    return decoded, time.perf_counter() - start
+
+
+def max_error(commands, decoded):
+    """
+    计算解码结果与原始参数的最大绝对误差（v2使用float32）
+    """
+    return max(abs(a - b) for command, values in zip(commands, decoded) for a, b in zip(command, values))
+
+
+def bench(version, commands):
+    """
+    执行单个协议版本的基准测试并打印结果
+    """
+    handler = ProtocolHandler(preferred_version=version, ack_timeout=1.0)
+    handler.version = version
+
+    # 预热
+    encode_all(handler, commands[:1000])
+
+    packets, encode_time = encode_all(handler, commands)
+    if version == PROTOCOL_V1:
+        decoded, decode_time = decode_v1(packets)
+    else:
+        decoded, decode_time = decode_v2(packets)
+
+    count = len(commands)
+    sizes = [len(packet) for packet in packets]
+    print(f"[v{version}] 指令数: {count}")
+    if version == PROTOCOL_V1:
+        legacy_packets, legacy_time = legacy_encode_all(commands)
+        legacy_sizes = [len(packet) for packet in legacy_packets]
+        print(f"  旧编码: {count / legacy_time:,.0f} 条/秒, {legacy_time / count * 1e6:.2f} 微秒/条, "
+              f"每条字节数 平均 {sum(legacy_sizes) / count:.1f}, 最大 {max(legacy_sizes)}")
+    print(f"  编码: {count / encode_time:,.0f} 条/秒, {encode_time / count * 1e6:.2f} 微秒/条")
+    print(f"  解码: {count / decode_time:,.0f} 条/秒, {decode_time / count * 1e6:.2f} 微秒/条")
+    print(f"  每条字节数: 平均 {sum(sizes) / count:.1f}, 最小 {min(sizes)}, 最大 {max(sizes)}")
+    print(f"  解码最大误差: {max_error(commands, decoded):.3g}")
+    print(f"  编码统计: {handler.encoder.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="控制协议编解码基准测试")
+    parser.add_argument('--messages', type=int, default=200000, help="控制指令条数")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    commands = build_commands(args.messages, random.Random(args.seed))
+    for version in (PROTOCOL_V1, PROTOCOL_V2):
+        bench(version, commands)
+
+
+if __name__ == '__main__':
+    main()
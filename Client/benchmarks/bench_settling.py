@@ -0,0 +1,166 @@
+"""
+稳定重量预测离线评估
+
+按工位的处理方式（Station._on_balance_reading）逐条回放天平读数流：StabilityDetector判定稳定，
+天平未稳定期间SettlingPredictor由过渡过程读数预测稳定重量。读数流中每次扰动后检测器判定稳定
+作为一个称量过程，统计：
+    - 给出预测的比例，预测比检测器判定稳定提前的时间（平均/P95）
+    - 预测误差（平均/最大，mg）和置信区间覆盖率
+    - 检测器判定稳定的误差
+真实稳定重量取判定稳定后truth_time秒内（保持稳定期间）的读数平均值；合成读数流已知真实重量，直接使用。
+
+读数流来源：
+    - tools/record_balance.py 录制的CSV文件（time,weight,stable）
+    - 不指定文件时使用与 bench_stability.py 相同的合成读数流（多次称量首尾相接）
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_settling.py [balance_20250101_120000.csv ...] [--trials 300] [--rate 10]
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_stability import generate_stream
+from core.stability import StabilityDetector, SettlingPredictor
+
+
+def load_stream(path):
+    """
+    读取录制的读数流
+
+    返回:
+        list: [(时间戳, 重量), ...]
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        return [(float(row['time']), float(row['weight'])) for row in csv.DictReader(file)]
+
+
+def synthetic_stream(args):
+    """
+    把多次合成的称量过程首尾相接
+
+    返回:
+        tuple: ([(时间戳, 重量), ...], [(落料结束时间戳, 真实重量), ...])
+    """
+    rng = random.Random(args.seed)
+    stream, truths = [], []
+    offset = 0.0
+    for _ in range(args.trials):
+        mass, samples = generate_stream(rng, args)
+        offset -= samples[0][0]
+        stream.extend((offset + t, value) for t, value in samples)
+        truths.append((offset, mass))
+        offset += samples[-1][0] + 1.0 / args.rate
+    return stream, truths
+
+
+def replay(stream, detector, predictor, truth_time):
+    """
+    回放读数流
+
+    返回:
+        list: 每个称量过程的 {'settled': 判定稳定的时间戳, 'weight': 检测器的稳定重量, 'truth': 稳定后读数平均值,
+              'prediction': (时间戳, 重量, 置信区间半宽)，没有预测时为None}
+    """
+    episodes = []
+    current = None
+    prediction = None
+    predict_time = 0.0
+    for timestamp, weight in stream:
+        was_settled = detector.settled
+        reading = detector.update(timestamp, weight)
+        if not detector.settled:
+            if was_settled:
+                predictor.reset()
+                prediction = None
+            start = time.perf_counter()
+            predicted = predictor.update(timestamp, weight)
+            predict_time += time.perf_counter() - start
+            if predicted is not None and prediction is None:
+                prediction = (timestamp, predicted.weight, predicted.bound)
+        if reading is not None and reading.first:
+            current = {'settled': timestamp, 'weight': reading.weight, 'prediction': prediction, 'readings': []}
+            episodes.append(current)
+            prediction = None
+        if current is not None:
+            if detector.settled and timestamp - current['settled'] <= truth_time:
+                current['readings'].append(weight)
+            else:
+                current = None
+    for episode in episodes:
+        readings = episode.pop('readings')
+        episode['truth'] = sum(readings) / len(readings)
+    return episodes, predict_time
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def report(label, episodes, truths=None):
+    """
+    输出一个读数流的评估结果
+
+    参数:
+        truths: [(落料结束时间戳, 真实重量), ...]，None则使用稳定后读数的平均值
+    """
+    if truths is not None:
+        for episode in episodes:
+            # 落料结束时间不晚于判定稳定时间的最后一个称量过程
+            episode['truth'] = max((t, mass) for t, mass in truths if t <= episode['settled'])[1]
+    predicted = [episode for episode in episodes if episode['prediction'] is not None]
+    print(f"{label}: {len(episodes)} 次称量，给出预测 {len(predicted)} 次")
+    if not episodes:
+        return
+    detector_errors = [abs(episode['weight'] - episode['truth']) * 1000 for episode in episodes]
+    print(f"  检测器  误差 平均 {statistics.mean(detector_errors):.3f} mg，最大 {max(detector_errors):.3f} mg")
+    if not predicted:
+        return
+    leads = [episode['settled'] - episode['prediction'][0] for episode in predicted]
+    errors = [abs(episode['prediction'][1] - episode['truth']) for episode in predicted]
+    covered = sum(error <= episode['prediction'][2] for error, episode in zip(errors, predicted)) / len(predicted)
+    print(f"  预测    提前 平均 {statistics.mean(leads):.2f} s，P95 {percentile(leads, 0.95):.2f} s；"
+          f"误差 平均 {statistics.mean(errors) * 1000:.3f} mg，最大 {max(errors) * 1000:.3f} mg；"
+          f"置信区间覆盖率 {covered:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="稳定重量预测离线评估")
+    parser.add_argument('streams', nargs='*', help="tools/record_balance.py录制的CSV文件，不指定则使用合成读数流")
+    parser.add_argument('--truth-time', type=float, default=2.0, help="真实稳定重量取判定稳定后多少秒内的读数（秒）")
+    parser.add_argument('--trials', type=int, default=300, help="合成读数流的称量次数")
+    parser.add_argument('--rate', type=float, default=10.0, help="合成读数流的天平输出频率（Hz）")
+    parser.add_argument('--noise', type=float, default=0.00003, help="合成读数流稳定后的读数噪声（g）")
+    parser.add_argument('--resolution', type=float, default=0.0001, help="天平分辨率（g）")
+    parser.add_argument('--spike-rate', type=float, default=0.02, help="合成读数流每条读数出现尖峰的概率")
+    parser.add_argument('--pre-time', type=float, default=1.0, help="合成读数流的落料持续时间（秒）")
+    parser.add_argument('--max-wait', type=float, default=5.0, help="合成读数流落料结束后的时长（秒）")
+    parser.add_argument('--max-bound', type=float, default=None, help="给出预测的最大置信区间半宽（g），默认读取配置")
+    parser.add_argument('--min-span', type=float, default=None, help="开始预测所需的最短读数跨度（秒），默认读取配置")
+    parser.add_argument('--seed', type=int, default=1, help="合成读数流的随机种子")
+    args = parser.parse_args()
+
+    if args.streams:
+        sources = [(path, load_stream(path), None) for path in args.streams]
+    else:
+        stream, truths = synthetic_stream(args)
+        sources = [(f"合成读数流（{args.rate:g} Hz）", stream, truths)]
+
+    for label, stream, truths in sources:
+        detector = StabilityDetector(resolution=args.resolution)
+        predictor = SettlingPredictor(max_bound=args.max_bound, min_span=args.min_span, resolution=args.resolution)
+        episodes, predict_time = replay(stream, detector, predictor, args.truth_time)
+        report(label, episodes, truths)
+        if predictor.fits:
+            print(f"  拟合 {predictor.fits} 次，每次 {predict_time / predictor.fits * 1e6:.0f} 微秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+天平稳定检测基准测试
+
+用合成的天平读数流比较两种读取稳定重量的方式：
+    - 固定等待: 与RAPID端calculate_difference原来的做法一致，落料结束后等待baseline_wait秒，再取5条读数的平均值
+    - 稳定检测: core.stability.StabilityDetector逐条处理读数，落料结束guard秒后收到的第一个稳定重量
+      （RAPID端先等待settle_guard秒再等待新的稳定重量）
+统计每次称量从落料结束到得到重量的时间（平均/P95）、误差（平均/最大，mg）、
+稳定检测的置信区间覆盖率，以及在max_wait秒内未判定稳定（RAPID端回退到固定等待）的比例。
+
+合成读数流：落料期间重量逐步增加并带冲击，落料结束后为真实重量加衰减振荡、高斯噪声、
+偶发的单点尖峰（气流、碰撞），并按天平分辨率取整。
+
+用法（在Client目录下执行）:
+    python benchmarks/bench_stability.py [--trials 500] [--rate 10] [--window 8]
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.stability import StabilityDetector
+
+
+def generate_stream(rng, args):
+    """
+    生成一次称量的读数流，落料结束时刻为0
+
+    返回:
+        tuple: (真实重量（g）, [(时间戳, 读数), ...])
+    """
+    start = rng.uniform(0.5, 2.0)
+    mass = start + rng.uniform(0.002, 0.05)
+    amplitude = rng.uniform(0.002, 0.01) * rng.choice((-1, 1))
+    tau = rng.uniform(0.15, 0.6)
+    frequency = rng.uniform(1.5, 5.0)
+    phase = rng.uniform(0, 2 * math.pi)
+    step = 1.0 / args.rate
+
+    samples = []
+    t = -args.pre_time
+    while t < args.max_wait + 1.0:
+        if t < 0:
+            # 落料过程：重量线性增加，抖动带来较大的冲击
+            progress = (t + args.pre_time) / args.pre_time
+            value = start + (mass - start) * progress + rng.gauss(0.0, 0.003)
+        else:
+            value = mass + amplitude * math.exp(-t / tau) * math.cos(2 * math.pi * frequency * t + phase)
+            value += rng.gauss(0.0, args.noise)
+            if rng.random() < args.spike_rate:
+                value += rng.choice((-1, 1)) * rng.uniform(0.001, 0.003)
+        samples.append((t, round(value / args.resolution) * args.resolution))
+        t += step
+    return mass, samples
+
+
+def baseline(mass, samples, args):
+    """
+    固定等待baseline_wait秒后取5条读数的平均值
+
+    返回:
+        tuple: (耗时, 误差)
+    """
+    readings = [value for t, value in samples if t >= args.baseline_wait][:5]
+    elapsed = args.baseline_wait + 5 / args.rate
+    return elapsed, sum(readings) / len(readings) - mass
+
+
+def detect(mass, samples, detector, args):
+    """
+    稳定检测器在落料结束后第一次判定稳定时的重量
+
+    返回:
+        tuple: (耗时, 误差, 置信区间半宽)，max_wait秒内未判定稳定时返回None
+    """
+    detector.reset()
+    for t, value in samples:
+        reading = detector.update(t, value)
+        if t > args.max_wait:
+            return None
+        if reading is not None and t >= args.guard:
+            return t, reading.weight - mass, reading.bound
+    return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天平稳定检测基准测试")
+    parser.add_argument('--trials', type=int, default=500, help="称量次数")
+    parser.add_argument('--rate', type=float, default=10.0, help="天平输出频率（Hz）")
+    parser.add_argument('--noise', type=float, default=0.00003, help="稳定后的读数噪声（g）")
+    parser.add_argument('--resolution', type=float, default=0.0001, help="天平分辨率（g）")
+    parser.add_argument('--spike-rate', type=float, default=0.02, help="每条读数出现尖峰的概率")
+    parser.add_argument('--pre-time', type=float, default=1.0, help="落料持续时间（秒）")
+    parser.add_argument('--baseline-wait', type=float, default=2.0, help="固定等待时间（秒）")
+    parser.add_argument('--guard', type=float, default=0.3, help="落料结束后开始接受稳定重量的时间（秒），与RAPID的settle_guard一致")
+    parser.add_argument('--max-wait', type=float, default=5.0, help="等待稳定重量的最长时间（秒），与RAPID的settle_max_time一致")
+    parser.add_argument('--median-window', type=int, default=None, help="中值滤波窗口，默认读取配置")
+    parser.add_argument('--fir-taps', type=int, default=None, help="FIR滑动平均抽头数，默认读取配置")
+    parser.add_argument('--window', type=int, default=None, help="稳定判定窗口，默认读取配置")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    args = parser.parse_args()
+
+    detector = StabilityDetector(median_window=args.median_window, fir_taps=args.fir_taps, window=args.window,
+                                 resolution=args.resolution, baseline_wait=args.baseline_wait)
+    rng = random.Random(args.seed)
+    fixed, detected, timeouts = [], [], 0
+    for _ in range(args.trials):
+        mass, samples = generate_stream(rng, args)
+        fixed.append(baseline(mass, samples, args))
+        result = detect(mass, samples, detector, args)
+        if result is None:
+            timeouts += 1
+        else:
+            detected.append(result)
+
+    print(f"{args.trials} 次称量，{args.rate:g} Hz，中值 {detector.median_window} / FIR {detector.fir_taps} / "
+          f"窗口 {detector.window} 条")
+    print(f"{'方式':<8} {'平均耗时/s':>8} {'P95/s':>7} {'平均误差/mg':>8} {'最大误差/mg':>8}")
+    for label, results in (('固定等待', fixed), ('稳定检测', detected)):
+        if not results:
+            print(f"{label:<8} 无结果")
+            continue
+        times = [result[0] for result in results]
+        errors = [abs(result[1]) * 1000 for result in results]
+        print(f"{label:<10} {statistics.mean(times):>10.2f} {percentile(times, 0.95):>8.2f} "
+              f"{statistics.mean(errors):>12.3f} {max(errors):>12.3f}")
+    if detected:
+        covered = sum(abs(error) <= bound for _, error, bound in detected) / len(detected)
+        saved = statistics.mean(result[0] for result in fixed) - statistics.mean(result[0] for result in detected)
+        print(f"置信区间覆盖率 {covered:.1%}，超时回退 {timeouts / args.trials:.1%}，平均每次节省 {saved:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
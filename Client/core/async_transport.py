@@ -0,0 +1,440 @@
+import asyncio
+import socket
+import threading
+from .communication import TCPCommunication
+from .logger import system_logger
+
+
+class AsyncioLoopThread:
+    """
+    共享的asyncio事件循环线程，所有通讯通道都运行在这一个事件循环上
+
+    与Qt主线程分离运行：Qt事件循环保持响应，网络读写不再各占一个阻塞线程
+    """
+
+    def __init__(self, name='AsyncTransportLoop'):
+        """
+        初始化事件循环线程
+
+        参数:
+            name: 线程名称
+        """
+        self.name = name
+        self.loop = None
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        启动事件循环线程（重复调用无副作用）
+
+        返回:
+            asyncio.AbstractEventLoop: 事件循环
+        """
+        with self._lock:
+            if self.loop is not None and self.thread is not None and self.thread.is_alive():
+                return self.loop
+
+            self.loop = asyncio.new_event_loop()
+            started = threading.Event()
+            self.thread = threading.Thread(target=self._run, args=(started,), name=self.name, daemon=True)
+            self.thread.start()
+            started.wait()
+            system_logger.info("异步通讯事件循环已启动")
+            return self.loop
+
+    def _run(self, started):
+        """
+        事件循环线程主函数
+        """
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def in_loop_thread(self):
+        """
+        判断当前是否运行在事件循环线程中
+
+        返回:
+            bool: 是否在事件循环线程中
+        """
+        return self.thread is not None and threading.current_thread() is self.thread
+
+    def submit(self, coro):
+        """
+        在事件循环中执行协程（线程安全）
+
+        参数:
+            coro: 协程对象
+
+        返回:
+            concurrent.futures.Future: 协程执行结果
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """
+        在事件循环中调度一个普通函数（线程安全）
+
+        参数:
+            callback: 要执行的函数
+            args: 函数参数
+        """
+        self.start()
+        if self.in_loop_thread():
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        """
+        停止事件循环线程
+        """
+        with self._lock:
+            if self.loop is None or not self.loop.is_running():
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self.thread is not None and not self.in_loop_thread():
+                self.thread.join(timeout=5)
+            system_logger.info("异步通讯事件循环已停止")
+
+
+class _ChannelProtocol(asyncio.BufferedProtocol):
+    """
+    单个TCP通道的协议实现，数据直接写入通讯对象的帧重组缓冲区
+    """
+
+    def __init__(self, comm):
+        self.comm = comm
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.comm.reassembler.write_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.comm._on_bytes_received(nbytes)
+
+    def eof_received(self):
+        # 返回False让传输层关闭连接，随后触发connection_lost
+        return False
+
+    def connection_lost(self, exc):
+        self.comm._on_connection_lost(exc)
+    
+    def pause_writing(self):
+        # 发送缓冲区超过高水位，暂停从发送队列取消息
+        self.comm._write_paused = True
+    
+    def resume_writing(self):
+        self.comm._write_paused = False
+        self.comm._drain_send_queue()
+
+
+class AsyncTCPCommunication(TCPCommunication):
+    """
+    基于asyncio的TCP通信类，接口与TCPCommunication一致
+
+    所有实例共享一个事件循环线程，读写操作都可以随时取消，
+    通道数量增加时不再需要为每个socket创建接收线程
+    """
+
+    def __init__(self, port=None, comm_type='CTRL_COM', loop_thread=None):
+        """
+        初始化异步TCP通信类
+
+        参数:
+            port: 指定端口号，None则使用配置文件中的默认端口
+            comm_type: 通讯类型，'CTRL_COM'表示控制通讯，'DATA_COM'表示数据通讯
+            loop_thread: 事件循环线程，None则使用全局共享的事件循环
+        """
+        super().__init__(port, comm_type)
+        self.loop_thread = loop_thread or global_loop_thread
+        self.transport = None
+        self._closing = False
+        self._flush_handle = None
+        self._reconnect_task = None
+        self._write_paused = False
+
+    def connect(self):
+        """
+        连接到机器人服务器
+
+        返回:
+            bool: 连接是否成功
+        """
+        self._user_disconnect = False
+        self._reconnect_cancel.clear()
+        self.logger.info(f"正在连接到机器人服务器: {self.host}:{self.port}")
+        future = self.loop_thread.submit(self._connect())
+        try:
+            return future.result(timeout=self.timeout + 1)
+        except Exception as e:
+            future.cancel()
+            self.logger.error(f"连接机器人服务器失败: {e}")
+            if self.error_callback:
+                self.error_callback(f"连接失败: {str(e)}")
+            return False
+
+    async def _connect(self):
+        """
+        建立连接的协程
+        """
+        try:
+            await self._open_connection_async()
+        except asyncio.TimeoutError:
+            self.logger.error(f"连接机器人服务器超时: {self.host}:{self.port}")
+            if self.error_callback:
+                self.error_callback("连接超时")
+            return False
+        except ConnectionRefusedError:
+            self.logger.error(f"机器人服务器拒绝连接: {self.host}:{self.port}")
+            if self.error_callback:
+                self.error_callback("连接被拒绝")
+            return False
+        except Exception as e:
+            self.logger.error(f"连接机器人服务器失败: {e}")
+            if self.error_callback:
+                self.error_callback(f"连接失败: {str(e)}")
+            return False
+
+        self.logger.info(f"成功连接到机器人服务器: {self.host}:{self.port}")
+        return True
+
+    async def _open_connection_async(self):
+        """
+        建立连接，失败时抛出异常
+        """
+        loop = asyncio.get_running_loop()
+        transport, _ = await asyncio.wait_for(
+            loop.create_connection(lambda: _ChannelProtocol(self), self.host, self.port),
+            timeout=self.timeout
+        )
+
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            # 按配置开启或关闭Nagle算法
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if self.tcp_nodelay else 0)
+
+        # 清空上一次连接残留的半帧数据、未配对的请求和未发出的消息
+        self.reassembler.reset()
+        self.latency.clear_pending()
+        self._discard_queued_messages()
+        self.transport = transport
+        self._write_paused = False
+        self._closing = False
+        self.stop_event.clear()
+        self.is_connected = True
+        self._capture_event('connected')
+
+    def disconnect(self):
+        """
+        断开与机器人服务器的连接
+        """
+        try:
+            # 手动断开时停止自动重连
+            self._user_disconnect = True
+            self._reconnect_cancel.set()
+            self._discard_incident()
+
+            self.stop_event.set()
+            self._closing = True
+            self.is_connected = False
+            if self.transport is not None or self._reconnect_task is not None:
+                self.loop_thread.call_soon(self._close_transport)
+            self.logger.info(f"已断开与机器人服务器的连接: {self.host}:{self.port}")
+        except Exception as e:
+            self.logger.error(f"断开连接时发生错误: {e}")
+
+    def _close_transport(self):
+        """
+        在事件循环中关闭传输层并取消挂起的读操作和重连任务
+        """
+        self._cancel_flush()
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def start_receive_thread(self):
+        """
+        异步实现中数据由事件循环接收，不需要单独的接收线程
+        """
+        pass
+
+    def start_send_thread(self):
+        """
+        异步实现中发送队列由事件循环写出，不需要单独的发送线程
+        """
+        pass
+
+    def _on_bytes_received(self, nbytes):
+        """
+        收到数据后的处理（在事件循环线程中执行）
+
+        参数:
+            nbytes: 写入缓冲区的字节数
+        """
+        self._cancel_flush()
+        self._capture_received(nbytes)
+        self.reassembler.commit(nbytes)
+        for frame in self.reassembler.frames():
+            self._dispatch_frame(frame)
+
+        # 有残余数据时启动空闲定时器，超时即提交残余数据
+        if self.reassembler.has_pending() and not self._closing:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.frame_idle_timeout, self._flush_pending
+            )
+
+    def _flush_pending(self):
+        """
+        接收空闲时提交残余数据
+        """
+        self._flush_handle = None
+        for frame in self.reassembler.flush():
+            self._dispatch_frame(frame)
+        if self.reassembler.has_pending() and not self._closing:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.frame_idle_timeout, self._flush_pending
+            )
+
+    def _cancel_flush(self):
+        """
+        取消空闲提交定时器
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _on_connection_lost(self, exc):
+        """
+        连接断开后的处理（在事件循环线程中执行）
+
+        参数:
+            exc: 断开原因，None表示对端正常关闭
+        """
+        self._cancel_flush()
+        self.transport = None
+        was_connected = self.is_connected
+        self.is_connected = False
+        if self._closing or not was_connected:
+            return
+
+        if exc is None:
+            self.logger.warning("机器人服务器连接已关闭")
+            self._connection_lost("连接已关闭")
+        else:
+            self.logger.error(f"接收数据时发生socket错误: {exc}")
+            self._connection_lost(f"接收错误: {str(exc)}")
+
+    def _schedule_reconnect(self):
+        """
+        在事件循环中启动重连任务
+        """
+        self.loop_thread.call_soon(self._start_reconnect_task)
+
+    def _start_reconnect_task(self):
+        """
+        创建重连任务（在事件循环线程中执行）
+        """
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            return
+        self._reconnect_task = self.loop_thread.loop.create_task(self._reconnect_async())
+
+    async def _reconnect_async(self):
+        """
+        按退避策略反复尝试重连，直到成功、被取消或次数用完
+        """
+        attempt = 0
+        try:
+            while True:
+                await asyncio.sleep(self.backoff.delay(attempt))
+                if self._reconnect_cancel.is_set():
+                    return
+                if self.is_connected:
+                    # 已被手动重新连接
+                    break
+
+                attempt += 1
+                self._notify_status('reconnecting', attempt)
+                try:
+                    await self._open_connection_async()
+                    break
+                except Exception as e:
+                    if self._reconnect_attempt_failed(attempt, e):
+                        return
+        finally:
+            self._reconnect_task = None
+
+        self._finish_incident(attempt)
+
+    def send_data(self, data, priority=None, reply=False):
+        """
+        发送数据到机器人服务器（线程安全，放入发送队列后立即返回）
+
+        参数:
+            data: 要发送的数据
+            priority: 发送优先级（见send_queue模块），None则根据消息内容确定
+            reply: 是否为对机器人请求的应答（用于延迟统计配对）
+
+        返回:
+            bool: 数据是否已放入发送队列
+        """
+        try:
+            if not self.is_connected or self.transport is None:
+                self.logger.error("发送数据失败: 未连接到机器人服务器")
+                return False
+
+            # 确保数据是字符串或字节类型（v2协议的控制指令为二进制数据包）
+            if not isinstance(data, (str, bytes)):
+                data = str(data)
+
+            if not self.send_queue.put(data, priority, reply):
+                self.logger.error(f"发送数据失败: 发送队列已满，丢弃消息 {repr(data)}")
+                return False
+            self.loop_thread.call_soon(self._drain_send_queue)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"发送数据时发生错误: {e}")
+            if self.error_callback:
+                self.error_callback(f"发送错误: {str(e)}")
+            return False
+
+    def _drain_send_queue(self):
+        """
+        在事件循环中按优先级把发送队列中的消息写入传输层，
+        传输层缓冲区超过高水位时暂停，恢复后继续
+        """
+        while not self._write_paused:
+            transport = self.transport
+            if transport is None or transport.is_closing():
+                return
+
+            item = self.send_queue.get_nowait()
+            if item is None:
+                return
+
+            data, enqueued_at, reply = item
+            try:
+                # 传输层保证整条消息最终全部写出
+                transport.write(self._to_bytes(data))
+            except Exception as e:
+                self.logger.error(f"发送数据时发生socket错误: {e}")
+                self._connection_lost(f"发送错误: {str(e)}")
+                return
+
+            self._message_sent(data, enqueued_at, reply)
+
+
+# 全局共享的事件循环线程
+global_loop_thread = AsyncioLoopThread()
@@ -0,0 +1,395 @@
+import re
+import threading
+import time
+import numpy as np
+from .config_manager import global_config
+from .logger import global_logger
+
+# 天平输出的一行读数：可选的正负号、数值、可选单位，读数未稳定时带'?'标志，例如
+#   "+    12.3456 g"、"?  -  0.0012 g"、"12.3456"
+READING_PATTERN = re.compile(rb'([-+]?)\s*(\d+(?:\.\d*)?|\.\d+)\s*([A-Za-z]+)?')
+# 支持的单位及换算为g的系数，没有单位时按g处理，其他单位（ct、oz等）的读数不解析
+UNIT_SCALES = {None: 1.0, b'g': 1.0, b'mg': 0.001, b'kg': 1000.0}
+UNSTABLE_FLAG = b'?'
+# 没有换行的数据超过该长度时丢弃（波特率设置错误或串口噪声）
+MAX_LINE_LENGTH = 256
+
+
+def parse_reading(line):
+    """
+    解析一行天平输出
+
+    参数:
+        line: 一行数据（bytes，不含换行符）
+
+    返回:
+        tuple: (重量（g）, 是否稳定)，无法解析或单位不支持时返回None
+    """
+    match = READING_PATTERN.search(line)
+    if match is None:
+        return None
+    scale = UNIT_SCALES.get(match.group(3))
+    if scale is None:
+        return None
+    weight = float(match.group(2)) * scale
+    if match.group(1) == b'-':
+        weight = -weight
+    return weight, UNSTABLE_FLAG not in line
+
+
+class WeightRingBuffer:
+    """
+    带时间戳的天平读数环形缓冲区（单写多读，无锁）
+
+    只有读取线程写入：先写槽位再递增写入总数，读者按写入总数定位最新的读数。
+    读者复制期间槽位可能被写入线程覆盖，复制后再检查写入总数，丢弃或重读被覆盖的部分
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        初始化缓冲区
+
+        参数:
+            capacity: 最多保存的读数条数
+        """
+        self.capacity = max(2, int(capacity))
+        self.times = np.zeros(self.capacity)  # time.monotonic()时间戳
+        self.weights = np.zeros(self.capacity)
+        self.stable = np.zeros(self.capacity, dtype=bool)
+        self.count = 0  # 写入总数
+        self.latest_stable = None  # 最近一次稳定读数 (时间戳, 重量)，整体替换
+
+    def append(self, timestamp, weight, stable):
+        """
+        写入一条读数（只能由一个线程调用）
+
+        参数:
+            timestamp: 时间戳（time.monotonic()）
+            weight: 重量（g）
+            stable: 是否稳定
+        """
+        index = self.count % self.capacity
+        self.times[index] = timestamp
+        self.weights[index] = weight
+        self.stable[index] = stable
+        self.count += 1
+        if stable:
+            self.latest_stable = (timestamp, weight)
+
+    def latest(self):
+        """
+        最新一条读数（不论是否稳定）
+
+        返回:
+            tuple: (时间戳, 重量, 是否稳定)，没有读数时返回None
+        """
+        while True:
+            count = self.count
+            if count == 0:
+                return None
+            index = (count - 1) % self.capacity
+            reading = (float(self.times[index]), float(self.weights[index]), bool(self.stable[index]))
+            # 写入总数达到count+capacity-1时写入线程开始覆盖该槽位
+            if self.count - count < self.capacity - 1:
+                return reading
+
+    def snapshot(self, since=None):
+        """
+        按时间顺序复制缓冲区中的读数
+
+        参数:
+            since: 只返回该时间戳之后（含）的读数，None表示全部
+
+        返回:
+            tuple: (时间戳数组, 重量数组, 稳定标志数组)
+        """
+        count = self.count
+        start = max(0, count - self.capacity)
+        indices = np.arange(start, count) % self.capacity
+        times = self.times[indices]
+        weights = self.weights[indices]
+        stable = self.stable[indices]
+        # 复制期间被覆盖（或正在被覆盖）的最旧读数丢弃
+        overwritten = max(0, self.count - self.capacity - start + 1)
+        if overwritten:
+            times, weights, stable = times[overwritten:], weights[overwritten:], stable[overwritten:]
+        if since is not None:
+            mask = times >= since
+            times, weights, stable = times[mask], weights[mask], stable[mask]
+        return times, weights, stable
+
+
+class BalanceReader:
+    """
+    串口天平读取线程：按行分帧，解析读数和不稳定标志，写入环形缓冲区
+
+    get_weight()不访问串口，只返回缓冲区中最近一次稳定读数
+    """
+
+    def __init__(self, port=None, baudrate=None, capacity=None, stable_max_age=None, serial_port=None):
+        """
+        初始化读取线程
+
+        参数:
+            port: 串口名称，None则读取配置
+            baudrate: 波特率，None则读取配置
+            capacity: 环形缓冲区容量，None则读取配置
+            stable_max_age: 稳定读数的最长有效时间（秒），0表示不限，None则读取配置
+            serial_port: 已打开的串口对象（提供read()和in_waiting），None则按port和baudrate打开
+        """
+        self.port = port or global_config.get('Balance', 'port', 'COM3')
+        self.baudrate = baudrate or global_config.get_int('Balance', 'baudrate', 9600)
+        self.buffer = WeightRingBuffer(capacity or global_config.get_int('Balance', 'buffer_size', 4096))
+        self.stable_max_age = stable_max_age if stable_max_age is not None else \
+            global_config.get_float('Balance', 'stable_max_age', 5.0)
+        self.reconnect_interval = global_config.get_float('Balance', 'reconnect_interval', 2.0)
+        self.ser = serial_port
+        self._owns_port = serial_port is None
+        self._stop_event = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # 每条读数的回调，整体替换（读取线程遍历时不加锁）
+        self._listeners = ()
+
+        # 统计信息
+        self.lines_total = 0
+        self.unstable_total = 0
+        self.parse_errors = 0
+        self.overflows = 0
+        self.serial_errors = 0
+
+    def start(self):
+        """
+        启动读取线程，已在运行时不做任何事
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set():
+                return
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop_event,),
+                                            name=f"BalanceReader-{self.port}", daemon=True)
+            self._thread.start()
+            global_logger.info(f"天平读取线程已启动: {self.port} {self.baudrate}")
+
+    def stop(self, timeout=1.0):
+        """
+        停止读取线程并关闭串口
+
+        参数:
+            timeout: 等待线程结束的时间（秒）
+        """
+        with self._lock:
+            if self._stop_event is None:
+                return
+            self._stop_event.set()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._close()
+
+    def is_running(self):
+        with self._lock:
+            return self._stop_event is not None and not self._stop_event.is_set()
+
+    def add_listener(self, listener):
+        """
+        注册读数回调，在读取线程中对每条读数调用 listener(时间戳, 重量, 是否稳定)，回调不能阻塞
+
+        参数:
+            listener: 回调函数
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """
+        取消读数回调
+
+        参数:
+            listener: add_listener()注册的回调函数
+        """
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item != listener)
+
+    def get_weight(self):
+        """
+        最近一次稳定读数（不阻塞）
+
+        返回:
+            float: 重量（g），没有稳定读数或已超过stable_max_age时返回None
+        """
+        latest = self.get_stable_reading()
+        return latest[1] if latest is not None else None
+
+    def get_stable_reading(self):
+        """
+        最近一次稳定读数及其时间戳（不阻塞）
+
+        返回:
+            tuple: (时间戳, 重量（g）)，没有稳定读数或已超过stable_max_age时返回None
+        """
+        latest = self.buffer.latest_stable
+        if latest is None:
+            return None
+        if self.stable_max_age and time.monotonic() - latest[0] > self.stable_max_age:
+            return None
+        return latest
+
+    def wait_stable(self, timeout, since=None):
+        """
+        等待一次新的稳定读数
+
+        参数:
+            timeout: 最长等待时间（秒）
+            since: 只接受该时间戳之后的读数，None表示调用时刻
+
+        返回:
+            float: 重量（g），超时返回None
+        """
+        since = time.monotonic() if since is None else since
+        deadline = time.monotonic() + timeout
+        while True:
+            latest = self.buffer.latest_stable
+            if latest is not None and latest[0] >= since:
+                return latest[1]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def get_stats(self):
+        """
+        获取读取统计
+
+        返回:
+            dict: 端口、是否运行、读数条数、不稳定读数、解析失败、超长行丢弃和串口错误次数
+        """
+        latest = self.buffer.latest()
+        return {
+            'port': self.port,
+            'running': self.is_running(),
+            'readings': self.buffer.count,
+            'lines_total': self.lines_total,
+            'unstable_total': self.unstable_total,
+            'parse_errors': self.parse_errors,
+            'overflows': self.overflows,
+            'serial_errors': self.serial_errors,
+            'latest': latest[1] if latest else None,
+            'latest_stable': self.get_weight()
+        }
+
+    def _open(self):
+        """
+        打开串口
+
+        返回:
+            bool: 是否成功
+        """
+        if self.ser is not None:
+            return True
+        try:
+            import serial
+        except ImportError:
+            global_logger.error("未安装pyserial，无法读取天平")
+            return False
+        try:
+            self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, bytesize=serial.EIGHTBITS,
+                                     parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE, timeout=0.1)
+            self.ser.reset_input_buffer()
+            return True
+        except Exception as e:
+            self.serial_errors += 1
+            global_logger.error(f"打开天平串口失败: {self.port}: {e}")
+            self.ser = None
+            return False
+
+    def _close(self):
+        ser = self.ser
+        if ser is not None and self._owns_port:
+            self.ser = None
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    def _run(self, stop_event):
+        pending = b''
+        while not stop_event.is_set():
+            if not self._open():
+                stop_event.wait(self.reconnect_interval)
+                continue
+            try:
+                # 有数据时一次读完，没有数据时最多阻塞到串口超时
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                self.serial_errors += 1
+                global_logger.error(f"读取天平串口失败: {self.port}: {e}")
+                self._close()
+                pending = b''
+                stop_event.wait(self.reconnect_interval)
+                continue
+            if not chunk:
+                continue
+
+            timestamp = time.monotonic()
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                self._handle_line(line.strip(), timestamp)
+            if len(pending) > MAX_LINE_LENGTH:
+                self.overflows += 1
+                pending = b''
+
+    def _handle_line(self, line, timestamp):
+        if not line:
+            return
+        self.lines_total += 1
+        reading = parse_reading(line)
+        if reading is None:
+            self.parse_errors += 1
+            return
+        weight, stable = reading
+        if not stable:
+            self.unstable_total += 1
+        self.buffer.append(timestamp, weight, stable)
+        for listener in self._listeners:
+            try:
+                listener(timestamp, weight, stable)
+            except Exception as e:
+                global_logger.error(f"天平读数回调失败: {e}")
+
+
+# 各串口的共享读取线程（多个工位使用同一台天平时只打开一次串口）
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_balance_reader(port=None, baudrate=None):
+    """
+    获取并启动串口对应的共享读取线程
+
+    参数:
+        port: 串口名称，None则读取配置
+        baudrate: 波特率，None则读取配置
+
+    返回:
+        BalanceReader: 读取线程
+    """
+    port = port or global_config.get('Balance', 'port', 'COM3')
+    with _readers_lock:
+        reader = _readers.get(port)
+        if reader is None:
+            reader = _readers[port] = BalanceReader(port, baudrate)
+        reader.start()
+        return reader
+
+
+def stop_balance_readers():
+    """
+    停止所有读取线程
+    """
+    with _readers_lock:
+        readers = list(_readers.values())
+        _readers.clear()
+    for reader in readers:
+        reader.stop()
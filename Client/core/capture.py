@@ -0,0 +1,139 @@
+import os
+import struct
+import threading
+import time
+from .logger import system_logger
+
+# 抓包文件格式：
+#   文件头 <4sHHd: 魔数 b'YCAP'、版本号、保留字段、开始录制时的系统时间（time.time()）
+#   记录   <dBBI:  相对开始录制的单调时钟时间（秒）、通道号、方向、数据长度，后接原始字节
+CAPTURE_MAGIC = b'YCAP'
+CAPTURE_VERSION = 1
+_HEADER = struct.Struct('<4sHHd')
+_RECORD = struct.Struct('<dBBI')
+
+# 通道号
+CHANNEL_IDS = {'CTRL_COM': 0, 'DATA_COM': 1}
+CHANNEL_NAMES = {value: key for key, value in CHANNEL_IDS.items()}
+
+# 方向：机器人发往客户端、客户端发往机器人、连接事件（数据为事件名称）
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+DIRECTION_EVENT = 2
+
+
+class WireCapture:
+    """
+    抓包记录器：把控制通道和数据通道收发的原始字节连同单调时钟时间戳写入二进制抓包文件
+
+    两个通道的接收线程/事件循环和发送线程会同时调用record()，写入时加锁
+    """
+
+    def __init__(self, file_path):
+        """
+        初始化抓包记录器并写入文件头
+
+        参数:
+            file_path: 抓包文件路径
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.records = 0
+        self.bytes_total = 0
+
+        capture_dir = os.path.dirname(file_path)
+        if capture_dir and not os.path.exists(capture_dir):
+            os.makedirs(capture_dir, exist_ok=True)
+        self._file = open(file_path, 'wb')
+        self._file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0, time.time()))
+        self._start = time.monotonic()
+        system_logger.info(f"开始录制通讯数据: {file_path}")
+
+    def record(self, channel, direction, data, timestamp=None):
+        """
+        写入一条记录
+
+        参数:
+            channel: 通道名称，'CTRL_COM'或'DATA_COM'
+            direction: 方向，DIRECTION_IN / DIRECTION_OUT / DIRECTION_EVENT
+            data: 原始字节（bytes/bytearray/memoryview）
+            timestamp: time.monotonic()时间戳，None表示当前时间
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(now - self._start, CHANNEL_IDS[channel], direction, len(data)))
+            self._file.write(data)
+            self.records += 1
+            self.bytes_total += len(data)
+
+    def record_event(self, channel, event):
+        """
+        写入一条连接事件记录
+
+        参数:
+            channel: 通道名称
+            event: 事件名称，例如 'connected' / 'connection_lost'
+        """
+        self.record(channel, DIRECTION_EVENT, event.encode('ascii'))
+
+    def close(self):
+        """
+        关闭抓包文件
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        system_logger.info(f"通讯数据录制结束，共 {self.records} 条记录，{self.bytes_total} 字节: {self.file_path}")
+
+    def get_stats(self):
+        """
+        获取录制统计
+
+        返回:
+            dict: 文件路径、记录数和字节数
+        """
+        return {
+            'file_path': self.file_path,
+            'records': self.records,
+            'bytes_total': self.bytes_total
+        }
+
+
+def read_capture(file_path):
+    """
+    读取抓包文件
+
+    参数:
+        file_path: 抓包文件路径
+
+    返回:
+        tuple: (开始录制的系统时间, 记录列表)，每条记录为 (时间, 通道名称, 方向, 原始字节)
+    """
+    records = []
+    with open(file_path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"抓包文件过短: {file_path}")
+        magic, version, _, started_at = _HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"不支持的抓包文件格式: {file_path}")
+
+        while True:
+            head = f.read(_RECORD.size)
+            if not head:
+                break
+            if len(head) < _RECORD.size:
+                # 录制过程中程序异常退出，最后一条记录不完整
+                system_logger.warning(f"抓包文件末尾记录不完整，已忽略: {file_path}")
+                break
+            timestamp, channel_id, direction, length = _RECORD.unpack(head)
+            data = f.read(length)
+            if len(data) < length:
+                system_logger.warning(f"抓包文件末尾记录不完整，已忽略: {file_path}")
+                break
+            records.append((timestamp, CHANNEL_NAMES.get(channel_id, str(channel_id)), direction, data))
+    return started_at, records
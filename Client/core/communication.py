@@ -1,7 +1,14 @@
 import socket
 import threading
+import time
 from .logger import data_com_logger, ctrl_com_logger, system_logger, global_logger
 from .config_manager import global_config
+from .frame_reassembler import FrameReassembler
+from .protocol_handler import parse_buffer
+from .reconnect import BackoffPolicy
+from .latency import LatencyRecorder
+from .send_queue import SendQueue
+from .capture import DIRECTION_IN, DIRECTION_OUT
 
 class TCPCommunication:
     """
@@ -38,21 +45,49 @@ class TCPCommunication:
         
         self.timeout = global_config.get_float('Communication', 'timeout')
         self.buffer_size = global_config.get_int('Communication', 'buffer_size')
+        self.frame_idle_timeout = global_config.get_float('Communication', 'frame_idle_timeout')
+        # 帧重组器：把TCP字节流还原为逐条消息，数据通道的消息直接在接收缓冲区上解析
+        self.reassembler = FrameReassembler(
+            mode='data' if comm_type == 'DATA_COM' else 'control',
+            capacity=self.buffer_size,
+            parser=parse_buffer if comm_type == 'DATA_COM' else None
+        )
+        # 往返延迟统计
+        self.latency = LatencyRecorder(comm_type)
+        # 有界优先级发送队列，由独立的发送线程写入socket
+        self.send_queue = SendQueue(global_config.get_int('Communication', 'send_queue_size'))
+        self.tcp_nodelay = global_config.get_boolean('Communication', 'tcp_nodelay')
+        self.send_thread = None
+        self.capture = None  # 抓包记录器，None表示不录制
         self.receive_callback = None
         self.error_callback = None
+        self.status_callback = None
         self.receive_thread = None
         self.stop_event = threading.Event()
+        
+        # 断线自动重连
+        self.auto_reconnect = global_config.get_boolean('Communication', 'auto_reconnect')
+        self.backoff = BackoffPolicy.from_config()
+        self.incidents = []  # 已结束的断线事件记录
+        self._incident = None  # 正在进行中的断线事件
+        self._incident_lock = threading.Lock()
+        self._user_disconnect = False
+        self._reconnect_cancel = threading.Event()
+        self._reconnect_thread = None
     
-    def set_callback(self, receive_callback=None, error_callback=None):
+    def set_callback(self, receive_callback=None, error_callback=None, status_callback=None):
         """
         设置回调函数
         
         参数:
             receive_callback: 接收数据回调函数
             error_callback: 错误回调函数
+            status_callback: 连接状态回调函数，参数为 (comm_type, event, info)，
+                event取值 'connection_lost' / 'reconnecting' / 'reconnected'
         """
         self.receive_callback = receive_callback
         self.error_callback = error_callback
+        self.status_callback = status_callback
     
     def connect(self):
         """
@@ -61,24 +96,12 @@ class TCPCommunication:
         返回:
             bool: 连接是否成功
         """
+        self._user_disconnect = False
+        self._reconnect_cancel.clear()
         try:
             self.logger.info(f"正在连接到机器人服务器: {self.host}:{self.port}")
-            
-            # 创建socket对象
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            
-            # 设置超时时间
-            self.socket.settimeout(self.timeout)
-            
-            # 连接服务器
-            self.socket.connect((self.host, self.port))
-            
-            self.is_connected = True
+            self._open_connection()
             self.logger.info(f"成功连接到机器人服务器: {self.host}:{self.port}")
-            
-            # 启动接收线程
-            self.start_receive_thread()
-            
             return True
             
         except socket.timeout:
@@ -97,16 +120,72 @@ class TCPCommunication:
                 self.error_callback(f"连接失败: {str(e)}")
             return False
     
+    def _open_connection(self):
+        """
+        建立socket连接并启动接收线程，失败时抛出异常
+        """
+        # 释放上一次连接残留的socket和发送线程
+        if not self.is_connected:
+            self._close_socket()
+        
+        # 创建socket对象
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        
+        # 设置超时时间
+        sock.settimeout(self.timeout)
+        
+        # 连接服务器
+        try:
+            sock.connect((self.host, self.port))
+            if self.tcp_nodelay:
+                # 关闭Nagle算法，小数据包立即发出
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            sock.close()
+            raise
+        
+        # 清空上一次连接残留的半帧数据、未配对的请求和未发出的消息
+        self.reassembler.reset()
+        self.latency.clear_pending()
+        self._discard_queued_messages()
+        
+        self.socket = sock
+        self.is_connected = True
+        self._capture_event('connected')
+        
+        # 启动接收线程和发送线程
+        self.start_receive_thread()
+        self.start_send_thread()
+    
+    def _close_socket(self):
+        """
+        关闭当前socket，忽略关闭过程中的错误
+        """
+        if self.socket:
+            try:
+                # 先shutdown以唤醒阻塞在recv中的接收线程
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+            try:
+                self.socket.close()
+            except Exception:
+                pass
+            self.socket = None
+        self._stop_send_thread()
+    
     def disconnect(self):
         """
         断开与机器人服务器的连接
         """
         try:
-            self.stop_event.set()
+            # 手动断开时停止自动重连
+            self._user_disconnect = True
+            self._reconnect_cancel.set()
+            self._discard_incident()
             
-            if self.socket:
-                self.socket.close()
-                self.socket = None
+            self.stop_event.set()
+            self._close_socket()
             
             self.is_connected = False
             self.logger.info(f"已断开与机器人服务器的连接: {self.host}:{self.port}")
@@ -121,83 +200,369 @@ class TCPCommunication:
         self.receive_thread = threading.Thread(target=self._receive_data_loop, daemon=True)
         self.receive_thread.start()
     
+    def start_send_thread(self):
+        """
+        启动发送数据的线程
+        """
+        self.send_thread = threading.Thread(target=self._send_data_loop, args=(self.socket,), daemon=True)
+        self.send_thread.start()
+    
+    def _stop_send_thread(self):
+        """
+        唤醒并等待发送线程退出
+        """
+        self.send_queue.wakeup()
+        thread = self.send_thread
+        if thread is not None and thread is not threading.current_thread() and thread.is_alive():
+            thread.join(timeout=1)
+        self.send_thread = None
+    
+    def _send_data_loop(self, sock):
+        """
+        发送数据的循环，按优先级从发送队列取出消息并完整写入socket
+        
+        参数:
+            sock: 本次连接的socket，连接被替换或关闭后线程退出
+        """
+        while not self.stop_event.is_set() and self.socket is sock:
+            item = self.send_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            
+            data, enqueued_at, reply = item
+            try:
+                # sendall保证整条消息写入，不会出现只发出一部分的情况
+                sock.sendall(self._to_bytes(data))
+            except socket.error as e:
+                if self.stop_event.is_set() or self.socket is not sock:
+                    break
+                self.logger.error(f"发送数据时发生socket错误: {e}")
+                self._connection_lost(f"发送错误: {str(e)}")
+                break
+            except Exception as e:
+                self.logger.error(f"发送数据时发生错误: {e}")
+                if self.error_callback:
+                    self.error_callback(f"发送错误: {str(e)}")
+                continue
+            
+            self._message_sent(data, enqueued_at, reply)
+    
+    def _message_sent(self, data, enqueued_at, reply=False):
+        """
+        消息写入socket后记录统计信息
+        
+        参数:
+            data: 已发送的消息
+            enqueued_at: 入队时间（time.monotonic()）
+            reply: 是否为对机器人请求的应答
+        """
+        now = time.monotonic()
+        self.latency.record_queue_wait(now - enqueued_at)
+        self.latency.on_send(data, now, reply)
+        capture = self.capture
+        if capture is not None:
+            capture.record(self.comm_type, DIRECTION_OUT, self._to_bytes(data), now)
+        self.logger.info(f"成功发送数据到机器人服务器: {repr(data)}")
+    
+    @staticmethod
+    def _to_bytes(data):
+        """
+        把待发送的消息转换为字节
+        
+        参数:
+            data: 字符串或字节
+        
+        返回:
+            bytes: 要写入socket的字节
+        """
+        return data.encode('ascii') if isinstance(data, str) else data
+    
+    def set_capture(self, capture):
+        """
+        设置抓包记录器
+        
+        参数:
+            capture: WireCapture对象，None表示停止录制
+        """
+        self.capture = capture
+    
+    def _capture_received(self, nbytes):
+        """
+        录制刚写入帧重组缓冲区、尚未提交的原始字节
+        
+        参数:
+            nbytes: 写入的字节数
+        """
+        capture = self.capture
+        if capture is not None:
+            capture.record(self.comm_type, DIRECTION_IN, self.reassembler.write_buffer()[:nbytes])
+    
+    def _capture_event(self, event):
+        """
+        录制连接事件
+        
+        参数:
+            event: 事件名称
+        """
+        capture = self.capture
+        if capture is not None:
+            capture.record_event(self.comm_type, event)
+    
+    def _discard_queued_messages(self):
+        """
+        丢弃发送队列中尚未发出的消息（重新连接时调用）
+        """
+        count = self.send_queue.clear()
+        if count:
+            self.logger.warning(f"丢弃断线前未发送的 {count} 条消息")
+    
     def _receive_data_loop(self):
         """
         接收数据的循环
+        
+        数据直接读入帧重组器的缓冲区，每得到一条完整消息调用一次回调函数；
+        缓冲区中有残余数据时改用短超时等待，超时即认为对端已发送完毕并提交残余数据
         """
+        sock = self.socket
+        current_timeout = self.timeout
         while not self.stop_event.is_set() and self.is_connected:
             try:
+                # 有残余数据时缩短超时时间，用于判定无结束符消息的边界
+                wanted_timeout = self.frame_idle_timeout if self.reassembler.has_pending() else self.timeout
+                if wanted_timeout != current_timeout:
+                    sock.settimeout(wanted_timeout)
+                    current_timeout = wanted_timeout
+                
                 # 接收数据
-                data = self.socket.recv(self.buffer_size)
+                nbytes = sock.recv_into(self.reassembler.write_buffer())
                 
-                if data:
-                    # 解码数据
-                    data_str = data.decode('ascii')
-                    self.logger.info(f"收到机器人服务器数据: {repr(data_str)}")
-                    
-                    # 调用回调函数处理数据
-                    if self.receive_callback:
-                        self.receive_callback(data_str)
+                if nbytes:
+                    self._capture_received(nbytes)
+                    self.reassembler.commit(nbytes)
+                    for frame in self.reassembler.frames():
+                        self._dispatch_frame(frame)
                 else:
                     # 连接已关闭
                     self.logger.warning(f"机器人服务器连接已关闭")
-                    self.is_connected = False
-                    if self.error_callback:
-                        self.error_callback("连接已关闭")
+                    self._connection_lost("连接已关闭")
                     break
                     
             except socket.timeout:
-                # 超时不处理，继续等待
+                # 接收空闲，提交残余数据
+                for frame in self.reassembler.flush():
+                    self._dispatch_frame(frame)
                 continue
             except socket.error as e:
+                if self.stop_event.is_set():
+                    break
                 self.logger.error(f"接收数据时发生socket错误: {e}")
-                self.is_connected = False
-                if self.error_callback:
-                    self.error_callback(f"接收错误: {str(e)}")
+                self._connection_lost(f"接收错误: {str(e)}")
                 break
             except Exception as e:
                 self.logger.error(f"接收数据时发生错误: {e}")
-                self.is_connected = False
-                if self.error_callback:
-                    self.error_callback(f"接收错误: {str(e)}")
+                self._connection_lost(f"接收错误: {str(e)}")
                 break
     
-    def send_data(self, data):
+    def _dispatch_frame(self, frame):
+        """
+        把一条完整消息交给回调函数处理
+        
+        参数:
+            frame: 完整消息，控制通道为字符串，数据通道为解析后的RobotMessage
+        """
+        self.latency.on_receive(frame)
+        self.logger.info(f"收到机器人服务器数据: {repr(frame)}")
+        
+        if self.receive_callback:
+            try:
+                self.receive_callback(frame)
+            except Exception as e:
+                self.logger.error(f"处理接收数据回调时发生错误: {e}")
+    
+    def send_data(self, data, priority=None, reply=False):
         """
-        发送数据到机器人服务器
+        发送数据到机器人服务器（放入发送队列后立即返回，不阻塞调用线程）
         
         参数:
             data: 要发送的数据
+            priority: 发送优先级（见send_queue模块），None则根据消息内容确定，
+                控制指令优先于例行的request_weight轮询
+            reply: 是否为对机器人请求的应答（用于延迟统计配对）
             
         返回:
-            bool: 发送是否成功
+            bool: 数据是否已放入发送队列
         """
         try:
             if not self.is_connected or not self.socket:
                 self.logger.error("发送数据失败: 未连接到机器人服务器")
                 return False
             
-            # 确保数据是字符串类型
-            if not isinstance(data, str):
+            # 确保数据是字符串或字节类型（v2协议的控制指令为二进制数据包）
+            if not isinstance(data, (str, bytes)):
                 data = str(data)
             
-            # 发送数据
-            self.socket.send(data.encode('ascii'))
-            self.logger.info(f"成功发送数据到机器人服务器: {repr(data)}")
+            # 放入发送队列，由发送线程写入socket
+            if not self.send_queue.put(data, priority, reply):
+                self.logger.error(f"发送数据失败: 发送队列已满，丢弃消息 {repr(data)}")
+                return False
             return True
             
-        except socket.error as e:
-            self.logger.error(f"发送数据时发生socket错误: {e}")
-            self.is_connected = False
-            if self.error_callback:
-                self.error_callback(f"发送错误: {str(e)}")
-            return False
         except Exception as e:
             self.logger.error(f"发送数据时发生错误: {e}")
             if self.error_callback:
                 self.error_callback(f"发送错误: {str(e)}")
             return False
     
+    def _connection_lost(self, error_msg):
+        """
+        连接意外中断时的处理：启用自动重连时开始重连，否则通过错误回调通知
+        
+        参数:
+            error_msg: 错误信息
+        """
+        self.is_connected = False
+        if self._user_disconnect:
+            return
+        self._capture_event('connection_lost')
+        
+        if self.auto_reconnect:
+            self._begin_incident(error_msg)
+            self._schedule_reconnect()
+        elif self.error_callback:
+            self.error_callback(error_msg)
+    
+    def _schedule_reconnect(self):
+        """
+        启动后台重连线程
+        """
+        if self._reconnect_thread and self._reconnect_thread.is_alive():
+            return
+        self._reconnect_thread = threading.Thread(target=self._reconnect_loop, daemon=True)
+        self._reconnect_thread.start()
+    
+    def _reconnect_loop(self):
+        """
+        按退避策略反复尝试重连，直到成功、被取消或次数用完
+        """
+        attempt = 0
+        while not self._reconnect_cancel.wait(self.backoff.delay(attempt)):
+            if self.is_connected:
+                # 已被手动重新连接
+                break
+            
+            attempt += 1
+            self._notify_status('reconnecting', attempt)
+            try:
+                self._close_socket()
+                self._open_connection()
+                break
+            except Exception as e:
+                if self._reconnect_attempt_failed(attempt, e):
+                    return
+        else:
+            return
+        
+        self._finish_incident(attempt)
+    
+    def _reconnect_attempt_failed(self, attempt, error):
+        """
+        记录一次失败的重连
+        
+        参数:
+            attempt: 本次重连序号
+            error: 失败原因
+            
+        返回:
+            bool: 是否放弃重连
+        """
+        self.logger.warning(f"第 {attempt} 次自动重连失败: {error}")
+        if not self.backoff.exhausted(attempt):
+            return False
+        
+        self._discard_incident()
+        self.logger.error(f"自动重连失败，已尝试 {attempt} 次: {self.host}:{self.port}")
+        if self.error_callback:
+            self.error_callback(f"自动重连失败（已尝试 {attempt} 次）: {str(error)}")
+        return True
+    
+    def _begin_incident(self, reason):
+        """
+        开始记录一次断线事件
+        
+        参数:
+            reason: 断线原因
+        """
+        with self._incident_lock:
+            if self._incident is not None:
+                return
+            self._incident = {
+                'comm_type': self.comm_type,
+                'reason': reason,
+                'start': time.time(),
+                'start_monotonic': time.monotonic()
+            }
+        self.logger.warning(f"与机器人服务器的连接中断，开始自动重连: {reason}")
+        self._notify_status('connection_lost', reason)
+    
+    def _finish_incident(self, attempts):
+        """
+        结束断线事件并记录中断时长
+        
+        参数:
+            attempts: 重连次数
+        """
+        with self._incident_lock:
+            incident = self._incident
+            self._incident = None
+        if incident is None:
+            return
+        
+        incident['end'] = time.time()
+        incident['downtime'] = time.monotonic() - incident.pop('start_monotonic')
+        incident['attempts'] = attempts
+        self.incidents.append(incident)
+        self.logger.info(f"自动重连成功: {self.host}:{self.port}，中断 {incident['downtime']:.2f} 秒，重连 {attempts} 次")
+        self._notify_status('reconnected', incident)
+    
+    def _discard_incident(self):
+        """
+        放弃正在记录的断线事件
+        """
+        with self._incident_lock:
+            self._incident = None
+    
+    def _notify_status(self, event, info=None):
+        """
+        通知连接状态变化
+        
+        参数:
+            event: 事件名称
+            info: 事件信息
+        """
+        if self.status_callback:
+            try:
+                self.status_callback(self.comm_type, event, info)
+            except Exception as e:
+                self.logger.error(f"处理连接状态回调时发生错误: {e}")
+    
+    def get_send_queue_stats(self):
+        """
+        获取发送队列统计信息
+        
+        返回:
+            dict: 队列当前深度、历史最大深度、入队/发送/丢弃总数
+        """
+        return self.send_queue.get_stats()
+    
+    def get_incidents(self):
+        """
+        获取断线事件记录
+        
+        返回:
+            list: 每次断线的原因、开始/结束时间、中断时长和重连次数
+        """
+        return list(self.incidents)
+    
     def get_connection_status(self):
         """
         获取连接状态
@@ -230,3 +595,23 @@ class TCPCommunication:
             tuple: (host, port)
         """
         return (self.host, self.port)
+
+
+def create_communication(port=None, comm_type='CTRL_COM'):
+    """
+    根据配置文件中的transport选项创建通讯对象
+    
+    参数:
+        port: 指定端口号，None则使用配置文件中的默认端口
+        comm_type: 通讯类型，'CTRL_COM'表示控制通讯，'DATA_COM'表示数据通讯
+        
+    返回:
+        TCPCommunication: 'asyncio'返回共享事件循环的异步实现，'thread'返回每个socket一个接收线程的实现
+    """
+    transport = global_config.get('Communication', 'transport', 'asyncio').strip().lower()
+    if transport == 'asyncio':
+        from .async_transport import AsyncTCPCommunication
+        return AsyncTCPCommunication(port, comm_type)
+    if transport != 'thread':
+        system_logger.warning(f"未知的通讯实现: {transport}，使用线程实现")
+    return TCPCommunication(port, comm_type)
@@ -1,5 +1,6 @@
 import configparser
 import os
+import threading
 from .logger import global_logger
 
 class ConfigManager:
@@ -16,6 +17,7 @@ class ConfigManager:
         """
         self.config_file = config_file
         self.config = configparser.ConfigParser()
+        self._lock = threading.RLock()  # 多个工位在线程池中同时写配置
         
         # 默认配置
         self.default_config = {
@@ -27,7 +29,40 @@ class ConfigManager:
                 'data_host': '127.0.0.1',
                 'data_port': '1025',
                 'timeout': '30',
-                'buffer_size': '10240'
+                'buffer_size': '10240',
+                'frame_idle_timeout': '0.02',
+                'transport': 'asyncio',
+                'auto_reconnect': 'True',
+                'reconnect_initial_delay': '0.5',
+                'reconnect_max_delay': '30',
+                'reconnect_multiplier': '2.0',
+                'reconnect_jitter': '0.5',
+                'reconnect_max_attempts': '0',
+                'send_queue_size': '64',
+                'tcp_nodelay': 'True',
+                'data_mode': 'push',
+                'push_max_rate': '10',
+                'push_ack_timeout': '2.0',
+                'protocol_version': '2',
+                'protocol_ack_timeout': '2.0',
+                'packet_precision': '4, 3, 4, 2',
+                'packet_max_length': '80',
+                'control_mode': 'lockstep',
+                'trajectory_steps': '4',
+                'trajectory_tolerance': '0.002',
+                'trajectory_deadband': '0.0005',
+                'trajectory_sample_rate': '20'
+            },
+            'Stations': {
+                'primary_name': '工位1',
+                'worker_threads': '4'
+            },
+            'Capture': {
+                'enabled': 'False',
+                'capture_dir': 'captures'
+            },
+            'UI': {
+                'refresh_rate': '30'
             },
             'File': {
                 'excel_file': 'test_file.xlsx',
@@ -40,6 +75,64 @@ class ConfigManager:
                 'particle_size': '3',
                 'simulate_weight': 'True'
             },
+            'Fuzzy': {
+                'lut_enabled': 'True',
+                'lut_difference_step': '0.005',
+                'lut_density_step': '0.02',
+                'lut_cache_enabled': 'True',
+                'lut_cache_dir': 'cache'
+            },
+            'Controller': {
+                'memo_size': '1024',
+                'weight_resolution': '0.0001',
+                'density_resolution': '0.001',
+                'strategy': 'threshold',
+                'material_strategies': ''
+            },
+            'Balance': {
+                'port': 'COM3',
+                'baudrate': '9600',
+                'buffer_size': '4096',
+                'stable_max_age': '5.0',
+                'reconnect_interval': '2.0',
+                'unstable_wait': '0.5'
+            },
+            'Stability': {
+                'enabled': 'True',
+                'median_window': '5',
+                'fir_taps': '4',
+                'window': '8',
+                'std_threshold': '0.0001',
+                'drift_threshold': '0.0002',
+                'confidence': '2.0',
+                'resolution': '0.0001',
+                'publish_interval': '0.2',
+                'baseline_wait': '2.0',
+                'predict_enabled': 'True',
+                'predict_window': '1.0',
+                'predict_min_samples': '6',
+                'predict_min_span': '0.6',
+                'predict_max_bound': '0.0003',
+                'predict_tau_min': '0.1',
+                'predict_tau_max': '1.5',
+                'predict_tau_steps': '8',
+                'predict_max_frequency': '6.0',
+                'predict_frequency_step': '0.5'
+            },
+            'Simulation': {
+                'seed': '',
+                'flow_noise': '0.3',
+                'clump_rate': '0.01',
+                'balance_noise': '0.00003',
+                'resolution': '0.0001',
+                'settle_tau': '0.3',
+                'settle_frequency': '3.0',
+                'settle_time': '3.0'
+            },
+            'Materials': {
+                'model_file': 'resources/material_models.json',
+                'platform': 'Dual-arm robot'
+            },
             'Logging': {
                 'level': 'DEBUG',
                 'log_file': 'robot_client.log'
@@ -94,7 +187,7 @@ class ConfigManager:
         保存配置到文件
         """
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            with self._lock, open(self.config_file, 'w', encoding='utf-8') as f:
                 self.config.write(f)
             global_logger.info(f"配置文件保存成功: {self.config_file}")
         except Exception as e:
@@ -202,14 +295,27 @@ class ConfigManager:
             value: 配置值
         """
         try:
-            if not self.config.has_section(section):
-                self.config.add_section(section)
-            self.config.set(section, key, str(value))
-            self.save_config()
+            with self._lock:
+                if not self.config.has_section(section):
+                    self.config.add_section(section)
+                self.config.set(section, key, str(value))
+                self.save_config()
             global_logger.info(f"配置项更新成功: [{section}] {key} = {value}")
         except Exception as e:
             global_logger.error(f"设置配置项失败: [{section}] {key} = {value}, 错误: {e}")
     
+    def get_sections(self, prefix=''):
+        """
+        获取名称以指定前缀开头的配置节
+        
+        参数:
+            prefix: 配置节名称前缀
+            
+        返回:
+            list: 配置节名称列表（按文件中的顺序）
+        """
+        return [section for section in self.config.sections() if section.startswith(prefix)]
+    
     def get_all_config(self):
         """
         获取所有配置
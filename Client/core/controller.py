@@ -0,0 +1,207 @@
+import threading
+from .config_manager import global_config
+from .logger import global_logger
+
+# 默认控制策略
+DEFAULT_CONTROLLER = 'threshold'
+
+
+class ShakingController:
+    """
+    抖动参数控制策略基类
+
+    子类设置name并实现compute()，用register_controller()注册后即可在Excel（第6列）
+    或配置文件（[Controller] strategy、material_strategies）中按名称选择
+    """
+
+    name = None
+
+    @property
+    def revision(self):
+        """
+        策略内部参数的版本号，变化时DataProcessor的抖动参数缓存失效
+        """
+        return 0
+
+    def compute(self, target_weight, current_weight, density, particle_size):
+        """
+        计算抖动参数
+
+        参数:
+            target_weight: 目标重量（g）
+            current_weight: 当前重量（g）
+            density: 物料密度
+            particle_size: 颗粒大小
+
+        返回:
+            tuple: (抖动幅度, 抖动角度)
+        """
+        raise NotImplementedError
+
+
+class ThresholdController(ShakingController):
+    """
+    分档策略：按剩余重量百分比（5/20/50%）选择抖动幅度，按颗粒大小选择角度，再按密度缩放
+    """
+
+    name = 'threshold'
+
+    def compute(self, target_weight, current_weight, density, particle_size):
+        # 计算差值和差值百分比
+        weight_diff = abs(target_weight - current_weight)
+        diff_percent = (weight_diff / target_weight) * 100 if target_weight > 0 else 0
+
+        global_logger.debug(f"重量差值: {weight_diff} g, 差值百分比: {diff_percent}%")
+
+        # 根据差值百分比计算抖动幅度（差值越大，抖动幅度越大）
+        if diff_percent > 50:
+            y_shaking = 100  # 大幅度抖动
+        elif diff_percent > 20:
+            y_shaking = 50   # 中等幅度抖动
+        elif diff_percent > 5:
+            y_shaking = 20   # 小幅度抖动
+        else:
+            y_shaking = 5    # 微调
+
+        # 根据颗粒大小调整抖动角度（颗粒越大，角度越小）
+        if particle_size > 5:
+            y_angle = 5   # 小角度
+        elif particle_size > 2:
+            y_angle = 10  # 中等角度
+        else:
+            y_angle = 15  # 大角度
+
+        # 根据密度调整参数（密度越大，抖动幅度和角度越小）
+        density_factor = 1.0 / density
+        y_shaking = y_shaking * density_factor
+        y_angle = y_angle * density_factor
+
+        # 确保参数在合理范围内
+        y_shaking = max(1, min(100, y_shaking))
+        y_angle = max(1, min(30, y_angle))
+        return (y_shaking, y_angle)
+
+
+class FuzzyController(ShakingController):
+    """
+    模糊逻辑策略：由FuzzyLogicEngine按剩余重量和密度推理抖动幅度，再按幅度选择角度
+    """
+
+    name = 'fuzzy'
+
+    def __init__(self, engine=None):
+        """
+        初始化模糊逻辑策略
+
+        参数:
+            engine: FuzzyLogicEngine，None则在第一次计算时创建（加载或编译查找表）
+        """
+        self._engine = engine
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    from .fuzzy_logic import FuzzyLogicEngine
+                    self._engine = FuzzyLogicEngine()
+        return self._engine
+
+    @property
+    def revision(self):
+        return self.engine.revision
+
+    def compute(self, target_weight, current_weight, density, particle_size):
+        return self.engine.calculate_shaking(target_weight - current_weight, density)
+
+
+# 已注册的控制策略: 名称 -> 类
+CONTROLLERS = {}
+# 各策略的共享实例（模糊引擎等初始化开销较大，所有工位共用）
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_controller(controller_class):
+    """
+    注册控制策略（可作为类装饰器使用）
+
+    参数:
+        controller_class: ShakingController子类，name不能为空
+
+    返回:
+        controller_class
+    """
+    if not controller_class.name:
+        raise ValueError(f"控制策略缺少名称: {controller_class.__name__}")
+    CONTROLLERS[controller_class.name] = controller_class
+    return controller_class
+
+
+register_controller(ThresholdController)
+register_controller(FuzzyController)
+
+
+def get_controller(name):
+    """
+    按名称获取控制策略的共享实例
+
+    参数:
+        name: 策略名称（不区分大小写）
+
+    返回:
+        ShakingController: 策略实例，名称未注册时返回None
+    """
+    name = str(name).strip().lower()
+    controller_class = CONTROLLERS.get(name)
+    if controller_class is None:
+        return None
+    with _instances_lock:
+        instance = _instances.get(name)
+        if instance is None or type(instance) is not controller_class:
+            instance = _instances[name] = controller_class()
+        return instance
+
+
+def material_strategies():
+    """
+    读取配置中物料对应的控制策略
+
+    返回:
+        dict: 物料名称（小写） -> 策略名称，格式为 "物料名: 策略, 物料名: 策略"
+    """
+    mapping = {}
+    for item in global_config.get('Controller', 'material_strategies', '').split(','):
+        material, _, strategy = item.partition(':')
+        if material.strip() and strategy.strip():
+            mapping[material.strip().lower()] = strategy.strip().lower()
+    return mapping
+
+
+def select_controller(name=None, material=None):
+    """
+    选择控制策略：指定名称（Excel行） > 配置中物料对应的策略 > 默认策略
+
+    参数:
+        name: 策略名称，None或空字符串表示未指定
+        material: 物料名称
+
+    返回:
+        ShakingController: 策略实例
+    """
+    candidates = []
+    if name is not None and str(name).strip():
+        candidates.append(name)
+    if material is not None:
+        strategy = material_strategies().get(str(material).strip().lower())
+        if strategy:
+            candidates.append(strategy)
+    candidates.append(global_config.get('Controller', 'strategy', DEFAULT_CONTROLLER))
+
+    for candidate in candidates:
+        controller = get_controller(candidate)
+        if controller is not None:
+            return controller
+        global_logger.warning(f"未知的控制策略: {candidate}，可选: {', '.join(sorted(CONTROLLERS))}")
+    return get_controller(DEFAULT_CONTROLLER)
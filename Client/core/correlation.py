@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from .latency import LatencyRecorder
+from .logger import system_logger
+
+# 统计表中使用的通道名称
+CORRELATION_CHANNEL = 'SEQ'
+
+
+class CorrelationTable(LatencyRecorder):
+    """
+    请求/应答关联表：按序号把机器人的应答与客户端发出的控制指令对应起来
+
+    协议v2中客户端的每条控制指令带有序号，RAPID端在下一次new_target/executing前缀中
+    回传最近执行的指令序号（"@序号 executing"），在称量结果前缀中回传本次目标指令的序号
+    （"@序号 accuracy difference target time"）。关联表据此：
+        - 丢弃序号早于最近确认序号的过期指令请求，避免用过期的请求驱动抖动参数
+        - 丢弃重复或属于旧目标的称量结果，避免重复写入结果文件
+        - 统计每条指令从发出到被确认的时间（new_target/executing/trajectory）以及目标下发到结果返回的时间（result）
+    轨迹模式下客户端会主动下发新的轨迹，RAPID端不逐条回传，被后续序号确认的轨迹按已执行处理而不计为丢失
+    未带序号的消息（协议v1、"9 9 9"）不经过关联表，保持原有处理方式
+    """
+
+    def __init__(self, max_outstanding=64):
+        """
+        初始化关联表
+
+        参数:
+            max_outstanding: 最多保留的未确认指令数，超过时最早的一条按丢失处理
+        """
+        super().__init__(CORRELATION_CHANNEL, max_pending=max_outstanding)
+        self.max_outstanding = max_outstanding
+        self._outstanding = OrderedDict()  # 序号 -> (指令类型, Excel行号, 发送时间)
+        self._acked_seq = 0  # 最近确认的指令序号，0表示本次连接尚未确认任何指令
+        self._target = None  # 当前目标指令 (序号, Excel行号, 发送时间)
+        self._target_resulted = False
+        self._lock = threading.Lock()
+
+        # 统计
+        self.acked_total = 0
+        self.lost_total = 0
+        self.stale_prompts = 0
+        self.stale_results = 0
+        self.duplicate_results = 0
+
+    def on_request(self, seq, kind, row, timestamp=None):
+        """
+        记录一条已发出的控制指令
+
+        参数:
+            seq: 指令序号
+            kind: 指令类型，'new_target'、'executing'或'trajectory'
+            row: 对应的Excel行号
+            timestamp: time.monotonic()时间戳，None表示当前时间
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self._outstanding.pop(seq, None)
+            self._outstanding[seq] = (kind, row, now)
+            while len(self._outstanding) > self.max_outstanding:
+                self._outstanding.popitem(last=False)
+                self.lost_total += 1
+            if kind == 'new_target':
+                self._target = (seq, row, now)
+                self._target_resulted = False
+
+    def on_prompt(self, seq, timestamp=None):
+        """
+        处理机器人带序号的new_target/executing请求
+
+        参数:
+            seq: 请求中回传的已执行指令序号
+            timestamp: time.monotonic()时间戳，None表示当前时间
+
+        返回:
+            bool: 是否应答该请求，False表示过期或重复的请求
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            entry = self._outstanding.get(seq)
+            if entry is None:
+                # 没有更新的未确认指令时，重复的确认序号说明上一条请求尚未应答
+                if seq == self._acked_seq and not self._outstanding:
+                    return True
+                self.stale_prompts += 1
+                stale = True
+            else:
+                # 早于该序号的未确认指令已被机器人跳过，主动下发的轨迹已按顺序执行
+                while True:
+                    pending_seq, (kind, _, sent_at) = self._outstanding.popitem(last=False)
+                    if pending_seq == seq:
+                        break
+                    if kind == 'trajectory':
+                        self.acked_total += 1
+                    else:
+                        self.lost_total += 1
+                self._acked_seq = seq
+                self.acked_total += 1
+                self._record(kind, now - sent_at)
+                stale = False
+        if stale:
+            system_logger.warning(f"丢弃过期的控制请求: 回传序号 {seq}，最近确认序号 {self._acked_seq}")
+        return not stale
+
+    def on_result(self, seq, timestamp=None):
+        """
+        处理带序号的称量结果
+
+        参数:
+            seq: 结果中回传的目标指令序号，0表示机器人端无法关联（目标指令以v1格式下发）
+            timestamp: time.monotonic()时间戳，None表示当前时间
+
+        返回:
+            bool: 是否保存该结果，False表示重复或属于旧目标的结果
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            if seq == 0:
+                return True
+            target = self._target
+            if target is None or target[0] != seq:
+                self.stale_results += 1
+                reason = "属于旧目标"
+            elif self._target_resulted:
+                self.duplicate_results += 1
+                reason = "重复"
+            else:
+                self._target_resulted = True
+                self._record('result', now - target[2])
+                return True
+        system_logger.warning(f"丢弃{reason}的称量结果: 目标序号 {seq}")
+        return False
+
+    def current_target(self):
+        """
+        获取当前目标指令
+
+        返回:
+            tuple: (序号, Excel行号, 发送时间)，尚未下发目标时返回None
+        """
+        with self._lock:
+            return self._target
+
+    def clear_pending(self):
+        """
+        连接断开或重新协商后清空未确认指令，RAPID端的确认序号从0重新开始
+
+        当前目标保留，断线前已产生但尚未保存的结果在恢复后仍可保存
+        """
+        with self._lock:
+            self._outstanding.clear()
+            self._acked_seq = 0
+
+    def reset(self):
+        """
+        清空延迟统计和计数
+        """
+        super().reset()
+        with self._lock:
+            self.acked_total = 0
+            self.lost_total = 0
+            self.stale_prompts = 0
+            self.stale_results = 0
+            self.duplicate_results = 0
+
+    def get_stats(self):
+        """
+        获取关联统计
+
+        返回:
+            dict: 未确认指令数和各项计数
+        """
+        with self._lock:
+            return {
+                'outstanding': len(self._outstanding),
+                'acked_seq': self._acked_seq,
+                'acked_total': self.acked_total,
+                'lost_total': self.lost_total,
+                'stale_prompts': self.stale_prompts,
+                'stale_results': self.stale_results,
+                'duplicate_results': self.duplicate_results
+            }
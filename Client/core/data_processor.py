@@ -1,6 +1,11 @@
-import random
+import time
 from .logger import global_logger
 from .config_manager import global_config
+from .memo import QuantizedLRUCache
+from .controller import select_controller
+from .balance import get_balance_reader
+from .simulator import DispensingSimulator
+from .material_models import get_material_models
 
 class DataProcessor:
     """
@@ -17,12 +22,36 @@ class DataProcessor:
         self.particle_size = global_config.get_float('Parameters', 'particle_size')
         self.simulate_weight = global_config.get_boolean('Parameters', 'simulate_weight')
         
-        # 串口配置（备用）
-        self.serial_port = "COM3"
-        self.baudrate = 9600
-        self.ser = None
+        # 控制策略：按Excel行或物料选择，默认读取配置
+        self.material = None
+        # 物料模型：由历史称量结果拟合（tools/fit_material_models.py），启动时加载
+        self.material_models = get_material_models()
+        self.material_model = None
+        # 物料模型拟合的落料系数，控制器按 密度 × 落料系数 的等效密度计算抖动参数
+        self.flow_scale = 1.0
+        self.controller = select_controller()
+        
+        # 抖动参数缓存：目标重量和当前重量按天平分辨率量化，物料参数变化时自动失效
+        weight_resolution = global_config.get_float('Controller', 'weight_resolution', 0.0001)
+        self.shaking_cache = QuantizedLRUCache(
+            global_config.get_int('Controller', 'memo_size', 1024),
+            (weight_resolution, weight_resolution)
+        )
+        
+        # 天平串口配置，第一次读取真实重量时启动共享的读取线程
+        self.serial_port = global_config.get('Balance', 'port', 'COM3')
+        self.baudrate = global_config.get_int('Balance', 'baudrate', 9600)
+        self.balance = None
+        self.prediction = None  # 最近一次预测的稳定重量（SettledReading），比天平稳定读数新时优先使用
+        
+        # 模拟重量：称量过程模拟器代替机器人和天平，下一次读取重量时执行最近一次下发的抖动参数
+        seed = (global_config.get('Simulation', 'seed', '') or '').strip()
+        self.simulator = DispensingSimulator(int(seed) if seed else None)
+        self.simulate_settle_time = global_config.get_float('Simulation', 'settle_time', 3.0)
+        self._pending_command = None
     
-    def update_parameters(self, density=None, vial_weight=None, particle_size=None, simulate_weight=None):
+    def update_parameters(self, density=None, vial_weight=None, particle_size=None, simulate_weight=None,
+                          material=None, controller=None):
         """
         更新参数
         
@@ -31,6 +60,8 @@ class DataProcessor:
             vial_weight: 空瓶重量
             particle_size: 颗粒大小
             simulate_weight: 是否使用模拟重量数据
+            material: 物料名称，用于按物料选择控制策略
+            controller: 控制策略名称，None则按物料或配置选择
             
         返回:
             dict: 更新后的参数
@@ -51,17 +82,28 @@ class DataProcessor:
             self.simulate_weight = simulate_weight
             global_config.set('Parameters', 'simulate_weight', simulate_weight)
         
-        global_logger.info(f"参数已更新 - 密度: {self.density}, 瓶重: {self.vial_weight} g, 颗粒大小: {self.particle_size}, 模拟重量: {self.simulate_weight}")
+        if material is not None:
+            self.material = material
+            self.material_model = self.material_models.get(material)
+            self.flow_scale = self.material_model.get('flow_scale', 1.0) if self.material_model is not None else 1.0
+            if self.material_model is not None:
+                global_logger.info(f"使用物料模型: {material} - 每克耗时: {self.material_model['seconds_per_gram']} s, "
+                                   f"落料系数: {self.material_model.get('flow_scale', 1.0)}, "
+                                   f"波动系数: {self.material_model.get('noise_scale', 1.0)}")
+        if material is not None or controller is not None:
+            self.controller = select_controller(controller, self.material)
+        
+        global_logger.info(f"参数已更新 - 密度: {self.density}, 瓶重: {self.vial_weight} g, 颗粒大小: {self.particle_size}, 模拟重量: {self.simulate_weight}, 控制策略: {self.controller.name}")
         
         # 返回更新后的参数
         return self.get_current_parameters()
     
     def get_weight(self):
         """
-        获取重量数据
+        获取重量数据（真实天平时为读取线程缓存的最近一次稳定读数，不阻塞）
         
         返回:
-            float: 重量数据（g）
+            float: 重量数据（g），天平暂无稳定读数时返回None
         """
         try:
             if self.simulate_weight:
@@ -81,33 +123,135 @@ class DataProcessor:
             global_logger.warning(f"使用模拟重量数据作为备份: {weight} g")
             return weight
     
+    def start_dispense(self, target_weight):
+        """
+        开始一次新的称量（模拟重量时换空瓶，按当前物料参数重置模拟器）
+        
+        参数:
+            target_weight: 目标重量（g）
+        """
+        if not self.simulate_weight:
+            return
+        self._pending_command = None
+        model = self.material_model or {}
+        self.simulator.reset(target_weight, self.density, self.particle_size,
+                             model.get('flow_scale', 1.0), model.get('noise_scale', 1.0))
+        global_logger.debug(f"模拟称量开始 - 目标重量: {target_weight} g, 密度: {self.density}, 颗粒大小: {self.particle_size}")
+    
+    def on_command(self, shaking_amplitude, shaking_angle):
+        """
+        记录已下发的抖动参数（模拟重量时在下一次读取重量前执行一个分料周期）
+        
+        参数:
+            shaking_amplitude: 抖动幅度
+            shaking_angle: 抖动角度
+        """
+        if self.simulate_weight and shaking_amplitude is not None:
+            self._pending_command = (shaking_amplitude, shaking_angle)
+    
     def _get_simulate_weight(self):
         """
-        获取模拟重量数据
+        获取模拟重量数据：先执行待执行的分料周期并等待天平稳定，再读取模拟天平
         
         返回:
-            float: 模拟重量数据（g）
+            float: 模拟重量数据（g，已去皮）
         """
-        # 返回一个随机的模拟重量值，范围在5-15g之间
-        weight = random.uniform(5.0, 15.0)
+        command = self._pending_command
+        if command is not None:
+            self._pending_command = None
+            dropped, _ = self.simulator.cycle(*command)
+            self.simulator.wait(self.simulate_settle_time)
+            global_logger.debug(f"模拟分料周期 - 勺子: {self.simulator.spoon}, 落料: {dropped:.5f} g")
+        weight = self.simulator.read()
         global_logger.debug(f"生成模拟重量: {weight} g")
         return weight
     
     def _get_serial_weight(self):
         """
-        从串口获取重量数据
+        从天平读取线程获取最近一次稳定读数（不阻塞），天平尚未稳定但已有更新的预测稳定重量时返回预测值
+        
+        返回:
+            float: 重量数据（g），还没有稳定读数或读数已过期时返回None
+        """
+        balance = self.get_balance()
+        latest = balance.get_stable_reading()
+        prediction = self.prediction
+        if prediction is not None and (latest is None or prediction.timestamp > latest[0]) and \
+                (not balance.stable_max_age or time.monotonic() - prediction.timestamp <= balance.stable_max_age):
+            global_logger.debug(f"使用预测的稳定重量: {prediction.weight} ± {prediction.bound} g")
+            return prediction.weight
+        weight = latest[1] if latest is not None else None
+        if weight is None:
+            global_logger.warning(f"天平 {self.serial_port} 暂无稳定读数")
+        return weight
+    
+    def wait_weight(self, timeout):
+        """
+        等待天平的下一次稳定读数（阻塞，最多timeout秒）
+        
+        参数:
+            timeout: 最长等待时间（秒）
+            
+        返回:
+            float: 重量数据（g），超时返回None；模拟重量时直接返回模拟值
+        """
+        if self.simulate_weight:
+            return self.get_weight()
+        weight = self.get_balance().wait_stable(timeout)
+        if weight is not None:
+            global_logger.info(f"等待后获取到重量数据: {weight} g")
+        return weight
+    
+    def set_prediction(self, prediction):
+        """
+        更新预测的稳定重量（由工位的天平读数回调调用）
+        
+        参数:
+            prediction: SettlingPredictor给出的SettledReading，None表示清除
+        """
+        self.prediction = prediction
+    
+    def get_balance(self):
+        """
+        获取（并启动）天平读取线程
         
         返回:
-            float: 重量数据（g）
+            BalanceReader: 天平读取线程
         """
-        # 注意：这里的串口读取功能需要根据实际硬件进行调整
-        # 当前实现为模拟数据，实际使用时需要取消注释并调整代码
-        global_logger.warning("串口重量读取功能尚未实现，使用模拟数据")
-        return self._get_simulate_weight()
+        if self.balance is None:
+            self.balance = get_balance_reader(self.serial_port, self.baudrate)
+        return self.balance
     
     def calculate_shaking_parameters(self, target_weight, current_weight):
         """
-        计算抖动参数
+        计算抖动参数（按天平分辨率量化后缓存）
+        
+        参数:
+            target_weight: 目标重量（g）
+            current_weight: 当前重量（g）
+            
+        返回:
+            tuple: (抖动幅度, 抖动角度)
+        """
+        return self.shaking_cache.get_or_compute(
+            (self.effective_density(), self.particle_size, self.controller.name, self.controller.revision),
+            (target_weight, current_weight),
+            self._compute_shaking_parameters
+        )
+    
+    def effective_density(self):
+        """
+        获取控制器使用的等效密度：物料模型的落料系数反映同样密度下实际落料的快慢，
+        与模拟器中落料量 ∝ 密度 × 落料系数 的关系一致
+        
+        返回:
+            float: 密度 × 落料系数
+        """
+        return self.density * self.flow_scale
+    
+    def _compute_shaking_parameters(self, target_weight, current_weight):
+        """
+        计算抖动参数（不经过缓存）
         
         参数:
             target_weight: 目标重量（g）
@@ -126,40 +270,10 @@ class DataProcessor:
             target_weight = float(target_weight)
             current_weight = float(current_weight)
             
-            global_logger.debug(f"开始计算抖动参数 - 目标重量: {target_weight} g, 当前重量: {current_weight} g, 密度: {self.density}, 颗粒大小: {self.particle_size}")
-            
-            # 计算差值和差值百分比
-            weight_diff = abs(target_weight - current_weight)
-            diff_percent = (weight_diff / target_weight) * 100 if target_weight > 0 else 0
-            
-            global_logger.debug(f"重量差值: {weight_diff} g, 差值百分比: {diff_percent}%")
-            
-            # 根据差值百分比计算抖动幅度（差值越大，抖动幅度越大）
-            if diff_percent > 50:
-                y_shaking = 100  # 大幅度抖动
-            elif diff_percent > 20:
-                y_shaking = 50   # 中等幅度抖动
-            elif diff_percent > 5:
-                y_shaking = 20   # 小幅度抖动
-            else:
-                y_shaking = 5    # 微调
-            
-            # 根据颗粒大小调整抖动角度（颗粒越大，角度越小）
-            if self.particle_size > 5:
-                y_angle = 5   # 小角度
-            elif self.particle_size > 2:
-                y_angle = 10  # 中等角度
-            else:
-                y_angle = 15  # 大角度
-            
-            # 根据密度调整参数（密度越大，抖动幅度和角度越小）
-            density_factor = 1.0 / self.density
-            y_shaking = y_shaking * density_factor
-            y_angle = y_angle * density_factor
+            density = self.effective_density()
+            global_logger.debug(f"开始计算抖动参数 - 目标重量: {target_weight} g, 当前重量: {current_weight} g, 等效密度: {density}, 颗粒大小: {self.particle_size}, 控制策略: {self.controller.name}")
             
-            # 确保参数在合理范围内
-            y_shaking = max(1, min(100, y_shaking))
-            y_angle = max(1, min(30, y_angle))
+            y_shaking, y_angle = self.controller.compute(target_weight, current_weight, density, self.particle_size)
             
             global_logger.debug(f"计算完成 - 抖动幅度: {y_shaking}, 抖动角度: {y_angle}")
             return (y_shaking, y_angle)
@@ -179,5 +293,9 @@ class DataProcessor:
             'density': self.density,
             'vial_weight': self.vial_weight,
             'particle_size': self.particle_size,
-            'simulate_weight': self.simulate_weight
+            'simulate_weight': self.simulate_weight,
+            'material': self.material,
+            'material_model': self.material_model,
+            'flow_scale': self.flow_scale,
+            'controller': self.controller.name
         }
@@ -0,0 +1,236 @@
+import re
+
+# RAPID端（T_SOC_COM）发送的消息本身没有统一的结束符：
+#   控制通道: "new_target" / "executing" / ValToStr(weight_vial)
+#   数据通道: "9 9 9" / "accuracy difference target time"
+# 协议v2中RAPID端在请求和结果前加序号前缀："@序号 executing"、"@序号 accuracy difference target time\n"，
+# 带前缀的结果以换行结束，不按字段个数切分。
+# 客户端发往RAPID的控制指令则以 '#' 结尾。
+# 因此分帧规则为：'#' 或换行是显式帧结束符；其余情况按通道语义（关键字、字段个数）切分，
+# 仍无法判定边界的残余数据在接收空闲时整体作为一帧提交。
+
+# 控制通道的请求（可带序号前缀），在其之前的数据单独成帧
+_PROMPT = rb'(?:@\d+[ \t]+)?(?:new_target|executing)'
+
+_CONTROL_FRAME_RE = re.compile(
+    rb'[\s\x00]*'
+    rb'(?:(?P<tagged>@\d+[ \t]+(?:new_target|executing))'
+    rb'|(?P<keyword>new_target|executing)'
+    rb'|(?P<body>(?:(?!' + _PROMPT + rb')[^#\n])*?)[ \t\r\x00]*(?P<end>#|\n|(?=' + _PROMPT + rb')))'
+)
+
+# "9 9 9"后紧跟数字或小数点时是以"9 9 9"开头的数值帧（如"9 9 9.5 ..."），不作为未就绪标记切分，
+# 紧跟的是另一个"9 9 9"时除外；缓冲区末尾只收到下一个"9 9 9"的一部分时等待后续数据
+_DATA_FRAME_RE = re.compile(
+    rb'[\s\x00]*'
+    rb'(?:(?P<sentinel>9 9 9)(?:(?![\d.])|(?=9 9 9))'
+    rb'|(?P<body>[^#\n]*?)[ \t\r\x00]*(?P<end>[#\n])'
+    rb'|(?P<fields>(?!@|9 9 99 9 \Z)[^\s#]+(?:[ \t]+[^\s#]+){3})(?=\s))'
+)
+
+_WHITESPACE = b' \t\r\n\x00'
+
+# 控制通道关键字的真前缀，空闲提交时保留在缓冲区中等待关键字的剩余部分
+_KEYWORD_PREFIXES = tuple(sorted(
+    {keyword[:i] for keyword in (b'new_target', b'executing') for i in range(1, len(keyword))},
+    key=len, reverse=True
+))
+
+
+class FrameReassembler:
+    """
+    TCP字节流帧重组器，负责把recv得到的任意分片还原为完整的协议消息
+
+    内部使用预分配的环形缓冲区：写指针到达末尾时回绕到缓冲区头部，
+    未消费的残帧（通常不足一帧）随之搬移，保证待解析数据始终连续，
+    可以直接通过memoryview切片解析和解码，收发过程中不再分配缓冲区。
+    """
+
+    def __init__(self, mode='control', capacity=10240, parser=None):
+        """
+        初始化帧重组器
+
+        参数:
+            mode: 分帧模式，'control'表示控制通道，'data'表示数据通道
+            capacity: 环形缓冲区容量（字节）
+            parser: 帧解析函数 parser(缓冲区, 起始位置, 结束位置)，在缓冲区上直接解析每一帧，
+                产生解析结果而不是帧字符串；None表示产生帧字符串
+        """
+        if mode not in ('control', 'data'):
+            raise ValueError(f"不支持的分帧模式: {mode}")
+
+        self.mode = mode
+        self.parser = parser
+        self.capacity = max(int(capacity), 64)
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        self._pattern = _CONTROL_FRAME_RE if mode == 'control' else _DATA_FRAME_RE
+        self._start = 0  # 未消费数据的起始位置
+        self._end = 0    # 未消费数据的结束位置（写指针）
+
+        # 统计信息
+        self.frames_total = 0
+        self.bytes_total = 0
+        self.dropped_bytes = 0
+        self.wraps = 0
+
+    def pending_bytes(self):
+        """
+        获取缓冲区中尚未组成完整帧的字节数
+
+        返回:
+            int: 待处理字节数
+        """
+        return self._end - self._start
+
+    def has_pending(self):
+        """
+        判断缓冲区中是否还有未提交的数据
+
+        返回:
+            bool: 是否存在残余数据
+        """
+        return self._end > self._start
+
+    def write_buffer(self):
+        """
+        获取可供socket.recv_into直接写入的空闲区域
+
+        返回:
+            memoryview: 缓冲区中连续的空闲区域
+        """
+        if self._end == self.capacity:
+            if self._start == 0:
+                # 缓冲区已满却无法分出一帧，说明数据已损坏
+                self._drop_pending()
+            else:
+                self._wrap()
+        return self._view[self._end:]
+
+    def commit(self, nbytes):
+        """
+        确认已写入write_buffer()返回区域的字节数
+
+        参数:
+            nbytes: 实际写入的字节数
+        """
+        self._end += nbytes
+        self.bytes_total += nbytes
+
+    def feed(self, data):
+        """
+        写入一段字节数据并返回由此得到的完整帧
+
+        参数:
+            data: bytes/bytearray/memoryview数据
+
+        返回:
+            list: 完整帧字符串列表
+        """
+        frames = []
+        data = memoryview(data)
+        offset = 0
+        while offset < len(data):
+            target = self.write_buffer()
+            count = min(len(target), len(data) - offset)
+            target[:count] = data[offset:offset + count]
+            self.commit(count)
+            offset += count
+            frames.extend(self.frames())
+        return frames
+
+    def frames(self):
+        """
+        依次取出缓冲区中所有完整的帧
+
+        返回:
+            generator: 逐个产生帧字符串（设置了parser时为解析结果）
+        """
+        match = self._pattern.match
+        view = self._view
+        parser = self.parser
+        while self._start < self._end:
+            m = match(self._buffer, self._start, self._end)
+            if m is None:
+                break
+
+            lastgroup = m.lastgroup
+            if lastgroup == 'end':
+                begin = m.start('body')
+                stop = m.end('end') if view[m.start('end')] == 35 else m.end('body')  # 35 == ord('#')
+            else:
+                begin, stop = m.span(lastgroup)
+
+            self._start = m.end()
+            if stop > begin:
+                self.frames_total += 1
+                if parser is None:
+                    yield str(view[begin:stop], 'ascii', 'replace')
+                else:
+                    # 在缓冲区被下一次接收覆盖之前解析
+                    yield parser(view, begin, stop)
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def flush(self):
+        """
+        接收空闲时把残余数据整体作为一帧提交
+
+        返回:
+            generator: 逐个产生帧字符串（设置了parser时为解析结果）
+        """
+        yield from self.frames()
+        if self._start < self._end:
+            stop = self._end
+            if self.mode == 'control':
+                for prefix in _KEYWORD_PREFIXES:
+                    if self._buffer.endswith(prefix, self._start, self._end):
+                        stop -= len(prefix)
+                        break
+            frame = bytes(self._view[self._start:stop]).strip(_WHITESPACE)
+            self._start = stop
+            if self._start == self._end:
+                self._start = self._end = 0
+            if frame:
+                self.frames_total += 1
+                yield frame.decode('ascii', 'replace') if self.parser is None else self.parser(memoryview(frame), 0, len(frame))
+
+    def reset(self):
+        """
+        清空缓冲区（重新连接时调用）
+        """
+        self._start = self._end = 0
+
+    def get_stats(self):
+        """
+        获取分帧统计信息
+
+        返回:
+            dict: 统计信息
+        """
+        return {
+            'frames_total': self.frames_total,
+            'bytes_total': self.bytes_total,
+            'dropped_bytes': self.dropped_bytes,
+            'pending_bytes': self.pending_bytes(),
+            'wraps': self.wraps
+        }
+
+    def _wrap(self):
+        """
+        写指针回绕到缓冲区头部，并把未消费的残帧搬移到头部
+        """
+        remaining = self._end - self._start
+        if remaining:
+            self._view[:remaining] = self._view[self._start:self._end]
+        self.wraps += 1
+        self._start = 0
+        self._end = remaining
+
+    def _drop_pending(self):
+        """
+        丢弃缓冲区中的全部残余数据
+        """
+        self.dropped_bytes += self._end - self._start
+        self._start = self._end = 0
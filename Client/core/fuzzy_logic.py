@@ -1,72 +1,554 @@
-from fuzzylogic.classes import Domain, Set, Rule
+import hashlib
+import json
+import os
+import random
+import numpy as np
+import fuzzylogic
 from fuzzylogic.functions import S, R, trapezoid
+from .config_manager import global_config
 from .logger import global_logger
+from .memo import QuantizedLRUCache
+
+# 模糊域范围
+DIFFERENCE_RANGE = (-0.1, 2)  # 差值
+DENSITY_RANGE = (0, 4)  # 密度
+SHAKING_RANGE = (0, 20)  # 抖动幅度
+ANGLE_RANGE = (10, 40)  # 角度
+SHAKING_RESOLUTION = 0.1  # 抖动幅度域的分辨率，决定后件集合重心的计算精度
+
+# 查找表缓存
+LUT_CACHE_PREFIX = 'fuzzy_lut_'
+LUT_CACHE_VERSION = 1  # 缓存文件布局或查找表编译方式变化时加1
+
+# 模糊集合定义：名称 -> (隶属函数, 参数)，S为递减边，R为递增边，trapezoid为梯形（核心隶属度1）
+DIFFERENCE_SETS = {
+    'small': ('S', (0.2, 0.4)),  # 小差值
+    'medium': ('trapezoid', (0.2, 0.5, 0.6, 0.8)),  # 中等差值
+    'large': ('R', (0.6, 0.8))  # 大差值
+}
+DENSITY_SETS = {
+    'small': ('S', (1.0, 2.5)),  # 低密度
+    'medium': ('trapezoid', (2, 2.4, 2.8, 3.2)),  # 中等密度
+    'large': ('R', (3, 3.2))  # 高密度
+}
+SHAKING_SETS = {
+    'small': ('S', (2, 4)),  # 小幅度抖动
+    'medium': ('trapezoid', (2, 6, 10, 12)),  # 中等幅度抖动
+    'large': ('R', (10, 15))  # 大幅度抖动
+}
+
+# 模糊规则：(差值集合, 密度集合) -> 抖动幅度集合
+RULES = [
+    (('small', 'medium'), 'small'),
+    (('small', 'small'), 'small'),
+    (('small', 'large'), 'small'),
+    (('medium', 'small'), 'medium'),
+    (('medium', 'medium'), 'medium'),
+    (('medium', 'large'), 'medium'),
+    (('large', 'small'), 'large'),
+    (('large', 'medium'), 'large'),
+    (('large', 'large'), 'large')
+]
+
+# fuzzylogic中对应的隶属函数
+MEMBERSHIP_FUNCTIONS = {
+    'S': S,
+    'R': R,
+    'trapezoid': lambda *params: trapezoid(*params, c_m=1)
+}
+
+
+def definition_hash(difference_step, density_step):
+    """
+    计算模糊控制器定义的哈希，作为查找表缓存的键
+
+    包含模糊域范围、模糊集合、规则、查找表采样间隔以及fuzzylogic版本，任何一项变化都会使缓存失效
+
+    参数:
+        difference_step: 差值方向的采样间隔
+        density_step: 密度方向的采样间隔
+
+    返回:
+        str: 十六进制SHA-256摘要
+    """
+    definition = (
+        LUT_CACHE_VERSION, getattr(fuzzylogic, '__version__', None),
+        DIFFERENCE_RANGE, DENSITY_RANGE, SHAKING_RANGE, SHAKING_RESOLUTION,
+        sorted(DIFFERENCE_SETS.items()), sorted(DENSITY_SETS.items()), sorted(SHAKING_SETS.items()), RULES,
+        float(difference_step), float(density_step)
+    )
+    return hashlib.sha256(repr(definition).encode('utf-8')).hexdigest()
+
+
+def _s_batch(x, low, high):
+    """
+    S隶属函数的向量化实现，运算顺序与fuzzylogic.functions.S一致
+    """
+    return np.where(x <= low, 1.0, np.where(x < high, high / (high - low) - x / (high - low), 0.0))
+
+
+def _r_batch(x, low, high):
+    """
+    R隶属函数的向量化实现，运算顺序与fuzzylogic.functions.R一致
+    """
+    return np.where(x < low, 0.0, np.where(x <= high, (x - low) / (high - low), 1.0))
+
+
+def _trapezoid_batch(x, low, c_low, c_high, high):
+    """
+    梯形隶属函数（核心隶属度1）的向量化实现，两侧斜边与fuzzylogic.functions.bounded_linear一致
+    """
+    left = np.clip((1 - 0) / (c_low - low) * (x - low) + 0, 0.0, 1.0)
+    right = np.clip((0 - 1) / (high - c_high) * (x - c_high) + 1, 0.0, 1.0)
+    inside = np.where(x < c_low, left, np.where(x > c_high, right, 1.0))
+    return np.where((x < low) | (high < x), 0.0, inside)
+
+
+BATCH_MEMBERSHIP_FUNCTIONS = {
+    'S': _s_batch,
+    'R': _r_batch,
+    'trapezoid': _trapezoid_batch
+}
+
+
+class VectorizedFuzzyEngine:
+    """
+    向量化的模糊推理引擎，对数组形式的输入一次完成推理
+
+    使用与FuzzyLogicEngine相同的模糊集合定义和规则库（DIFFERENCE_SETS、DENSITY_SETS、RULES），
+    推理方式与fuzzylogic的Rule.__call__（method='cog'）一致：规则强度取前件隶属度的最小值（Mamdani的min蕴含），
+    输出为各后件集合重心按规则强度的加权平均，结果与逐次推理在浮点精度内一致
+    """
+    
+    def __init__(self):
+        """
+        初始化向量化引擎，预先计算各后件集合在抖动幅度域上的重心
+        """
+        low, high = SHAKING_RANGE
+        shaking_range = np.arange(low, high + SHAKING_RESOLUTION, SHAKING_RESOLUTION)
+        self.output_scale = (high - low) / len(shaking_range)
+        self.output_offset = low
+        self.centers = {}
+        for name, (kind, params) in SHAKING_SETS.items():
+            weights = np.fromiter((MEMBERSHIP_FUNCTIONS[kind](*params)(x) for x in shaking_range), float)
+            self.centers[name] = np.average(np.arange(len(weights)), weights=weights) if sum(weights) else 0
+    
+    def __call__(self, differences, densities):
+        """
+        批量推理
+        
+        参数:
+            differences: 重量差值数组
+            densities: 物料密度数组（可以是标量，按广播规则与差值数组匹配）
+            
+        返回:
+            numpy.ndarray: 抖动幅度数组，没有规则被激活的位置为NaN
+        """
+        x = np.clip(np.asarray(differences, dtype=float), *DIFFERENCE_RANGE)
+        y = np.clip(np.asarray(densities, dtype=float), *DENSITY_RANGE)
+        x, y = np.broadcast_arrays(x, y)
+        
+        mu_difference = {name: BATCH_MEMBERSHIP_FUNCTIONS[kind](x, *params)
+                         for name, (kind, params) in DIFFERENCE_SETS.items()}
+        mu_density = {name: BATCH_MEMBERSHIP_FUNCTIONS[kind](y, *params)
+                      for name, (kind, params) in DENSITY_SETS.items()}
+        
+        numerator = np.zeros(x.shape)
+        denominator = np.zeros(x.shape)
+        for (difference_set, density_set), shaking_set in RULES:
+            strength = np.minimum(mu_difference[difference_set], mu_density[density_set])
+            numerator += self.centers[shaking_set] * strength
+            denominator += strength
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            index = numerator / denominator
+        return self.output_scale * index + self.output_offset
+
+
+class FuzzyLookupTable:
+    """
+    预编译的规则曲面查找表
+
+    在 差值 × 密度 网格上对规则库采样一次，运行时按双线性插值求值，与规则数量和输出域分辨率无关。
+    采样时先分别计算各输入模糊集合在坐标轴上的隶属度，再按规则库的重心法（与 Rule.__call__ 相同）组合，
+    网格点上的值与精确推理一致，误差只来自网格之间的插值
+    """
+    
+    def __init__(self, table, difference_range, density_range):
+        """
+        初始化查找表
+        
+        参数:
+            table: 二维数组，table[i, j]为第i个差值采样点、第j个密度采样点的抖动幅度
+            difference_range: 差值范围 (最小值, 最大值)
+            density_range: 密度范围 (最小值, 最大值)
+        """
+        self.table = np.asarray(table, dtype=float)
+        self.x0, self.x1 = difference_range
+        self.y0, self.y1 = density_range
+        self.nx, self.ny = self.table.shape
+        self.inv_dx = (self.nx - 1) / (self.x1 - self.x0)
+        self.inv_dy = (self.ny - 1) / (self.y1 - self.y0)
+        self.max_error = None  # 与精确推理相比的最大误差，由check()计算
+        # 标量查询直接读取数组元素（item()返回Python浮点数），缓存加载的内存映射表格不会整体读入内存
+        self._item = self.table.item
+    
+    @classmethod
+    def compile(cls, engine, difference_step=0.005, density_step=0.02):
+        """
+        对模糊逻辑引擎的规则库采样生成查找表
+        
+        参数:
+            engine: 已创建模糊系统的FuzzyLogicEngine
+            difference_step: 差值方向的采样间隔
+            density_step: 密度方向的采样间隔
+            
+        返回:
+            FuzzyLookupTable: 查找表
+        """
+        xs = np.linspace(DIFFERENCE_RANGE[0], DIFFERENCE_RANGE[1],
+                         int(round((DIFFERENCE_RANGE[1] - DIFFERENCE_RANGE[0]) / difference_step)) + 1)
+        ys = np.linspace(DENSITY_RANGE[0], DENSITY_RANGE[1],
+                         int(round((DENSITY_RANGE[1] - DENSITY_RANGE[0]) / density_step)) + 1)
+        axes = {engine.D: xs.tolist(), engine.density: ys.tolist()}
+        
+        # 各输入模糊集合在坐标轴上的隶属度
+        memberships = {}
+        for condition in engine.rules.conditions:
+            for fuzzy_set in condition:
+                if fuzzy_set not in memberships:
+                    values = np.array([fuzzy_set(value) for value in axes[fuzzy_set.domain]], dtype=float)
+                    # 差值集合按行、密度集合按列展开，便于广播
+                    memberships[fuzzy_set] = values[:, None] if fuzzy_set.domain is engine.D else values[None, :]
+        
+        # 重心法：各规则强度取前件隶属度的最小值，按后件集合的重心加权平均
+        numerator = np.zeros((len(xs), len(ys)))
+        denominator = np.zeros((len(xs), len(ys)))
+        for condition, consequence in engine.rules.conditions.items():
+            strength = None
+            for fuzzy_set in condition:
+                mu = memberships[fuzzy_set]
+                strength = mu if strength is None else np.minimum(strength, mu)
+            strength = np.broadcast_to(strength, numerator.shape)
+            numerator += strength * consequence.center_of_gravity
+            denominator += strength
+        
+        target = engine.Sa
+        with np.errstate(invalid='ignore', divide='ignore'):
+            index = numerator / denominator
+        table = (SHAKING_RANGE[1] - SHAKING_RANGE[0]) / len(target.range) * index + SHAKING_RANGE[0]
+        if np.isnan(table).any():
+            raise ValueError("规则库未覆盖整个输入范围，无法生成查找表")
+        return cls(table, DIFFERENCE_RANGE, DENSITY_RANGE)
+    
+    def __call__(self, difference, density_val):
+        """
+        双线性插值求抖动幅度，输入超出范围时按边界值计算
+        
+        参数:
+            difference: 重量差值
+            density_val: 物料密度
+            
+        返回:
+            float: 抖动幅度
+        """
+        x = (min(max(difference, self.x0), self.x1) - self.x0) * self.inv_dx
+        y = (min(max(density_val, self.y0), self.y1) - self.y0) * self.inv_dy
+        i = int(x)
+        j = int(y)
+        if i > self.nx - 2:
+            i = self.nx - 2
+        if j > self.ny - 2:
+            j = self.ny - 2
+        fx = x - i
+        fy = y - j
+        item = self._item
+        a00 = item(i, j)
+        a10 = item(i + 1, j)
+        a = a00 + (item(i, j + 1) - a00) * fy
+        b = a10 + (item(i + 1, j + 1) - a10) * fy
+        return a + (b - a) * fx
+    
+    def check(self, reference, points):
+        """
+        计算查找表与精确推理的最大误差
+        
+        参数:
+            reference: 精确推理函数 reference(difference, density) -> 抖动幅度
+            points: [(差值, 密度), ...] 检查点
+            
+        返回:
+            float: 最大绝对误差
+        """
+        max_error = 0.0
+        for difference, density_val in points:
+            exact = reference(difference, density_val)
+            if exact is not None:
+                max_error = max(max_error, abs(self(difference, density_val) - exact))
+        self.max_error = max_error
+        return max_error
+    
+    def save(self, directory, key):
+        """
+        保存到缓存目录，并删除目录中其它定义的旧缓存
+        
+        表格保存为.npy（启动时内存映射加载），范围和误差等元数据保存为.json。
+        两个文件都先写临时文件再替换，元数据最后写入，作为缓存完整的标志
+        
+        参数:
+            directory: 缓存目录
+            key: 模糊控制器定义的哈希（definition_hash）
+        """
+        os.makedirs(directory, exist_ok=True)
+        base_name = LUT_CACHE_PREFIX + key[:16]
+        for name in os.listdir(directory):
+            if name.startswith(LUT_CACHE_PREFIX) and not name.startswith(base_name):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # 可能仍被其它进程映射，下次保存时再删除
+        
+        base = os.path.join(directory, base_name)
+        with open(base + '.npy.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.table, dtype=float))
+        os.replace(base + '.npy.tmp', base + '.npy')
+        
+        metadata = {
+            'key': key,
+            'shape': [self.nx, self.ny],
+            'difference_range': [self.x0, self.x1],
+            'density_range': [self.y0, self.y1],
+            'max_error': self.max_error
+        }
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+        os.replace(base + '.json.tmp', base + '.json')
+    
+    @classmethod
+    def load(cls, directory, key):
+        """
+        从缓存目录内存映射加载查找表
+        
+        参数:
+            directory: 缓存目录
+            key: 模糊控制器定义的哈希（definition_hash）
+            
+        返回:
+            FuzzyLookupTable: 查找表，没有与key一致的完整缓存时返回None
+        """
+        base = os.path.join(directory, LUT_CACHE_PREFIX + key[:16])
+        try:
+            with open(base + '.json', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if metadata.get('key') != key:
+            return None
+        
+        table = np.load(base + '.npy', mmap_mode='r')
+        if list(table.shape) != metadata['shape']:
+            return None
+        lut = cls(table, tuple(metadata['difference_range']), tuple(metadata['density_range']))
+        lut.max_error = metadata['max_error']
+        return lut
+
 
 class FuzzyLogicEngine:
     """
     模糊逻辑引擎，负责模糊推理和抖动参数计算
     """
     
-    def __init__(self):
+    def __init__(self, use_lut=None, cache_dir=None):
         """
         初始化模糊逻辑引擎
+        
+        参数:
+            use_lut: 是否预编译查找表代替逐次推理，None则读取配置
+            cache_dir: 查找表缓存目录，None则读取配置，空字符串表示不使用缓存
         """
         self.rules = None
         self.D = None  # 差值模糊域
         self.density = None  # 密度模糊域
         self.Sa = None  # 抖动幅度模糊域
         self.A = None  # 角度模糊域
+        self.lut = None  # 预编译的查找表
+        self._batch = None  # 向量化引擎，第一次批量推理时创建
+        self.revision = 0  # 规则库或查找表每次变化加1，用于使抖动参数缓存失效
+        
+        # 抖动参数缓存：差值按天平分辨率、密度按密度分辨率量化
+        self.shaking_cache = QuantizedLRUCache(
+            global_config.get_int('Controller', 'memo_size', 1024),
+            (global_config.get_float('Controller', 'weight_resolution', 0.0001),
+             global_config.get_float('Controller', 'density_resolution', 0.001))
+        )
         
-        # 创建模糊系统
-        self.create_fuzzy_system()
+        if use_lut is None:
+            use_lut = global_config.get_boolean('Fuzzy', 'lut_enabled', True)
+        if cache_dir is None:
+            cache_dir = global_config.get('Fuzzy', 'lut_cache_dir', 'cache') \
+                if global_config.get_boolean('Fuzzy', 'lut_cache_enabled', True) else ''
+        self.cache_dir = cache_dir
+        
+        # 缓存命中时直接使用查找表，模糊系统在第一次需要精确推理时才创建
+        if not (use_lut and self.load_lut()):
+            self.create_fuzzy_system()
+            if use_lut and self.rules:
+                self.compile_lut()
     
     def create_fuzzy_system(self):
         """
         创建模糊逻辑系统
         """
+        # fuzzylogic.classes会导入matplotlib.pyplot（约1秒），只在需要规则库时导入
+        from fuzzylogic.classes import Domain, Rule
+        
         try:
             # 定义模糊域
-            self.D = Domain("Difference", -0.1, 2, res=0.02)  # 差值范围
-            self.density = Domain("density", 0, 4, res=0.02)  # 密度范围
-            self.Sa = Domain("shaking", 0, 20, res=0.1)  # 抖动幅度范围
-            self.A = Domain('angle', 10, 40, res=0.1)  # 角度范围
-            
-            # 定义模糊集合 - 差值
-            self.D.small = S(0.2, 0.4)  # 小差值
-            self.D.medium = trapezoid(0.2, 0.5, 0.6, 0.8, c_m=1)  # 中等差值
-            self.D.large = R(0.6, 0.8)  # 大差值
-            
-            # 定义模糊集合 - 密度
-            self.density.small = S(1.0, 2.5)  # 低密度
-            self.density.medium = trapezoid(2, 2.4, 2.8, 3.2, c_m=1)  # 中等密度
-            self.density.large = R(3, 3.2)  # 高密度
-            
-            # 定义模糊集合 - 抖动幅度
-            self.Sa.small = S(2, 4)  # 小幅度抖动
-            self.Sa.medium = trapezoid(2, 6, 10, 12, c_m=1)  # 中等幅度抖动
-            self.Sa.large = R(10, 15)  # 大幅度抖动
+            self.D = Domain("Difference", *DIFFERENCE_RANGE, res=0.02)  # 差值范围
+            self.density = Domain("density", *DENSITY_RANGE, res=0.02)  # 密度范围
+            self.Sa = Domain("shaking", *SHAKING_RANGE, res=SHAKING_RESOLUTION)  # 抖动幅度范围
+            self.A = Domain('angle', *ANGLE_RANGE, res=0.1)  # 角度范围
+            
+            # 定义模糊集合
+            for domain, sets in ((self.D, DIFFERENCE_SETS), (self.density, DENSITY_SETS), (self.Sa, SHAKING_SETS)):
+                for name, (kind, params) in sets.items():
+                    setattr(domain, name, MEMBERSHIP_FUNCTIONS[kind](*params))
             
             # 定义模糊规则
             rules = [
-                Rule({(self.D.small, self.density.medium): self.Sa.small}),
-                Rule({(self.D.small, self.density.small): self.Sa.small}),
-                Rule({(self.D.small, self.density.large): self.Sa.small}),
-                Rule({(self.D.medium, self.density.small): self.Sa.medium}),
-                Rule({(self.D.medium, self.density.medium): self.Sa.medium}),
-                Rule({(self.D.medium, self.density.large): self.Sa.medium}),
-                Rule({(self.D.large, self.density.small): self.Sa.large}),
-                Rule({(self.D.large, self.density.medium): self.Sa.large}),
-                Rule({(self.D.large, self.density.large): self.Sa.large})
+                Rule({(getattr(self.D, difference_set), getattr(self.density, density_set)): getattr(self.Sa, shaking_set)})
+                for (difference_set, density_set), shaking_set in RULES
             ]
             
             # 合并规则
             self.rules = sum(rules)
+            self.revision += 1
             
             global_logger.info("模糊逻辑系统创建成功")
             
         except Exception as e:
             global_logger.error(f"创建模糊逻辑系统失败: {e}")
     
+    def ensure_fuzzy_system(self):
+        """
+        模糊系统尚未创建时创建（从缓存加载查找表后延迟到第一次需要精确推理时）
+        
+        返回:
+            bool: 规则库是否可用
+        """
+        if self.rules is None:
+            self.create_fuzzy_system()
+        return bool(self.rules)
+    
+    def _lut_steps(self, difference_step, density_step):
+        """
+        查找表采样间隔，None则读取配置
+        """
+        if difference_step is None:
+            difference_step = global_config.get_float('Fuzzy', 'lut_difference_step', 0.005)
+        if density_step is None:
+            density_step = global_config.get_float('Fuzzy', 'lut_density_step', 0.02)
+        return difference_step, density_step
+    
+    def load_lut(self, difference_step=None, density_step=None):
+        """
+        从缓存目录加载与当前模糊控制器定义一致的查找表
+        
+        参数:
+            difference_step: 差值方向的采样间隔，None则读取配置
+            density_step: 密度方向的采样间隔，None则读取配置
+            
+        返回:
+            FuzzyLookupTable: 查找表，未启用缓存或没有可用缓存时返回None
+        """
+        if not self.cache_dir:
+            return None
+        difference_step, density_step = self._lut_steps(difference_step, density_step)
+        try:
+            lut = FuzzyLookupTable.load(self.cache_dir, definition_hash(difference_step, density_step))
+        except (OSError, ValueError, KeyError) as e:
+            global_logger.warning(f"读取模糊查找表缓存失败，重新编译: {e}")
+            return None
+        if lut is None:
+            global_logger.info("没有与当前模糊规则一致的查找表缓存，重新编译")
+            return None
+        
+        self.lut = lut
+        self.revision += 1
+        global_logger.info(f"已加载模糊查找表缓存: {lut.nx}x{lut.ny}，最大误差 {lut.max_error:.4g}")
+        return lut
+    
+    def compile_lut(self, difference_step=None, density_step=None, check_points=1000):
+        """
+        预编译规则曲面查找表，并在随机检查点上与精确推理比较，启用缓存时保存到缓存目录
+        
+        参数:
+            difference_step: 差值方向的采样间隔，None则读取配置
+            density_step: 密度方向的采样间隔，None则读取配置
+            check_points: 误差检查点数量，0表示不检查
+            
+        返回:
+            FuzzyLookupTable: 查找表，编译失败时返回None并继续使用精确推理
+        """
+        difference_step, density_step = self._lut_steps(difference_step, density_step)
+        if not self.ensure_fuzzy_system():
+            global_logger.error("模糊规则未初始化，无法预编译查找表")
+            return None
+        try:
+            lut = FuzzyLookupTable.compile(self, difference_step, density_step)
+        except Exception as e:
+            global_logger.error(f"预编译模糊查找表失败，使用精确推理: {e}")
+            self.lut = None
+            self.revision += 1
+            return None
+        
+        if check_points:
+            rng = random.Random(0)
+            points = [(rng.uniform(*DIFFERENCE_RANGE), rng.uniform(*DENSITY_RANGE)) for _ in range(check_points)]
+            lut.check(self.fuzzy_inference_exact, points)
+            global_logger.info(f"模糊查找表编译完成: {lut.nx}x{lut.ny}，最大误差 {lut.max_error:.4g}")
+        self.lut = lut
+        self.revision += 1
+        
+        if self.cache_dir:
+            try:
+                lut.save(self.cache_dir, definition_hash(difference_step, density_step))
+            except OSError as e:
+                global_logger.warning(f"保存模糊查找表缓存失败: {e}")
+        return lut
+    
+    def fuzzy_inference_exact(self, difference, density_val):
+        """
+        按规则库逐次推理（不使用查找表）
+        
+        参数:
+            difference: 重量差值
+            density_val: 物料密度
+            
+        返回:
+            float: 推理得到的抖动幅度，没有规则被激活时返回None
+        """
+        if not self.ensure_fuzzy_system():
+            return None
+        difference = max(DIFFERENCE_RANGE[0], min(DIFFERENCE_RANGE[1], difference))
+        density_val = max(DENSITY_RANGE[0], min(DENSITY_RANGE[1], density_val))
+        return self.rules({self.D: difference, self.density: density_val})
+    
+    def fuzzy_inference_batch(self, differences, densities):
+        """
+        批量执行模糊推理（用于参数整定、仿真和报表）
+        
+        参数:
+            differences: 重量差值数组
+            densities: 物料密度数组或标量
+            
+        返回:
+            numpy.ndarray: 抖动幅度数组，没有规则被激活的位置为NaN
+        """
+        if self._batch is None:
+            self._batch = VectorizedFuzzyEngine()
+        return self._batch(differences, densities)
+    
     def fuzzy_inference(self, difference, density_val):
         """
         执行模糊推理
@@ -79,19 +561,15 @@ class FuzzyLogicEngine:
             float: 推理得到的抖动幅度
         """
         try:
-            if not self.rules:
+            if self.lut is None and not self.ensure_fuzzy_system():
                 global_logger.error("模糊规则未初始化")
                 return None
             
-            # 输入值必须在模糊域范围内
-            difference = max(self.D.min, min(self.D.max, difference))
-            density_val = max(self.density.min, min(self.density.max, density_val))
-            
-            # 构建输入字典
-            X = {self.D: difference, self.density: density_val}
-            
-            # 执行模糊推理
-            result = self.rules(X)
+            # 预编译了查找表时按插值求值，否则执行模糊推理（输入值限制在模糊域范围内）
+            if self.lut is not None:
+                result = self.lut(difference, density_val)
+            else:
+                result = self.fuzzy_inference_exact(difference, density_val)
             
             global_logger.debug(f"模糊推理 - 差值: {difference}, 密度: {density_val}, 结果: {result}")
             return result
@@ -102,7 +580,20 @@ class FuzzyLogicEngine:
     
     def calculate_shaking(self, difference, density_val):
         """
-        计算抖动参数
+        计算抖动参数（按天平分辨率和密度分辨率量化后缓存，规则库或查找表变化时自动失效）
+        
+        参数:
+            difference: 重量差值
+            density_val: 物料密度
+            
+        返回:
+            tuple: (抖动幅度, 抖动角度)
+        """
+        return self.shaking_cache.get_or_compute(self.revision, (difference, density_val), self._compute_shaking)
+    
+    def _compute_shaking(self, difference, density_val):
+        """
+        计算抖动参数（不经过缓存）
         
         参数:
             difference: 重量差值
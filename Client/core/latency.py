@@ -0,0 +1,336 @@
+import csv
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from .protocol_handler import split_sequence
+
+# 直方图精度参数：每个2的幂区间划分为64个子区间，相对误差不超过约1.6%
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+
+# 发送队列等待时间（入队到写入socket）在统计中使用的消息类型名称
+QUEUE_WAIT_TYPE = 'send_queue_wait'
+
+# 导出统计时使用的百分位
+EXPORT_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    HDR风格的固定内存延迟直方图（对数-线性分桶，单位：微秒）
+
+    记录值只占用预先分配的计数数组，记录次数再多内存也不会增长
+    """
+
+    def __init__(self, max_value_us=60_000_000):
+        """
+        初始化直方图
+
+        参数:
+            max_value_us: 可记录的最大值（微秒），超出部分按最大值计入
+        """
+        self.max_value_us = int(max_value_us)
+        self.bucket_count = self._index_of(self.max_value_us) + 1
+        self.counts = array('Q', bytes(8 * self.bucket_count))
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self.overflow_count = 0
+
+    @staticmethod
+    def _index_of(value):
+        """
+        计算数值所在的桶序号
+        """
+        magnitude = value.bit_length() - _SUB_BUCKET_BITS
+        if magnitude <= 0:
+            return value
+        return magnitude * _SUB_BUCKET_HALF + (value >> magnitude)
+
+    @staticmethod
+    def _value_at(index):
+        """
+        计算桶序号对应的代表值（桶区间中点）
+        """
+        if index < _SUB_BUCKET_COUNT:
+            return index
+        magnitude = index // _SUB_BUCKET_HALF - 1
+        sub_bucket = index - magnitude * _SUB_BUCKET_HALF
+        lower = sub_bucket << magnitude
+        return lower + ((1 << magnitude) - 1) // 2
+
+    def record(self, value_us):
+        """
+        记录一个延迟值
+
+        参数:
+            value_us: 延迟（微秒）
+        """
+        value = int(value_us)
+        if value < 0:
+            value = 0
+        if value > self.max_value_us:
+            self.overflow_count += 1
+            value = self.max_value_us
+
+        self.counts[self._index_of(value)] += 1
+        self.total_count += 1
+        self.total_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, percent):
+        """
+        获取百分位数
+
+        参数:
+            percent: 百分位（0~100）
+
+        返回:
+            float: 百分位对应的延迟（微秒），没有数据时返回None
+        """
+        if self.total_count == 0:
+            return None
+        target = max(1, int(self.total_count * percent / 100.0 + 0.5))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                cumulative += count
+                if cumulative >= target:
+                    return min(max(self._value_at(index), self.min_us), self.max_us)
+        return self.max_us
+
+    def mean(self):
+        """
+        获取平均延迟
+
+        返回:
+            float: 平均延迟（微秒），没有数据时返回None
+        """
+        if self.total_count == 0:
+            return None
+        return self.total_us / self.total_count
+
+    def nonzero_buckets(self):
+        """
+        获取非空桶
+
+        返回:
+            list: [(代表值微秒, 计数), ...]
+        """
+        return [(self._value_at(index), count) for index, count in enumerate(self.counts) if count]
+
+    def reset(self):
+        """
+        清空直方图
+        """
+        for index in range(self.bucket_count):
+            self.counts[index] = 0
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+        self.overflow_count = 0
+
+
+class LatencyRecorder:
+    """
+    通讯延迟记录器，按消息类型把发送和对应的接收配对并记录到直方图
+
+    控制通道由机器人发起（new_target/executing），记录从收到指令到客户端发出应答的时间；
+    数据通道由客户端发起（request_weight），记录从发出请求到收到回复的往返时间
+    """
+
+    def __init__(self, channel, max_pending=64):
+        """
+        初始化延迟记录器
+
+        参数:
+            channel: 通道名称，'CTRL_COM'或'DATA_COM'
+            max_pending: 最多保留的未配对消息数
+        """
+        self.channel = channel
+        self.client_initiated = channel == 'DATA_COM'
+        self.histograms = {}
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _message_type(message):
+        """
+        获取消息类型
+
+        参数:
+            message: 消息字符串
+
+        返回:
+            str: 消息类型，不需要应答的消息返回None
+        """
+        # 协议v2的请求带序号前缀"@序号 "，按去掉前缀后的消息分类
+        message = split_sequence(message.strip())[1].strip()
+        if message == 'new_target':
+            return 'new_target'
+        if 'executing' in message:
+            return 'executing'
+        if message and not message[0].isdigit() and not message.endswith('#'):
+            return message.split()[0]
+        return None
+
+    def on_send(self, message, timestamp=None, reply=True):
+        """
+        记录一次发送
+
+        参数:
+            message: 发送的消息
+            timestamp: time.monotonic()时间戳，None表示当前时间
+            reply: 是否为对机器人请求的应答，控制通道只有应答才与请求配对，
+                客户端主动发送的稳定重量、重量更新和重新规划的轨迹不参与配对
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            if self.client_initiated:
+                message_type = self._message_type(message)
+                if message_type:
+                    self._pending.append((message_type, now))
+            elif reply and self._pending:
+                message_type, started = self._pending.popleft()
+                self._record(message_type, now - started)
+
+    def on_receive(self, message, timestamp=None):
+        """
+        记录一次接收
+
+        参数:
+            message: 接收到的消息
+            timestamp: time.monotonic()时间戳，None表示当前时间
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            if self.client_initiated:
+                if self._pending:
+                    message_type, started = self._pending.popleft()
+                    self._record(message_type, now - started)
+            else:
+                message_type = self._message_type(message)
+                if message_type:
+                    self._pending.append((message_type, now))
+
+    def record_queue_wait(self, seconds):
+        """
+        记录一条消息从入队到写入socket的等待时间
+
+        参数:
+            seconds: 等待时间（秒）
+        """
+        with self._lock:
+            self._record(QUEUE_WAIT_TYPE, seconds)
+
+    def _record(self, message_type, seconds):
+        """
+        把一次延迟记录到对应类型的直方图
+        """
+        histogram = self.histograms.get(message_type)
+        if histogram is None:
+            histogram = self.histograms[message_type] = LatencyHistogram()
+        histogram.record(seconds * 1e6)
+
+    def clear_pending(self):
+        """
+        清空未配对的消息（断线重连后调用）
+        """
+        with self._lock:
+            self._pending.clear()
+
+    def reset(self):
+        """
+        清空所有统计数据
+        """
+        with self._lock:
+            self._pending.clear()
+            self.histograms.clear()
+
+    def get_summary(self):
+        """
+        获取各消息类型的延迟统计
+
+        返回:
+            list: 每种消息类型一条统计，时间单位为毫秒
+        """
+        summary = []
+        with self._lock:
+            for message_type, histogram in sorted(self.histograms.items()):
+                row = {
+                    'channel': self.channel,
+                    'message_type': message_type,
+                    'count': histogram.total_count,
+                    'min_ms': _to_ms(histogram.min_us),
+                    'mean_ms': _to_ms(histogram.mean()),
+                    'max_ms': _to_ms(histogram.max_us)
+                }
+                for percent in EXPORT_PERCENTILES:
+                    row[f'p{percent:g}_ms'] = _to_ms(histogram.percentile(percent))
+                summary.append(row)
+        return summary
+
+    def get_buckets(self):
+        """
+        获取各消息类型的直方图非空桶
+
+        返回:
+            dict: {消息类型: [(代表值微秒, 计数), ...]}
+        """
+        with self._lock:
+            return {message_type: histogram.nonzero_buckets()
+                    for message_type, histogram in self.histograms.items()}
+
+
+def _to_ms(value_us):
+    """
+    微秒转换为毫秒
+    """
+    return None if value_us is None else round(value_us / 1000.0, 3)
+
+
+def export_latency_stats(recorders, file_path):
+    """
+    导出延迟统计，根据扩展名选择CSV或JSON格式
+
+    参数:
+        recorders: LatencyRecorder列表
+        file_path: 导出文件路径（.csv或.json）
+
+    返回:
+        int: 导出的统计条数
+    """
+    rows = []
+    for recorder in recorders:
+        rows.extend(recorder.get_summary())
+
+    if os.path.splitext(file_path)[1].lower() == '.json':
+        data = {
+            'exported_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
+            'unit': 'ms',
+            'summary': rows,
+            'histograms': {recorder.channel: {
+                message_type: [[value_us, count] for value_us, count in buckets]
+                for message_type, buckets in recorder.get_buckets().items()
+            } for recorder in recorders}
+        }
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    else:
+        fieldnames = ['channel', 'message_type', 'count', 'min_ms', 'mean_ms'] + \
+                     [f'p{percent:g}_ms' for percent in EXPORT_PERCENTILES] + ['max_ms']
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return len(rows)
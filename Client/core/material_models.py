@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from .config_manager import global_config
+from .logger import global_logger
+
+# 参数文件格式版本，tools/fit_material_models.py 写入，版本不同时不加载
+MODEL_VERSION = 1
+
+
+def normalize_material(name):
+    """
+    物料名称的查找键（忽略大小写和首尾空白）
+
+    参数:
+        name: 物料名称
+
+    返回:
+        str: 查找键
+    """
+    return str(name).strip().upper()
+
+
+class MaterialModelStore:
+    """
+    物料模型参数：由 tools/fit_material_models.py 从历史称量结果拟合，按物料和平台保存
+    成功率、耗时模型（overhead + seconds_per_gram * 目标重量）、误差模型（abs_sd + rel_sd * 目标重量）
+    以及相对同平台中位数的 flow_scale / noise_scale
+    """
+
+    def __init__(self, path=None, platform=None):
+        """
+        初始化参数存储，参数为None时读取配置
+
+        参数:
+            path: 参数文件路径
+            platform: 默认平台名称（与结果文件名中的平台一致）
+        """
+        self.path = path or global_config.get('Materials', 'model_file', 'resources/material_models.json')
+        self.platform = platform or global_config.get('Materials', 'platform', 'Dual-arm robot')
+        self.materials = {}  # 查找键 -> (物料名称, 平台 -> 模型参数)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        加载参数文件，文件不存在或格式不符时清空已加载的模型
+
+        返回:
+            bool: 是否成功
+        """
+        materials = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, encoding='utf-8') as file:
+                    store = json.load(file)
+                if store.get('version') != MODEL_VERSION:
+                    global_logger.warning(f"物料模型文件版本不符: {self.path}: {store.get('version')}")
+                else:
+                    for name, platforms in store.get('materials', {}).items():
+                        materials[normalize_material(name)] = (name, platforms)
+            else:
+                global_logger.info(f"物料模型文件不存在: {self.path}")
+        except Exception as e:
+            global_logger.error(f"加载物料模型文件失败: {self.path}: {e}")
+        with self._lock:
+            self.materials = materials
+        if materials:
+            global_logger.info(f"已加载物料模型: {len(materials)} 种物料，平台 {self.platform}")
+        return bool(materials)
+
+    def get(self, material, platform=None):
+        """
+        获取物料在平台上的模型参数
+
+        参数:
+            material: 物料名称（忽略大小写）
+            platform: 平台名称，None表示默认平台
+
+        返回:
+            dict: 模型参数，没有该物料或该平台的成功记录时返回None
+        """
+        if not material:
+            return None
+        entry = self.materials.get(normalize_material(material))
+        if entry is None:
+            return None
+        model = entry[1].get(platform or self.platform)
+        if not model or 'seconds_per_gram' not in model:
+            return None
+        return model
+
+    def names(self):
+        """
+        已加载的物料名称
+
+        返回:
+            list: 物料名称
+        """
+        return sorted(name for name, _ in self.materials.values())
+
+
+# 共享的物料模型，第一次使用时加载参数文件
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_material_models():
+    """
+    获取（并加载）共享的物料模型
+
+    返回:
+        MaterialModelStore: 物料模型
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MaterialModelStore()
+            _store.load()
+        return _store
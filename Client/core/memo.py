@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class QuantizedLRUCache:
+    """
+    按量化后的输入缓存计算结果的有界LRU缓存（线程安全）
+
+    输入按各自的分辨率（如天平分辨率0.1 mg）量化后作为键，计算时使用量化后的值，
+    同一量化格内的输入得到完全相同的结果，与缓存是否命中无关。
+    调用时传入上下文（规则库版本、物料参数等），上下文变化时自动清空缓存
+    """
+
+    def __init__(self, max_size=1024, resolutions=(0.0001,)):
+        """
+        初始化缓存
+
+        参数:
+            max_size: 最多缓存的结果数，0表示不缓存
+            resolutions: 各输入的量化分辨率
+        """
+        self.max_size = max(0, int(max_size))
+        self.resolutions = tuple(resolutions)
+        # 分辨率为10的负整数次幂时按整数倍率量化，反量化时用除法得到最接近的十进制值
+        self._scales = tuple(1.0 / resolution for resolution in self.resolutions)
+        self._entries = OrderedDict()
+        self._context = _MISSING
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def quantize(self, values):
+        """
+        量化输入
+
+        参数:
+            values: 输入值序列，长度与resolutions一致
+
+        返回:
+            tuple: 量化后的整数键
+        """
+        return tuple(round(float(value) * scale) for value, scale in zip(values, self._scales))
+
+    def get_or_compute(self, context, values, compute):
+        """
+        查找缓存，未命中时用量化后的输入计算并缓存
+
+        参数:
+            context: 计算上下文，与上次不同时清空缓存
+            values: 输入值序列
+            compute: 计算函数 compute(*量化后的输入)
+
+        返回:
+            计算结果；输入无法量化（None、非数值）时直接用原始输入计算，不经过缓存
+        """
+        if not self.max_size:
+            return compute(*values)
+        try:
+            key = self.quantize(values)
+        except (TypeError, ValueError, OverflowError):
+            return compute(*values)
+
+        with self._lock:
+            if context != self._context:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._context = context
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute(*(index / scale for index, scale in zip(key, self._scales)))
+
+        with self._lock:
+            # 计算期间上下文已变化时不缓存旧上下文的结果
+            if context == self._context:
+                self._entries[key] = value
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._context = _MISSING
+
+    def reset(self):
+        """
+        清空统计（保留已缓存的结果）
+        """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def get_stats(self):
+        """
+        获取缓存统计
+
+        返回:
+            dict: 当前条目数、容量、命中/未命中/淘汰/失效次数和命中率
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -1,19 +1,336 @@
+import math
+import struct
+import threading
+import time
 from .logger import global_logger, system_logger
+from .config_manager import global_config
 
-class ProtocolHandler:
+# 协议版本
+PROTOCOL_V1 = 1  # ASCII："target_weight shaking_amplitude current_weight shaking_angle #"
+PROTOCOL_V2 = 2  # 定长二进制，见 V2_CONTROL_STRUCT
+
+# v2控制指令：消息类型(1字节) 标志(1字节) 序号(uint16) 4个float32，网络字节序，共20字节
+# 消息类型字节不可打印，RAPID端据此区分v2数据包和ASCII数据包
+V2_MSG_CONTROL = 0x02
+V2_CONTROL_STRUCT = struct.Struct('!BBH4f')
+
+# v2抖动轨迹：消息类型(0x03) 设定点数N(1字节) 序号(uint16) 当前重量 轨迹上限重量，
+# 随后N组 (起始重量, 抖动幅度, 抖动角度)，均为float32，共12+12N字节
+# N为0时只更新当前重量，序号为0且不占用序号
+V2_MSG_TRAJECTORY = 0x03
+V2_TRAJECTORY_HEADER = struct.Struct('!BBH2f')
+V2_SETPOINT_STRUCT = struct.Struct('!3f')
+TRAJECTORY_MAX_STEPS = 8  # 与RAPID端轨迹数组长度一致
+TRAJECTORY_FIELDS = ('current_weight', 'limit_weight', 'setpoints')
+
+# v2稳定重量（客户端检测到天平读数稳定后主动发送）：消息类型(0x04) 标志(1字节) 稳定次数(uint16)
+# 稳定重量 置信区间半宽，均为float32，共12字节。标志位0表示一次扰动后第一次判定稳定，标志位1表示
+# 由过渡过程读数预测的稳定重量（天平尚未稳定），稳定次数每次扰动后加1（1~65535），
+# 保持稳定期间的刷新沿用同一个值。不占用指令序号，RAPID端不回复
+V2_MSG_SETTLED = 0x04
+V2_SETTLED_STRUCT = struct.Struct('!BBH2f')
+SETTLED_FLAG_FIRST = 0x01
+SETTLED_FLAG_PREDICTED = 0x02
+SETTLED_FIELDS = ('settled_weight', 'bound')
+
+# 天平暂无稳定读数时控制指令中的当前重量，RAPID端收到command{3}=100后置recv_stable为FALSE，
+# 不使用本次的抖动参数，稍后再次请求
+UNSTABLE_WEIGHT = 100.0
+
+# v1控制指令的字段顺序
+CONTROL_FIELDS = ('target_weight', 'shaking_amplitude', 'current_weight', 'shaking_angle')
+
+# RAPID字符串最大长度，SocketReceive \Str 超出部分会被截断
+RAPID_STRING_MAX = 80
+
+# 协议协商（在数据通道上进行）：客户端发送"protocol 2"，支持v2的RAPID程序回复"protocol 2"，
+# 旧版程序把它当作普通请求回复称重数据，此时继续使用v1
+PROTOCOL_REQUEST_PREFIX = 'protocol '
+
+# 协议v2中RAPID端消息的序号前缀："@序号 executing" / "@序号 accuracy difference target time"
+# 序号范围1~65535，0表示尚未执行过带序号的指令
+SEQUENCE_TAG = '@'
+SEQUENCE_MAX = 0xFFFF
+
+
+class RobotMessage:
     """
-    通讯协议处理类，负责处理与机器人的通讯协议
+    解析后的机器人消息
+
+    kind取值:
+        'new_target' / 'target' / 'executing': 控制通道请求
+        'vial_weight': 瓶重，values为 (重量,)
+        'result': 称量结果，values为 (accuracy, difference, target_weight, time)
+        'not_ready': 数据未就绪占位消息 "9 9 9"
+        'data': 以'#'结尾的控制指令，values为各参数
+        'subscribed' / 'unsubscribed' / 'protocol': 订阅与协议协商应答，values为应答中的数值
+        'unknown': 无法识别的消息，raw为原始字符串
+    不带序号和数值的消息使用共享实例，调用方不应修改返回的对象
+    """
+    
+    __slots__ = ('kind', 'values', 'sequence', 'raw')
+    
+    def __init__(self, kind, values, sequence, raw):
+        self.kind = kind
+        self.values = values  # 数值字段（tuple），没有时为None
+        self.sequence = sequence  # 协议v2的序号前缀，没有时为None
+        self.raw = raw  # 原始消息字符串，仅executing和unknown保留
+    
+    def __repr__(self):
+        return f"RobotMessage({self.kind!r}, values={self.values!r}, sequence={self.sequence!r}, raw={self.raw!r})"
+
+
+# 完整匹配即可确定的消息，使用共享实例，解析时不分配内存
+_SHARED_MESSAGES = {
+    'new_target': RobotMessage('new_target', None, None, None),
+    'target': RobotMessage('target', None, None, None),
+    'executing': RobotMessage('executing', None, None, 'executing'),
+    '9 9 9': RobotMessage('not_ready', None, None, None),
+    'unsubscribed': RobotMessage('unsubscribed', (), None, None),
+}
+_EMPTY = RobotMessage('unknown', None, None, '')
+
+# 带数值的应答前缀
+_PREFIXES = {
+    's': ('subscribed', 'subscribed'),
+    'p': ('protocol', PROTOCOL_REQUEST_PREFIX),
+}
+
+
+def _unknown(text):
+    """
+    慢速路径：去掉首尾空白后重新解析，仍无法识别时返回unknown
+    """
+    stripped = text.strip()
+    if not stripped:
+        return _EMPTY
+    if stripped != text:
+        return parse_message(stripped)
+    if 'executing' in text:
+        # 与旧实现一致，包含executing的消息按executing处理
+        return RobotMessage('executing', None, None, text)
+    return RobotMessage('unknown', None, None, text)
+
+
+def _parse_numeric(frame):
+    """
+    解析以数字开头的消息：瓶重、称量结果和以'#'结尾的控制指令
+    """
+    try:
+        if frame[-1] == '#':
+            fields = frame[:-1].split()
+            if len(fields) >= 4:
+                return RobotMessage('data', tuple(map(float, fields)), None, None)
+            return _unknown(frame)
+        fields = frame.split()
+        count = len(fields)
+        if count == 4:
+            return RobotMessage('result', (float(fields[0]), float(fields[1]), float(fields[2]), float(fields[3])),
+                                None, None)
+        if count == 1:
+            return RobotMessage('vial_weight', (float(fields[0]),), None, None)
+        if count > 4:
+            return RobotMessage('result', tuple(map(float, fields)), None, None)
+    except ValueError:
+        pass
+    return _unknown(frame)
+
+
+def split_sequence(frame):
     """
+    拆分协议v2的序号前缀："@序号 消息" -> (序号, 消息)
     
-    def __init__(self):
+    Args:
+        frame: 一帧消息（字符串）
+        
+    Returns:
+        tuple: (序号, 去掉前缀的消息)，没有序号前缀时返回 (None, 原消息)
+    """
+    if frame.startswith(SEQUENCE_TAG):
+        tag, _, body = frame.partition(' ')
+        if tag[1:].isdigit():
+            return int(tag[1:]), body
+    return None, frame
+
+
+def _parse_tagged(frame):
+    """
+    解析协议v2带序号前缀的消息："@序号 消息"
+    """
+    sequence, body = split_sequence(frame)
+    if sequence is not None:
+        message = parse_message(body)
+        if message.kind != 'unknown':
+            return RobotMessage(message.kind, message.values, sequence, message.raw)
+    return _unknown(frame)
+
+
+def _parse_prefixed(frame):
+    """
+    解析"前缀 数值..."格式的订阅/协商应答
+    """
+    kind, prefix = _PREFIXES[frame[0]]
+    if frame.startswith(prefix):
+        try:
+            return RobotMessage(kind, tuple(map(float, frame[len(prefix):].split())), None, None)
+        except ValueError:
+            pass
+    return _unknown(frame)
+
+
+def _build_dispatch():
+    """
+    按首字符建立分派表
+    """
+    table = {char: _parse_numeric for char in '0123456789+-.'}
+    table[SEQUENCE_TAG] = _parse_tagged
+    for char in _PREFIXES:
+        table[char] = _parse_prefixed
+    return table
+
+
+_DISPATCH = _build_dispatch()
+
+
+def parse_message(frame):
+    """
+    解析机器人发来的一帧消息
+    
+    先按完整内容查表（关键字和"9 9 9"直接返回共享实例），再按首字符查分派表解析带数值的消息
+    
+    Args:
+        frame: 一帧消息（字符串）
+        
+    Returns:
+        RobotMessage: 解析结果，无法识别时kind为'unknown'
+    """
+    message = _SHARED_MESSAGES.get(frame)
+    if message is not None:
+        return message
+    if not frame:
+        return _EMPTY
+    handler = _DISPATCH.get(frame[0])
+    if handler is None:
+        return _unknown(frame)
+    return handler(frame)
+
+
+_NOT_READY = _SHARED_MESSAGES['9 9 9']
+_NOT_READY_BYTES = b'9 9 9'
+_TAG = ord(SEQUENCE_TAG)
+# 最近一次在缓冲区上解析出的称量结果 (帧字节, 消息)。轮询模式下RAPID端在下一次称量前
+# 对每次request_weight都回复同一条结果，内容相同的帧直接返回同一个消息对象
+_last_result = (None, None)
+
+
+def parse_buffer(buffer, start=0, stop=None):
+    """
+    直接在帧重组器的接收缓冲区上解析数据通道的一帧消息
+
+    数据通道的高频消息（"9 9 9"和v1/v2称量结果）按字节识别和转换，不先解码为字符串，
+    与上一条结果相同的帧不再重复转换；其他消息解码后交给parse_message。
+    必须在接收线程中、缓冲区被下一次接收覆盖之前调用
+
+    Args:
+        buffer: 接收缓冲区的memoryview
+        start: 帧在缓冲区中的起始位置
+        stop: 帧在缓冲区中的结束位置，None表示缓冲区末尾
+
+    Returns:
+        RobotMessage: 解析结果，无法识别时kind为'unknown'
+    """
+    global _last_result
+    if stop is None:
+        stop = len(buffer)
+    frame = buffer[start:stop].tobytes()
+    if frame == _NOT_READY_BYTES:
+        return _NOT_READY
+    last, message = _last_result
+    if frame == last:
+        return message
+
+    # 以'#'结尾的控制指令和字段不是数值的消息在float()时失败，交给parse_message
+    fields = frame.split()
+    count = len(fields)
+    sequence = None
+    if count == 5 and frame[0] == _TAG and fields[0][1:].isdigit():
+        # 协议v2的序号前缀
+        sequence = int(fields[0][1:])
+        del fields[0]
+        count = 4
+    if count == 4:
+        try:
+            message = RobotMessage('result', (float(fields[0]), float(fields[1]), float(fields[2]),
+                                              float(fields[3])), sequence, None)
+        except ValueError:
+            return parse_message(frame.decode('ascii', 'replace'))
+        _last_result = (frame, message)
+        return message
+    return parse_message(frame.decode('ascii', 'replace'))
+
+
+def v2_packet_size(buffer):
+    """
+    计算缓冲区开头一个v2二进制数据包的长度
+
+    Args:
+        buffer: bytes/bytearray，以数据包的消息类型字节开头
+
+    Returns:
+        int: 数据包长度，数据不足以确定长度时返回0，不是v2二进制数据包时返回None
+    """
+    if not buffer:
+        return 0
+    msg_type = buffer[0]
+    if msg_type == V2_MSG_CONTROL:
+        return V2_CONTROL_STRUCT.size
+    if msg_type == V2_MSG_TRAJECTORY:
+        if len(buffer) < 2:
+            return 0
+        return V2_TRAJECTORY_HEADER.size + V2_SETPOINT_STRUCT.size * buffer[1]
+    if msg_type == V2_MSG_SETTLED:
+        return V2_SETTLED_STRUCT.size
+    return None
+
+
+class PacketEncoder:
+    """
+    控制指令编码器：按字段精度直接生成合法的数据包，编码时检查长度，不再回头解析验证
+
+    v1格式为 "target_weight shaking_amplitude current_weight shaking_angle #"，每个字段按配置的
+    小数位数输出，避免浮点数的完整表示使指令超过RAPID字符串的80字符上限而被截断；
+    v2格式为V2_CONTROL_STRUCT定长二进制包。两种格式都拒绝None、NaN和无穷大
+    """
+    
+    def __init__(self, precision=None, max_length=None):
         """
-        初始化协议处理器
+        初始化编码器
+        
+        Args:
+            precision: 各字段的小数位数（与CONTROL_FIELDS顺序一致），可以是列表或逗号分隔的字符串，None则读取配置
+            max_length: v1数据包最大长度（字符），None则读取配置
         """
-        pass
+        if precision is None:
+            precision = global_config.get('Communication', 'packet_precision', '4, 3, 4, 2')
+        if isinstance(precision, str):
+            precision = [int(item) for item in precision.split(',')]
+        if len(precision) != len(CONTROL_FIELDS):
+            raise ValueError(f"控制指令精度需要 {len(CONTROL_FIELDS)} 个字段，实际为 {len(precision)} 个")
+        if max_length is None:
+            max_length = global_config.get_int('Communication', 'packet_max_length', RAPID_STRING_MAX)
+        
+        self.precision = tuple(max(0, min(9, int(item))) for item in precision)
+        self.max_length = max_length
+        self._format = ' '.join(f'%.{digits}f' for digits in self.precision) + ' #'
+        
+        # 统计信息，按协议版本分别记录
+        self._stats = {version: {'packets': 0, 'bytes_total': 0, 'min_bytes': None, 'max_bytes': 0}
+                       for version in (PROTOCOL_V1, PROTOCOL_V2)}
+        self.rejected = 0
     
-    def format_data_packet(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
+    def encode_ascii(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
         """
-        格式化数据数据包
+        编码v1控制指令
         
         Args:
             target_weight: 目标重量(g)
@@ -22,45 +339,231 @@ class ProtocolHandler:
             shaking_angle: 抖动角度
             
         Returns:
-            str: 格式化后的数据包字符串
+            str: 控制指令字符串，参数无效或超过最大长度时返回None
         """
         try:
-            # 按照协议格式组装数据
-            packet = f"{target_weight} {shaking_amplitude} {current_weight} {shaking_angle} #"
-            return packet
-        except Exception as e:
-            system_logger.error(f"格式化数据包失败: {e}")
-            return None
+            packet = self._format % (target_weight, shaking_amplitude, current_weight, shaking_angle)
+        except TypeError:
+            return self._reject("参数类型无效", target_weight, shaking_amplitude, current_weight, shaking_angle)
+        if 'n' in packet:
+            # nan / inf
+            return self._reject("参数不是有限数值", target_weight, shaking_amplitude, current_weight, shaking_angle)
+        size = len(packet)
+        if size > self.max_length:
+            return self._reject(f"长度 {size} 超过上限 {self.max_length}",
+                                target_weight, shaking_amplitude, current_weight, shaking_angle)
+        self._record(PROTOCOL_V1, size)
+        return packet
     
-    def format_control_packet(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
+    def encode_binary(self, sequence, target_weight, shaking_amplitude, current_weight, shaking_angle):
         """
-        格式化控制指令数据包
+        编码v2控制指令
         
         Args:
+            sequence: 指令序号
             target_weight: 目标重量(g)
             shaking_amplitude: 抖动幅度
             current_weight: 当前重量(g)
             shaking_angle: 抖动角度
             
         Returns:
-            str: 格式化后的控制指令字符串
+            bytes: 20字节的控制指令数据包，参数无效时返回None
+        """
+        try:
+            packet = V2_CONTROL_STRUCT.pack(V2_MSG_CONTROL, 0, sequence,
+                                            target_weight, shaking_amplitude, current_weight, shaking_angle)
+        except (struct.error, OverflowError, TypeError):
+            return self._reject("参数无法编码为float32", target_weight, shaking_amplitude, current_weight, shaking_angle)
+        if not math.isfinite(target_weight + shaking_amplitude + current_weight + shaking_angle):
+            return self._reject("参数不是有限数值", target_weight, shaking_amplitude, current_weight, shaking_angle)
+        self._record(PROTOCOL_V2, V2_CONTROL_STRUCT.size)
+        return packet
+    
+    def encode_trajectory(self, sequence, current_weight, limit_weight, setpoints):
+        """
+        编码v2抖动轨迹
+        
+        Args:
+            sequence: 指令序号，只更新重量时为0
+            current_weight: 当前重量(g)
+            limit_weight: 轨迹适用的重量上限(g)，超过后需要重新规划
+            setpoints: [(起始重量, 抖动幅度, 抖动角度), ...]，起始重量递增，最多TRAJECTORY_MAX_STEPS组
+            
+        Returns:
+            bytes: 轨迹数据包，参数无效时返回None
+        """
+        if len(setpoints) > TRAJECTORY_MAX_STEPS:
+            return self._reject(f"轨迹设定点数 {len(setpoints)} 超过上限 {TRAJECTORY_MAX_STEPS}",
+                                current_weight, fields=TRAJECTORY_FIELDS)
+        try:
+            parts = [V2_TRAJECTORY_HEADER.pack(V2_MSG_TRAJECTORY, len(setpoints), sequence, current_weight, limit_weight)]
+            total = current_weight + limit_weight
+            for setpoint in setpoints:
+                parts.append(V2_SETPOINT_STRUCT.pack(*setpoint))
+                total += setpoint[0] + setpoint[1] + setpoint[2]
+        except (struct.error, OverflowError, TypeError, IndexError):
+            return self._reject("轨迹参数无法编码为float32", current_weight, limit_weight, setpoints,
+                                fields=TRAJECTORY_FIELDS)
+        if not math.isfinite(total):
+            return self._reject("轨迹参数不是有限数值", current_weight, limit_weight, setpoints,
+                                fields=TRAJECTORY_FIELDS)
+        packet = b''.join(parts)
+        self._record(PROTOCOL_V2, len(packet))
+        return packet
+    
+    def encode_settled(self, counter, weight, bound, first=False, predicted=False):
+        """
+        编码v2稳定重量
+        
+        Args:
+            counter: 稳定次数（1~65535）
+            weight: 稳定重量(g)
+            bound: 置信区间半宽(g)
+            first: 是否为一次扰动后第一次判定稳定
+            predicted: 是否为预测的稳定重量
+            
+        Returns:
+            bytes: 12字节的稳定重量数据包，参数无效时返回None
         """
+        flags = (SETTLED_FLAG_FIRST if first else 0) | (SETTLED_FLAG_PREDICTED if predicted else 0)
         try:
-            # 控制指令格式："target_weight shaking_amplitude current_weight shaking_angle #"
-            packet = f"{target_weight} {shaking_amplitude} {current_weight} {shaking_angle} #"
-            # 验证数据包格式
-            if self.validate_packet(packet):
-                return packet
-            else:
-                system_logger.warning(f"格式化的控制指令包格式无效: {repr(packet)}")
+            packet = V2_SETTLED_STRUCT.pack(V2_MSG_SETTLED, flags, counter, weight, bound)
+        except (struct.error, OverflowError, TypeError):
+            return self._reject("稳定重量无法编码为float32", weight, bound, fields=SETTLED_FIELDS)
+        if not math.isfinite(weight + bound):
+            return self._reject("稳定重量不是有限数值", weight, bound, fields=SETTLED_FIELDS)
+        self._record(PROTOCOL_V2, V2_SETTLED_STRUCT.size)
+        return packet
+    
+    def _record(self, version, size):
+        """
+        记录一个数据包的字节数
+        """
+        stats = self._stats[version]
+        stats['packets'] += 1
+        stats['bytes_total'] += size
+        if stats['min_bytes'] is None or size < stats['min_bytes']:
+            stats['min_bytes'] = size
+        if size > stats['max_bytes']:
+            stats['max_bytes'] = size
+    
+    def _reject(self, reason, *values, fields=CONTROL_FIELDS):
+        """
+        拒绝编码并记录原因
+        """
+        self.rejected += 1
+        system_logger.warning(f"控制指令编码失败，{reason}: {dict(zip(fields, values))}")
+        return None
+    
+    def get_stats(self):
+        """
+        获取编码统计
+        
+        Returns:
+            dict: 各协议版本的数据包数、总字节数、每包平均/最小/最大字节数，以及被拒绝的次数
+        """
+        result = {'rejected': self.rejected, 'max_length': self.max_length}
+        for version, stats in self._stats.items():
+            packets = stats['packets']
+            result[f'v{version}'] = dict(stats, mean_bytes=stats['bytes_total'] / packets if packets else 0.0)
+        return result
+
+
+class ProtocolHandler:
+    """
+    通讯协议处理类，负责处理与机器人的通讯协议
+    """
+    
+    def __init__(self, preferred_version=None, ack_timeout=None):
+        """
+        初始化协议处理器
+        
+        Args:
+            preferred_version: 希望使用的协议版本，None则读取配置，1表示不进行协商
+            ack_timeout: 等待协商回复的超时时间（秒），None则读取配置
+        """
+        if preferred_version is None:
+            preferred_version = global_config.get_int('Communication', 'protocol_version')
+        if ack_timeout is None:
+            ack_timeout = global_config.get_float('Communication', 'protocol_ack_timeout')
+        self.preferred_version = preferred_version
+        self.ack_timeout = ack_timeout
+        self.version = PROTOCOL_V1  # 当前使用的协议版本
+        self.negotiation = 'idle'  # 'idle' / 'pending' / 'done'
+        self._requested_at = 0.0
+        self._sequence = 0
+        self.last_sequence = 0  # 最近一条v2控制指令的序号
+        self.settled_counter = 0  # 最近一次发送的稳定次数
+        self.encoder = PacketEncoder()  # 控制指令编码器
+        self._lock = threading.Lock()
+    
+    def negotiation_request(self):
+        """
+        开始协议协商
+        
+        Returns:
+            str: 需要在数据通道上发送的协商请求，不需要协商时返回None
+        """
+        with self._lock:
+            if self.preferred_version <= PROTOCOL_V1:
+                self.negotiation = 'done'
                 return None
-        except Exception as e:
-            system_logger.error(f"格式化控制指令包失败: {e}")
-            return None
+            self.negotiation = 'pending'
+            self._requested_at = time.monotonic()
+        return f"{PROTOCOL_REQUEST_PREFIX}{self.preferred_version}"
     
-    def format_data_packet(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
+    def on_negotiation_frame(self, message):
         """
-        格式化数据数据包
+        处理协商期间数据通道收到的消息
+        
+        Args:
+            message: 数据通道收到的一条消息（RobotMessage）
+            
+        Returns:
+            bool: 是否为协商回复（True表示该消息已处理，不再作为称重数据）
+        """
+        with self._lock:
+            if self.negotiation != 'pending':
+                return False
+            self.negotiation = 'done'
+            if message.kind == 'protocol' or (message.kind == 'unknown' and
+                                              message.raw.startswith(PROTOCOL_REQUEST_PREFIX)):
+                values = message.values
+                version = int(values[0]) if values and values[0].is_integer() else PROTOCOL_V1
+                self.version = version if version in (PROTOCOL_V1, PROTOCOL_V2) else PROTOCOL_V1
+                system_logger.info(f"协议协商完成，使用v{self.version}")
+                return True
+        
+        # 旧版RAPID程序把协商请求当作普通请求，回复的是称重数据
+        system_logger.info(f"机器人不支持协议协商，使用v1: {message!r}")
+        return False
+    
+    def negotiation_timed_out(self):
+        """
+        检查协商是否超时，超时则回退到v1
+        
+        Returns:
+            bool: 是否超时
+        """
+        with self._lock:
+            if self.negotiation != 'pending' or time.monotonic() - self._requested_at < self.ack_timeout:
+                return False
+            self.negotiation = 'done'
+            self.version = PROTOCOL_V1
+        system_logger.warning("等待协议协商回复超时，使用v1")
+        return True
+    
+    def reset_negotiation(self):
+        """
+        连接断开后复位协商状态，RAPID程序重新ServerStart后恢复为v1
+        """
+        with self._lock:
+            self.negotiation = 'idle'
+            self.version = PROTOCOL_V1
+    
+    def encode_control_v2(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
+        """
+        编码v2控制指令
         
         Args:
             target_weight: 目标重量(g)
@@ -69,117 +572,184 @@ class ProtocolHandler:
             shaking_angle: 抖动角度
             
         Returns:
-            str: 格式化后的数据包字符串
+            bytes: 20字节的控制指令数据包，参数无效时返回None
         """
-        try:
-            # 按照协议格式组装数据
-            packet = f"{target_weight} {shaking_amplitude} {current_weight} {shaking_angle} #"
-            # 验证数据包格式
-            if self.validate_packet(packet):
-                return packet
-            else:
-                system_logger.warning(f"格式化的数据包格式无效: {repr(packet)}")
-                return None
-        except Exception as e:
-            global_logger.error(f"格式化数据包失败: {e}")
+        with self._lock:
+            sequence = self._sequence % SEQUENCE_MAX + 1
+            packet = self.encoder.encode_binary(sequence, target_weight, shaking_amplitude,
+                                                current_weight, shaking_angle)
+            # 编码失败的指令不会发出，不占用序号，避免RAPID端误判为丢失
+            if packet is not None:
+                self._sequence = self.last_sequence = sequence
+        return packet
+    
+    def encode_trajectory(self, current_weight, limit_weight=0.0, setpoints=()):
+        """
+        编码v2抖动轨迹，带设定点时分配新的序号，只更新重量时序号为0
+        
+        Args:
+            current_weight: 当前重量(g)
+            limit_weight: 轨迹适用的重量上限(g)
+            setpoints: [(起始重量, 抖动幅度, 抖动角度), ...]
+            
+        Returns:
+            bytes: 轨迹数据包，参数无效时返回None
+        """
+        if not setpoints:
+            return self.encoder.encode_trajectory(0, current_weight, limit_weight, setpoints)
+        with self._lock:
+            sequence = self._sequence % SEQUENCE_MAX + 1
+            packet = self.encoder.encode_trajectory(sequence, current_weight, limit_weight, setpoints)
+            if packet is not None:
+                self._sequence = self.last_sequence = sequence
+        return packet
+    
+    def encode_settled(self, weight, bound, first=False, predicted=False):
+        """
+        编码v2稳定重量，first为True时稳定次数加1
+        
+        Args:
+            weight: 稳定重量(g)
+            bound: 置信区间半宽(g)
+            first: 是否为一次扰动后第一次判定稳定
+            predicted: 是否为预测的稳定重量
+            
+        Returns:
+            bytes: 12字节的稳定重量数据包，参数无效时返回None
+        """
+        with self._lock:
+            counter = self.settled_counter % SEQUENCE_MAX + 1 if first or not self.settled_counter \
+                else self.settled_counter
+            packet = self.encoder.encode_settled(counter, weight, bound, first, predicted)
+            if packet is not None:
+                self.settled_counter = counter
+        return packet
+    
+    @staticmethod
+    def decode_settled(packet):
+        """
+        解码v2稳定重量
+        
+        Args:
+            packet: 12字节的稳定重量数据包
+            
+        Returns:
+            dict: 稳定次数、是否为第一次判定、是否为预测、稳定重量和置信区间半宽，格式错误时返回None
+        """
+        if len(packet) != V2_SETTLED_STRUCT.size or packet[0] != V2_MSG_SETTLED:
             return None
+        _, flags, counter, weight, bound = V2_SETTLED_STRUCT.unpack(packet)
+        return {
+            'counter': counter,
+            'first': bool(flags & SETTLED_FLAG_FIRST),
+            'predicted': bool(flags & SETTLED_FLAG_PREDICTED),
+            'settled_weight': weight,
+            'bound': bound
+        }
     
-    def parse_response(self, response):
+    @staticmethod
+    def decode_trajectory(packet):
         """
-        解析机器人响应
+        解码v2抖动轨迹
         
         Args:
-            response: 机器人返回的原始响应字符串
+            packet: 完整的轨迹数据包
             
         Returns:
-            dict: 解析后的响应数据，包含指令类型和相关数据
+            dict: 序号、当前重量、上限重量和设定点列表，格式错误时返回None
         """
-        try:
-            response = response.strip()
-            
-            # 处理new_target指令
-            if response == 'new_target':
-                return {
-                    'command': 'new_target',
-                    'data': None
-                }
-            
-            # 处理target指令
-            elif response == 'target':
-                return {
-                    'command': 'target',
-                    'data': None
-                }
-            
-            # 处理executing指令
-            elif 'executing' in response:
-                return {
-                    'command': 'executing',
-                    'data': response
-                }
-            
-            # 处理其他指令，尝试解析为数据格式
-            elif response.endswith('#'):
-                # 移除末尾的分隔符
-                response = response[:-1]
-                
-                # 分割数据
-                data_parts = response.split()
-                
-                if len(data_parts) >= 4:
-                    return {
-                        'command': 'data',
-                        'data': {
-                            'target_weight': float(data_parts[0]),
-                            'shaking_amplitude': float(data_parts[1]),
-                            'current_weight': float(data_parts[2]),
-                            'shaking_angle': float(data_parts[3])
-                        }
-                    }
-                else:
-                    return {
-                        'command': 'unknown',
-                        'data': response
-                    }
+        if len(packet) < V2_TRAJECTORY_HEADER.size or packet[0] != V2_MSG_TRAJECTORY:
+            return None
+        _, count, sequence, current_weight, limit_weight = V2_TRAJECTORY_HEADER.unpack_from(packet)
+        if len(packet) < V2_TRAJECTORY_HEADER.size + V2_SETPOINT_STRUCT.size * count:
+            return None
+        setpoints = [V2_SETPOINT_STRUCT.unpack_from(packet, V2_TRAJECTORY_HEADER.size + V2_SETPOINT_STRUCT.size * i)
+                     for i in range(count)]
+        return {
+            'sequence': sequence,
+            'current_weight': current_weight,
+            'limit_weight': limit_weight,
+            'setpoints': setpoints
+        }
+    
+    @staticmethod
+    def decode_control_v2(packet):
+        """
+        解码v2控制指令
+        
+        Args:
+            packet: 20字节的控制指令数据包
             
-        except Exception as e:
-            system_logger.error(f"解析响应失败: {e}")
-            return {
-                'command': 'error',
-                'data': str(e)
-            }
+        Returns:
+            dict: 序号和4个参数，格式错误时返回None
+        """
+        if len(packet) != V2_CONTROL_STRUCT.size or packet[0] != V2_MSG_CONTROL:
+            return None
+        _, _, sequence, target_weight, shaking_amplitude, current_weight, shaking_angle = \
+            V2_CONTROL_STRUCT.unpack(packet)
+        return {
+            'sequence': sequence,
+            'target_weight': target_weight,
+            'shaking_amplitude': shaking_amplitude,
+            'current_weight': current_weight,
+            'shaking_angle': shaking_angle
+        }
     
-    def validate_packet(self, packet):
+    def format_control_packet(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
         """
-        验证数据包格式是否正确
+        格式化控制指令数据包
         
         Args:
-            packet: 要验证的数据包
+            target_weight: 目标重量(g)
+            shaking_amplitude: 抖动幅度
+            current_weight: 当前重量(g)
+            shaking_angle: 抖动角度
             
         Returns:
-            bool: 格式是否正确
+            str/bytes: 格式化后的控制指令，协商为v2时为20字节的二进制数据包，参数无效时返回None
         """
-        if not packet or not isinstance(packet, str):
-            return False
+        if self.version == PROTOCOL_V2:
+            return self.encode_control_v2(target_weight, shaking_amplitude, current_weight, shaking_angle)
+        return self.encoder.encode_ascii(target_weight, shaking_amplitude, current_weight, shaking_angle)
+    
+    def format_unstable_packet(self, target_weight=0):
+        """
+        格式化"数据未稳定"控制指令（天平暂无稳定读数时回复机器人的请求，避免RAPID端一直等待）
         
-        if not packet.endswith('#'):
-            return False
+        Args:
+            target_weight: 目标重量(g)，executing指令时为0
+            
+        Returns:
+            str/bytes: 格式化后的控制指令，当前重量为UNSTABLE_WEIGHT，抖动参数为0
+        """
+        return self.format_control_packet(target_weight, 0, UNSTABLE_WEIGHT, 0)
+    
+    def format_data_packet(self, target_weight, shaking_amplitude, current_weight, shaking_angle):
+        """
+        格式化数据数据包（格式与v1控制指令相同）
         
-        try:
-            parts = packet[:-1].split()
-            if len(parts) != 4:
-                return False
+        Args:
+            target_weight: 目标重量(g)
+            shaking_amplitude: 抖动幅度
+            current_weight: 当前重量(g)
+            shaking_angle: 抖动角度
             
-            # 验证每个部分是否为数字
-            for part in parts:
-                float(part)
+        Returns:
+            str: 格式化后的数据包字符串，参数无效时返回None
+        """
+        return self.encoder.encode_ascii(target_weight, shaking_amplitude, current_weight, shaking_angle)
+    
+    def parse_response(self, response):
+        """
+        解析机器人响应
+        
+        Args:
+            response: 机器人返回的一帧消息（字符串）
             
-            return True
-        except ValueError:
-            return False
-        except Exception as e:
-            system_logger.error(f"验证数据包失败: {e}")
-            return False
+        Returns:
+            RobotMessage: 解析后的消息，无法识别时kind为'unknown'
+        """
+        return parse_message(response)
     
     def handle_new_target(self):
         """
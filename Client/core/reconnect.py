@@ -0,0 +1,158 @@
+import random
+import time
+from .config_manager import global_config
+
+
+class BackoffPolicy:
+    """
+    带随机抖动的指数退避策略，用于断线自动重连
+    """
+
+    def __init__(self, initial_delay=0.5, max_delay=30.0, multiplier=2.0, jitter=0.5, max_attempts=0):
+        """
+        初始化退避策略
+
+        参数:
+            initial_delay: 第一次重连前的等待时间（秒）
+            max_delay: 等待时间上限（秒）
+            multiplier: 每次失败后等待时间的放大倍数
+            jitter: 随机抖动比例（0~1），实际等待时间在 [delay*(1-jitter), delay] 之间
+            max_attempts: 最大重连次数，0表示不限次数
+        """
+        self.initial_delay = max(0.0, initial_delay)
+        self.max_delay = max(self.initial_delay, max_delay)
+        self.multiplier = max(1.0, multiplier)
+        self.jitter = min(1.0, max(0.0, jitter))
+        self.max_attempts = max(0, int(max_attempts))
+        self._random = random.Random()
+
+    @classmethod
+    def from_config(cls):
+        """
+        从配置文件创建退避策略
+
+        返回:
+            BackoffPolicy: 退避策略
+        """
+        return cls(
+            initial_delay=global_config.get_float('Communication', 'reconnect_initial_delay'),
+            max_delay=global_config.get_float('Communication', 'reconnect_max_delay'),
+            multiplier=global_config.get_float('Communication', 'reconnect_multiplier'),
+            jitter=global_config.get_float('Communication', 'reconnect_jitter'),
+            max_attempts=global_config.get_int('Communication', 'reconnect_max_attempts')
+        )
+
+    def delay(self, attempt):
+        """
+        计算第attempt次重连前的等待时间
+
+        参数:
+            attempt: 已失败的重连次数（从0开始）
+
+        返回:
+            float: 等待时间（秒）
+        """
+        delay = min(self.max_delay, self.initial_delay * (self.multiplier ** min(attempt, 64)))
+        return delay * (1.0 - self.jitter * self._random.random())
+
+    def exhausted(self, attempt):
+        """
+        判断重连次数是否已用完
+
+        参数:
+            attempt: 已执行的重连次数
+
+        返回:
+            bool: 是否已达到最大重连次数
+        """
+        return self.max_attempts > 0 and attempt >= self.max_attempts
+
+
+class SessionDowntimeTracker:
+    """
+    会话级中断统计：任意通道断开即开始计时，所有通道恢复后记为一次中断事件
+    """
+
+    def __init__(self):
+        """
+        初始化中断统计
+        """
+        self.down_channels = {}
+        self.incidents = []
+        self._start_time = None
+        self._start_monotonic = None
+
+    def channel_down(self, channel, reason=None):
+        """
+        记录通道断开
+
+        参数:
+            channel: 通道名称，如'CTRL_COM'
+            reason: 断开原因
+        """
+        if not self.down_channels:
+            self._start_time = time.time()
+            self._start_monotonic = time.monotonic()
+        self.down_channels.setdefault(channel, reason)
+
+    def channel_up(self, channel):
+        """
+        记录通道恢复
+
+        参数:
+            channel: 通道名称
+
+        返回:
+            dict: 所有通道均已恢复时返回本次中断事件，否则返回None
+        """
+        if channel not in self.down_channels:
+            return None
+        self.down_channels.pop(channel)
+        if self.down_channels:
+            return None
+        return self._close_incident(channel)
+
+    def discard(self, channel):
+        """
+        手动断开的通道不再参与中断统计
+
+        参数:
+            channel: 通道名称
+        """
+        self.down_channels.pop(channel, None)
+        if not self.down_channels:
+            self._start_time = None
+            self._start_monotonic = None
+
+    def is_down(self):
+        """
+        判断当前是否处于中断状态
+
+        返回:
+            bool: 是否有通道处于断开状态
+        """
+        return bool(self.down_channels)
+
+    def total_downtime(self):
+        """
+        获取累计中断时间
+
+        返回:
+            float: 累计中断时间（秒）
+        """
+        return sum(incident['downtime'] for incident in self.incidents)
+
+    def _close_incident(self, channel):
+        """
+        结束本次中断事件
+        """
+        incident = {
+            'start': self._start_time,
+            'end': time.time(),
+            'downtime': time.monotonic() - self._start_monotonic,
+            'last_channel': channel
+        }
+        self.incidents.append(incident)
+        self._start_time = None
+        self._start_monotonic = None
+        return incident
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import threading
+import time
+
+# 发送优先级，数值越小越先发送
+PRIORITY_URGENT = 0    # 控制指令（以'#'结尾的目标数据包或v2二进制数据包）
+PRIORITY_NORMAL = 1    # 其他消息
+PRIORITY_ROUTINE = 2   # 例行轮询（request_weight）
+
+
+def classify_priority(data):
+    """
+    根据消息内容确定默认发送优先级
+
+    参数:
+        data: 要发送的消息字符串，字节类型为v2协议的二进制控制指令
+
+    返回:
+        int: 发送优先级
+    """
+    if isinstance(data, bytes):
+        return PRIORITY_URGENT
+    message = data.strip()
+    if message.endswith('#'):
+        return PRIORITY_URGENT
+    if message == 'request_weight':
+        return PRIORITY_ROUTINE
+    return PRIORITY_NORMAL
+
+
+class SendQueue:
+    """
+    有界优先级发送队列（线程安全）
+
+    同优先级的消息按入队顺序发送；队列满时高优先级消息会挤掉最新入队的低优先级消息，
+    无法挤出空位时拒绝入队，保证控制指令不会被积压的轮询请求阻塞
+    """
+
+    def __init__(self, max_size=64):
+        """
+        初始化发送队列
+
+        参数:
+            max_size: 队列最大长度
+        """
+        self.max_size = max(1, int(max_size))
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+        # 统计信息
+        self.enqueued_total = 0
+        self.sent_total = 0
+        self.dropped_total = 0
+        self.max_depth = 0
+
+    def put(self, data, priority=None, reply=False):
+        """
+        消息入队
+
+        参数:
+            data: 要发送的消息字符串
+            priority: 发送优先级，None则根据消息内容确定
+            reply: 是否为对机器人请求的应答，随消息取出用于延迟配对
+
+        返回:
+            bool: 是否已入队
+        """
+        if priority is None:
+            priority = classify_priority(data)
+
+        with self._condition:
+            if len(self._heap) >= self.max_size and not self._evict_lower(priority):
+                self.dropped_total += 1
+                return False
+
+            heapq.heappush(self._heap, (priority, next(self._sequence), time.monotonic(), data, reply))
+            self.enqueued_total += 1
+            self.max_depth = max(self.max_depth, len(self._heap))
+            self._condition.notify()
+            return True
+
+    def _evict_lower(self, priority):
+        """
+        挤掉一条优先级低于priority的最新消息
+
+        返回:
+            bool: 是否腾出了空位
+        """
+        victim = None
+        for index, item in enumerate(self._heap):
+            if item[0] > priority and (victim is None or item[:2] > self._heap[victim][:2]):
+                victim = index
+        if victim is None:
+            return False
+
+        self._heap[victim] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+        self.dropped_total += 1
+        return True
+
+    def get(self, timeout=None):
+        """
+        取出优先级最高的消息，队列为空时等待
+
+        参数:
+            timeout: 最长等待时间（秒），None表示一直等待直到有消息或被唤醒
+
+        返回:
+            tuple: (消息字符串, 入队时间, 是否为应答)，超时或被唤醒时返回None
+        """
+        with self._condition:
+            if not self._heap:
+                self._condition.wait(timeout)
+                if not self._heap:
+                    return None
+            return self._pop()
+
+    def get_nowait(self):
+        """
+        不等待地取出优先级最高的消息
+
+        返回:
+            tuple: (消息字符串, 入队时间, 是否为应答)，队列为空时返回None
+        """
+        with self._condition:
+            if not self._heap:
+                return None
+            return self._pop()
+
+    def _pop(self):
+        """
+        弹出队首消息
+        """
+        _, _, enqueued_at, data, reply = heapq.heappop(self._heap)
+        self.sent_total += 1
+        return data, enqueued_at, reply
+
+    def wakeup(self):
+        """
+        唤醒所有等待中的发送线程
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+    def clear(self):
+        """
+        清空队列
+
+        返回:
+            int: 被丢弃的消息数
+        """
+        with self._condition:
+            count = len(self._heap)
+            self._heap.clear()
+            self.dropped_total += count
+            return count
+
+    def depth(self):
+        """
+        获取当前队列长度
+
+        返回:
+            int: 队列中待发送的消息数
+        """
+        return len(self._heap)
+
+    def get_stats(self):
+        """
+        获取发送队列统计信息
+
+        返回:
+            dict: 统计信息
+        """
+        with self._condition:
+            return {
+                'depth': len(self._heap),
+                'max_depth': self.max_depth,
+                'capacity': self.max_size,
+                'enqueued_total': self.enqueued_total,
+                'sent_total': self.sent_total,
+                'dropped_total': self.dropped_total
+            }
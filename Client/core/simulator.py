@@ -0,0 +1,240 @@
+import math
+import random
+from .config_manager import global_config
+
+# 勺子参数（与RAPID端T_ROB_R的分料流程一致）：
+#   threshold: 剩余重量大于该值时使用该勺（large只在目标重量不小于0.8 g时使用）
+#   capacity: 每次舀取、密度为1时的装载量（g）
+#   flow: 每次抖动（中勺、大勺）或每度倾斜角（小勺）、密度为1时的平均落料量（g）
+#   no_dropping: 一个周期的落料量小于该值时下一周期重新舀取（load_nodropping）
+#   cycle_time: 每周期移动和往返的固定耗时（秒）
+SPOONS = {
+    'large': {'threshold': 0.8, 'capacity': 1.5, 'flow': 0.05, 'shakes': 5, 'no_dropping': 0.1, 'cycle_time': 6.0},
+    'medium': {'threshold': 0.1, 'capacity': 0.3, 'flow': 0.004, 'no_dropping': 0.002, 'cycle_time': 3.0},
+    'small': {'threshold': 0.0, 'capacity': 0.03, 'flow': 0.0006, 'no_dropping': 0.001, 'cycle_time': 3.0},
+}
+SHAKE_TIME = 0.15  # 每次抖动的耗时（秒）
+TILT_TIME = 1.0  # 小勺倾斜后的停留时间（秒）
+SCOOP_TIME = 8.0  # 重新舀取的耗时（秒）
+SMALL_SPOON_ONSET = 3.0  # 小勺开始落料的倾斜角（度），颗粒越细越黏，起始角越大
+
+
+class DispensingSimulator:
+    """
+    称量过程模拟器：代替机器人和天平，按抖动参数计算落料量，并模拟天平读数的稳定过程
+
+    与RAPID端T_ROB_R一致，剩余重量大于0.8 g时用大勺（固定抖动），大于0.1 g时用中勺
+    （抖动次数取抖动幅度），否则用小勺（按抖动角度倾斜一次）。落料量：
+        中勺/大勺: 抖动次数 * flow * 密度 / (1 + 0.2 * 颗粒大小)
+        小勺: (角度 - 起始角) * flow * 密度 / (1 + 0.2 * 颗粒大小)，起始角 = 3 + 1 / 颗粒大小
+    落料量带随机波动（n次抖动合计的变异系数为 flow_noise / sqrt(n)）和偶发的结块（一次多落数倍），
+    并受勺中剩余物料限制，一个周期落料过少时下一周期重新舀取。
+    天平读数 = 已落料重量 + 落料冲击引起的衰减振荡 + 读数噪声，按天平分辨率取整。
+
+    模拟器有自己的时钟（秒），按机器人动作的耗时推进，不依赖真实时间；使用random.Random，
+    相同的种子得到相同的结果。所有计算都是常数时间，每秒可以模拟数千次完整的称量
+    """
+
+    def __init__(self, seed=None, flow_noise=None, clump_rate=None, balance_noise=None, resolution=None,
+                 settle_tau=None, settle_frequency=None):
+        """
+        初始化模拟器，参数为None时读取配置
+
+        参数:
+            seed: 随机种子，None表示随机
+            flow_noise: 单次抖动落料量的变异系数
+            clump_rate: 每次抖动出现结块的概率
+            balance_noise: 天平读数噪声（g）
+            resolution: 天平分辨率（g）
+            settle_tau: 天平稳定过程的衰减时间常数（秒）
+            settle_frequency: 天平稳定过程的振荡频率（Hz）
+        """
+        def option(value, key, default):
+            return value if value is not None else global_config.get_float('Simulation', key, default)
+
+        self.flow_noise = option(flow_noise, 'flow_noise', 0.3)
+        self.clump_rate = option(clump_rate, 'clump_rate', 0.01)
+        self.balance_noise = option(balance_noise, 'balance_noise', 0.00003)
+        self.resolution = option(resolution, 'resolution', 0.0001)
+        self.settle_tau = option(settle_tau, 'settle_tau', 0.3)
+        self.settle_frequency = option(settle_frequency, 'settle_frequency', 3.0)
+        self.rng = random.Random(seed)
+
+        self.density = 1.0
+        self.particle_size = 1.0
+        self.flow_scale = 1.0
+        self.noise_scale = 1.0
+        self.target_weight = 0.0
+        self.mass = 0.0  # 瓶中已落料重量（g），天平已去皮
+        self.clock = 0.0  # 模拟时间（秒）
+        self.spoon = None  # 当前使用的勺子
+        self.load = 0.0  # 勺中剩余物料（g）
+        self._rescoop = False
+        self._impact = 0.0  # 最近一次落料冲击引起的振荡幅度（g）
+        self._phase = 0.0
+        self._drop_time = 0.0  # 最近一次落料结束的模拟时间
+
+        # 统计信息
+        self.dispenses = 0
+        self.cycles = 0
+        self.shakes = 0
+        self.scoops = 0
+        self.clumps = 0
+
+    def reset(self, target_weight, density=None, particle_size=None, flow_scale=1.0, noise_scale=1.0):
+        """
+        开始一次新的称量（换空瓶）
+
+        参数:
+            target_weight: 目标重量（g）
+            density: 物料密度，None则沿用
+            particle_size: 颗粒大小，None则沿用
+            flow_scale: 物料落料速度的相对系数（core.material_models拟合的flow_scale）
+            noise_scale: 物料落料波动的相对系数（core.material_models拟合的noise_scale）
+        """
+        self.flow_scale = flow_scale
+        self.noise_scale = noise_scale
+        if density is not None and density > 0:
+            self.density = density
+        if particle_size is not None and particle_size > 0:
+            self.particle_size = particle_size
+        self.target_weight = target_weight
+        self.mass = 0.0
+        self.spoon = None
+        self.load = 0.0
+        self._rescoop = False
+        self._impact = 0.0
+        self._drop_time = self.clock
+        self.dispenses += 1
+
+    def select_spoon(self, remaining):
+        """
+        按剩余重量选择勺子
+
+        参数:
+            remaining: 剩余重量（g）
+
+        返回:
+            str: 'large' / 'medium' / 'small'
+        """
+        if remaining > SPOONS['large']['threshold'] and self.target_weight >= SPOONS['large']['threshold']:
+            return 'large'
+        if remaining >= SPOONS['medium']['threshold']:
+            return 'medium'
+        return 'small'
+
+    def cycle(self, amplitude, angle, remaining=None):
+        """
+        执行一个分料周期
+
+        参数:
+            amplitude: 抖动幅度（中勺抖动次数）
+            angle: 抖动角度（小勺倾斜角度，度）
+            remaining: 机器人计算的剩余重量（g），None则按真实重量计算
+
+        返回:
+            tuple: (本周期落料量（g）, 本周期耗时（秒）)
+        """
+        if remaining is None:
+            remaining = self.target_weight - self.mass
+        spoon = self.select_spoon(remaining)
+        params = SPOONS[spoon]
+        elapsed = params['cycle_time']
+        if spoon != self.spoon or self._rescoop or self.load <= 0.0:
+            self.spoon = spoon
+            self.load = params['capacity'] * self.density * self.rng.uniform(0.7, 1.0)
+            self._rescoop = False
+            self.scoops += 1
+            elapsed += SCOOP_TIME
+
+        scale = params['flow'] * self.density * self.flow_scale / (1 + 0.2 * self.particle_size)
+        if spoon == 'small':
+            onset = SMALL_SPOON_ONSET + 1.0 / self.particle_size
+            count = 1
+            expected = max(0.0, (angle or 0.0) - onset) * scale
+            elapsed += TILT_TIME
+        else:
+            count = params['shakes'] if spoon == 'large' else max(1, int(round(amplitude or 0.0)))
+            expected = count * scale
+            elapsed += count * SHAKE_TIME
+        dropped = self._drop(expected, count, scale)
+
+        self.mass += dropped
+        self.load -= dropped
+        if dropped < params['no_dropping']:
+            self._rescoop = True
+        self.cycles += 1
+        self.shakes += count
+        self.clock += elapsed
+        self._drop_time = self.clock
+        # 冲击振荡幅度随落料量增大
+        self._impact = 0.001 + 0.02 * math.sqrt(dropped)
+        self._phase = self.rng.uniform(0.0, 2 * math.pi)
+        return dropped, elapsed
+
+    def _drop(self, expected, count, scale):
+        """
+        一个周期的实际落料量：n次抖动合计的随机波动按正态近似，加上偶发的结块，不超过勺中剩余物料
+        """
+        if expected <= 0.0:
+            return 0.0
+        dropped = expected * max(0.0, self.rng.gauss(1.0, self.flow_noise * self.noise_scale / math.sqrt(count)))
+        if self.rng.random() < self.clump_rate * count:
+            self.clumps += 1
+            dropped += scale * self.rng.uniform(2.0, 5.0)
+        return min(dropped, max(0.0, self.load))
+
+    def read(self, delay=None):
+        """
+        天平读数
+
+        参数:
+            delay: 距最近一次落料结束的时间（秒），None表示当前模拟时间
+
+        返回:
+            float: 读数（g），按天平分辨率取整
+        """
+        t = self.clock - self._drop_time if delay is None else delay
+        value = self.mass + self.rng.gauss(0.0, self.balance_noise)
+        if t < 10 * self.settle_tau:
+            value += self._impact * math.exp(-t / self.settle_tau) * \
+                math.cos(2 * math.pi * self.settle_frequency * t + self._phase)
+        return round(value / self.resolution) * self.resolution
+
+    def wait(self, seconds):
+        """
+        推进模拟时间（等待天平稳定）
+
+        参数:
+            seconds: 等待时间（秒）
+        """
+        self.clock += seconds
+
+    def stream(self, duration, rate):
+        """
+        最近一次落料结束后的读数流，用于测试稳定检测
+
+        参数:
+            duration: 时长（秒）
+            rate: 天平输出频率（Hz）
+
+        返回:
+            list: [(距落料结束的时间（秒）, 读数), ...]
+        """
+        return [(i / rate, self.read(i / rate)) for i in range(int(duration * rate))]
+
+    def get_stats(self):
+        """
+        获取模拟统计
+
+        返回:
+            dict: 称量次数、周期数、抖动次数、舀取次数、结块次数和模拟时间
+        """
+        return {
+            'dispenses': self.dispenses,
+            'cycles': self.cycles,
+            'shakes': self.shakes,
+            'scoops': self.scoops,
+            'clumps': self.clumps,
+            'clock': self.clock
+        }
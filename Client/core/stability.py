@@ -0,0 +1,396 @@
+import math
+from collections import deque
+import numpy as np
+from .config_manager import global_config
+
+
+class SettledReading:
+    """
+    稳定检测器给出的稳定重量
+    """
+
+    __slots__ = ('timestamp', 'weight', 'bound', 'latency', 'first', 'predicted')
+
+    def __init__(self, timestamp, weight, bound, latency, first, predicted=False):
+        self.timestamp = timestamp  # 判定稳定的读数时间戳
+        self.weight = weight  # 稳定重量（g）
+        self.bound = bound  # 稳定重量的置信区间半宽（g）
+        self.latency = latency  # 读数最后一次超出稳定范围到判定稳定的时间（秒），刷新时为None
+        self.first = first  # 是否为一次扰动后的第一次判定
+        self.predicted = predicted  # 是否为SettlingPredictor由过渡过程读数预测的稳定重量
+
+    def __repr__(self):
+        kind = 'predicted' if self.predicted else 'settled'
+        return f"SettledReading({kind} {self.weight:.5f} ± {self.bound:.5f} g @ {self.timestamp:.3f})"
+
+
+class StabilityDetector:
+    """
+    天平读数流的稳定检测器
+
+    每条读数依次经过：
+        1. 中值滤波（median_window条），去除单点尖峰
+        2. FIR滑动平均（fir_taps条），衰减抖动和机械振动
+        3. 滚动窗口（window条）：中值滤波结果的标准差不超过std_threshold，
+           且滑动平均结果后半段与前半段均值之差（漂移）不超过drift_threshold时判定稳定
+    稳定重量为窗口内中值滤波结果的均值，置信区间半宽为 z * 标准差 / sqrt(n) 加天平分辨率的一半（取整误差）。
+    一次扰动后第一次判定稳定时立即给出结果，之后保持稳定期间每隔publish_interval秒刷新一次。
+
+    对比RAPID端calculate_difference固定等待baseline_wait秒后再读数，统计每次扰动节省的等待时间：
+    节省时间 = baseline_wait - 判定延迟，判定延迟为读数最后一次超出稳定范围到判定稳定的时间
+    """
+
+    def __init__(self, median_window=None, fir_taps=None, window=None, std_threshold=None,
+                 drift_threshold=None, confidence=None, resolution=None, publish_interval=None, baseline_wait=None):
+        """
+        初始化稳定检测器，参数为None时读取配置
+
+        参数:
+            median_window: 中值滤波窗口（条）
+            fir_taps: FIR滑动平均的抽头数
+            window: 判定稳定的滚动窗口（条）
+            std_threshold: 窗口内中值滤波结果的最大标准差（g）
+            drift_threshold: 窗口前后两半均值之差的最大值（g）
+            confidence: 置信区间的z值
+            resolution: 天平分辨率（g）
+            publish_interval: 保持稳定期间刷新稳定重量的间隔（秒）
+            baseline_wait: RAPID端固定等待时间（秒），用于统计节省的时间
+        """
+        def option(value, key, default, getter=global_config.get_float):
+            return value if value is not None else getter('Stability', key, default)
+
+        self.median_window = max(1, option(median_window, 'median_window', 5, global_config.get_int))
+        self.fir_taps = max(1, option(fir_taps, 'fir_taps', 4, global_config.get_int))
+        self.window = max(4, option(window, 'window', 8, global_config.get_int))
+        self.std_threshold = option(std_threshold, 'std_threshold', 0.0001)
+        self.drift_threshold = option(drift_threshold, 'drift_threshold', 0.0002)
+        self.confidence = option(confidence, 'confidence', 2.0)
+        self.resolution = option(resolution, 'resolution', 0.0001)
+        self.publish_interval = option(publish_interval, 'publish_interval', 0.2)
+        self.baseline_wait = option(baseline_wait, 'baseline_wait', 2.0)
+
+        self._raw = deque(maxlen=self.median_window)
+        self._fir = deque(maxlen=self.fir_taps)
+        self._medians = deque(maxlen=self.window)
+        self._filtered = deque(maxlen=self.window)
+        # 判定延迟需要向前查找读数最后一次超出稳定范围的时间
+        self._history = deque(maxlen=max(64, 4 * self.window))
+        self.settled = False
+        self._last_publish = None
+
+        # 统计信息
+        self.samples = 0
+        self.episodes = 0
+        self.published = 0
+        self._latencies = deque(maxlen=1000)
+
+    def reset(self):
+        """
+        清空滤波器状态（天平更换或重新去皮后调用）
+        """
+        self._raw.clear()
+        self._fir.clear()
+        self._medians.clear()
+        self._filtered.clear()
+        self._history.clear()
+        self.settled = False
+        self._last_publish = None
+
+    def reset_stats(self):
+        """
+        清空统计
+        """
+        self.samples = 0
+        self.episodes = 0
+        self.published = 0
+        self._latencies.clear()
+
+    def update(self, timestamp, weight):
+        """
+        输入一条读数
+
+        参数:
+            timestamp: 时间戳（秒，单调递增）
+            weight: 重量（g）
+
+        返回:
+            SettledReading: 判定稳定或需要刷新稳定重量时返回，否则返回None
+        """
+        self.samples += 1
+        self._history.append((timestamp, weight))
+
+        self._raw.append(weight)
+        median = sorted(self._raw)[len(self._raw) // 2]
+        self._fir.append(median)
+        filtered = sum(self._fir) / len(self._fir)
+        self._medians.append(median)
+        self._filtered.append(filtered)
+
+        if not self._is_stable():
+            if self.settled:
+                self.settled = False
+            return None
+
+        count = len(self._medians)
+        estimate = sum(self._medians) / count
+        spread = math.sqrt(sum((value - estimate) ** 2 for value in self._medians) / (count - 1))
+        bound = self.confidence * spread / math.sqrt(count) + self.resolution / 2
+
+        if not self.settled:
+            self.settled = True
+            self.episodes += 1
+            self._last_publish = timestamp
+            self.published += 1
+            latency = timestamp - self._quiet_since(estimate, bound)
+            self._latencies.append(latency)
+            return SettledReading(timestamp, estimate, bound, latency, True)
+
+        if timestamp - self._last_publish >= self.publish_interval:
+            self._last_publish = timestamp
+            self.published += 1
+            return SettledReading(timestamp, estimate, bound, None, False)
+        return None
+
+    def _is_stable(self):
+        """
+        滚动窗口是否满足稳定条件
+        """
+        count = len(self._filtered)
+        if count < self.window or len(self._fir) < self.fir_taps:
+            return False
+        # 标准差按中值滤波结果计算：滑动平均会把噪声较大的读数平滑到阈值以下
+        mean = sum(self._medians) / count
+        variance = sum((value - mean) ** 2 for value in self._medians) / (count - 1)
+        if variance > self.std_threshold ** 2:
+            return False
+        half = count // 2
+        values = list(self._filtered)
+        drift = sum(values[half:]) / (count - half) - sum(values[:half]) / half
+        return abs(drift) <= self.drift_threshold
+
+    def _quiet_since(self, estimate, bound):
+        """
+        读数最后一次超出稳定范围之后第一条读数的时间戳
+        """
+        band = max(3 * self.std_threshold, bound)
+        quiet = self._history[0][0]
+        for timestamp, weight in reversed(self._history):
+            if abs(weight - estimate) > band:
+                break
+            quiet = timestamp
+        return quiet
+
+    def get_stats(self):
+        """
+        获取稳定检测统计
+
+        返回:
+            dict: 读数条数、扰动次数、发布次数、判定延迟（平均/P95）和每次扰动节省的等待时间（平均/合计）
+        """
+        latencies = sorted(self._latencies)
+        mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+        saved = [self.baseline_wait - latency for latency in latencies]
+        return {
+            'samples': self.samples,
+            'episodes': self.episodes,
+            'published': self.published,
+            'settled': self.settled,
+            'mean_latency': mean_latency,
+            'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            'mean_saved': sum(saved) / len(saved) if saved else 0.0,
+            'total_saved': sum(saved)
+        }
+
+
+class SettlingPredictor:
+    """
+    由过渡过程的读数预测最终稳定重量
+
+    抖动后天平读数为稳定重量加上衰减的振荡和漂移，用以下模型拟合最近predict_window秒的读数：
+        y(t) = m + e^(-t/τ) * (A*cos(ωt) + B*sin(ωt))，ω为0时为 m + (A + B*t) * e^(-t/τ)
+    τ和ω在网格上取值，每组(τ, ω)下模型对(m, A, B)是线性的，所有网格一次批量最小二乘求解，
+    取残差最小的一组；残差超过4倍标准差的读数（尖峰）剔除后重新拟合一次。
+    置信区间半宽 = z * m的标准差（最小二乘协方差） + 残差相当的其他网格模型给出的m的最大偏差 + 天平分辨率的一半。
+    区间半宽不超过max_bound时给出预测，之后只有新的预测与上次预测不一致（出现新的扰动）时才再次给出
+    """
+
+    def __init__(self, window=None, min_samples=None, min_span=None, max_bound=None, tau_min=None, tau_max=None, tau_steps=None,
+                 max_frequency=None, frequency_step=None, confidence=None, resolution=None):
+        """
+        初始化预测器，参数为None时读取配置
+
+        参数:
+            window: 拟合使用的最近读数时间范围（秒）
+            min_samples: 开始预测所需的最少读数条数
+            min_span: 开始预测所需的最短读数时间跨度（秒），跨度太短时外推不可靠
+            max_bound: 给出预测的最大置信区间半宽（g）
+            tau_min: 衰减时间常数网格的最小值（秒）
+            tau_max: 衰减时间常数网格的最大值（秒）
+            tau_steps: 衰减时间常数网格的点数（按对数均匀分布）
+            max_frequency: 振荡频率网格的最大值（Hz）
+            frequency_step: 振荡频率网格的间隔（Hz）
+            confidence: 置信区间的z值
+            resolution: 天平分辨率（g）
+        """
+        def option(value, key, default, getter=global_config.get_float):
+            return value if value is not None else getter('Stability', key, default)
+
+        self.window = option(window, 'predict_window', 1.0)
+        self.min_samples = max(4, option(min_samples, 'predict_min_samples', 6, global_config.get_int))
+        self.min_span = option(min_span, 'predict_min_span', 0.6)
+        self.max_bound = option(max_bound, 'predict_max_bound', 0.0003)
+        tau_min = option(tau_min, 'predict_tau_min', 0.1)
+        tau_max = option(tau_max, 'predict_tau_max', 1.5)
+        tau_steps = max(1, option(tau_steps, 'predict_tau_steps', 8, global_config.get_int))
+        max_frequency = option(max_frequency, 'predict_max_frequency', 6.0)
+        frequency_step = option(frequency_step, 'predict_frequency_step', 0.5)
+        self.confidence = option(confidence, 'confidence', 2.0)
+        self.resolution = option(resolution, 'resolution', 0.0001)
+
+        taus = np.geomspace(tau_min, tau_max, tau_steps)
+        frequencies = np.arange(0.0, max_frequency + frequency_step / 2, frequency_step) if frequency_step > 0 \
+            else np.zeros(1)
+        grid_tau, grid_frequency = np.meshgrid(taus, frequencies, indexing='ij')
+        self._rates = (1.0 / grid_tau).ravel()
+        self._omegas = (2 * np.pi * grid_frequency).ravel()
+        # 取整误差的标准差，作为残差标准差的下限
+        self._noise_floor = self.resolution / math.sqrt(12)
+
+        self._samples = deque()
+        self._last = None  # 最近一次给出的预测
+
+        # 统计信息
+        self.fits = 0
+        self.predictions = 0
+
+    def reset(self):
+        """
+        开始一次新的过渡过程（稳定检测器判定扰动后调用），清空读数
+        """
+        self._samples.clear()
+        self._last = None
+
+    def update(self, timestamp, weight):
+        """
+        输入一条读数
+
+        参数:
+            timestamp: 时间戳（秒，单调递增）
+            weight: 重量（g）
+
+        返回:
+            SettledReading: 置信区间足够小且与上次预测不一致时返回预测（predicted为True），否则返回None
+        """
+        self._samples.append((timestamp, weight))
+        while timestamp - self._samples[0][0] > self.window:
+            self._samples.popleft()
+        if len(self._samples) < self.min_samples or timestamp - self._samples[0][0] < self.min_span:
+            return None
+
+        estimate = self.predict()
+        if estimate is None:
+            return None
+        weight, bound = estimate
+        if bound > self.max_bound:
+            return None
+        last = self._last
+        if last is not None and abs(weight - last.weight) <= bound + last.bound:
+            return None
+        self.predictions += 1
+        self._last = SettledReading(timestamp, weight, bound, None, True, predicted=True)
+        return self._last
+
+    def predict(self):
+        """
+        拟合当前窗口内的读数
+
+        返回:
+            tuple: (预测的稳定重量（g）, 置信区间半宽（g）)，读数不足时返回None
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        self.fits += 1
+        times, weights = np.array(self._samples).T
+        return self.fit(times - times[0], weights)
+
+    def fit(self, times, weights):
+        """
+        对一段读数批量拟合全部网格模型
+
+        参数:
+            times: 时间数组（秒，从0开始）
+            weights: 重量数组（g）
+
+        返回:
+            tuple: (预测的稳定重量（g）, 置信区间半宽（g）)
+        """
+        offset = weights[-1]
+        values = weights - offset
+        decay = np.exp(-np.outer(self._rates, times))  # (网格, 读数)
+        phase = np.outer(self._omegas, times)
+        oscillating = (self._omegas > 0)[:, None]
+        columns = np.stack([
+            np.ones_like(decay),
+            decay * np.where(oscillating, np.cos(phase), 1.0),
+            decay * np.where(oscillating, np.sin(phase), times)
+        ], axis=2)  # (网格, 读数, 3)
+
+        mask = np.ones(len(times), dtype=bool)
+        for _ in range(2):
+            result = self._solve(columns[:, mask], values[mask])
+            if result is None:
+                return None
+            coefficients, residual, covariance, sigma = result
+            best = int(np.argmin(residual))
+            predicted = columns[best] @ coefficients[best]
+            outliers = np.abs(values - predicted) > 4 * sigma[best]
+            # 剔除尖峰后至少保留min_samples条，没有尖峰时不再重新拟合
+            if not outliers.any() or len(times) - outliers.sum() < self.min_samples or not mask.all():
+                break
+            mask = ~outliers
+
+        # 与最优模型残差相当（卡方差不超过4）的其他模型给出的m的偏差计入模型不确定度
+        similar = residual <= residual[best] + 4 * sigma[best] ** 2
+        spread = np.max(np.abs(coefficients[similar, 0] - coefficients[best, 0]))
+        bound = self.confidence * math.sqrt(max(covariance[best], 0.0)) + spread + self.resolution / 2
+        return float(coefficients[best, 0] + offset), float(bound)
+
+    def _solve(self, columns, values):
+        """
+        批量求解正规方程
+
+        返回:
+            tuple: (系数, 残差平方和, m的方差, 残差标准差)，自由度不足时返回None
+        """
+        count = columns.shape[1]
+        dof = count - columns.shape[2]
+        if dof < 1:
+            return None
+        transposed = columns.transpose(0, 2, 1)
+        normal = transposed @ columns
+        # 小的岭项避免τ较大时衰减项与常数项近似共线导致矩阵奇异
+        normal += np.eye(3) * 1e-12 * np.trace(normal, axis1=1, axis2=2)[:, None, None]
+        inverse = np.linalg.inv(normal)
+        coefficients = (inverse @ (transposed @ values)[:, :, None])[:, :, 0]
+        residual = np.sum((values - (columns @ coefficients[:, :, None])[:, :, 0]) ** 2, axis=1)
+        sigma = np.maximum(np.sqrt(residual / dof), self._noise_floor)
+        return coefficients, residual, inverse[:, 0, 0] * sigma ** 2, sigma
+
+    def reset_stats(self):
+        """
+        清空统计
+        """
+        self.fits = 0
+        self.predictions = 0
+
+    def get_stats(self):
+        """
+        获取预测统计
+
+        返回:
+            dict: 拟合次数和给出预测的次数
+        """
+        return {
+            'fits': self.fits,
+            'predictions': self.predictions
+        }
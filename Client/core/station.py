@@ -0,0 +1,1067 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .logger import system_logger, data_com_logger, ctrl_com_logger
+from .config_manager import global_config
+from .balance import stop_balance_readers
+from .capture import WireCapture
+from .communication import create_communication
+from .correlation import CorrelationTable
+from .data_processor import DataProcessor
+from .file_handler import FileHandler
+from .protocol_handler import ProtocolHandler, PROTOCOL_V2
+from .reconnect import SessionDowntimeTracker
+from .stability import StabilityDetector, SettlingPredictor
+from .trajectory import ShakeTrajectory, TrajectoryMonitor
+from .weight_stream import WeightStream
+
+# 额外工位在配置文件中的节名前缀，例如 [Station:工位2]
+STATION_SECTION_PREFIX = 'Station:'
+
+
+class SerialExecutor:
+    """
+    在共享线程池上按提交顺序串行执行任务
+
+    同一工位的消息必须按到达顺序处理，不同工位之间则可以并行，
+    因此每个工位使用一个串行执行器，所有工位共享同一个线程池
+    """
+
+    def __init__(self, pool, name, batch_size=32):
+        """
+        初始化串行执行器
+
+        参数:
+            pool: 共享的线程池
+            name: 名称（用于日志）
+            batch_size: 每次占用线程池最多连续执行的任务数，超过后让出线程保证各工位公平
+        """
+        self.pool = pool
+        self.name = name
+        self.batch_size = batch_size
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def submit(self, fn, *args):
+        """
+        提交任务
+
+        参数:
+            fn: 要执行的函数
+            args: 函数参数
+        """
+        with self._lock:
+            self._queue.append((fn, args))
+            if self._running:
+                return
+            self._running = True
+        self.pool.submit(self._drain)
+
+    def pending(self):
+        """
+        获取待执行的任务数
+
+        返回:
+            int: 任务数
+        """
+        return len(self._queue)
+
+    def _drain(self):
+        """
+        依次执行队列中的任务
+        """
+        for _ in range(self.batch_size):
+            with self._lock:
+                if not self._queue:
+                    self._running = False
+                    return
+                fn, args = self._queue.popleft()
+            try:
+                fn(*args)
+            except Exception as e:
+                system_logger.error(f"[{self.name}] 执行任务时发生错误: {e}")
+
+        # 让出线程，剩余任务重新排队
+        try:
+            self.pool.submit(self._drain)
+        except RuntimeError:
+            # 线程池已关闭
+            with self._lock:
+                self._running = False
+
+
+class Station:
+    """
+    工位类：一台YuMi机器人及其控制/数据通道、数据处理器和Excel处理进度
+
+    通讯回调只负责把消息提交到工位的串行执行器，业务处理在共享线程池中完成，
+    处理结果通过监听函数 listener(station_name, event, payload) 通知界面
+    """
+
+    def __init__(self, name, control_host, control_port, data_host, data_port, section='Communication',
+                 executor=None, excel_file=None):
+        """
+        初始化工位
+
+        参数:
+            name: 工位名称
+            control_host: 控制通道IP地址
+            control_port: 控制通道端口
+            data_host: 数据通道IP地址
+            data_port: 数据通道端口
+            section: 保存该工位连接配置的配置节
+            executor: 串行执行器，None则在通讯线程中直接处理
+            excel_file: Excel文件路径
+        """
+        self.name = name
+        self.section = section
+        self.executor = executor
+        self.excel_file = excel_file or ''
+
+        self.tcp_comm = create_communication(control_port, comm_type='CTRL_COM')  # 控制参数通讯客户端
+        self.tcp_data_comm = create_communication(data_port, comm_type='DATA_COM')  # 整体数据读取客户端
+        self.tcp_comm.host = control_host
+        self.tcp_data_comm.host = data_host
+        self.data_processor = DataProcessor()
+        self.file_handler = FileHandler()
+        self.protocol_handler = ProtocolHandler()  # 通讯协议处理器
+        self.correlation = CorrelationTable()  # 协议v2请求/应答序号关联
+        self.weight_stream = WeightStream(self.tcp_data_comm)  # 称重结果推送订阅/轮询
+        self.trajectory = ShakeTrajectory()  # 抖动轨迹规划（协议v2）
+        self.trajectory_monitor = TrajectoryMonitor(lambda: self._submit(self._check_trajectory), name=name)
+        self.session_tracker = SessionDowntimeTracker()  # 会话级中断统计
+        self.stability = StabilityDetector()  # 天平稳定检测（协议v2下把稳定重量发送给机器人）
+        self.publish_settled = global_config.get_boolean('Stability', 'enabled', True)
+        self.predictor = SettlingPredictor()  # 由过渡过程读数预测稳定重量
+        self.predict_settling = global_config.get_boolean('Stability', 'predict_enabled', True)
+        self.unstable_wait = global_config.get_float('Balance', 'unstable_wait', 0.5)  # 暂无稳定读数时的等待时间
+        self._balance_listener = None
+        self.capture = None  # 抓包记录器
+        self.listeners = []
+
+        self.tcp_comm.set_callback(
+            receive_callback=lambda frame: self._submit(self.handle_control_frame, frame),
+            error_callback=lambda msg: self._notify('comm_error', msg),
+            status_callback=lambda comm_type, event, info: self._submit(self.handle_status, comm_type, event, info)
+        )
+        self.tcp_data_comm.set_callback(
+            receive_callback=lambda message: self._submit(self.handle_data_frame, message),
+            error_callback=lambda msg: self._notify('comm_error', msg),
+            status_callback=lambda comm_type, event, info: self._submit(self.handle_status, comm_type, event, info)
+        )
+
+        # Excel处理进度
+        self.is_running = False
+        self.current_target_weight = None
+        self.excel_sheet = None
+        self.excel_max_row = 0
+        self.excel_max_col = 0
+        self.current_row = 1
+        self.current_col = 1
+        self.current_material = "Unknown"
+        self.excel_filename = "Unknown"
+        self.current_json_filename = "Unknown"  # 当前物料的JSON文件名
+
+        # 断线恢复相关变量
+        self.resume_pending = False  # 通讯恢复后尚未收到第一条控制指令
+        self.row_started = False  # 当前行是否已收到executing（机器人已开始执行）
+
+        # 吞吐量统计
+        self.targets_sent = 0
+        self.results_saved = 0
+        self._last_sample = None
+
+    def add_listener(self, listener):
+        """
+        添加事件监听函数
+
+        参数:
+            listener: 监听函数，参数为 (station_name, event, payload)
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, event, payload=None):
+        """
+        通知所有监听函数
+        """
+        for listener in self.listeners:
+            try:
+                listener(self.name, event, payload)
+            except Exception as e:
+                system_logger.error(f"[{self.name}] 处理工位事件回调时发生错误: {e}")
+
+    def _submit(self, fn, *args):
+        """
+        把任务提交到工位的串行执行器
+        """
+        if self.executor is None:
+            fn(*args)
+        else:
+            self.executor.submit(fn, *args)
+
+    def set_server_info(self, control_host, control_port, data_host, data_port):
+        """
+        设置服务器信息并保存到配置文件
+
+        参数:
+            control_host: 控制通道IP地址
+            control_port: 控制通道端口
+            data_host: 数据通道IP地址
+            data_port: 数据通道端口
+        """
+        self.tcp_comm.host, self.tcp_comm.port = control_host, control_port
+        self.tcp_data_comm.host, self.tcp_data_comm.port = data_host, data_port
+
+        global_config.set(self.section, 'control_host', control_host)
+        global_config.set(self.section, 'control_port', str(control_port))
+        global_config.set(self.section, 'data_host', data_host)
+        global_config.set(self.section, 'data_port', str(data_port))
+
+    def connect(self):
+        """
+        连接控制通道和数据通道
+
+        返回:
+            tuple: (控制通道是否连接成功, 数据通道是否连接成功)
+        """
+        return self.connect_control(), self.connect_data()
+
+    def connect_control(self):
+        """
+        连接控制通道
+
+        返回:
+            bool: 连接是否成功
+        """
+        return self.tcp_comm.connect()
+
+    def connect_data(self):
+        """
+        连接数据通道
+
+        返回:
+            bool: 连接是否成功
+        """
+        return self.tcp_data_comm.connect()
+
+    def disconnect(self):
+        """
+        断开控制通道和数据通道
+        """
+        self.disconnect_control()
+        self.disconnect_data()
+        self._stop_trajectory()
+
+    def disconnect_control(self):
+        """
+        手动断开控制通道
+        """
+        self.tcp_comm.disconnect()
+        self.session_tracker.discard('CTRL_COM')
+
+    def disconnect_data(self):
+        """
+        手动断开数据通道
+        """
+        self.tcp_data_comm.disconnect()
+        self.session_tracker.discard('DATA_COM')
+        self.weight_stream.reset()
+        self.protocol_handler.reset_negotiation()
+
+    def start_capture(self, file_path=None):
+        """
+        开始录制控制通道和数据通道的原始收发数据
+
+        参数:
+            file_path: 抓包文件路径，None则在配置的抓包目录下按工位名称和时间生成
+
+        返回:
+            str: 抓包文件路径
+        """
+        self.stop_capture()
+        if file_path is None:
+            capture_dir = global_config.get('Capture', 'capture_dir', 'captures')
+            timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime())
+            file_path = os.path.join(capture_dir, f"{self.name}_{timestamp}.ycap")
+
+        self.capture = WireCapture(file_path)
+        self.tcp_comm.set_capture(self.capture)
+        self.tcp_data_comm.set_capture(self.capture)
+        return file_path
+
+    def stop_capture(self):
+        """
+        停止录制
+
+        返回:
+            dict: 录制统计，未在录制时返回None
+        """
+        capture = self.capture
+        if capture is None:
+            return None
+        self.tcp_comm.set_capture(None)
+        self.tcp_data_comm.set_capture(None)
+        self.capture = None
+        capture.close()
+        return capture.get_stats()
+
+    def is_connected(self):
+        """
+        判断控制通道和数据通道是否都已连接
+
+        返回:
+            bool: 是否都已连接
+        """
+        return self.tcp_comm.get_connection_status() and self.tcp_data_comm.get_connection_status()
+
+    def load_excel(self, file_path):
+        """
+        加载Excel文件并重置处理进度
+
+        参数:
+            file_path: Excel文件路径
+
+        返回:
+            tuple: (sheet, max_row, max_col)，加载失败时sheet为None
+        """
+        sheet, max_row, max_col = self.file_handler.read_excel(file_path)
+        if not sheet:
+            return None, 0, 0
+
+        self.excel_file = file_path
+        self.excel_sheet = sheet
+        self.excel_max_row = max_row
+        self.excel_max_col = max_col
+
+        # 保存Excel文件名（不包含路径和扩展名）
+        self.excel_filename = os.path.splitext(os.path.basename(file_path))[0]
+        if self.section.startswith(STATION_SECTION_PREFIX):
+            global_config.set(self.section, 'excel_file', file_path)
+        return sheet, max_row, max_col
+
+    def is_completed(self):
+        """
+        检查是否处理完所有数据
+
+        返回:
+            bool: 是否已处理完所有数据
+        """
+        if not self.excel_sheet:
+            return True
+        return self.current_col > self.excel_max_col
+
+    def start(self):
+        """
+        开始处理
+
+        返回:
+            str: 无法开始时返回原因，成功返回None
+        """
+        if not self.tcp_comm.get_connection_status():
+            return "请先连接到服务器"
+
+        # 如果没有加载Excel文件，提示用户
+        if not self.excel_sheet:
+            return "请先加载Excel文件"
+
+        # 初始化当前行和列
+        self.current_row = 1
+        self.row_started = False
+        self.resume_pending = False
+
+        self.is_running = True
+        self._start_stability()
+        system_logger.info(f"[{self.name}] 开始处理")
+        return None
+
+    def stop(self):
+        """
+        停止处理
+        """
+        self.is_running = False
+        self._stop_trajectory()
+        self._stop_stability()
+
+        # 停止处理后不再需要推送
+        self.weight_stream.stop()
+
+    def poll(self):
+        """
+        定时处理（每秒一次），轮询模式下发送request_weight
+        """
+        if not self.is_running:
+            return
+
+        try:
+            # 断线重连期间不发送请求
+            if not self.tcp_data_comm.get_connection_status():
+                return
+
+            # 连接后第一次处理时先协商协议版本，服务器不支持或超时时使用v1
+            protocol = self.protocol_handler
+            if protocol.negotiation == 'idle':
+                request = protocol.negotiation_request()
+                if request:
+                    self.tcp_data_comm.send_data(request)
+                    return
+            elif protocol.negotiation == 'pending' and not protocol.negotiation_timed_out():
+                return
+
+            # 协商完成后订阅推送，服务器不支持时自动回退到轮询
+            if self.weight_stream.state == 'idle':
+                self.weight_stream.start()
+
+            # 1. 数据回传客户端：轮询模式下发送 'request_weight' 到数据服务器
+            if self.weight_stream.should_poll():
+                self.tcp_data_comm.send_data('request_weight')
+
+        except Exception as e:
+            system_logger.error(f"[{self.name}] 处理数据时发生错误: {e}")
+
+    def handle_control_frame(self, data_str):
+        """
+        处理控制通道收到的一条消息
+
+        参数:
+            data_str: 接收到的数据字符串
+        """
+        try:
+            # 使用协议处理器解析响应
+            message = self.protocol_handler.parse_response(data_str)
+            command = message.kind
+
+            # 协议v2的请求带有机器人最近执行的指令序号，过期或重复的请求不应答
+            if message.sequence is not None and not self.correlation.on_prompt(message.sequence):
+                return
+
+            # 处理new_target指令
+            if command == 'new_target':
+                self.protocol_handler.handle_new_target()
+                self._stop_trajectory()
+
+                # 获取新目标重量
+                if self.excel_sheet and not self.is_completed() and self.is_running:
+                    self._send_new_target()
+
+            # 处理executing指令
+            elif command == 'executing':
+                self.protocol_handler.handle_executing(message.raw)
+                self.row_started = True
+                self.resume_pending = False
+
+                # 如果有目标重量，计算抖动参数并发送；协议v2下可以改为下发一段轨迹
+                if self.current_target_weight and not self.is_completed() and self.is_running:
+                    if self.trajectory.enabled and self.protocol_handler.version == PROTOCOL_V2:
+                        self._send_trajectory()
+                    else:
+                        self._send_executing()
+
+        except Exception as e:
+            ctrl_com_logger.error(f"[{self.name}] 处理控制指令数据时发生错误: {e}")
+
+    def _send_new_target(self):
+        """
+        移动到下一行并下发新目标
+        """
+        # 断线前已下发、但机器人尚未开始执行的目标在恢复后重新下发，不跳过该行
+        resume_row = self.resume_pending and not self.row_started and self.current_row > 1
+        self.resume_pending = False
+
+        if resume_row:
+            system_logger.info(f"[{self.name}] 通讯恢复后重新下发第 {self.current_row} 行目标")
+        elif self.current_row < self.excel_max_row:
+            # 移动到下一个目标
+            self.current_row += 1
+        else:
+            self.stop()
+            self._notify('completed')
+            return
+        self.row_started = False
+
+        # 从Excel获取物料参数（假设列结构：1-物料名，2-目标重量，3-密度，4-颗粒大小，5-空瓶重，6-控制策略（可选））
+        get_cell_value = self.file_handler.get_cell_value
+        material_name = get_cell_value(self.excel_sheet, self.current_row, 1)  # 第1列：物料名称
+        target_weight_cell = get_cell_value(self.excel_sheet, self.current_row, 2)  # 第2列：目标重量
+        density_cell = get_cell_value(self.excel_sheet, self.current_row, 3)  # 第3列：密度
+        particle_size_cell = get_cell_value(self.excel_sheet, self.current_row, 4)  # 第4列：颗粒大小
+        vial_weight_cell = get_cell_value(self.excel_sheet, self.current_row, 5)  # 第5列：空瓶重
+        controller_cell = get_cell_value(self.excel_sheet, self.current_row, 6)  # 第6列：控制策略（可选）
+
+        # 保存当前物料名称，用于JSON命名
+        self.current_material = material_name if material_name else "Unknown"
+
+        # 处理目标重量
+        if target_weight_cell is None or not isinstance(target_weight_cell, (int, float)):
+            system_logger.warning(f"[{self.name}] 从Excel获取的目标重量无效: {target_weight_cell}，使用测试值 10.0 g")
+            target_weight = 10.0
+        else:
+            target_weight = float(target_weight_cell)
+            system_logger.info(f"[{self.name}] 获取到有效目标重量: {target_weight} g")
+
+        # 生成当前物料的JSON文件名（重新下发同一行时沿用原文件）
+        if not resume_row or self.current_json_filename == "Unknown":
+            timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime())
+            self.current_json_filename = f"{self.excel_filename}_{self.current_material}_{timestamp}.json"
+
+        # 处理密度
+        density = None
+        if density_cell is not None and isinstance(density_cell, (int, float)):
+            density = float(density_cell)
+            system_logger.info(f"[{self.name}] 获取到有效密度: {density}")
+
+        # 处理颗粒大小
+        particle_size = None
+        if particle_size_cell is not None and isinstance(particle_size_cell, (int, float)):
+            particle_size = float(particle_size_cell)
+            system_logger.info(f"[{self.name}] 获取到有效颗粒大小: {particle_size}")
+
+        # 处理空瓶重
+        vial_weight = None
+        if vial_weight_cell is not None and isinstance(vial_weight_cell, (int, float)):
+            vial_weight = float(vial_weight_cell)
+            system_logger.info(f"[{self.name}] 获取到有效空瓶重: {vial_weight} g")
+
+        # 处理控制策略，未指定时按物料或配置选择
+        controller = controller_cell.strip() if isinstance(controller_cell, str) and controller_cell.strip() else None
+
+        # 更新数据处理器参数
+        self.data_processor.update_parameters(
+            density=density,
+            vial_weight=vial_weight,
+            particle_size=particle_size,
+            material=self.current_material,
+            controller=controller
+        )
+
+        # 更新当前目标重量，模拟重量时换空瓶
+        self.current_target_weight = target_weight
+        if not resume_row:
+            self.data_processor.start_dispense(target_weight)
+
+        # 获取当前重量并计算抖动参数
+        current_weight = self._read_weight()
+        shaking_amplitude, shaking_angle = self.data_processor.calculate_shaking_parameters(
+            self.current_target_weight, current_weight
+        )
+
+        self._notify('target', {
+            'row': self.current_row,
+            'material': self.current_material,
+            'target_weight': target_weight,
+            'density': density,
+            'particle_size': particle_size,
+            'vial_weight': vial_weight,
+            'controller': self.data_processor.controller.name,
+            'current_weight': current_weight,
+            'shaking_amplitude': shaking_amplitude,
+            'shaking_angle': shaking_angle
+        })
+
+        # 使用协议处理器格式化控制指令，没有抖动参数时回复"数据未稳定"，RAPID端稍后再次请求
+        if shaking_amplitude is None or shaking_angle is None:
+            ctrl_com_logger.warning(f"[{self.name}] 暂无稳定重量，回复数据未稳定")
+            send_str = self.protocol_handler.format_unstable_packet(target_weight)
+        else:
+            send_str = self.protocol_handler.format_control_packet(
+                target_weight,
+                shaking_amplitude,
+                current_weight,
+                shaking_angle
+            )
+
+        if send_str and self.tcp_comm.send_data(send_str, reply=True):
+            self.targets_sent += 1
+            self._track_request('new_target')
+            self.data_processor.on_command(shaking_amplitude, shaking_angle)
+
+    def _send_executing(self, reply=True):
+        """
+        执行过程中根据当前重量下发抖动参数
+
+        参数:
+            reply: 是否为对executing请求的应答
+        """
+        # 获取当前重量并计算抖动参数
+        current_weight = self._read_weight()
+        shaking_amplitude, shaking_angle = self.data_processor.calculate_shaking_parameters(
+            self.current_target_weight, current_weight
+        )
+
+        self._notify('control', {
+            'current_weight': current_weight,
+            'shaking_amplitude': shaking_amplitude,
+            'shaking_angle': shaking_angle
+        })
+
+        # 使用协议处理器格式化控制指令，没有抖动参数时回复"数据未稳定"，RAPID端稍后再次请求
+        if shaking_amplitude is None or shaking_angle is None:
+            ctrl_com_logger.warning(f"[{self.name}] 暂无稳定重量，回复数据未稳定")
+            send_str = self.protocol_handler.format_unstable_packet(0)
+        else:
+            send_str = self.protocol_handler.format_control_packet(
+                0,  # executing指令时target_weight为0
+                shaking_amplitude,
+                current_weight,
+                shaking_angle
+            )
+
+        if send_str and self.tcp_comm.send_data(send_str, reply=reply):
+            self._track_request('executing')
+            self.data_processor.on_command(shaking_amplitude, shaking_angle)
+
+    def _send_trajectory(self, current_weight=None, reply=True):
+        """
+        根据当前重量规划并下发一段抖动轨迹，之后由采样线程监视重量
+
+        参数:
+            current_weight: 当前重量（g），None则重新读取
+            reply: 是否为对executing请求的应答，重量超出预测范围时主动重新规划为False
+        """
+        if current_weight is None:
+            current_weight = self._read_weight()
+        if current_weight is None:
+            ctrl_com_logger.warning(f"[{self.name}] 暂无稳定重量，回复数据未稳定")
+            packet = self.protocol_handler.format_unstable_packet(0)
+            if packet and self.tcp_comm.send_data(packet, reply=reply):
+                self._track_request('executing')
+            return
+        setpoints, limit = self.trajectory.plan(
+            self.current_target_weight, current_weight, self.data_processor.calculate_shaking_parameters
+        )
+        if not setpoints:
+            ctrl_com_logger.warning(f"[{self.name}] 抖动轨迹规划失败，改为逐周期应答")
+            self._send_executing(reply)
+            return
+
+        self._notify('control', {
+            'current_weight': current_weight,
+            'shaking_amplitude': setpoints[0][1],
+            'shaking_angle': setpoints[0][2]
+        })
+
+        packet = self.protocol_handler.encode_trajectory(current_weight, limit, setpoints)
+        if packet and self.tcp_comm.send_data(packet, reply=reply):
+            self.trajectory.commit(current_weight, limit)
+            self._track_request('trajectory')
+            self.data_processor.on_command(setpoints[0][1], setpoints[0][2])
+            self.trajectory_monitor.start()
+
+    def _check_trajectory(self):
+        """
+        采样线程触发的重量检查：超出预测范围时重新规划，否则按死区发送重量更新
+        """
+        if not self.trajectory.active or not self.is_running:
+            return
+        if self.protocol_handler.version != PROTOCOL_V2:
+            self._stop_trajectory()
+            return
+        current_weight = self.data_processor.get_weight()
+        if current_weight is None:
+            # 天平尚未稳定，等下一次采样
+            return
+        action = self.trajectory.check(current_weight)
+        if action == 'replan':
+            self._send_trajectory(current_weight, reply=False)
+        elif action == 'weight':
+            packet = self.protocol_handler.encode_trajectory(current_weight)
+            if packet and self.tcp_comm.send_data(packet):
+                self.trajectory.on_weight_sent(current_weight)
+
+    def _read_weight(self):
+        """
+        读取当前重量，暂无稳定读数时最多等待unstable_wait秒
+
+        返回:
+            float: 重量（g），仍没有稳定读数时返回None
+        """
+        current_weight = self.data_processor.get_weight()
+        if current_weight is None and self.unstable_wait > 0:
+            current_weight = self.data_processor.wait_weight(self.unstable_wait)
+        return current_weight
+
+    def _stop_trajectory(self):
+        """
+        停止当前轨迹和重量采样
+        """
+        self.trajectory_monitor.stop()
+        self.trajectory.clear()
+
+    def _start_stability(self):
+        """
+        使用真实天平时注册读数回调，由稳定检测器判定稳定后发送稳定重量
+        """
+        if not self.publish_settled or self.data_processor.simulate_weight or self._balance_listener is not None:
+            return
+        self.stability.reset()
+        self.predictor.reset()
+        self.data_processor.set_prediction(None)
+        self._balance_listener = self.data_processor.get_balance()
+        self._balance_listener.add_listener(self._on_balance_reading)
+
+    def _stop_stability(self):
+        """
+        取消读数回调
+        """
+        if self._balance_listener is not None:
+            self._balance_listener.remove_listener(self._on_balance_reading)
+            self._balance_listener = None
+
+    def _on_balance_reading(self, timestamp, weight, stable):
+        """
+        天平读取线程的读数回调：稳定检测在读取线程中完成，发送提交到工位的串行执行器
+
+        天平未稳定期间同时用SettlingPredictor预测稳定重量，置信区间足够小时DataProcessor
+        改用预测值计算抖动参数，预测值也作为稳定重量（带预测标志）发送给机器人
+        """
+        was_settled = self.stability.settled
+        reading = self.stability.update(timestamp, weight)
+        if self.predict_settling and not self.stability.settled:
+            if was_settled:
+                # 新的扰动，之前的读数不属于这次过渡过程
+                self.predictor.reset()
+            prediction = self.predictor.update(timestamp, weight)
+            if prediction is not None:
+                self.data_processor.set_prediction(prediction)
+                reading = prediction
+        if reading is not None and self.is_running and self.protocol_handler.version == PROTOCOL_V2:
+            self._submit(self._send_settled, reading)
+
+    def _send_settled(self, reading):
+        """
+        发送稳定重量，RAPID端calculate_difference收到后不再固定等待
+
+        参数:
+            reading: SettledReading
+        """
+        packet = self.protocol_handler.encode_settled(reading.weight, reading.bound, reading.first, reading.predicted)
+        if not packet or not self.tcp_comm.send_data(packet):
+            return
+        if reading.predicted:
+            ctrl_com_logger.info(f"[{self.name}] 预测稳定重量: {reading.weight:.4f} ± {reading.bound:.4f} g")
+        elif reading.first:
+            ctrl_com_logger.info(f"[{self.name}] 天平稳定: {reading.weight:.4f} ± {reading.bound:.4f} g，"
+                                 f"判定延迟 {reading.latency:.2f} s")
+
+    def _track_request(self, kind):
+        """
+        协议v2下把刚发出的控制指令登记到关联表
+
+        参数:
+            kind: 指令类型，'new_target'、'executing'或'trajectory'
+        """
+        if self.protocol_handler.version == PROTOCOL_V2:
+            self.correlation.on_request(self.protocol_handler.last_sequence, kind, self.current_row)
+
+    def handle_data_frame(self, message):
+        """
+        处理数据通道收到的一条消息
+
+        参数:
+            message: 接收到的消息（已在接收缓冲区上解析的RobotMessage）
+        """
+        try:
+            # 协议协商回复（旧版RAPID回复的是称重数据，照常处理）
+            negotiated = False
+            if self.protocol_handler.negotiation == 'pending':
+                negotiated = True
+                if self.protocol_handler.on_negotiation_frame(message):
+                    message = None
+
+            # 合并重复结果并处理订阅确认
+            if message is not None:
+                message = self.weight_stream.on_frame(message)
+
+            # 协商完成后立即订阅，不等下一次定时处理
+            if negotiated:
+                self.correlation.clear_pending()
+                if self.is_running and self.weight_stream.state == 'idle':
+                    self.weight_stream.start()
+            if message is None:
+                return
+
+            # 只处理称量结果，"9 9 9"等其他消息忽略
+            if message.kind != 'result':
+                return
+
+            # 协议v2的结果带有目标指令序号，重复或属于旧目标的结果不保存
+            if message.sequence is not None and not self.correlation.on_result(message.sequence):
+                return
+
+            # 处理数据回传客户端的数据
+            if self.excel_sheet and not self.is_completed() and self.is_running:
+                values = message.values
+                # 格式化数据为字典
+                result_dict = {
+                    'accuracy': values[0],
+                    'difference': values[1],
+                    'target_weight': values[2],
+                    'time': values[3]
+                }
+                self._save_result(result_dict)
+        except Exception as e:
+            data_com_logger.error(f"[{self.name}] 处理数据回传客户端数据时发生错误: {e}")
+
+    def _save_result(self, result_dict):
+        """
+        保存一条称量结果到当前物料的JSON文件
+
+        参数:
+            result_dict: 称量结果
+        """
+        results_dir = global_config.get('File', 'results_dir', 'Experimental results')
+        if not os.path.exists(results_dir):
+            os.makedirs(results_dir, exist_ok=True)
+
+        # 使用当前物料的JSON文件名
+        if self.current_json_filename != "Unknown":
+            json_file = os.path.join(results_dir, self.current_json_filename)
+
+            # 保存新数据
+            with open(json_file, 'a') as f:
+                f.write(json.dumps(result_dict) + '\n')
+            self.results_saved += 1
+            system_logger.info(f"[{self.name}] 保存数据到JSON文件: {result_dict}")
+            self._notify('result', result_dict)
+        else:
+            system_logger.info(f"[{self.name}] 不保存数据，当前文件名为Unknown: {result_dict}")
+
+    def handle_status(self, comm_type, event, info):
+        """
+        处理连接状态变化，维护会话中断统计和断线恢复标志
+
+        参数:
+            comm_type: 通讯类型，'CTRL_COM'或'DATA_COM'
+            event: 事件名称，'connection_lost' / 'reconnecting' / 'reconnected'
+            info: 事件信息
+        """
+        incident = None
+        if event == 'connection_lost':
+            self.session_tracker.channel_down(comm_type, info)
+            self.resume_pending = True
+            # 重新ServerStart后的RAPID程序恢复为v1，需要重新协商
+            self.protocol_handler.reset_negotiation()
+            self.correlation.clear_pending()
+            self._stop_trajectory()
+            if comm_type == 'DATA_COM':
+                # 重连后的RAPID程序需要重新订阅
+                self.weight_stream.reset()
+
+        elif event == 'reconnected':
+            incident = self.session_tracker.channel_up(comm_type)
+
+        self._notify('comm_status', {
+            'comm_type': comm_type,
+            'event': event,
+            'info': info,
+            'incident': incident
+        })
+
+    def get_throughput(self):
+        """
+        获取工位吞吐量统计，速率按距上次调用的时间间隔计算
+
+        返回:
+            dict: 收发消息总数、每秒收发消息数、下发目标数和保存结果数
+        """
+        now = time.monotonic()
+        frames_in = self.tcp_comm.reassembler.frames_total + self.tcp_data_comm.reassembler.frames_total
+        bytes_in = self.tcp_comm.reassembler.bytes_total + self.tcp_data_comm.reassembler.bytes_total
+        messages_out = self.tcp_comm.send_queue.sent_total + self.tcp_data_comm.send_queue.sent_total
+
+        rate_in = rate_out = 0.0
+        if self._last_sample is not None:
+            last_time, last_in, last_out = self._last_sample
+            elapsed = now - last_time
+            if elapsed > 0:
+                rate_in = (frames_in - last_in) / elapsed
+                rate_out = (messages_out - last_out) / elapsed
+        self._last_sample = (now, frames_in, messages_out)
+
+        return {
+            'name': self.name,
+            'control_connected': self.tcp_comm.get_connection_status(),
+            'data_connected': self.tcp_data_comm.get_connection_status(),
+            'is_running': self.is_running,
+            'current_row': self.current_row,
+            'max_row': self.excel_max_row,
+            'frames_in': frames_in,
+            'bytes_in': bytes_in,
+            'messages_out': messages_out,
+            'rate_in': rate_in,
+            'rate_out': rate_out,
+            'targets_sent': self.targets_sent,
+            'results_saved': self.results_saved,
+            'backlog': self.executor.pending() if self.executor else 0,
+            'correlation': self.correlation.get_stats(),
+            'packets': self.protocol_handler.encoder.get_stats(),
+            'trajectory': self.trajectory.get_stats(),
+            'controller_cache': self.data_processor.shaking_cache.get_stats(),
+            'stability': dict(self.stability.get_stats(), **self.predictor.get_stats()),
+            'simulator': self.data_processor.simulator.get_stats() if self.data_processor.simulate_weight else None
+        }
+
+
+class StationManager:
+    """
+    工位管理器：维护工位注册表，所有工位的消息处理共享一个线程池
+
+    第一个工位使用 [Communication] 中的连接配置，其余工位在配置文件中以
+    [Station:名称] 节定义（control_host / control_port / data_host / data_port / excel_file）
+    """
+
+    def __init__(self, worker_threads=None):
+        """
+        初始化工位管理器
+
+        参数:
+            worker_threads: 线程池线程数，None则读取配置
+        """
+        if worker_threads is None:
+            worker_threads = global_config.get_int('Stations', 'worker_threads')
+        self.pool = ThreadPoolExecutor(max_workers=max(1, worker_threads), thread_name_prefix='StationWorker')
+        self.stations = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """
+        添加事件监听函数，对已注册和以后注册的工位都生效
+
+        参数:
+            listener: 监听函数，参数为 (station_name, event, payload)
+        """
+        self._listeners.append(listener)
+        for station in self.stations.values():
+            station.add_listener(listener)
+
+    def load_from_config(self):
+        """
+        按配置文件创建所有工位
+
+        返回:
+            list: 工位名称列表
+        """
+        primary_name = global_config.get('Stations', 'primary_name', '工位1')
+        self.add_station(
+            primary_name,
+            global_config.get('Communication', 'control_host'),
+            global_config.get_int('Communication', 'control_port'),
+            global_config.get('Communication', 'data_host'),
+            global_config.get_int('Communication', 'data_port'),
+            section='Communication',
+            excel_file=global_config.get('File', 'excel_file')
+        )
+
+        for section in global_config.get_sections(STATION_SECTION_PREFIX):
+            name = section[len(STATION_SECTION_PREFIX):].strip()
+            if not name or name in self.stations:
+                system_logger.warning(f"忽略无效或重复的工位配置: [{section}]")
+                continue
+            self.add_station(
+                name,
+                global_config.get(section, 'control_host', '127.0.0.1'),
+                global_config.get_int(section, 'control_port', 1023),
+                global_config.get(section, 'data_host', '127.0.0.1'),
+                global_config.get_int(section, 'data_port', 1025),
+                section=section,
+                excel_file=global_config.get(section, 'excel_file', '')
+            )
+        return self.names()
+
+    def add_station(self, name, control_host, control_port, data_host, data_port, section=None, excel_file=None):
+        """
+        注册一个工位
+
+        参数:
+            name: 工位名称
+            control_host: 控制通道IP地址
+            control_port: 控制通道端口
+            data_host: 数据通道IP地址
+            data_port: 数据通道端口
+            section: 保存该工位配置的配置节，None则使用 [Station:名称]
+            excel_file: Excel文件路径
+
+        返回:
+            Station: 新注册的工位
+        """
+        if name in self.stations:
+            raise ValueError(f"工位已存在: {name}")
+
+        station = Station(
+            name, control_host, control_port, data_host, data_port,
+            section=section or f"{STATION_SECTION_PREFIX}{name}",
+            executor=SerialExecutor(self.pool, name),
+            excel_file=excel_file
+        )
+        for listener in self._listeners:
+            station.add_listener(listener)
+        if global_config.get_boolean('Capture', 'enabled'):
+            station.start_capture()
+        self.stations[name] = station
+        system_logger.info(f"注册工位 {name}: 控制端 {control_host}:{control_port}，数据端 {data_host}:{data_port}")
+        return station
+
+    def remove_station(self, name):
+        """
+        注销工位并断开其连接
+
+        参数:
+            name: 工位名称
+        """
+        station = self.stations.pop(name, None)
+        if station is not None:
+            station.stop()
+            station.disconnect()
+            station.stop_capture()
+            system_logger.info(f"注销工位 {name}")
+
+    def get(self, name):
+        """
+        获取工位
+
+        参数:
+            name: 工位名称
+
+        返回:
+            Station: 工位，不存在时返回None
+        """
+        return self.stations.get(name)
+
+    def names(self):
+        """
+        获取所有工位名称
+
+        返回:
+            list: 工位名称列表（按注册顺序）
+        """
+        return list(self.stations)
+
+    def poll_all(self):
+        """
+        对所有工位执行一次定时处理
+        """
+        for station in self.stations.values():
+            station.poll()
+
+    def get_throughput(self):
+        """
+        获取所有工位的吞吐量统计
+
+        返回:
+            list: 每个工位一条统计
+        """
+        return [station.get_throughput() for station in self.stations.values()]
+
+    def shutdown(self):
+        """
+        断开所有工位，停止天平读取线程并关闭线程池
+        """
+        for station in self.stations.values():
+            station.stop()
+            station.disconnect()
+            station.stop_capture()
+        stop_balance_readers()
+        self.pool.shutdown(wait=False)
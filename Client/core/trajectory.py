@@ -0,0 +1,226 @@
+import threading
+from .config_manager import global_config
+from .logger import ctrl_com_logger
+
+# 控制方式
+CONTROL_LOCKSTEP = 'lockstep'  # 每次executing请求回复一组抖动参数
+CONTROL_TRAJECTORY = 'trajectory'  # 回复一段抖动轨迹，重量超出预测范围时才重新规划
+
+# 相邻两个设定点之间剩余重量减半：越接近目标设定点越密
+TRAJECTORY_DECAY = 0.5
+
+
+class ShakeTrajectory:
+    """
+    抖动轨迹规划器：把"每个抖动周期往返一次"的executing交互改为一次下发一段预览轨迹
+
+    轨迹由若干设定点组成，每个设定点给出起始重量及该重量以上使用的抖动幅度和角度，
+    RAPID端按客户端更新的当前重量选择设定点，不再每个周期发送executing请求。
+    客户端按固定频率读取重量：
+        - 重量在轨迹的预测范围内（当前重量-容差 ~ 轨迹上限）且变化超过死区时，只发送重量更新
+        - 重量超出预测范围时重新计算并下发新的轨迹
+    """
+
+    def __init__(self, mode=None, steps=None, tolerance=None, deadband=None):
+        """
+        初始化轨迹规划器
+
+        参数:
+            mode: 'trajectory'或'lockstep'，None则读取配置
+            steps: 每段轨迹的采样点数（合并相同参数前），None则读取配置
+            tolerance: 预测范围下限的容差（g），None则读取配置
+            deadband: 发送重量更新的最小变化量（g），None则读取配置
+        """
+        from .protocol_handler import TRAJECTORY_MAX_STEPS
+
+        if mode is None:
+            mode = global_config.get('Communication', 'control_mode', CONTROL_LOCKSTEP)
+        self.mode = mode.strip().lower()
+        if self.mode not in (CONTROL_LOCKSTEP, CONTROL_TRAJECTORY):
+            ctrl_com_logger.warning(f"未知的控制方式: {mode}，使用逐周期应答")
+            self.mode = CONTROL_LOCKSTEP
+        if steps is None:
+            steps = global_config.get_int('Communication', 'trajectory_steps', 4)
+        self.steps = max(1, min(TRAJECTORY_MAX_STEPS, steps))
+        self.tolerance = tolerance if tolerance is not None else \
+            global_config.get_float('Communication', 'trajectory_tolerance', 0.002)
+        self.deadband = deadband if deadband is not None else \
+            global_config.get_float('Communication', 'trajectory_deadband', 0.0005)
+
+        # 当前轨迹的预测范围
+        self.active = False
+        self.lower = 0.0
+        self.upper = 0.0
+        self.last_weight = None
+
+        # 统计信息
+        self.plans = 0
+        self.replans = 0
+        self.weight_updates = 0
+        self.samples = 0
+
+    @property
+    def enabled(self):
+        return self.mode == CONTROL_TRAJECTORY
+
+    def plan(self, target_weight, current_weight, controller):
+        """
+        根据当前重量规划一段轨迹
+
+        参数:
+            target_weight: 目标重量（g）
+            current_weight: 当前重量（g）
+            controller: 抖动参数计算函数 controller(target_weight, weight) -> (幅度, 角度)
+
+        返回:
+            tuple: (设定点列表 [(起始重量, 幅度, 角度), ...], 轨迹上限重量)，计算失败或没有重量时返回(None, None)
+        """
+        if target_weight is None or current_weight is None:
+            return None, None
+        remaining = target_weight - current_weight
+        if remaining <= self.tolerance:
+            # 已到达或超过目标，只保持当前参数，重量再变化就重新规划
+            weights = [current_weight]
+            limit = current_weight + self.tolerance
+        else:
+            weights = [target_weight - remaining * TRAJECTORY_DECAY ** k for k in range(self.steps)]
+            limit = target_weight - remaining * TRAJECTORY_DECAY ** self.steps
+
+        setpoints = []
+        for weight in weights:
+            amplitude, angle = controller(target_weight, weight)
+            if amplitude is None or angle is None:
+                return None, None
+            # 参数与上一个设定点相同时合并
+            if setpoints and setpoints[-1][1] == amplitude and setpoints[-1][2] == angle:
+                continue
+            setpoints.append((weight, amplitude, angle))
+        return setpoints, limit
+
+    def commit(self, current_weight, limit):
+        """
+        轨迹已下发，更新预测范围
+
+        参数:
+            current_weight: 规划时的当前重量（g）
+            limit: 轨迹上限重量（g）
+        """
+        self.active = True
+        self.lower = current_weight - self.tolerance
+        self.upper = limit
+        self.last_weight = current_weight
+        self.plans += 1
+
+    def check(self, weight):
+        """
+        检查一次重量采样
+
+        参数:
+            weight: 当前重量（g）
+
+        返回:
+            str: 'replan'表示超出预测范围需要重新规划，'weight'表示只需发送重量更新，None表示无需发送
+        """
+        self.samples += 1
+        if not self.active or weight is None:
+            return None
+        if weight < self.lower or weight >= self.upper:
+            self.replans += 1
+            return 'replan'
+        if abs(weight - self.last_weight) >= self.deadband:
+            return 'weight'
+        return None
+
+    def on_weight_sent(self, weight):
+        """
+        重量更新已发送
+        """
+        self.last_weight = weight
+        self.weight_updates += 1
+
+    def clear(self):
+        """
+        当前目标结束或连接断开，停止使用当前轨迹
+        """
+        self.active = False
+        self.last_weight = None
+
+    def reset(self):
+        """
+        清空统计
+        """
+        self.plans = 0
+        self.replans = 0
+        self.weight_updates = 0
+        self.samples = 0
+
+    def get_stats(self):
+        """
+        获取轨迹统计
+
+        返回:
+            dict: 控制方式、规划次数（其中因超出预测范围的重新规划次数）、重量更新次数和采样次数
+        """
+        return {
+            'mode': self.mode,
+            'active': self.active,
+            'plans': self.plans,
+            'replans': self.replans,
+            'weight_updates': self.weight_updates,
+            'samples': self.samples
+        }
+
+
+class TrajectoryMonitor:
+    """
+    轨迹模式下按固定频率触发重量采样的后台线程
+    """
+
+    def __init__(self, callback, rate=None, name='trajectory'):
+        """
+        初始化采样线程
+
+        参数:
+            callback: 每次采样调用的函数（通常把检查提交到工位的串行执行器）
+            rate: 采样频率（Hz），None则读取配置
+            name: 线程名称
+        """
+        self.callback = callback
+        if rate is None:
+            rate = global_config.get_float('Communication', 'trajectory_sample_rate', 20)
+        self.interval = 1.0 / rate if rate > 0 else 0.05
+        self.name = name
+        self._stop_event = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        开始采样，已在运行时不做任何事
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set():
+                return
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop_event,),
+                                            name=f"TrajectoryMonitor-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        停止采样
+        """
+        with self._lock:
+            if self._stop_event is not None:
+                self._stop_event.set()
+
+    def is_running(self):
+        with self._lock:
+            return self._stop_event is not None and not self._stop_event.is_set()
+
+    def _run(self, stop_event):
+        while not stop_event.wait(self.interval):
+            try:
+                self.callback()
+            except Exception as e:
+                ctrl_com_logger.error(f"[{self.name}] 重量采样失败: {e}")
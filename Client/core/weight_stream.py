@@ -0,0 +1,178 @@
+import threading
+import time
+from .config_manager import global_config
+from .logger import data_com_logger
+
+class WeightStream:
+    """
+    数据通道的称重结果流，支持推送订阅和轮询两种模式
+
+    推送模式下客户端发送 "subscribe <最大频率>"，RAPID端回复 "subscribed <频率>" 后
+    在结果产生时主动推送，客户端不再定时发送request_weight；
+    旧版RAPID程序不认识订阅指令，会把它当作一次普通请求直接回复数据，此时自动回退到轮询模式。
+
+    客户端侧同时做限速和合并：连续重复的结果只交付一次，未就绪占位消息超过最大频率时丢弃，
+    结果消息始终交付，不会因限速丢失。
+    """
+
+    def __init__(self, comm, mode=None, max_rate=None, ack_timeout=None):
+        """
+        初始化称重结果流
+
+        参数:
+            comm: 数据通道通讯对象
+            mode: 'push'表示推送订阅（不支持时回退轮询），'poll'表示轮询，None则读取配置
+            max_rate: 最大推送频率（Hz），None则读取配置
+            ack_timeout: 等待订阅确认的超时时间（秒），None则读取配置
+        """
+        self.comm = comm
+        if mode is None:
+            mode = global_config.get('Communication', 'data_mode', 'push')
+        self.mode = mode.strip().lower()
+        if self.mode not in ('push', 'poll'):
+            data_com_logger.warning(f"未知的数据通道模式: {mode}，使用轮询模式")
+            self.mode = 'poll'
+        self.max_rate = max_rate if max_rate is not None else global_config.get_float('Communication', 'push_max_rate')
+        self.ack_timeout = ack_timeout if ack_timeout is not None else global_config.get_float('Communication', 'push_ack_timeout')
+        self.min_interval = 1.0 / self.max_rate if self.max_rate > 0 else 0.0
+
+        # 当前状态: 'idle' / 'subscribing' / 'push' / 'poll'
+        self.state = 'idle'
+        self._subscribe_time = None
+        self._last_frame = None
+        self._last_delivered = 0.0
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.frames_received = 0
+        self.frames_delivered = 0
+        self.frames_coalesced = 0
+
+    def start(self):
+        """
+        开始接收称重结果：推送模式下发送订阅指令，否则直接进入轮询模式
+        """
+        with self._lock:
+            self._last_frame = None
+            if self.mode != 'push':
+                self.state = 'poll'
+                return
+
+            self.state = 'subscribing'
+            self._subscribe_time = time.monotonic()
+
+        rate = f"{self.max_rate:g}"
+        if self.comm.send_data(f"subscribe {rate}"):
+            data_com_logger.info(f"请求订阅称重结果推送，最大频率 {rate} Hz")
+        else:
+            self._fallback("订阅指令发送失败")
+
+    def stop(self):
+        """
+        停止接收称重结果：推送模式下取消订阅
+        """
+        with self._lock:
+            was_pushing = self.state == 'push'
+            self.state = 'idle'
+        if was_pushing and self.comm.get_connection_status():
+            self.comm.send_data("unsubscribe")
+            data_com_logger.info("已取消称重结果推送订阅")
+
+    def reset(self):
+        """
+        连接断开后复位状态，重新连接后需要重新订阅
+        """
+        with self._lock:
+            self.state = 'idle'
+            self._last_frame = None
+
+    def should_poll(self):
+        """
+        定时器触发时调用，判断是否需要发送request_weight
+
+        返回:
+            bool: 是否需要发送一次轮询请求
+        """
+        with self._lock:
+            state = self.state
+            expired = state == 'subscribing' and time.monotonic() - self._subscribe_time >= self.ack_timeout
+        if expired:
+            self._fallback(f"{self.ack_timeout:g} 秒内未收到订阅确认")
+            return True
+        return state == 'poll'
+
+    def on_frame(self, message):
+        """
+        处理数据通道收到的一条消息
+
+        参数:
+            message: 解析后的消息（RobotMessage）
+
+        返回:
+            RobotMessage: 需要交付给上层处理的消息，被合并或属于控制应答时返回None
+        """
+        self.frames_received += 1
+        kind = message.kind
+
+        if kind == 'subscribed':
+            with self._lock:
+                if self.state == 'subscribing':
+                    self.state = 'push'
+            rate = f"{message.values[0]:g} Hz" if message.values else ''
+            data_com_logger.info(f"称重结果推送订阅成功: {rate}")
+            return None
+        if kind == 'unsubscribed':
+            return None
+
+        with self._lock:
+            fallback = self.state == 'subscribing'
+        if fallback:
+            # 旧版RAPID把订阅指令当作普通请求直接回复了数据
+            self._fallback("服务器不支持推送订阅")
+
+        now = time.monotonic()
+        key = (kind, message.values, message.sequence, message.raw)
+        with self._lock:
+            duplicate = key == self._last_frame
+            self._last_frame = key
+            if kind == 'not_ready':
+                # 占位消息不携带数据，超过最大频率时直接丢弃
+                if duplicate or now - self._last_delivered < self.min_interval:
+                    self.frames_coalesced += 1
+                    return None
+            elif duplicate:
+                # 结果未被占位消息隔开而重复出现，说明是同一次结果
+                self.frames_coalesced += 1
+                return None
+
+            self._last_delivered = now
+            self.frames_delivered += 1
+        return message
+
+    def _fallback(self, reason):
+        """
+        回退到轮询模式
+
+        参数:
+            reason: 回退原因
+        """
+        with self._lock:
+            if self.state != 'subscribing':
+                return
+            self.state = 'poll'
+        data_com_logger.warning(f"{reason}，回退到request_weight轮询模式")
+
+    def get_stats(self):
+        """
+        获取称重结果流统计信息
+
+        返回:
+            dict: 统计信息
+        """
+        return {
+            'mode': self.mode,
+            'state': self.state,
+            'frames_received': self.frames_received,
+            'frames_delivered': self.frames_delivered,
+            'frames_coalesced': self.frames_coalesced
+        }
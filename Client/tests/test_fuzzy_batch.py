@@ -0,0 +1,82 @@
+"""
+向量化模糊推理一致性检查
+
+在固定网格（包含模糊域边界 -0.1/2 和 0/4）以及超出模糊域的点上，
+比较FuzzyLogicEngine.fuzzy_inference_batch与逐次精确推理fuzzy_inference_exact的结果，
+不一致时断言失败，进程以非零状态退出。
+
+用法（在Client目录下执行）:
+    python -m pytest tests/test_fuzzy_batch.py
+    python tests/test_fuzzy_batch.py
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fuzzy_logic import FuzzyLogicEngine, DIFFERENCE_RANGE, DENSITY_RANGE
+
+# 允许的最大绝对误差
+TOLERANCE = 1e-9
+
+
+def grid_points():
+    """
+    生成固定网格：模糊域内等距的点（含两端边界）和模糊域外的点
+
+    返回:
+        tuple: (差值数组, 密度数组)
+    """
+    differences = np.concatenate([
+        np.linspace(DIFFERENCE_RANGE[0], DIFFERENCE_RANGE[1], 43),
+        [DIFFERENCE_RANGE[0] - 1, DIFFERENCE_RANGE[1] + 1]
+    ])
+    densities = np.concatenate([
+        np.linspace(DENSITY_RANGE[0], DENSITY_RANGE[1], 41),
+        [DENSITY_RANGE[0] - 1, DENSITY_RANGE[1] + 1]
+    ])
+    difference_grid, density_grid = np.meshgrid(differences, densities)
+    return difference_grid.ravel(), density_grid.ravel()
+
+
+def test_grid_includes_domain_edges():
+    differences, densities = grid_points()
+    for edge in DIFFERENCE_RANGE:
+        assert edge in differences, edge
+    for edge in DENSITY_RANGE:
+        assert edge in densities, edge
+
+
+def test_batch_matches_exact():
+    engine = FuzzyLogicEngine(use_lut=False)
+    differences, densities = grid_points()
+    batch = engine.fuzzy_inference_batch(differences, densities)
+    assert batch.shape == differences.shape
+
+    mismatches = []
+    for difference, density, value in zip(differences.tolist(), densities.tolist(), batch.tolist()):
+        exact = engine.fuzzy_inference_exact(difference, density)
+        if exact is None:
+            if not np.isnan(value):
+                mismatches.append((difference, density, exact, value))
+        elif not abs(value - exact) <= TOLERANCE:
+            mismatches.append((difference, density, exact, value))
+    assert not mismatches, f"{len(mismatches)}/{len(batch)} 点不一致，例如 {mismatches[:5]}"
+
+
+def test_batch_scalar_density():
+    engine = FuzzyLogicEngine(use_lut=False)
+    differences = np.linspace(DIFFERENCE_RANGE[0], DIFFERENCE_RANGE[1], 43)
+    for density in DENSITY_RANGE:
+        batch = engine.fuzzy_inference_batch(differences, density)
+        expected = engine.fuzzy_inference_batch(differences, np.full_like(differences, density))
+        np.testing.assert_array_equal(batch, expected)
+
+
+if __name__ == '__main__':
+    test_grid_includes_domain_edges()
+    test_batch_matches_exact()
+    test_batch_scalar_density()
+    print("fuzzy_inference_batch 与 fuzzy_inference_exact 结果一致")
@@ -0,0 +1,250 @@
+"""
+物料模型拟合工具
+
+读取 Solid-dispensing-main/Experimental results 中的称量结果（每个文件为 [物料]_[平台].json，
+每行一条JSON记录），按物料和平台拟合：
+    - 成功率（"fail"、"block"等失败记录和缺少时间的记录计为失败）和离群率（相对误差超过outlier阈值）
+    - 耗时模型: 耗时 = overhead + seconds_per_gram * 目标重量（最小二乘）
+    - 误差模型: 各目标重量的误差标准差 = abs_sd + rel_sd * 目标重量（最小二乘，不含离群记录），平均偏差bias
+    - flow_scale / noise_scale: 与同一平台所有物料中位数的比值（落料速度和误差波动的相对大小），
+      客户端的称量模拟器按它们缩放落料量和落料噪声
+结果写入紧凑的参数文件（默认 resources/material_models.json），客户端启动时由 core.material_models 加载。
+
+支持三种记录格式（重量单位统一为g）：
+    Dual-arm robot: {"accuracy", "difference", "target_weight", "time"}（与客户端保存的结果格式相同）
+    Chemspeed: {"target"（mg）, "mg", "time", "accuracy"}
+    Quantos: {"successful", "mg", "time", "accuracy"}，没有目标重量，取最接近的标准目标重量（20/200/500/1000 mg）
+
+用法（在Client目录下执行）:
+    python tools/fit_material_models.py [--input "../Solid-dispensing-main/Experimental results"] [--output resources/material_models.json]
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.material_models import MODEL_VERSION, normalize_material
+
+# Quantos记录没有目标重量时使用的标准目标重量（g）
+STANDARD_TARGETS = (0.02, 0.2, 0.5, 1.0)
+
+
+def parse_record(record):
+    """
+    解析一条称量结果
+
+    参数:
+        record: 一条JSON记录（dict）
+
+    返回:
+        tuple: (目标重量（g）, 误差（g，实际-目标）, 耗时（秒）)，失败记录返回None
+    """
+    if 'fail' in record or 'time' not in record:
+        return None
+    if 'target_weight' in record:
+        target = record['target_weight']
+        if not target or 'accuracy' not in record:
+            return None
+        # accuracy = (实际-目标)/目标，比按1 mg取整的difference精度高
+        return float(target), float(record['accuracy']) * float(target), float(record['time'])
+    if 'mg' not in record:
+        return None
+    weight = float(record['mg']) / 1000.0
+    if 'target' in record:
+        target = float(record['target']) / 1000.0
+    else:
+        target = min(STANDARD_TARGETS, key=lambda value: abs(math.log(max(weight, 1e-6) / value)))
+    if target <= 0 or weight <= 0:
+        return None
+    return target, weight - target, float(record['time'])
+
+
+def load_file(path):
+    """
+    读取一个结果文件
+
+    返回:
+        tuple: (成功记录 [(目标重量, 误差, 耗时), ...], 总记录数)
+    """
+    results, total = [], 0
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            total += 1
+            try:
+                parsed = parse_record(json.loads(line))
+            except (ValueError, TypeError):
+                parsed = None
+            if parsed is not None:
+                results.append(parsed)
+    return results, total
+
+
+def linear_fit(xs, ys, weights=None):
+    """
+    加权最小二乘拟合 y = a + b * x
+
+    返回:
+        tuple: (a, b)，x没有变化时b为0
+    """
+    weights = weights or [1.0] * len(xs)
+    total = sum(weights)
+    mean_x = sum(w * x for w, x in zip(weights, xs)) / total
+    mean_y = sum(w * y for w, y in zip(weights, ys)) / total
+    sxx = sum(w * (x - mean_x) ** 2 for w, x in zip(weights, xs))
+    if sxx <= 0:
+        return mean_y, 0.0
+    slope = sum(w * (x - mean_x) * (y - mean_y) for w, x, y in zip(weights, xs, ys)) / sxx
+    return mean_y - slope * mean_x, slope
+
+
+def fit_model(results, total, outlier, resolution):
+    """
+    拟合一个物料在一个平台上的模型
+
+    参数:
+        results: 成功记录 [(目标重量, 误差, 耗时), ...]
+        total: 总记录数
+        outlier: 离群记录的相对误差阈值
+        resolution: 结果的重量分辨率（g），作为误差标准差的下限
+
+    返回:
+        dict: 模型参数，没有成功记录时只有成功率
+    """
+    model = {'records': total, 'success_rate': round(len(results) / total, 4) if total else 0.0}
+    if not results:
+        return model
+    inliers = [result for result in results if abs(result[1]) <= outlier * result[0]]
+    model['outlier_rate'] = round(1 - len(inliers) / len(results), 4)
+
+    targets = [result[0] for result in results]
+    times = [result[2] for result in results]
+    overhead, seconds_per_gram = linear_fit(targets, times)
+    if overhead < 0:
+        # 负的固定耗时没有意义，改为过原点拟合
+        overhead = 0.0
+        seconds_per_gram = sum(x * y for x, y in zip(targets, times)) / sum(x * x for x in targets)
+    model['overhead'] = round(overhead, 2)
+    model['seconds_per_gram'] = round(seconds_per_gram, 2)
+
+    if inliers:
+        groups = {}
+        for target, error, _ in inliers:
+            groups.setdefault(target, []).append(error)
+        levels = sorted(groups)
+        # 各目标重量的标准差，按记录数加权
+        sds = [max(statistics.pstdev(groups[level]), resolution / math.sqrt(12)) for level in levels]
+        abs_sd, rel_sd = linear_fit(levels, sds, [len(groups[level]) for level in levels])
+        if rel_sd < 0 or abs_sd < 0:
+            # 负的系数没有意义，退化为常数或纯相对模型
+            abs_sd, rel_sd = (statistics.mean(sds), 0.0) if rel_sd < 0 else \
+                (0.0, sum(sds) / sum(levels))
+        model['bias'] = round(statistics.mean(error for _, error, _ in inliers), 6)
+        model['abs_sd'] = round(abs_sd, 6)
+        model['rel_sd'] = round(rel_sd, 6)
+        model['targets'] = levels
+    return model
+
+
+def add_scales(materials):
+    """
+    按平台计算各物料相对中位数的落料速度（flow_scale）和误差波动（noise_scale）
+
+    参数:
+        materials: 物料名称 -> 平台 -> 模型参数
+    """
+    platforms = {}
+    for models in materials.values():
+        for platform, model in models.items():
+            platforms.setdefault(platform, []).append(model)
+    summary = {}
+    for platform, models in platforms.items():
+        rates = [model['seconds_per_gram'] for model in models if model.get('seconds_per_gram', 0) > 0]
+        noises = [model['abs_sd'] + model['rel_sd'] for model in models if 'abs_sd' in model]
+        median_rate = statistics.median(rates) if rates else None
+        median_noise = statistics.median(noises) if noises else None
+        summary[platform] = {'materials': len(models), 'median_seconds_per_gram': median_rate,
+                             'median_sd_at_1g': median_noise}
+        for model in models:
+            if median_rate and model.get('seconds_per_gram', 0) > 0:
+                # 每克耗时越短落料越快
+                model['flow_scale'] = round(median_rate / model['seconds_per_gram'], 3)
+            if median_noise and 'abs_sd' in model:
+                model['noise_scale'] = round((model['abs_sd'] + model['rel_sd']) / median_noise, 3)
+    return summary
+
+
+def fit_directory(directory, outlier, resolution):
+    """
+    拟合目录中的所有结果文件
+
+    返回:
+        dict: 参数文件内容
+    """
+    materials = {}
+    files = sorted(glob.glob(os.path.join(directory, '*.json')))
+    for path in files:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if '_' not in name:
+            print(f"跳过无法识别物料和平台的文件: {path}")
+            continue
+        material, platform = name.rsplit('_', 1)
+        results, total = load_file(path)
+        # 物料名称的大小写不一致（NANO2 / NaNO2）时合并为同一物料
+        key = normalize_material(material)
+        entry = materials.setdefault(key, {'name': material, 'platforms': {}})
+        if material != material.upper():
+            entry['name'] = material
+        entry['platforms'][platform] = fit_model(results, total, outlier, resolution)
+
+    models = {entry['name']: entry['platforms'] for entry in materials.values()}
+    platforms = add_scales(models)
+    return {
+        'version': MODEL_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
+        'source': os.path.basename(os.path.normpath(directory)),
+        'files': len(files),
+        'platforms': platforms,
+        'materials': dict(sorted(models.items()))
+    }
+
+
+def main():
+    default_input = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 'Solid-dispensing-main', 'Experimental results')
+    parser = argparse.ArgumentParser(description="物料模型拟合工具")
+    parser.add_argument('--input', default=default_input, help="结果文件目录（[物料]_[平台].json）")
+    parser.add_argument('--output', default=os.path.join('resources', 'material_models.json'), help="参数文件")
+    parser.add_argument('--outlier', type=float, default=0.1, help="离群记录的相对误差阈值")
+    parser.add_argument('--resolution', type=float, default=0.001, help="结果的重量分辨率（g）")
+    args = parser.parse_args()
+
+    store = fit_directory(args.input, args.outlier, args.resolution)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(store, file, ensure_ascii=False, separators=(',', ':'), sort_keys=False)
+        file.write('\n')
+
+    print(f"{store['files']} 个文件，{len(store['materials'])} 种物料 -> {args.output}")
+    print(f"{'物料':<10} {'平台':<16} {'成功率':>6} {'离群':>6} {'s/g':>8} {'固定/s':>8} {'abs_sd/mg':>9} {'rel_sd':>7} "
+          f"{'flow':>6} {'noise':>6}")
+    for material, platforms in store['materials'].items():
+        for platform, model in sorted(platforms.items()):
+            if 'seconds_per_gram' not in model:
+                print(f"{material:<12} {platform:<18} {model['success_rate']:>7.1%}")
+                continue
+            print(f"{material:<12} {platform:<18} {model['success_rate']:>7.1%} {model['outlier_rate']:>7.1%} "
+                  f"{model['seconds_per_gram']:>8.1f} {model['overhead']:>9.1f} "
+                  f"{model.get('abs_sd', 0) * 1000:>10.3f} {model.get('rel_sd', 0):>8.4f} "
+                  f"{model.get('flow_scale', 0):>7.2f} {model.get('noise_scale', 0):>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,859 @@
+"""
+RAPID T_SOC_COM 替身服务器
+
+在普通Linux主机上模拟机器人控制器TASK3（Robot/RAPID/T_SOC_COM）的socket服务端，
+用于在没有实体控制器的情况下联调和压测Client：
+    - ServerStart: 先后监听并接受数据端口（1025，scale）和控制端口（1023，command）的连接
+    - 主循环与RAPID逐条一致：数据通道先收后发（结果或"9 9 9"），随后在控制通道发送
+      瓶重/"new_target"/"executing"并等待客户端以'#'结尾的控制指令，按Parsemsg解析
+    - 回复格式与RAPID一致：numToStr(result{1},5) numToStr(result{2},4) ValToStr(result{3}) numToStr(result{4},1)
+    - 支持推送订阅（subscribe/unsubscribe）和控制协议协商（protocol 2，二进制控制指令），
+      --legacy 模拟两者都不支持的旧版程序
+    - 协议v2中请求和结果带序号前缀（"@序号 executing"），--duplicate 按概率重复发送以检验客户端的过期消息处理
+    - 协议v2中接受抖动轨迹（消息类型0x03）：按客户端更新的重量选择设定点，
+      轨迹有效期间不再每个周期发送executing，客户端超过1秒无消息时才发送一次
+    - SocketReceive超时按RAPID的ERR_SOCK_TIMEOUT处理：关闭连接并重新ServerStart
+
+称重过程由一个简化的机器人模型代替：收到目标后依次完成空瓶称重（发送瓶重）、
+若干个executing周期的分料，最后给出结果并保持一段时间，然后请求下一个目标。
+
+用法（在Client目录下执行）:
+    python tools/rapid_stand_in.py [--host 127.0.0.1] [--control-port 1023] [--data-port 1025]
+        [--latency 0] [--jitter 0] [--rate 0] [--cycles 20] [--disconnect-every 0] [--cells 1] [--legacy]
+"""
+import argparse
+import random
+import select
+import socket
+import struct
+import threading
+import time
+
+# RAPID字符串最大长度，SocketReceive \Str 一次最多接收80个字符
+RAPID_STRING_MAX = 80
+
+# 协议v2控制指令：类型(0x02)、标志、序号(uint16)、4个float32，网络字节序，与ReceiveCommand一致
+V2_CONTROL = struct.Struct('!BBH4f')
+V2_MSG_CONTROL = 0x02
+
+# 协议v2抖动轨迹：类型(0x03)、设定点数N、序号(uint16)、当前重量、上限重量，随后N组(起始重量, 幅度, 角度)
+V2_TRAJECTORY_HEADER = struct.Struct('!BBH2f')
+V2_SETPOINT = struct.Struct('!3f')
+V2_MSG_TRAJECTORY = 0x03
+TRAJECTORY_MAX_STEPS = 8
+
+# 协议v2稳定重量：类型(0x04)、标志（0x02为预测值）、稳定次数(uint16)、稳定重量、置信区间半宽，客户端主动发送，不是应答
+V2_SETTLED = struct.Struct('!BBH2f')
+V2_MSG_SETTLED = 0x04
+
+# 轨迹模式下客户端无消息多久后发送一次executing（秒），与RAPID的traj_timeout一致
+TRAJECTORY_TIMEOUT = 1.0
+
+
+def num_to_str(value, decimals):
+    """
+    模拟RAPID的NumToStr：保留指定位数小数，并去掉末尾多余的0
+
+    参数:
+        value: 数值
+        decimals: 小数位数
+
+    返回:
+        str: 字符串
+    """
+    text = f"{value:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        text = '0'
+    return text
+
+
+def val_to_str(value):
+    """
+    模拟RAPID的ValToStr（num类型）：最多6位有效数字
+
+    参数:
+        value: 数值
+
+    返回:
+        str: 字符串
+    """
+    text = f"{value:.6g}".upper()
+    return '0' if text == '-0' else text
+
+
+def str_to_val(text):
+    """
+    模拟RAPID的StrToVal
+
+    参数:
+        text: 字符串
+
+    返回:
+        tuple: (是否转换成功, 数值)
+    """
+    try:
+        return True, float(text)
+    except ValueError:
+        return False, 0.0
+
+
+def parse_msg(msg, command):
+    """
+    模拟RAPID的Parsemsg：按空格切分'#'之前的字段依次写入command数组
+
+    参数:
+        msg: 接收到的控制指令
+        command: 长度为4的列表，解析结果原地写入
+
+    返回:
+        int: 解析出的参数个数，消息损坏（没有'#'）时返回-1
+    """
+    length = msg.find('#') + 1  # StrMatch从1开始计数
+    if length == 0:
+        return -1
+
+    ind = 1
+    index = 0
+    while True:
+        space = msg.find(' ', ind - 1)
+        new_ind = (space + 1 if space >= 0 else len(msg) + 1) + 1
+        if new_ind > length:
+            break
+        ok, value = str_to_val(msg[ind - 1:new_ind - 2])
+        if index < len(command):
+            if ok:
+                command[index] = value
+        index += 1
+        ind = new_ind
+    return index
+
+
+class SimulatedCell:
+    """
+    简化的机器人模型，代替T_ROB_L/T_ROB_R维护T_SOC_COM使用的共享变量
+    （ready_new_command、weight_vial_reday、send_result、result）
+    """
+
+    def __init__(self, cycles=20, result_hold=1.0, tolerance=0.005, over_error=0.02, rng=None):
+        """
+        初始化机器人模型
+
+        参数:
+            cycles: 每个目标的executing周期数
+            result_hold: 结果保持时间（秒），与T_ROB_L中WaitTime 1 + 回原点一致
+            tolerance: 模拟称量误差的标准差（g）
+            over_error: 误差超过该值时不发送结果（对应over_error=1）
+            rng: 随机数生成器
+        """
+        self.cycles = max(1, int(cycles))
+        self.result_hold = result_hold
+        self.tolerance = tolerance
+        self.over_error = over_error
+        self.rng = rng or random.Random()
+
+        self.ready_new_command = True
+        self.weight_vial_ready = False
+        self.weight_vial = 0.0
+        self.send_result = False
+        self.result = [0.0] * 5
+        self.target_weight = 0.0
+        self._executing = 0
+        self._start_time = None
+        self._result_until = None
+        self.targets_done = 0
+
+    def on_new_target(self, target_weight):
+        """
+        收到新目标后开始一次称量
+        """
+        self.ready_new_command = False
+        self.target_weight = target_weight
+        self._executing = 0
+        self._start_time = time.monotonic()
+        # 空瓶称重完成后发送瓶重
+        self.weight_vial = round(self.rng.uniform(8.0, 11.0), 4)
+        self.weight_vial_ready = True
+
+    def on_executing(self, command):
+        """
+        每完成一次executing交互推进一步
+
+        参数:
+            command: 最近一次解析到的控制指令
+        """
+        if self._start_time is None or self._result_until is not None:
+            return
+        self._executing += 1
+        if self._executing >= self.cycles:
+            self._finish()
+
+    def _finish(self):
+        """
+        分料结束，计算结果（对应get_dispensingresult与sendtosocketL5）
+        """
+        difference = self.rng.gauss(0.0, self.tolerance)
+        target = self.target_weight if self.target_weight else 1.0
+        elapsed = time.monotonic() - self._start_time
+        self.result = [difference / target, difference, self.target_weight, elapsed,
+                       -(100 * 0.7 * abs(difference / target) + 0.2 * ((elapsed / 60) - 10))]
+        self.send_result = abs(difference) <= self.over_error
+        self._result_until = time.monotonic() + self.result_hold
+
+    def tick(self):
+        """
+        每次主循环调用，结果保持时间结束后请求下一个目标
+        """
+        if self._result_until is not None and time.monotonic() >= self._result_until:
+            self.send_result = False
+            self._result_until = None
+            self._start_time = None
+            self.targets_done += 1
+            self.ready_new_command = True
+
+    def result_message(self):
+        """
+        生成结果消息，格式与T_SOC_COM一致
+        """
+        r = self.result
+        return f"{num_to_str(r[0], 5)} {num_to_str(r[1], 4)} {val_to_str(r[2])} {num_to_str(r[3], 1)}"
+
+
+class RapidStandIn:
+    """
+    T_SOC_COM替身服务器，单线程顺序执行，与RAPID任务的执行方式一致
+    """
+
+    def __init__(self, host='127.0.0.1', control_port=1023, data_port=1025, latency=0.0, jitter=0.0,
+                 rate=0.0, receive_timeout=60.0, disconnect_every=0.0, legacy=False, cell=None,
+                 name='cell', seed=None, verbose=False, duplicate=0.0):
+        """
+        初始化替身服务器
+
+        参数:
+            host: 监听地址
+            control_port: 控制端口（command，RAPID中为1023）
+            data_port: 数据端口（scale，RAPID中为1025）
+            latency: 每次发送前的固定延迟（秒）
+            jitter: 延迟的随机抖动上限（秒）
+            rate: 主循环最大频率（次/秒），0表示不限速
+            receive_timeout: SocketReceive超时时间（秒），超时后重新ServerStart
+            disconnect_every: 平均每隔多少秒主动断开一次连接（指数分布），0表示不断开
+            legacy: True表示模拟不支持推送订阅和协议协商的旧版程序
+            cell: SimulatedCell机器人模型，None则使用默认参数
+            name: 服务器名称（用于输出）
+            seed: 随机种子
+            verbose: 是否打印每条消息
+            duplicate: 协议v2中请求和结果被重复发送的概率
+        """
+        self.host = host
+        self.control_port = control_port
+        self.data_port = data_port
+        self.latency = latency
+        self.jitter = jitter
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.receive_timeout = receive_timeout
+        self.disconnect_every = disconnect_every
+        self.legacy = legacy
+        self.rng = random.Random(seed)
+        self.cell = cell or SimulatedCell(rng=self.rng)
+        self.name = name
+        self.verbose = verbose
+        self.duplicate = duplicate
+
+        self.scale_server = None
+        self.command_server = None
+        self.scale_client = None
+        self.command_client = None
+        self.command = [0.0] * 4
+        self.push_mode = False
+        self.proto_version = 1
+        self.command_seq = 0
+        self.target_seq = 0
+        self.trajectory = []  # [(起始重量, 抖动幅度, 抖动角度), ...]，空表示逐周期应答
+        self.trajectory_limit = 0.0
+        self.recv_reading = 0.0
+        self.shake = 0.0
+        self.a_smallspoon = 0.0
+        self.settled_weight = None
+        self.settled_count = 0
+        self.settled_refresh = 0
+        self.settled_last = -1
+        self._trajectory_time = 0.0
+        self.push_interval = 0.1
+        self._push_time = 0.0
+        self._result_pushed = False
+        self._next_disconnect = None
+        self._stop_event = threading.Event()
+        self.thread = None
+
+        # 统计信息
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.sessions = 0
+        self.disconnects = 0
+        self.corrupt_messages = 0
+        self.sequence_gaps = 0
+        self.duplicates_sent = 0
+        self.prompts_sent = 0
+        self.trajectories_received = 0
+        self.weight_updates_received = 0
+        self.settled_received = 0
+        self.predicted_received = 0
+
+    def start(self):
+        """
+        在后台线程中启动服务器
+
+        返回:
+            threading.Thread: 服务器线程
+        """
+        self._bind()
+        self.thread = threading.Thread(target=self.run, name=f"RapidStandIn-{self.name}", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """
+        停止服务器
+        """
+        self._stop_event.set()
+        self._close_clients()
+        for server in (self.scale_server, self.command_server):
+            if server is not None:
+                server.close()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+    def _bind(self):
+        """
+        创建并绑定监听socket（对应ServerStart中的SocketCreate/SocketBind/SocketListen）
+        """
+        if self.scale_server is not None:
+            return
+        self.scale_server = self._listen(self.data_port)
+        self.command_server = self._listen(self.control_port)
+        # 端口为0时使用系统分配的端口
+        self.data_port = self.scale_server.getsockname()[1]
+        self.control_port = self.command_server.getsockname()[1]
+
+    def _listen(self, port):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, port))
+        server.listen(1)
+        server.settimeout(0.5)
+        return server
+
+    def run(self):
+        """
+        服务器主循环：ServerStart -> 消息循环 -> 断开后重新ServerStart
+        """
+        self._bind()
+        while not self._stop_event.is_set():
+            if not self._server_start():
+                continue
+            try:
+                self._message_loop()
+            except socket.timeout:
+                self._log("Timeout while waiting for message! restarting connection and retrying!!!")
+            except (ConnectionError, OSError) as e:
+                if not self._stop_event.is_set():
+                    self._log(f"Socket closed by client!: {e}")
+            finally:
+                self._close_clients()
+
+    def _server_start(self):
+        """
+        等待客户端连接（先数据端口再控制端口，与RAPID的SocketAccept顺序一致）
+
+        返回:
+            bool: 两个通道是否都已连接
+        """
+        self.scale_client = self._accept(self.scale_server)
+        if self.scale_client is None:
+            return False
+        self._log(f"scale client accepted for connection from {self.scale_client.getpeername()[0]}")
+        self.command_client = self._accept(self.command_server)
+        if self.command_client is None:
+            self._close_clients()
+            return False
+        self._log(f"command client accepted for connection from {self.command_client.getpeername()[0]}")
+
+        self.sessions += 1
+        self.push_mode = False
+        self.proto_version = 1
+        self.trajectory = []
+        self.settled_weight = None
+        self.settled_count = 0
+        self.settled_refresh = 0
+        self.settled_last = -1
+        self._result_pushed = False
+        self._schedule_disconnect()
+        return True
+
+    def _accept(self, server):
+        """
+        接受一个连接，期间响应停止请求
+        """
+        while not self._stop_event.is_set():
+            try:
+                client, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return None
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.settimeout(self.receive_timeout)
+            return client
+        return None
+
+    def _message_loop(self):
+        """
+        对应T_SOC_COM中main的WHILE循环
+        """
+        cell = self.cell
+        while not self._stop_event.is_set():
+            loop_start = time.monotonic()
+            cell.tick()
+
+            if not self.push_mode:
+                # [poll] 等待请求后回复结果或9 9 9
+                request = self._receive(self.scale_client)
+                if not self._scale_subscription(request) and not self._protocol_request(request):
+                    self._send_scale_result()
+            else:
+                # [push] 不阻塞地处理订阅消息，每个结果只推送一次
+                if self._peek(self.scale_client):
+                    request = self._receive(self.scale_client)
+                    if not self._scale_subscription(request) and not self._protocol_request(request):
+                        self._send_scale_result()
+                if (self.push_mode and cell.send_result and not self._result_pushed
+                        and time.monotonic() - self._push_time >= self.push_interval):
+                    self._send_scale_result()
+                    self._result_pushed = True
+                    self._push_time = time.monotonic()
+            if not cell.send_result:
+                self._result_pushed = False
+
+            # 瓶重就绪时通过控制通道发送
+            if cell.weight_vial_ready:
+                self._send(self.command_client, val_to_str(cell.weight_vial))
+            cell.weight_vial_ready = False
+
+            # 下发new_target或executing并等待控制指令
+            if cell.ready_new_command:
+                self.trajectory = []
+                self._send_prompt("new_target")
+                self._receive_command(control_only=True)
+                self.trajectory = []  # 等待期间到达的旧轨迹作废
+                self.target_seq = self.command_seq
+                cell.on_new_target(self.command[0])
+            elif self.trajectory:
+                # [trajectory] 按客户端更新的重量选择设定点，客户端长时间无消息时才请求
+                if self._peek(self.command_client):
+                    self._receive_packets()
+                    self._trajectory_time = time.monotonic()
+                elif time.monotonic() - self._trajectory_time >= TRAJECTORY_TIMEOUT:
+                    self._send_prompt("executing")
+                    self._receive_command()
+                    self._trajectory_time = time.monotonic()
+                else:
+                    self._stop_event.wait(0.01)
+                cell.on_executing(self.command)
+            else:
+                self._send_prompt("executing")
+                self._receive_command()
+                self._trajectory_time = time.monotonic()
+                cell.on_executing(self.command)
+            if self.trajectory:
+                self._apply_trajectory()
+
+            self._maybe_disconnect()
+
+            # 限制主循环频率
+            if self.min_interval:
+                remaining = self.min_interval - (time.monotonic() - loop_start)
+                if remaining > 0:
+                    self._stop_event.wait(remaining)
+
+    def _scale_subscription(self, msg):
+        """
+        对应ScaleSubscription：处理订阅/取消订阅消息
+
+        返回:
+            bool: 是否为订阅类消息
+        """
+        if self.legacy:
+            return False
+        if msg.startswith('subscribe '):
+            ok, rate = str_to_val(msg[10:].strip())
+            if not ok or rate <= 0:
+                rate = 10
+            self.push_interval = 1 / rate
+            self.push_mode = True
+            self._result_pushed = False
+            self._send(self.scale_client, f"subscribed {val_to_str(rate)}\n")
+            return True
+        if msg.startswith('unsubscribe'):
+            self.push_mode = False
+            self._send(self.scale_client, "unsubscribed\n")
+            return True
+        return False
+
+    def _protocol_request(self, msg):
+        """
+        对应ProtocolRequest：处理控制协议协商消息
+
+        返回:
+            bool: 是否为协商消息
+        """
+        if self.legacy or not msg.startswith('protocol '):
+            return False
+        ok, version = str_to_val(msg[9:].strip())
+        self.proto_version = 2 if ok and version >= 2 else 1
+        self.command_seq = 0
+        self._send(self.scale_client, f"protocol {self.proto_version}\n")
+        return True
+
+    def _receive_command(self, control_only=False):
+        """
+        对应ReceiveCommand：等待客户端对请求的应答
+
+        参数:
+            control_only: True表示只有控制指令算作应答（new_target，对应\\Control开关），
+                否则控制指令和带设定点的轨迹都算作应答
+        """
+        if self.proto_version < 2:
+            self._parse(self._receive(self.command_client))
+            return
+        while not self._receive_packets(control_only):
+            pass
+
+    def _receive_packets(self, control_only=False):
+        """
+        对应ReceivePackets：v2中接收一次数据并处理其中的全部数据包，首字节不是v2消息类型时按ASCII包处理
+
+        返回:
+            bool: 是否收到了应答
+        """
+        data = self._receive_raw(self.command_client)
+        if data[0] not in (V2_MSG_CONTROL, V2_MSG_TRAJECTORY, V2_MSG_SETTLED):
+            self._parse(data[:RAPID_STRING_MAX].decode('ascii', 'replace'))
+            self.command_seq = 0
+            self.trajectory = []
+            return True
+
+        reply = False
+        offset = 0
+        while offset < len(data):
+            msg_type = data[offset]
+            if msg_type == V2_MSG_CONTROL:
+                size = V2_CONTROL.size
+            elif msg_type == V2_MSG_TRAJECTORY:
+                if len(data) < offset + 2:
+                    data += self._receive_exact(self.command_client, offset + 2 - len(data))
+                size = V2_TRAJECTORY_HEADER.size + V2_SETPOINT.size * data[offset + 1]
+            elif msg_type == V2_MSG_SETTLED:
+                size = V2_SETTLED.size
+            else:
+                self.corrupt_messages += 1
+                self._log(f"unknown packet type {msg_type}")
+                break
+            if len(data) < offset + size:
+                # 包被TCP拆开，读取剩余字节（\ReadNoOfBytes）
+                data += self._receive_exact(self.command_client, offset + size - len(data))
+            if msg_type == V2_MSG_CONTROL:
+                self._unpack_control(data, offset)
+                reply = True
+            elif msg_type == V2_MSG_SETTLED:
+                self._unpack_settled(data, offset)
+            elif self._unpack_trajectory(data, offset) and not control_only:
+                reply = True
+            offset += size
+        return reply
+
+    def _check_sequence(self, seq):
+        """
+        对应CheckSequence：检查指令序号是否连续
+        """
+        if self.command_seq and seq != self.command_seq % 65535 + 1:
+            self.sequence_gaps += 1
+            self._log(f"command sequence gap {self.command_seq} -> {seq}")
+        self.command_seq = seq
+
+    def _unpack_control(self, data, offset):
+        """
+        对应UnpackControl：控制指令取消当前轨迹
+        """
+        _, _, seq, *values = V2_CONTROL.unpack_from(data, offset)
+        self._check_sequence(seq)
+        self.command[:] = values
+        self.trajectory = []
+
+    def _unpack_trajectory(self, data, offset):
+        """
+        对应UnpackTrajectory
+
+        返回:
+            bool: 是否为带设定点的轨迹（只更新重量时返回False）
+        """
+        _, count, seq, weight, limit = V2_TRAJECTORY_HEADER.unpack_from(data, offset)
+        self.recv_reading = weight
+        if count == 0:
+            self.weight_updates_received += 1
+            return False
+        self._check_sequence(seq)
+        count = min(count, TRAJECTORY_MAX_STEPS)
+        self.trajectory = [V2_SETPOINT.unpack_from(data, offset + V2_TRAJECTORY_HEADER.size + V2_SETPOINT.size * i)
+                           for i in range(count)]
+        self.trajectory_limit = limit
+        self.trajectories_received += 1
+        return True
+
+    def _unpack_settled(self, data, offset):
+        """
+        对应UnpackSettled：保存稳定重量，calculate_difference据此结束等待
+        """
+        _, flags, counter, weight, _ = V2_SETTLED.unpack_from(data, offset)
+        if flags & 0x02:
+            self.predicted_received += 1
+        self.settled_weight = weight
+        self.recv_reading = weight
+        # 保持稳定期间的刷新（稳定次数不变且没有标志）不算新的稳定重量
+        if counter != self.settled_last or flags & 0x03:
+            self.settled_count += 1
+        else:
+            self.settled_refresh += 1
+        self.settled_last = counter
+        self.settled_received += 1
+
+    def _apply_trajectory(self):
+        """
+        对应ApplyTrajectory：选择起始重量不超过当前重量的最后一个设定点
+        """
+        index = 0
+        for i in range(1, len(self.trajectory)):
+            if self.recv_reading >= self.trajectory[i][0]:
+                index = i
+        _, self.shake, self.a_smallspoon = self.trajectory[index]
+
+    def _send_prompt(self, prompt):
+        """
+        对应SendPrompt：协议v2中请求带最近执行的指令序号
+        """
+        self.prompts_sent += 1
+        if self.proto_version >= 2:
+            self._send_tagged(self.command_client, f"@{self.command_seq} {prompt}")
+        else:
+            self._send(self.command_client, prompt)
+
+    def _send_tagged(self, sock, text):
+        """
+        发送带序号的消息，按duplicate概率重复发送一次
+        """
+        self._send(sock, text)
+        if self.duplicate and self.rng.random() < self.duplicate:
+            self.duplicates_sent += 1
+            self._send(sock, text)
+
+    def _send_scale_result(self):
+        """
+        对应SendScaleResult：发送结果或9 9 9
+        """
+        if self.cell.send_result and self.proto_version >= 2:
+            self._send_tagged(self.scale_client, f"@{self.target_seq} {self.cell.result_message()}\n")
+        elif self.cell.send_result:
+            self._send(self.scale_client, self.cell.result_message())
+        else:
+            self._send(self.scale_client, "9 9 9")
+
+    def _parse(self, msg):
+        """
+        对应Parsemsg，消息损坏时command保持不变
+        """
+        if parse_msg(msg, self.command) < 0:
+            self.corrupt_messages += 1
+            self._log(f"corrupt message: {msg!r}")
+
+    def _send(self, sock, text):
+        """
+        对应SocketSend，发送前按配置加入延迟和抖动
+        """
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        sock.sendall(text.encode('ascii'))
+        self.messages_sent += 1
+        if self.verbose:
+            self._log(f"send {text!r}")
+
+    def _receive(self, sock):
+        """
+        对应SocketReceive \\Str：一次最多接收80个字符
+        """
+        data = sock.recv(RAPID_STRING_MAX)
+        if not data:
+            raise ConnectionError("connection closed")
+        self.messages_received += 1
+        text = data.decode('ascii', 'replace')
+        if self.verbose:
+            self._log(f"recv {text!r}")
+        return text
+
+    def _receive_raw(self, sock):
+        """
+        对应SocketReceive \\RawData
+        """
+        data = sock.recv(1024)
+        if not data:
+            raise ConnectionError("connection closed")
+        self.messages_received += 1
+        if self.verbose:
+            self._log(f"recv {data!r}")
+        return data
+
+    @staticmethod
+    def _receive_exact(sock, size):
+        """
+        对应SocketReceive \\RawData \\ReadNoOfBytes：接收指定字节数
+        """
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("connection closed")
+            data += chunk
+        return data
+
+    @staticmethod
+    def _peek(sock):
+        """
+        对应SocketPeek：判断是否有待接收的数据
+        """
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable)
+
+    def _schedule_disconnect(self):
+        """
+        计划下一次主动断开的时间
+        """
+        if self.disconnect_every > 0:
+            self._next_disconnect = time.monotonic() + self.rng.expovariate(1.0 / self.disconnect_every)
+        else:
+            self._next_disconnect = None
+
+    def _maybe_disconnect(self):
+        """
+        到达计划时间时模拟一次通讯中断（按ERR_SOCK_TIMEOUT的恢复流程重新ServerStart）
+        """
+        if self._next_disconnect is not None and time.monotonic() >= self._next_disconnect:
+            self.disconnects += 1
+            raise socket.timeout("simulated disconnect")
+
+    def _close_clients(self):
+        """
+        关闭客户端连接（对应ServerStart TRUE中的SocketClose）
+        """
+        for attr in ('scale_client', 'command_client'):
+            sock = getattr(self, attr)
+            if sock is not None:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+                setattr(self, attr, None)
+
+    def _log(self, message):
+        print(f"[{self.name}] {message}", flush=True)
+
+    def get_stats(self):
+        """
+        获取服务器统计信息
+
+        返回:
+            dict: 统计信息
+        """
+        return {
+            'name': self.name,
+            'messages_sent': self.messages_sent,
+            'messages_received': self.messages_received,
+            'sessions': self.sessions,
+            'disconnects': self.disconnects,
+            'corrupt_messages': self.corrupt_messages,
+            'sequence_gaps': self.sequence_gaps,
+            'duplicates_sent': self.duplicates_sent,
+            'prompts_sent': self.prompts_sent,
+            'trajectories_received': self.trajectories_received,
+            'weight_updates_received': self.weight_updates_received,
+            'settled_received': self.settled_received,
+            'predicted_received': self.predicted_received,
+            'protocol_version': self.proto_version,
+            'targets_done': self.cell.targets_done
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAPID T_SOC_COM 替身服务器")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--control-port', type=int, default=1023, help="控制端口（command）")
+    parser.add_argument('--data-port', type=int, default=1025, help="数据端口（scale）")
+    parser.add_argument('--cells', type=int, default=1, help="模拟的工位数量，第n个工位的端口依次加10*n")
+    parser.add_argument('--latency', type=float, default=0.0, help="每次发送前的固定延迟（毫秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="延迟的随机抖动上限（毫秒）")
+    parser.add_argument('--rate', type=float, default=0.0, help="主循环最大频率（次/秒），0表示不限速")
+    parser.add_argument('--cycles', type=int, default=20, help="每个目标的executing周期数")
+    parser.add_argument('--result-hold', type=float, default=1.0, help="结果保持时间（秒）")
+    parser.add_argument('--receive-timeout', type=float, default=60.0, help="SocketReceive超时时间（秒）")
+    parser.add_argument('--disconnect-every', type=float, default=0.0, help="平均每隔多少秒断开一次连接，0表示不断开")
+    parser.add_argument('--legacy', action='store_true', help="模拟不支持推送订阅和协议协商的旧版RAPID程序")
+    parser.add_argument('--duplicate', type=float, default=0.0, help="协议v2中请求和结果被重复发送的概率")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+    parser.add_argument('--stats-interval', type=float, default=5.0, help="统计输出间隔（秒）")
+    parser.add_argument('--verbose', action='store_true', help="打印每条消息")
+    args = parser.parse_args()
+
+    servers = []
+    for index in range(args.cells):
+        seed = None if args.seed is None else args.seed + index
+        rng = random.Random(seed)
+        server = RapidStandIn(
+            host=args.host,
+            control_port=args.control_port + 10 * index if args.control_port else 0,
+            data_port=args.data_port + 10 * index if args.data_port else 0,
+            latency=args.latency / 1000.0,
+            jitter=args.jitter / 1000.0,
+            rate=args.rate,
+            receive_timeout=args.receive_timeout,
+            disconnect_every=args.disconnect_every,
+            legacy=args.legacy,
+            cell=SimulatedCell(cycles=args.cycles, result_hold=args.result_hold, rng=rng),
+            name=f"cell{index + 1}",
+            seed=seed,
+            verbose=args.verbose,
+            duplicate=args.duplicate
+        )
+        server.start()
+        print(f"[{server.name}] 监听 控制端口 {server.control_port}，数据端口 {server.data_port}", flush=True)
+        servers.append(server)
+
+    last = {server.name: 0 for server in servers}
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            for server in servers:
+                stats = server.get_stats()
+                total = stats['messages_sent'] + stats['messages_received']
+                rate = (total - last[server.name]) / args.stats_interval
+                last[server.name] = total
+                print(f"[{server.name}] {rate:.1f} 条/秒 {stats}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
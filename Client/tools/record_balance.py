@@ -0,0 +1,77 @@
+"""
+天平读数录制工具
+
+打开天平串口（core.balance.BalanceReader），把每条读数按到达时间写入CSV文件（时间戳, 重量, 是否稳定），
+用于离线评估稳定检测和稳定重量预测（benchmarks/bench_settling.py）。录制时可以正常运行称量流程，
+多个称量周期的抖动、落料和稳定过程都会记录在同一个文件中。
+
+用法（在Client目录下执行）:
+    python tools/record_balance.py [--port COM3] [--baudrate 9600] [--duration 600] [--output balance.csv]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.balance import BalanceReader
+
+CSV_HEADER = 'time,weight,stable\n'
+
+
+class StreamRecorder:
+    """
+    天平读数回调：在读取线程中把读数写入CSV文件
+    """
+
+    def __init__(self, file):
+        """
+        参数:
+            file: 以文本方式打开的输出文件
+        """
+        self.file = file
+        self.count = 0
+        self._start = None
+        self._lock = threading.Lock()
+        file.write(CSV_HEADER)
+
+    def __call__(self, timestamp, weight, stable):
+        with self._lock:
+            if self._start is None:
+                self._start = timestamp
+            self.file.write(f"{timestamp - self._start:.4f},{weight:.5f},{int(stable)}\n")
+            self.count += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天平读数录制工具")
+    parser.add_argument('--port', default=None, help="串口名称，默认读取配置")
+    parser.add_argument('--baudrate', type=int, default=None, help="波特率，默认读取配置")
+    parser.add_argument('--duration', type=float, default=600.0, help="录制时长（秒），0表示直到Ctrl+C")
+    parser.add_argument('--output', default=None, help="输出CSV文件，默认为 balance_年月日_时分秒.csv")
+    args = parser.parse_args()
+
+    output = args.output or time.strftime('balance_%Y%m%d_%H%M%S.csv')
+    reader = BalanceReader(args.port, args.baudrate)
+    with open(output, 'w', encoding='utf-8') as file:
+        recorder = StreamRecorder(file)
+        reader.add_listener(recorder)
+        reader.start()
+        print(f"录制 {reader.port} {reader.baudrate} -> {output}", flush=True)
+        deadline = time.monotonic() + args.duration if args.duration > 0 else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(1.0)
+                print(f"\r已录制 {recorder.count} 条读数", end='', flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reader.stop()
+            reader.remove_listener(recorder)
+    print(f"\n共 {recorder.count} 条读数，统计: {reader.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+"""
+通讯抓包回放工具
+
+把 core/capture.py 录制的抓包文件中机器人发往客户端的原始字节按时间线重新发送给客户端，
+用于在没有实体机器人的情况下复现现场会话、做回归压测和事后分析：
+    - 回放服务端监听控制端口和数据端口，按录制时的时间间隔除以回放速度发送数据；
+      速度为0表示不等待录制间隔，尽可能快地回放
+    - 录制中客户端对某条控制指令（new_target/executing）做了应答时，回放会等待客户端应答后
+      再继续，因此回放顺序与录制完全一致，结果可重复；同时记录每条指令的客户端反应时间
+    - 协议没有结束符，同一通道上一条数据没有得到应答时，下一次发送至少间隔 --min-gap，
+      避免客户端把两条消息合并
+    - 客户端开始处理后才会响应控制指令，因此回放在客户端发出第一条数据（订阅或轮询请求）后开始
+    - 默认在本进程中创建一个工位作为客户端（读取 --excel 指定的Excel文件），
+      使用 --external 时只启动回放服务端，等待外部客户端（例如上位机界面）连接
+
+用法（在Client目录下执行）:
+    python tools/replay_capture.py captures/工位1_20250101_120000.ycap [--speed 1|10|0]
+        [--control-port 0] [--data-port 0] [--excel test_file.xlsx] [--external] [--report report.json]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.capture import read_capture, DIRECTION_IN, DIRECTION_OUT
+from core.config_manager import global_config
+from core.latency import LatencyHistogram
+from core.protocol_handler import v2_packet_size
+
+
+def _message_type(data):
+    """
+    获取机器人消息的类型
+
+    参数:
+        data: 原始字节
+
+    返回:
+        str: 'new_target' / 'executing' / 'weight'（瓶重等数值）/ 其他消息的第一个单词
+    """
+    text = data.decode('ascii', 'replace').strip()
+    if not text:
+        return 'empty'
+    # 录制时一次接收可能包含多条消息（例如瓶重后紧跟executing），按需要应答的指令归类
+    for command in ('new_target', 'executing'):
+        if command in text:
+            return command
+    if text[0].isdigit() or text[0] in '-.':
+        return 'weight'
+    return text.split()[0]
+
+
+def build_schedule(records):
+    """
+    由抓包记录生成回放计划
+
+    参数:
+        records: read_capture()返回的记录列表
+
+    返回:
+        list: 机器人发往客户端的每条数据一项，包含时间、通道、数据，
+            以及录制中客户端在该通道下一条机器人数据之前的应答（只统计控制通道）
+    """
+    schedule = []
+    last_control = None
+    for timestamp, channel, direction, data in records:
+        if direction == DIRECTION_IN:
+            item = {'time': timestamp, 'channel': channel, 'data': data, 'reply': None}
+            schedule.append(item)
+            if channel == 'CTRL_COM':
+                last_control = item
+        elif direction == DIRECTION_OUT and channel == 'CTRL_COM' and last_control is not None:
+            # 控制通道由机器人发起，客户端的第一条应答即对上一条机器人数据的反应
+            if last_control['reply'] is None:
+                last_control['reply'] = data
+    return schedule
+
+
+class _ClientReader(threading.Thread):
+    """
+    读取客户端发来的数据并记录到达时间
+    """
+
+    def __init__(self, sock, name, activity):
+        super().__init__(daemon=True, name=name)
+        self.sock = sock
+        self.activity = activity  # 收到客户端数据时置位
+        self.condition = threading.Condition()
+        self.buffer = bytearray()
+        self.first_at = None  # 缓冲区中第一个字节的到达时间
+        self.closed = False
+        self.bytes_total = 0
+
+    def run(self):
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                data = b''
+            now = time.monotonic()
+            with self.condition:
+                if not data:
+                    self.closed = True
+                    self.condition.notify_all()
+                    return
+                if not self.buffer:
+                    self.first_at = now
+                self.buffer.extend(data)
+                self.bytes_total += len(data)
+                self.condition.notify_all()
+            self.activity.set()
+
+    def take_reply(self, timeout):
+        """
+        等待一条控制指令：协议v1为以'#'结尾的字符串，协议v2为定长二进制包
+
+        参数:
+            timeout: 超时时间（秒）
+
+        返回:
+            tuple: (应答字节, 第一个字节的到达时间)，超时返回 (None, None)
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                end = self._reply_end()
+                if end:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.closed:
+                    return None, None
+                self.condition.wait(remaining)
+            reply, arrived = bytes(self.buffer[:end]), self.first_at
+            del self.buffer[:end]
+            self.first_at = time.monotonic() if self.buffer else None
+            return reply, arrived
+
+    def _reply_end(self):
+        """
+        计算缓冲区中第一条完整控制指令的结束位置，不完整时返回0
+        """
+        size = v2_packet_size(self.buffer)
+        if size is not None:
+            # v2二进制控制指令或抖动轨迹
+            return size if size and len(self.buffer) >= size else 0
+        return self.buffer.find(b'#') + 1
+
+    def discard(self):
+        """
+        丢弃尚未取走的数据（发送新指令前调用，避免把旧数据当成应答）
+        """
+        with self.condition:
+            self.buffer.clear()
+            self.first_at = None
+
+
+class CaptureReplayer:
+    """
+    抓包回放服务端
+    """
+
+    def __init__(self, schedule, speed=1.0, host='127.0.0.1', control_port=0, data_port=0,
+                 reply_timeout=5.0, min_gap=None, start_timeout=60.0):
+        """
+        初始化回放服务端
+
+        参数:
+            schedule: build_schedule()生成的回放计划
+            speed: 回放速度倍数，0表示尽可能快
+            host: 监听地址
+            control_port: 控制端口，0表示自动分配
+            data_port: 数据端口，0表示自动分配
+            reply_timeout: 等待客户端应答的超时时间（秒）
+            min_gap: 同一通道上一条数据未得到应答时到下一次发送的最小间隔（秒），None则取帧空闲超时的2倍
+            start_timeout: 等待客户端发出第一条数据的超时时间（秒），超时后直接开始回放
+        """
+        self.schedule = schedule
+        self.speed = speed
+        self.host = host
+        self.reply_timeout = reply_timeout
+        if min_gap is None:
+            min_gap = 2 * global_config.get_float('Communication', 'frame_idle_timeout')
+        self.min_gap = min_gap
+        self.start_timeout = start_timeout
+
+        self.scale_server = self._listen(data_port)
+        self.command_server = self._listen(control_port)
+        self.data_port = self.scale_server.getsockname()[1]
+        self.control_port = self.command_server.getsockname()[1]
+
+        self.histograms = {}
+        self.sent = 0
+        self.replies_matched = 0
+        self.replies_differed = 0
+        self.replies_missing = 0
+        self.unexpected_replies = 0
+        self.duration = 0.0
+        self.finished = threading.Event()
+        self.thread = None
+
+    def _listen(self, port):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, port))
+        server.listen(1)
+        return server
+
+    def start(self):
+        """
+        在后台线程中开始回放
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True, name='CaptureReplayer')
+        self.thread.start()
+
+    def run(self):
+        """
+        接受客户端连接并按计划回放
+        """
+        # 与RAPID的ServerStart一致：先接受数据端口，再接受控制端口
+        scale_socket, _ = self.scale_server.accept()
+        command_socket, _ = self.command_server.accept()
+        sockets = {'DATA_COM': scale_socket, 'CTRL_COM': command_socket}
+        for sock in sockets.values():
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        activity = threading.Event()
+        control_reader = _ClientReader(command_socket, 'ReplayControlReader', activity)
+        data_reader = _ClientReader(scale_socket, 'ReplayDataReader', activity)
+        control_reader.start()
+        data_reader.start()
+
+        # 等待客户端开始处理
+        activity.wait(self.start_timeout)
+
+        try:
+            self._replay(sockets, control_reader)
+        finally:
+            for sock in sockets.values():
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+            self.scale_server.close()
+            self.command_server.close()
+            self.finished.set()
+
+    def _replay(self, sockets, control_reader):
+        started = time.monotonic()
+        previous_time = None
+        previous_sent = started
+        unanswered = {}  # 各通道最近一次未得到应答的发送时间
+
+        for item in self.schedule:
+            # 按录制间隔计算发送时间，等待客户端应答所用的时间计入间隔
+            due = previous_sent
+            if previous_time is not None and self.speed > 0:
+                due += (item['time'] - previous_time) / self.speed
+            channel = item['channel']
+            if channel in unanswered:
+                due = max(due, unanswered.pop(channel) + self.min_gap)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            expects_reply = item['reply'] is not None
+            if channel == 'CTRL_COM':
+                if control_reader.buffer:
+                    self.unexpected_replies += 1
+                control_reader.discard()
+
+            try:
+                sockets[channel].sendall(item['data'])
+            except OSError:
+                break
+            sent_at = time.monotonic()
+            if not expects_reply:
+                unanswered[channel] = sent_at
+            previous_time, previous_sent = item['time'], sent_at
+            self.sent += 1
+
+            if expects_reply:
+                reply, arrived = control_reader.take_reply(self.reply_timeout)
+                if reply is None:
+                    self.replies_missing += 1
+                    unanswered[channel] = sent_at
+                    continue
+                message_type = _message_type(item['data'])
+                histogram = self.histograms.get(message_type)
+                if histogram is None:
+                    histogram = self.histograms[message_type] = LatencyHistogram()
+                histogram.record((arrived - sent_at) * 1e6)
+                if reply.strip() == item['reply'].strip():
+                    self.replies_matched += 1
+                else:
+                    self.replies_differed += 1
+
+        self.duration = time.monotonic() - started
+
+    def get_report(self):
+        """
+        获取回放报告
+
+        返回:
+            dict: 回放统计和各类指令的客户端反应时间（毫秒）
+        """
+        latency = {}
+        for message_type, histogram in sorted(self.histograms.items()):
+            latency[message_type] = {
+                'count': histogram.total_count,
+                'p50_ms': histogram.percentile(50) / 1000.0,
+                'p95_ms': histogram.percentile(95) / 1000.0,
+                'p99_ms': histogram.percentile(99) / 1000.0,
+                'max_ms': histogram.max_us / 1000.0
+            }
+        return {
+            'speed': self.speed,
+            'messages_scheduled': len(self.schedule),
+            'messages_sent': self.sent,
+            'duration_s': round(self.duration, 3),
+            'replies_matched': self.replies_matched,
+            'replies_differed': self.replies_differed,
+            'replies_missing': self.replies_missing,
+            'unexpected_replies': self.unexpected_replies,
+            'reaction_latency': latency
+        }
+
+
+def _run_station(replayer, excel_file, seed):
+    """
+    在本进程中创建一个工位连接到回放服务端并开始处理
+
+    参数:
+        replayer: 回放服务端
+        excel_file: Excel文件路径
+        seed: 模拟重量的随机种子
+    """
+    from core.station import StationManager
+
+    manager = StationManager(worker_threads=1)
+    station = manager.add_station('回放', replayer.host, replayer.control_port,
+                                  replayer.host, replayer.data_port, section='Replay')
+    control_connected, data_connected = station.connect()
+    if not (control_connected and data_connected):
+        raise RuntimeError("回放客户端连接失败")
+    # 模拟重量由工位自己的模拟器生成，种子设置在模拟器上而不是全局random
+    station.data_processor.simulator.rng.seed(seed)
+    sheet, _, _ = station.load_excel(excel_file)
+    if not sheet:
+        raise RuntimeError(f"Excel文件加载失败: {excel_file}")
+    error_msg = station.start()
+    if error_msg:
+        raise RuntimeError(error_msg)
+
+    # 与上位机界面的定时器一致，每秒执行一次定时处理
+    def poll_loop():
+        station.poll()
+        while not replayer.finished.wait(1.0):
+            station.poll()
+    threading.Thread(target=poll_loop, daemon=True).start()
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通讯抓包回放工具")
+    parser.add_argument('capture', help="抓包文件路径")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放速度倍数，0表示尽可能快")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--control-port', type=int, default=0, help="控制端口，0表示自动分配")
+    parser.add_argument('--data-port', type=int, default=0, help="数据端口，0表示自动分配")
+    parser.add_argument('--reply-timeout', type=float, default=5.0, help="等待客户端应答的超时时间（秒）")
+    parser.add_argument('--min-gap', type=float, default=None, help="上一条数据未得到应答时同一通道的最小发送间隔（秒）")
+    parser.add_argument('--excel', default=None, help="内置客户端使用的Excel文件，默认读取配置")
+    parser.add_argument('--external', action='store_true', help="不创建内置客户端，等待外部客户端连接")
+    parser.add_argument('--seed', type=int, default=0, help="模拟重量的随机种子，保证回放结果可重复")
+    parser.add_argument('--report', default=None, help="把回放报告保存为JSON文件")
+    args = parser.parse_args()
+
+    started_at, records = read_capture(args.capture)
+    schedule = build_schedule(records)
+    print(f"抓包文件录制于 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started_at))}，"
+          f"共 {len(records)} 条记录，回放 {len(schedule)} 条机器人数据", flush=True)
+
+    replayer = CaptureReplayer(schedule, speed=args.speed, host=args.host,
+                               control_port=args.control_port, data_port=args.data_port,
+                               reply_timeout=args.reply_timeout, min_gap=args.min_gap)
+    replayer.start()
+    print(f"回放服务端监听 控制端口 {replayer.control_port}，数据端口 {replayer.data_port}", flush=True)
+
+    manager = None
+    if not args.external:
+        manager = _run_station(replayer, args.excel or global_config.get('File', 'excel_file'), args.seed)
+
+    try:
+        replayer.finished.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+    report = replayer.get_report()
+    print(json.dumps(report, ensure_ascii=False, indent=2), flush=True)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+from core.config_manager import global_config
+from core.logger import system_logger
+
+# 只需显示最新值的事件类型，同一工位的同类事件在一个刷新周期内只保留最后一条
+COALESCED_EVENTS = ('target', 'control', 'result')
+
+
+class UiEventDispatcher(QObject):
+    """
+    UI事件分发器：把工位线程中产生的事件转到GUI线程处理
+
+    工位线程调用 post() 只是把事件放入待处理表，并在需要时发出一次排队信号；
+    GUI线程按显示刷新频率统一处理，重量/抖动参数等显示值只处理最新的一条，
+    因此控制指令的回复不会等待界面刷新
+    """
+
+    # 唤醒信号：以排队连接方式把处理转到GUI线程
+    _wakeup_signal = pyqtSignal()
+
+    def __init__(self, handler, refresh_rate=None, parent=None):
+        """
+        初始化UI事件分发器
+
+        参数:
+            handler: GUI线程中的事件处理函数，参数为 (station_name, event, payload)
+            refresh_rate: 每秒最多处理次数，None则读取配置
+            parent: 父对象
+        """
+        super().__init__(parent)
+        if refresh_rate is None:
+            refresh_rate = global_config.get_float('UI', 'refresh_rate')
+        self.handler = handler
+        self.interval = 1.0 / refresh_rate if refresh_rate > 0 else 0.0
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # 待处理事件，键为 (工位名称, 事件类型) 或唯一序号
+        self._sequence = itertools.count()
+        self._scheduled = False  # 是否已安排一次处理
+        self._last_flush = 0.0
+
+        # 统计
+        self.posted_total = 0
+        self.coalesced_total = 0
+        self.delivered_total = 0
+
+        self._wakeup_signal.connect(self._schedule_flush, Qt.QueuedConnection)
+
+    def post(self, station_name, event, payload=None):
+        """
+        提交事件，可在任意线程调用
+
+        参数:
+            station_name: 工位名称
+            event: 事件名称
+            payload: 事件信息
+        """
+        if event in COALESCED_EVENTS:
+            key = (station_name, event)
+        else:
+            key = next(self._sequence)
+
+        with self._lock:
+            self.posted_total += 1
+            if key in self._pending:
+                # 旧值尚未显示，直接用新值替换
+                del self._pending[key]
+                self.coalesced_total += 1
+            self._pending[key] = (station_name, event, payload)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._wakeup_signal.emit()
+
+    def _schedule_flush(self):
+        """
+        在GUI线程中安排处理，距上次处理不足一个刷新周期时延后处理
+        """
+        delay = self._last_flush + self.interval - time.monotonic()
+        if delay > 0:
+            QTimer.singleShot(int(delay * 1000) + 1, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        """
+        在GUI线程中处理所有待处理事件
+        """
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._scheduled = False
+        self._last_flush = time.monotonic()
+
+        for station_name, event, payload in events:
+            try:
+                self.handler(station_name, event, payload)
+            except Exception as e:
+                system_logger.error(f"[{station_name}] 处理界面事件 {event} 时发生错误: {e}")
+        self.delivered_total += len(events)
+
+    def get_stats(self):
+        """
+        获取分发统计
+
+        返回:
+            dict: 提交数、合并数、实际处理数和待处理数
+        """
+        with self._lock:
+            return {
+                'posted_total': self.posted_total,
+                'coalesced_total': self.coalesced_total,
+                'delivered_total': self.delivered_total,
+                'pending': len(self._pending)
+            }
@@ -8,14 +8,13 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 from PyQt5.QtGui import QPalette, QColor
 import logging
-from core.logger import global_logger, Logger, system_logger, data_com_logger, ctrl_com_logger
+from core.logger import global_logger, Logger, system_logger
 from core.config_manager import global_config
-from core.communication import TCPCommunication
-from core.data_processor import DataProcessor
 from core.file_handler import FileHandler
-from core.protocol_handler import ProtocolHandler
+from core.latency import export_latency_stats
+from core.station import StationManager
+from ui.event_dispatcher import UiEventDispatcher
 import os
-import json
 import time
 import pyqtgraph as pg
 from pyqtgraph import PlotWidget, plot
@@ -35,41 +34,16 @@ class MainWindow(QMainWindow):
         super().__init__()
         
         # 初始化核心组件
-        # 尝试获取控制端口，默认使用1023
-        try:
-            control_port = global_config.get_int('Communication', 'control_port', fallback=global_config.get_int('Communication', 'port', fallback=1023))
-        except Exception as e:
-            control_port = 1023
-            system_logger.info(f"使用默认控制端口: {control_port}")
+        self.file_handler = FileHandler()
         
-        # 尝试获取数据端口，默认使用1025
-        try:
-            data_port = global_config.get_int('Communication', 'data_port', fallback=1025)
-        except Exception as e:
-            data_port = 1025
-            system_logger.info(f"使用默认数据端口: {data_port}")
+        # 工位注册表：每个工位拥有独立的控制/数据通道、数据处理器和Excel处理进度，消息处理共享线程池
+        self.station_manager = StationManager()
+        self.station_manager.load_from_config()
+        self.station = self.station_manager.get(self.station_manager.names()[0])  # 当前界面显示的工位
         
-        self.tcp_comm = TCPCommunication(control_port, comm_type='CTRL_COM')  # 控制参数通讯客户端
-        self.tcp_data_comm = TCPCommunication(data_port, comm_type='DATA_COM')  # 整体数据读取客户端
-        self.data_processor = DataProcessor()
-        self.file_handler = FileHandler()
-        self.protocol_handler = ProtocolHandler()  # 通讯协议处理器
-        
-        # 设置回调函数
-        self.tcp_comm.set_callback(receive_callback=self.on_control_data_received, error_callback=self.on_comm_error)
-        self.tcp_data_comm.set_callback(receive_callback=self.on_data_received, error_callback=self.on_comm_error)
-        
-        # 初始化变量
-        self.is_running = False
-        self.current_target_weight = None
-        self.excel_sheet = None
-        self.excel_max_row = 0
-        self.excel_max_col = 0
-        self.current_row = 1
-        self.current_col = 1
-        self.current_material = "Unknown"
-        self.excel_filename = "Unknown"
-        self.current_json_filename = "Unknown"  # 当前物料的JSON文件名
+        # 设置回调函数：工位事件在通讯线程/线程池中产生，经分发器按刷新频率合并后转到GUI线程处理
+        self.event_dispatcher = UiEventDispatcher(self.on_station_event, parent=self)
+        self.station_manager.add_listener(self.event_dispatcher.post)
         
         # 曲线相关变量
         self.curve_data = []  # 存储曲线数据，格式：[(time, target_weight, current_weight), ...]
@@ -91,7 +65,15 @@ class MainWindow(QMainWindow):
         # 初始化定时器，用于更新UI
         self.update_timer = QTimer(self)
         self.update_timer.setInterval(1000)  # 1秒更新一次
+        self.update_timer.timeout.connect(self.update_latency_table)
+        self.update_timer.timeout.connect(self.update_station_table)
         self.update_timer.start()
+        
+        # 初始化定时器，用于所有工位的定时处理（轮询模式下请求称重结果）
+        self.process_timer = QTimer(self)
+        self.process_timer.setInterval(1000)  # 每秒处理一次
+        self.process_timer.timeout.connect(self.station_manager.poll_all)
+        self.process_timer.start()
     
     def init_ui(self):
         """
@@ -143,6 +125,16 @@ class MainWindow(QMainWindow):
         
         middle_layout.addWidget(self.file_group, stretch=1)  # 文件操作，适当拉伸
         
+        # 中列：通讯延迟统计
+        self.setup_latency_section()
+        
+        middle_layout.addWidget(self.latency_group, stretch=0)  # 通讯延迟，不拉伸
+        
+        # 中列：工位状态
+        self.setup_station_section()
+        
+        middle_layout.addWidget(self.station_group, stretch=0)  # 工位状态，不拉伸
+        
     
     def setup_connection_section(self):
         """
@@ -153,6 +145,20 @@ class MainWindow(QMainWindow):
         conn_layout.setContentsMargins(15, 15, 15, 15)  # 设置组内边距
         conn_layout.setSpacing(15)  # 设置组内控件间距
         
+        # 工位选择（水平布局）
+        station_layout = QHBoxLayout()
+        station_layout.setSpacing(10)
+        station_label = QLabel("工位:")
+        station_label.setMinimumWidth(60)  # 固定标签宽度
+        station_layout.addWidget(station_label, alignment=Qt.AlignLeft | Qt.AlignVCenter)
+        self.station_combo = QComboBox()
+        self.station_combo.addItems(self.station_manager.names())
+        self.station_combo.setMinimumHeight(30)
+        self.station_combo.setMinimumWidth(120)  # 固定下拉框宽度
+        self.station_combo.currentTextChanged.connect(self.on_station_changed)
+        station_layout.addWidget(self.station_combo)
+        conn_layout.addLayout(station_layout)
+        
         # 控制指令客户端配置
         control_label = QLabel("控制指令客户端:")
         control_label.setStyleSheet("font-weight: bold;")
@@ -165,11 +171,7 @@ class MainWindow(QMainWindow):
         control_ip_label.setMinimumWidth(60)  # 固定标签宽度
         control_ip_layout.addWidget(control_ip_label, alignment=Qt.AlignLeft | Qt.AlignVCenter)
         # 获取控制客户端IP地址
-        try:
-            control_host = global_config.get('Communication', 'control_host')
-        except Exception:
-            control_host = global_config.get('Communication', 'host')
-        self.control_ip_edit = QLineEdit(control_host)
+        self.control_ip_edit = QLineEdit(self.station.tcp_comm.host)
         self.control_ip_edit.setMinimumHeight(30)
         self.control_ip_edit.setMinimumWidth(120)  # 固定文本框宽度
         control_ip_layout.addWidget(self.control_ip_edit)
@@ -184,11 +186,7 @@ class MainWindow(QMainWindow):
         self.control_port_edit = QSpinBox()
         self.control_port_edit.setRange(1, 65535)
         # 获取控制客户端端口
-        try:
-            control_port = global_config.get_int('Communication', 'control_port')
-        except Exception:
-            control_port = global_config.get_int('Communication', 'port')
-        self.control_port_edit.setValue(control_port)
+        self.control_port_edit.setValue(self.station.tcp_comm.port)
         self.control_port_edit.setMinimumHeight(30)
         self.control_port_edit.setMinimumWidth(120)  # 固定文本框宽度
         control_port_layout.addWidget(self.control_port_edit)
@@ -225,11 +223,7 @@ class MainWindow(QMainWindow):
         data_ip_label.setMinimumWidth(60)  # 固定标签宽度
         data_ip_layout.addWidget(data_ip_label, alignment=Qt.AlignLeft | Qt.AlignVCenter)
         # 获取数据客户端IP地址
-        try:
-            data_host = global_config.get('Communication', 'data_host')
-        except Exception:
-            data_host = global_config.get('Communication', 'host')
-        self.data_ip_edit = QLineEdit(data_host)
+        self.data_ip_edit = QLineEdit(self.station.tcp_data_comm.host)
         self.data_ip_edit.setMinimumHeight(30)
         self.data_ip_edit.setMinimumWidth(120)  # 固定文本框宽度
         data_ip_layout.addWidget(self.data_ip_edit)
@@ -244,11 +238,7 @@ class MainWindow(QMainWindow):
         self.data_port_edit = QSpinBox()
         self.data_port_edit.setRange(1, 65535)
         # 获取数据客户端端口
-        try:
-            data_port = global_config.get_int('Communication', 'data_port')
-        except Exception:
-            data_port = 1025
-        self.data_port_edit.setValue(data_port)
+        self.data_port_edit.setValue(self.station.tcp_data_comm.port)
         self.data_port_edit.setMinimumHeight(30)
         self.data_port_edit.setMinimumWidth(120)  # 固定文本框宽度
         data_port_layout.addWidget(self.data_port_edit)
@@ -475,7 +465,7 @@ class MainWindow(QMainWindow):
         file_label.setMinimumWidth(80)  # 固定标签宽度
         file_row.addWidget(file_label, alignment=Qt.AlignLeft | Qt.AlignVCenter)
         self.excel_path_edit = QLineEdit()
-        self.excel_path_edit.setText(global_config.get('File', 'excel_file'))
+        self.excel_path_edit.setText(self.station.excel_file)
         self.excel_path_edit.setMinimumHeight(30)  # 设置输入框高度
         file_row.addWidget(self.excel_path_edit, stretch=1)  # 输入框占满剩余空间，自适应宽度
         
@@ -591,6 +581,228 @@ class MainWindow(QMainWindow):
         # 初始化JSON文件列表
         self.refresh_json_files()
     
+    def setup_latency_section(self):
+        """
+        设置通讯延迟统计区域
+        """
+        self.latency_group = QGroupBox("通讯延迟")
+        latency_layout = QVBoxLayout(self.latency_group)
+        latency_layout.setContentsMargins(15, 15, 15, 15)  # 设置组内边距
+        latency_layout.setSpacing(10)  # 设置组内控件间距
+        
+        # 延迟统计表格
+        self.latency_table = QTableWidget()
+        self.latency_table.setColumnCount(7)
+        self.latency_table.setHorizontalHeaderLabels(["通道", "消息类型", "次数", "P50(ms)", "P95(ms)", "P99(ms)", "最大(ms)"])
+        self.latency_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 列宽自适应
+        self.latency_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.latency_table.setMinimumHeight(120)  # 设置表格最小高度
+        latency_layout.addWidget(self.latency_table)
+        
+        # 发送队列状态
+        self.send_queue_label = QLabel("发送队列: -")
+        latency_layout.addWidget(self.send_queue_label)
+        
+        # 操作按钮区域
+        actions_layout = QHBoxLayout()
+        actions_layout.setSpacing(10)  # 设置水平布局间距
+        
+        # 重置按钮
+        reset_btn = QPushButton("重置统计")
+        reset_btn.clicked.connect(self.reset_latency_stats)
+        reset_btn.setMinimumWidth(100)  # 设置按钮最小宽度
+        reset_btn.setMinimumHeight(30)  # 设置按钮高度
+        actions_layout.addWidget(reset_btn)
+        
+        # 导出按钮
+        export_btn = QPushButton("导出统计")
+        export_btn.clicked.connect(self.export_latency_stats)
+        export_btn.setMinimumWidth(100)  # 设置按钮最小宽度
+        export_btn.setMinimumHeight(30)  # 设置按钮高度
+        actions_layout.addWidget(export_btn)
+        
+        actions_layout.addStretch(1)  # 添加伸缩项，将按钮推到左侧
+        
+        latency_layout.addLayout(actions_layout)
+    
+    def update_latency_table(self):
+        """
+        刷新通讯延迟统计表格
+        """
+        rows = (self.station.tcp_comm.latency.get_summary() + self.station.tcp_data_comm.latency.get_summary()
+                + self.station.correlation.get_summary())
+        self.latency_table.setRowCount(len(rows))
+        
+        for row, stats in enumerate(rows):
+            values = [
+                stats['channel'], stats['message_type'], str(stats['count']),
+                f"{stats['p50_ms']:.2f}", f"{stats['p95_ms']:.2f}", f"{stats['p99_ms']:.2f}", f"{stats['max_ms']:.2f}"
+            ]
+            for col, value in enumerate(values):
+                self.latency_table.setItem(row, col, QTableWidgetItem(value))
+        
+        # 发送队列深度（当前/历史最大/容量）和丢弃数
+        queue_texts = []
+        for name, comm in (("控制", self.station.tcp_comm), ("数据", self.station.tcp_data_comm)):
+            stats = comm.get_send_queue_stats()
+            queue_texts.append(f"{name} {stats['depth']}/{stats['max_depth']}/{stats['capacity']}，丢弃 {stats['dropped_total']}")
+        correlation = self.station.correlation.get_stats()
+        packets = self.station.protocol_handler.encoder.get_stats()
+        text = ("发送队列(当前/最大/容量): " + "；".join(queue_texts)
+                + f"；序号关联: 过期请求 {correlation['stale_prompts']}，重复结果 {correlation['duplicate_results']}，"
+                  f"旧目标结果 {correlation['stale_results']}，未确认 {correlation['lost_total']}"
+                + f"；指令字节(平均/最大): v1 {packets['v1']['mean_bytes']:.1f}/{packets['v1']['max_bytes']}，"
+                  f"v2 {packets['v2']['mean_bytes']:.1f}/{packets['v2']['max_bytes']}，编码拒绝 {packets['rejected']}")
+        if self.station.trajectory.enabled:
+            trajectory = self.station.trajectory.get_stats()
+            text += f"；抖动轨迹: 规划 {trajectory['plans']}（超出预测 {trajectory['replans']}），重量更新 {trajectory['weight_updates']}"
+        cache = self.station.data_processor.shaking_cache.get_stats()
+        text += f"；抖动参数缓存: 命中率 {cache['hit_rate']:.0%}（{cache['size']}/{cache['max_size']}，淘汰 {cache['evictions']}，失效 {cache['invalidations']}）"
+        stability = self.station.stability.get_stats()
+        if stability['episodes']:
+            text += f"；天平稳定: {stability['episodes']} 次，平均判定 {stability['mean_latency']:.2f} s，平均节省 {stability['mean_saved']:.2f} s，预测 {self.station.predictor.predictions} 次"
+        self.send_queue_label.setText(text)
+    
+    def reset_latency_stats(self):
+        """
+        清空通讯延迟统计
+        """
+        self.station.tcp_comm.latency.reset()
+        self.station.tcp_data_comm.latency.reset()
+        self.station.correlation.reset()
+        self.station.trajectory.reset()
+        self.station.data_processor.shaking_cache.reset()
+        self.station.stability.reset_stats()
+        self.station.predictor.reset_stats()
+        self.update_latency_table()
+        self.status_bar.showMessage("通讯延迟统计已重置")
+    
+    def export_latency_stats(self):
+        """
+        导出通讯延迟统计为CSV或JSON文件
+        """
+        timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime())
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出通讯延迟统计", f"latency_{timestamp}.csv", "CSV Files (*.csv);;JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        
+        try:
+            count = export_latency_stats(
+                [self.station.tcp_comm.latency, self.station.tcp_data_comm.latency, self.station.correlation], file_path
+            )
+            self.status_bar.showMessage(f"通讯延迟统计导出完成，共 {count} 条: {file_path}")
+            system_logger.info(f"通讯延迟统计导出完成: {file_path}")
+        except Exception as e:
+            self.status_bar.showMessage(f"导出通讯延迟统计失败: {str(e)}")
+            system_logger.error(f"导出通讯延迟统计失败: {e}")
+    
+    def setup_station_section(self):
+        """
+        设置工位状态区域
+        """
+        self.station_group = QGroupBox("工位状态")
+        station_layout = QVBoxLayout(self.station_group)
+        station_layout.setContentsMargins(15, 15, 15, 15)  # 设置组内边距
+        station_layout.setSpacing(10)  # 设置组内控件间距
+        
+        # 工位吞吐量表格
+        self.station_table = QTableWidget()
+        self.station_table.setColumnCount(8)
+        self.station_table.setHorizontalHeaderLabels(["工位", "连接", "状态", "进度", "接收(条/秒)", "发送(条/秒)", "已下发", "已保存"])
+        self.station_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 列宽自适应
+        self.station_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.station_table.setMinimumHeight(120)  # 设置表格最小高度
+        station_layout.addWidget(self.station_table)
+        
+        # 操作按钮区域
+        actions_layout = QHBoxLayout()
+        actions_layout.setSpacing(10)  # 设置水平布局间距
+        
+        # 录制按钮：录制当前工位两个通道的原始收发数据，可用 tools/replay_capture.py 回放
+        self.capture_btn = QPushButton("开始录制" if self.station.capture is None else "停止录制")
+        self.capture_btn.clicked.connect(self.toggle_capture)
+        self.capture_btn.setMinimumWidth(100)  # 设置按钮最小宽度
+        self.capture_btn.setMinimumHeight(30)  # 设置按钮高度
+        actions_layout.addWidget(self.capture_btn)
+        
+        actions_layout.addStretch(1)  # 添加伸缩项，将按钮推到左侧
+        
+        station_layout.addLayout(actions_layout)
+    
+    def update_station_table(self):
+        """
+        刷新工位吞吐量表格
+        """
+        rows = self.station_manager.get_throughput()
+        self.station_table.setRowCount(len(rows))
+        
+        for row, stats in enumerate(rows):
+            if stats['control_connected'] and stats['data_connected']:
+                connection = "已连接"
+            elif stats['control_connected'] or stats['data_connected']:
+                connection = "部分连接"
+            else:
+                connection = "未连接"
+            progress = f"{max(stats['current_row'] - 1, 0)}/{max(stats['max_row'] - 1, 0)}"
+            values = [
+                stats['name'], connection, "处理中" if stats['is_running'] else "空闲", progress,
+                f"{stats['rate_in']:.1f}", f"{stats['rate_out']:.1f}", str(stats['targets_sent']), str(stats['results_saved'])
+            ]
+            for col, value in enumerate(values):
+                self.station_table.setItem(row, col, QTableWidgetItem(value))
+    
+    def toggle_capture(self):
+        """
+        开始或停止录制当前工位的通讯数据
+        """
+        if self.station.capture is None:
+            try:
+                file_path = self.station.start_capture()
+            except Exception as e:
+                self.status_bar.showMessage(f"开始录制失败: {str(e)}")
+                system_logger.error(f"[{self.station.name}] 开始录制失败: {e}")
+                return
+            self.status_bar.showMessage(f"[{self.station.name}] 正在录制通讯数据: {file_path}")
+        else:
+            stats = self.station.stop_capture()
+            self.status_bar.showMessage(f"[{self.station.name}] 录制结束，共 {stats['records']} 条记录: {stats['file_path']}")
+        self.capture_btn.setText("开始录制" if self.station.capture is None else "停止录制")
+    
+    def on_station_changed(self, name):
+        """
+        切换当前显示的工位
+        
+        参数:
+            name: 工位名称
+        """
+        station = self.station_manager.get(name)
+        if station is None:
+            return
+        self.station = station
+        
+        # 显示该工位的连接配置和Excel文件
+        self.control_ip_edit.setText(station.tcp_comm.host)
+        self.control_port_edit.setValue(station.tcp_comm.port)
+        self.data_ip_edit.setText(station.tcp_data_comm.host)
+        self.data_port_edit.setValue(station.tcp_data_comm.port)
+        self.excel_path_edit.setText(station.excel_file)
+        self.show_excel_preview(station.excel_sheet, station.excel_max_row, station.excel_max_col)
+        
+        # 显示该工位的处理状态
+        self.target_weight_label.setText(f"{station.current_target_weight:.2f}" if station.current_target_weight else "--")
+        self.current_weight_label.setText("--")
+        self.shaking_label.setText("--")
+        self.angle_label.setText("--")
+        self.start_btn.setEnabled(not station.is_running)
+        self.stop_btn.setEnabled(station.is_running)
+        self.capture_btn.setText("开始录制" if station.capture is None else "停止录制")
+        
+        self.update_connection_status()
+        self.update_latency_table()
+        self.status_bar.showMessage(f"当前工位: {name}")
+    
     def save_connection_config(self):
         """
         保存连接配置到配置文件
@@ -600,13 +812,10 @@ class MainWindow(QMainWindow):
         data_host = self.data_ip_edit.text()
         data_port = self.data_port_edit.value()
         
-        # 更新配置
-        global_config.set('Communication', 'control_host', control_host)
-        global_config.set('Communication', 'control_port', str(control_port))
-        global_config.set('Communication', 'data_host', data_host)
-        global_config.set('Communication', 'data_port', str(data_port))
+        # 更新当前工位的配置
+        self.station.set_server_info(control_host, control_port, data_host, data_port)
         
-        system_logger.info("连接配置保存成功")
+        system_logger.info(f"[{self.station.name}] 连接配置保存成功")
         self.status_bar.showMessage("连接配置保存成功")
     
     def update_connection_status(self):
@@ -614,7 +823,7 @@ class MainWindow(QMainWindow):
         更新连接状态显示
         """
         # 更新控制指令客户端状态
-        control_connected = self.tcp_comm.get_connection_status()
+        control_connected = self.station.tcp_comm.get_connection_status()
         if control_connected:
             self.control_status_label.setText("已连接")
             self.control_status_label.setStyleSheet("color: green")
@@ -625,7 +834,7 @@ class MainWindow(QMainWindow):
             self.control_connect_btn.setText("连接控制指令客户端")
         
         # 更新数据回传客户端状态
-        data_connected = self.tcp_data_comm.get_connection_status()
+        data_connected = self.station.tcp_data_comm.get_connection_status()
         if data_connected:
             self.data_status_label.setText("已连接")
             self.data_status_label.setStyleSheet("color: green")
@@ -650,9 +859,9 @@ class MainWindow(QMainWindow):
         """
         切换控制指令客户端连接状态
         """
-        if self.tcp_comm.get_connection_status():
+        if self.station.tcp_comm.get_connection_status():
             # 断开连接
-            self.tcp_comm.disconnect()
+            self.station.disconnect_control()
             self.status_bar.showMessage("已断开控制指令客户端连接")
         else:
             # 保存连接配置
@@ -662,11 +871,8 @@ class MainWindow(QMainWindow):
             control_host = self.control_ip_edit.text()
             control_port = self.control_port_edit.value()
             
-            # 设置控制参数客户端信息
-            self.tcp_comm.set_server_info(control_host, control_port)
-            
             # 连接控制指令客户端
-            control_connected = self.tcp_comm.connect()
+            control_connected = self.station.connect_control()
             
             if control_connected:
                 self.status_bar.showMessage(f"已连接到控制端 {control_host}:{control_port}")
@@ -682,9 +888,9 @@ class MainWindow(QMainWindow):
         """
         切换数据回传客户端连接状态
         """
-        if self.tcp_data_comm.get_connection_status():
+        if self.station.tcp_data_comm.get_connection_status():
             # 断开连接
-            self.tcp_data_comm.disconnect()
+            self.station.disconnect_data()
             self.status_bar.showMessage("已断开数据回传客户端连接")
         else:
             # 保存连接配置
@@ -694,11 +900,8 @@ class MainWindow(QMainWindow):
             data_host = self.data_ip_edit.text()
             data_port = self.data_port_edit.value()
             
-            # 设置数据读取客户端信息
-            self.tcp_data_comm.set_server_info(data_host, data_port)
-            
             # 连接数据回传客户端
-            data_connected = self.tcp_data_comm.connect()
+            data_connected = self.station.connect_data()
             
             if data_connected:
                 self.status_bar.showMessage(f"已连接到数据端 {data_host}:{data_port}")
@@ -717,13 +920,12 @@ class MainWindow(QMainWindow):
         # 保存连接配置
         self.save_connection_config()
         
-        control_connected = self.tcp_comm.get_connection_status()
-        data_connected = self.tcp_data_comm.get_connection_status()
+        control_connected = self.station.tcp_comm.get_connection_status()
+        data_connected = self.station.tcp_data_comm.get_connection_status()
         
         if control_connected or data_connected:
             # 断开所有连接
-            self.tcp_comm.disconnect()
-            self.tcp_data_comm.disconnect()
+            self.station.disconnect()
             self.status_bar.showMessage("已断开所有连接")
         else:
             # 连接所有客户端
@@ -732,13 +934,8 @@ class MainWindow(QMainWindow):
             data_host = self.data_ip_edit.text()
             data_port = self.data_port_edit.value()
             
-            # 设置客户端信息
-            self.tcp_comm.set_server_info(control_host, control_port)
-            self.tcp_data_comm.set_server_info(data_host, data_port)
-            
             # 连接客户端
-            control_connected = self.tcp_comm.connect()
-            data_connected = self.tcp_data_comm.connect()
+            control_connected, data_connected = self.station.connect()
             
             if control_connected and data_connected:
                 self.status_bar.showMessage(f"已连接到控制端 {control_host}:{control_port} 和数据端 {data_host}:{data_port}")
@@ -786,23 +983,40 @@ class MainWindow(QMainWindow):
             self.status_bar.showMessage("请选择Excel文件")
             return
         
-        # 更新配置
-        global_config.set('File', 'excel_file', file_path)
+        # 更新配置（其他工位的Excel文件保存在各自的工位配置节中）
+        if self.station.section == 'Communication':
+            global_config.set('File', 'excel_file', file_path)
         
         # 读取Excel文件
-        sheet, max_row, max_col = self.file_handler.read_excel(file_path)
+        sheet, max_row, max_col = self.station.load_excel(file_path)
         if not sheet:
             self.status_bar.showMessage("Excel文件加载失败")
             return
         
-        self.excel_sheet = sheet
-        self.excel_max_row = max_row
-        self.excel_max_col = max_col
+        self.show_excel_preview(sheet, max_row, max_col)
+        
+        # 计算实际数据行数（跳过标题行）
+        actual_data_rows = max_row - 1
+        self.status_bar.showMessage(f"Excel文件加载成功，共 {actual_data_rows} 行数据，{max_col} 列")
+    
+    def show_excel_preview(self, sheet, max_row, max_col):
+        """
+        显示Excel文件预览
+        
+        参数:
+            sheet: 工作表，None则清空预览
+            max_row: 最大行数
+            max_col: 最大列数
+        """
+        if not sheet:
+            self.excel_table.setRowCount(0)
+            return
         
         # 计算实际数据行数（跳过标题行）
         actual_data_rows = max_row - 1
         
         # 更新表格行数，只显示前20行数据
+        self.excel_table.clearContents()
         self.excel_table.setRowCount(min(actual_data_rows, 20))
         
         # 从第2行开始读取数据（跳过标题行）
@@ -814,254 +1028,95 @@ class MainWindow(QMainWindow):
                 cell_value = self.file_handler.get_cell_value(sheet, excel_row, excel_col)
                 item = QTableWidgetItem(str(cell_value) if cell_value is not None else "")
                 self.excel_table.setItem(table_row, table_col, item)
-        
-        # 保存Excel文件名（不包含路径和扩展名）
-        self.excel_filename = os.path.splitext(os.path.basename(file_path))[0]
-        
-        self.status_bar.showMessage(f"Excel文件加载成功，共 {actual_data_rows} 行数据，{max_col} 列")
-    
-    def is_completed(self):
-        """
-        检查是否处理完所有数据
-        
-        返回:
-            bool: 是否已处理完所有数据
-        """
-        if not self.excel_sheet:
-            return True
-        return self.current_col > self.excel_max_col
     
     def start_process(self):
         """
-        开始处理
+        开始处理当前工位
         """
-        if not self.tcp_comm.get_connection_status():
-            self.status_bar.showMessage("请先连接到服务器")
-            return
-        
-        # 如果没有加载Excel文件，提示用户
-        if not self.excel_sheet:
-            self.status_bar.showMessage("请先加载Excel文件")
+        error_msg = self.station.start()
+        if error_msg:
+            self.status_bar.showMessage(error_msg)
             return
         
-        # 初始化当前行和列
-        self.current_row = 1
-        
-        self.is_running = True
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
-        self.status_bar.showMessage("处理中...")
-
-        self.process_timer = QTimer()
-        self.process_timer.timeout.connect(self.handle_data)
-        self.process_timer.start(1000)  # 每秒处理一次
+        self.status_bar.showMessage(f"[{self.station.name}] 处理中...")
     
     def stop_process(self):
         """
-        停止处理
+        停止处理当前工位
         """
-        self.is_running = False
+        self.station.stop()
         
         # 检查是否处理完成所有数据
-        if self.is_completed():
+        if self.station.is_completed():
             # 遍历完所有数据，禁用开始按钮
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(False)
             self.status_bar.showMessage("所有物料已处理完成")
-            system_logger.info("所有物料已处理完成")
+            system_logger.info(f"[{self.station.name}] 所有物料已处理完成")
         else:
             # 未遍历完所有数据，启用开始按钮，禁用停止按钮
             self.start_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
             self.status_bar.showMessage("已停止")
         
-        if hasattr(self, 'process_timer'):
-            self.process_timer.stop()
-        
-    def on_control_data_received(self, data_str):
+    def on_station_event(self, station_name, event, payload):
         """
-        控制指令客户端数据接收回调
+        工位事件回调（GUI线程），只有当前显示的工位才更新监控区域
         
         参数:
-            data_str: 接收到的数据字符串
+            station_name: 工位名称
+            event: 事件名称
+            payload: 事件信息
         """
-        try:
-            # 使用协议处理器解析响应
-            parsed_response = self.protocol_handler.parse_response(data_str)
+        station = self.station_manager.get(station_name)
+        if station is None:
+            return
+        is_current = station is self.station
+        
+        if event == 'comm_error':
+            self.on_comm_error(payload if is_current else f"[{station_name}] {payload}")
+        
+        elif event == 'comm_status':
+            self.on_comm_status(station, payload['comm_type'], payload['event'], payload['info'], payload['incident'])
+        
+        elif event == 'completed':
+            if is_current:
+                self.status_bar.showMessage("所有目标已处理完成")
+                self.stop_process()
+            else:
+                self.status_bar.showMessage(f"[{station_name}] 所有目标已处理完成")
+        
+        elif event == 'target' and is_current:
+            self.target_weight_label.setText(f"{payload['target_weight']:.2f}")
             
-            if parsed_response:
-                command = parsed_response['command']
-                data = parsed_response['data']
-                
-                # 处理new_target指令
-                if command == 'new_target':
-                    self.protocol_handler.handle_new_target()
-                    
-                    # 获取新目标重量
-                    if self.excel_sheet and not self.is_completed() and self.is_running:
-                        # 移动到下一个目标
-                        if self.current_row < self.excel_max_row:
-                            self.current_row += 1
-                        else:
-                            self.status_bar.showMessage("所有目标已处理完成")
-                            self.stop_process()
-                            return
-                        
-                        # 从Excel获取物料参数（假设列结构：1-物料名，2-目标重量，3-密度，4-颗粒大小，5-空瓶重）
-                        material_name = self.file_handler.get_cell_value(self.excel_sheet, self.current_row, 1)  # 第1列：物料名称
-                        target_weight_cell = self.file_handler.get_cell_value(self.excel_sheet, self.current_row, 2)  # 第2列：目标重量
-                        density_cell = self.file_handler.get_cell_value(self.excel_sheet, self.current_row, 3)  # 第3列：密度
-                        particle_size_cell = self.file_handler.get_cell_value(self.excel_sheet, self.current_row, 4)  # 第4列：颗粒大小
-                        vial_weight_cell = self.file_handler.get_cell_value(self.excel_sheet, self.current_row, 5)  # 第5列：空瓶重
-                        
-                        # 保存当前物料名称，用于JSON命名
-                        self.current_material = material_name if material_name else "Unknown"
-                        
-                        # 处理目标重量
-                        if target_weight_cell is None or not isinstance(target_weight_cell, (int, float)):
-                            system_logger.warning(f"从Excel获取的目标重量无效: {target_weight_cell}，使用测试值 10.0 g")
-                            target_weight = 10.0
-                        else:
-                            target_weight = float(target_weight_cell)
-                            system_logger.info(f"获取到有效目标重量: {target_weight} g")
-                        
-                        # 生成当前物料的JSON文件名
-                        timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime())
-                        self.current_json_filename = f"{self.excel_filename}_{self.current_material}_{timestamp}.json"
-                        
-                        # 处理密度
-                        density = None
-                        if density_cell is not None and isinstance(density_cell, (int, float)):
-                            density = float(density_cell)
-                            system_logger.info(f"获取到有效密度: {density}")
-                        
-                        # 处理颗粒大小
-                        particle_size = None
-                        if particle_size_cell is not None and isinstance(particle_size_cell, (int, float)):
-                            particle_size = float(particle_size_cell)
-                            system_logger.info(f"获取到有效颗粒大小: {particle_size}")
-                        
-                        # 处理空瓶重
-                        vial_weight = None
-                        if vial_weight_cell is not None and isinstance(vial_weight_cell, (int, float)):
-                            vial_weight = float(vial_weight_cell)
-                            system_logger.info(f"获取到有效空瓶重: {vial_weight} g")
-                        
-                        # 更新数据处理器参数
-                        self.data_processor.update_parameters(
-                            density=density,
-                            vial_weight=vial_weight,
-                            particle_size=particle_size
-                        )
-                        
-                        # 更新当前目标重量
-                        self.current_target_weight = target_weight
-                        self.target_weight_label.setText(f"{target_weight:.2f}")
-                        
-                        # 获取当前重量
-                        current_weight = self.data_processor.get_weight()
-                        
-                        # 计算抖动参数
-                        shaking_amplitude, shaking_angle = self.data_processor.calculate_shaking_parameters(
-                            self.current_target_weight, current_weight
-                        )
-                        
-                        # 更新UI参数
-                        if density is not None and isinstance(density, (int, float)):
-                            self.density_edit.setValue(float(density))
-                        if particle_size is not None and isinstance(particle_size, (int, float)):
-                            self.particle_edit.setValue(float(particle_size))
-                        if vial_weight is not None and isinstance(vial_weight, (int, float)):
-                            self.vial_edit.setValue(float(vial_weight))
-                        
-                        # 更新其他UI
-                        self.current_weight_label.setText(f"{current_weight:.2f}")
-                        self.shaking_label.setText(f"{shaking_amplitude:.2f}")
-                        self.angle_label.setText(f"{shaking_angle:.2f}")
-
-                        # 使用协议处理器格式化控制指令
-                        send_str = self.protocol_handler.format_control_packet(
-                            target_weight,
-                            shaking_amplitude,
-                            current_weight,
-                            shaking_angle
-                        )
-                        
-                        if send_str:
-                            self.tcp_comm.send_data(send_str)
-                
-                # 处理executing指令
-                elif command == 'executing':
-                    self.protocol_handler.handle_executing(data)
-
-                     # 获取当前重量
-                    current_weight = self.data_processor.get_weight()
-                    
-                    # 如果有目标重量，计算抖动参数并发送
-                    if self.current_target_weight and not self.is_completed() and self.is_running:
-                        # 计算抖动参数
-                        shaking_amplitude, shaking_angle = self.data_processor.calculate_shaking_parameters(
-                            self.current_target_weight, current_weight
-                        )
-                        
-                        # 更新UI
-                        self.current_weight_label.setText(f"{current_weight:.2f}")
-                        self.shaking_label.setText(f"{shaking_amplitude:.2f}")
-                        self.angle_label.setText(f"{shaking_angle:.2f}")
-                        
-                        # 使用协议处理器格式化控制指令
-                        send_str = self.protocol_handler.format_control_packet(
-                            0,  # executing指令时target_weight为0
-                            shaking_amplitude,
-                            current_weight,
-                            shaking_angle
-                        )
-                        
-                        if send_str:
-                            self.tcp_comm.send_data(send_str)
+            # 更新UI参数
+            if payload['density'] is not None:
+                self.density_edit.setValue(payload['density'])
+            if payload['particle_size'] is not None:
+                self.particle_edit.setValue(payload['particle_size'])
+            if payload['vial_weight'] is not None:
+                self.vial_edit.setValue(payload['vial_weight'])
+            
+            # 更新其他UI
+            self._show_control(payload)
         
-        except Exception as e:
-            ctrl_com_logger.error(f"处理控制指令数据时发生错误: {e}")
+        elif event == 'control' and is_current:
+            self._show_control(payload)
     
-    def on_data_received(self, data_str):
+    def _show_control(self, payload):
         """
-        数据回传客户端数据接收回调
+        显示当前重量和抖动参数，天平未稳定（重量为None）时显示"--"
         
         参数:
-            data_str: 接收到的数据字符串
+            payload: 'target'或'control'事件的数据
         """
-        try:
-            # 处理数据回传客户端的数据
-            if self.excel_sheet and not self.is_completed() and self.is_running:
-                if data_str != "9 9 9":  # 有效的数据
-                    # 解析数据
-                    data_parts = data_str.split()
-                    if len(data_parts) >= 4:
-                        # 格式化数据为字典
-                        result_dict = {
-                            'accuracy': float(data_parts[0]),
-                            'difference': float(data_parts[1]),
-                            'target_weight': float(data_parts[2]),
-                            'time': float(data_parts[3])
-                        }
-                        
-                        # 保存数据到JSON文件
-                        results_dir = global_config.get('File', 'results_dir', 'Experimental results')
-                        if not os.path.exists(results_dir):
-                            os.makedirs(results_dir)
-                        
-                        # 使用当前物料的JSON文件名
-                        if self.current_json_filename != "Unknown":
-                            json_file = os.path.join(results_dir, self.current_json_filename)
-                            
-                            # 保存新数据
-                            with open(json_file, 'a') as f:
-                                f.write(json.dumps(result_dict) + '\n')
-                            system_logger.info(f"保存数据到JSON文件: {result_dict}")
-                        else:
-                            system_logger.info(f"不保存数据，当前文件名为Unknown: {result_dict}")
-        except Exception as e:
-            data_com_logger.error(f"处理数据回传客户端数据时发生错误: {e}")
+        for label, key in ((self.current_weight_label, 'current_weight'),
+                           (self.shaking_label, 'shaking_amplitude'),
+                           (self.angle_label, 'shaking_angle')):
+            value = payload.get(key)
+            label.setText(f"{value:.2f}" if value is not None else "--")
     
     def on_comm_error(self, error_msg):
         """
@@ -1078,6 +1133,44 @@ class MainWindow(QMainWindow):
         
         # 更新连接状态
         self.update_connection_status()
+    
+    def on_comm_status(self, station, comm_type, event, info, incident):
+        """
+        连接状态变化回调（GUI线程），显示自动重连过程中的提示和会话恢复情况
+        
+        参数:
+            station: 工位
+            comm_type: 通讯类型，'CTRL_COM'或'DATA_COM'
+            event: 事件名称，'connection_lost' / 'reconnecting' / 'reconnected'
+            info: 事件信息
+            incident: 两个通道均已恢复时的中断记录，否则为None
+        """
+        channel_name = "控制指令客户端" if comm_type == 'CTRL_COM' else "数据回传客户端"
+        prefix = "" if station is self.station else f"[{station.name}] "
+        
+        if event == 'connection_lost':
+            system_logger.warning(f"[{station.name}] {channel_name}连接中断，正在自动重连: {info}")
+            self.status_bar.showMessage(f"{prefix}{channel_name}连接中断，正在自动重连...")
+        
+        elif event == 'reconnecting':
+            self.status_bar.showMessage(f"{prefix}{channel_name}正在进行第 {info} 次重连...")
+        
+        elif event == 'reconnected':
+            system_logger.info(f"[{station.name}] {channel_name}已恢复，中断 {info['downtime']:.2f} 秒，重连 {info['attempts']} 次")
+            if incident is not None:
+                # 两个通道均已恢复，会话从断线前的步骤继续
+                tracker = station.session_tracker
+                message = (f"{prefix}通讯已恢复，本次中断 {incident['downtime']:.2f} 秒"
+                           f"（累计 {len(tracker.incidents)} 次，共 {tracker.total_downtime():.2f} 秒）")
+                if station.is_running:
+                    message += f"，从第 {station.current_row} 行继续"
+                system_logger.info(message)
+                self.status_bar.showMessage(message)
+            else:
+                self.status_bar.showMessage(f"{prefix}{channel_name}已恢复，等待其他通道重连...")
+        
+        # 更新连接状态
+        self.update_connection_status()
   
     def refresh_json_files(self):
         """
@@ -1289,33 +1382,14 @@ class MainWindow(QMainWindow):
         # 刷新物料下拉框
         self.refresh_json_files()
     
-    def handle_data(self):
-        """
-        处理数据
-        """
-        if not self.is_running:
-            return
-        
-        try:
-            # 1. 数据回传客户端：发送 'request_data' 到数据服务器
-            self.tcp_data_comm.send_data('request_weight')
-            
-        except Exception as e:
-            system_logger.error(f"处理数据时发生错误: {e}")
-    
     def closeEvent(self, event):
         """
         关闭窗口时的处理
         """
-        # 断开TCP连接
-        if self.tcp_comm.get_connection_status():
-            self.tcp_comm.disconnect()
-        
-        if self.tcp_data_comm.get_connection_status():
-            self.tcp_data_comm.disconnect()
-        
         # 停止定时器
-        if hasattr(self, 'process_timer'):
-            self.process_timer.stop()
+        self.process_timer.stop()
+        
+        # 断开所有工位的TCP连接
+        self.station_manager.shutdown()
         
         event.accept()
@@ -109,6 +109,17 @@ MODULE T_ROB_R
     PERS num over_error;! if solid is overdispenisng
     ! Trigger to send data via socket
     PERS bool send;
+    ! Settled weight sent by the client (see T_SOC_COM), settled_count increments with every new settle,
+    ! refreshes of the same settled weight do not count
+    PERS num settled_weight;
+    PERS num settled_count;
+    ! Incremented for every refresh of a settled weight, the client refreshes only while the scale stays settled
+    PERS num settled_refresh;
+    PERS bool settle_publish;
+    ! Time for the last drop to land and the previous settled packet to be received before waiting (s)
+    VAR num settle_guard := 0.3;
+    ! Longest wait for a settled weight before falling back to averaging 5 readings (s)
+    VAR num settle_max_time := 5;
      
     ! Procedure: main
     ! Purpose: Main control procedure for right arm operations
@@ -316,11 +327,33 @@ MODULE T_ROB_R
     
     ! Procedure: calculate_difference
     ! Purpose: Calculates average weight difference
-    ! Process: Takes 5 weight readings, calculates average difference from target
+    ! Process: Uses the next settled weight of the client, otherwise takes 5 weight readings after a
+    !          fixed wait and calculates average difference from target
     ! Usage: Called during dispensing to monitor progress
     PROC calculate_difference() 
+        VAR num settled_start;
+        VAR num refresh_start;
+        VAR bool settle_timeout;
+        
+        IF settle_publish = TRUE THEN
+            ! the client reports as soon as the scale has settled, no fixed wait
+            WaitTime settle_guard;
+            settled_start := settled_count;
+            refresh_start := settled_refresh;
+            ! a drop too small to disturb the scale gives no new settle, the client keeps refreshing the
+            ! settled weight instead; the first refresh after the guard may have been sent before the
+            ! drop landed, the second one was sent a full publish interval later while still settled
+            WaitUntil settled_count <> settled_start OR settled_refresh - refresh_start >= 2 \MaxTime:=settle_max_time \TimeFlag:=settle_timeout;
+            IF settle_timeout = FALSE THEN
+                difference:= targetweight - settled_weight + weight_vial;
+                TPWrite "calculated difference: " \Num:=difference;
+                RETURN;
+            ENDIF
+            TPWrite "no settled weight, averaging readings";
+        ELSE
+            waitTIme 2;
+        ENDIF
         ! calcuate differnence and set some default value
-        waitTIme 2;
         WaitUntil recv_stable;
         difference1:= targetweight - recv_reading+ weight_vial;
         WaitUntil recv_stable;
@@ -65,6 +65,47 @@ MODULE T_SOC_COM
     PERS bool weight_vial_reday;
     ! Average vial weight (kg)
     PERS num weight_vial;
+    ! Push mode: the client sent "subscribe <rate>", results are pushed without request_weight polling
+    VAR bool push_mode := FALSE;
+    ! Minimum interval between two pushed messages (s)
+    VAR num push_interval := 0.1;
+    ! Timer limiting the push rate
+    VAR clock push_timer;
+    ! Indicates if the current result has already been pushed
+    VAR bool result_pushed := FALSE;
+    ! Command channel protocol: 1 = ASCII "t a c ang #", 2 = packed binary (negotiated with "protocol 2")
+    VAR num proto_version := 1;
+    ! Raw command packet received in protocol v2
+    VAR rawbytes command_raw;
+    ! Sequence number of the last v2 command packet (1..65535, 0 = none yet), echoed in every request
+    VAR num command_seq := 0;
+    ! Sequence number of the command packet that set the current target, echoed in the result
+    VAR num target_seq := 0;
+    ! Set when ReceivePackets got a reply to the last prompt
+    VAR bool got_reply := FALSE;
+    ! Shaking trajectory (v2): setpoint k applies from traj_weight{k} (g) upwards, 0 setpoints = lock-step
+    VAR num traj_count := 0;
+    VAR num traj_weight{8};
+    VAR num traj_shake{8};
+    VAR num traj_angle{8};
+    ! Weight up to which the client predicted the trajectory (g)
+    VAR num traj_limit := 0;
+    ! Time since the last packet of the client while a trajectory is active
+    VAR clock traj_timer;
+    ! Send an executing prompt when the client has been silent this long (s)
+    VAR num traj_timeout := 1;
+    ! Settled weight (v2): the client detects when the scale has settled and sends the weight (g) and its
+    ! confidence bound (g); settled_count is incremented for every new settle (changed settle counter,
+    ! first or predicted packet) so T_ROB_R can wait for one; refreshes of a settled weight do not count
+    PERS num settled_weight;
+    PERS num settled_bound;
+    PERS num settled_count;
+    ! Incremented for every refresh of a settled weight (same settle counter, no flags)
+    PERS num settled_refresh;
+    ! Settle counter of the last settled packet, -1 after ServerStart
+    VAR num settled_last := -1;
+    ! Set once a settled packet arrived since ServerStart, T_ROB_R then stops waiting a fixed time
+    PERS bool settle_publish;
     
     ! Procedure: main
     ! Purpose: Main communication loop for socket operations
@@ -78,15 +119,38 @@ MODULE T_SOC_COM
         client_connected := FALSE;
         ready_new_command := TRUE;
         ServerStart TRUE;
+        ClkReset push_timer;
+        ClkStart push_timer;
         WHILE client_connected = TRUE DO
-            SocketReceive scaleClientSocket \Str := rec_json;
-            ! [send]if the dispensing process end, send result info by scaleclient
-            IF send_result THEN 
-                Socketsend scaleClientSocket \Str :=numToStr(result{1},5)+" " + numToStr(result{2},4)+" "+ ValToStr(result{3})+" "+numToStr(result{4},1);                
-                TPWrite "result"+ ValToStr(result{1})+" " + ValToStr(result{2})+" "+ ValToStr(result{3})+" "+ValToStr(result{4})+" "+ValToStr(result{5});
-            ELSE 
-                Socketsend scaleClientSocket \Str :="9 9 9";   ! send_result false only trigger sending 9 9 9 which the pyhthon not save the unready result
-            ENDIF         
+            IF push_mode = FALSE THEN
+                ! [poll] wait for a request, answer it with the result or 9 9 9
+                SocketReceive scaleClientSocket \Str := rec_json;
+                IF ScaleSubscription(rec_json) = FALSE THEN
+                    IF ProtocolRequest(rec_json) = FALSE THEN
+                        SendScaleResult;
+                    ENDIF
+                ENDIF
+            ELSE
+                ! [push] handle pending subscription messages without blocking
+                IF SocketPeek(scaleClientSocket) > 0 THEN
+                    SocketReceive scaleClientSocket \Str := rec_json;
+                    IF ScaleSubscription(rec_json) = FALSE THEN
+                        IF ProtocolRequest(rec_json) = FALSE THEN
+                            SendScaleResult;  ! an explicit request_weight is still answered
+                        ENDIF
+                    ENDIF
+                ENDIF
+                ! push each result once, no faster than the subscribed rate
+                IF push_mode = TRUE AND send_result = TRUE AND result_pushed = FALSE AND ClkRead(push_timer) >= push_interval THEN
+                    SendScaleResult;
+                    result_pushed := TRUE;
+                    ClkReset push_timer;
+                    ClkStart push_timer;
+                ENDIF
+            ENDIF
+            IF send_result = FALSE THEN
+                result_pushed := FALSE;
+            ENDIF
             
             ! [send]if the weight vial is ready, send weight info by commandclient
             IF weight_vial_reday=TRUE THEN
@@ -98,20 +162,40 @@ MODULE T_SOC_COM
             ! cond1: ready for new cmd
             IF ready_new_command = TRUE THEN 
                 no_vials_now:= no_vials_now+1 ;  ! vial index update 
-                Socketsend commandClientSocket \Str := "new_target";  ! send cmd
-                SocketReceive commandClientSocket \Str :=  command_recv_msg;
-                Parsemsg(command_recv_msg);   ! parse msg           
+                traj_count := 0;
+                SendPrompt "new_target";  ! send cmd
+                ReceiveCommand \Control;   ! receive and parse msg
+                traj_count := 0;  ! a trajectory of the previous vial received while waiting is void
+                target_seq := command_seq;
                 recv_target_weight:=command{1};
                 ready_new_command := FALSE;
+            ! executing with a trajectory: the client only sends weight updates and new trajectories
+            ELSEIF traj_count > 0 THEN
+                IF SocketPeek(commandClientSocket) > 0 THEN
+                    ReceivePackets;
+                    ClkReset traj_timer;
+                    ClkStart traj_timer;
+                ELSEIF ClkRead(traj_timer) >= traj_timeout THEN
+                    SendPrompt "executing";
+                    ReceiveCommand;
+                    ClkReset traj_timer;
+                    ClkStart traj_timer;
+                ELSE
+                    WaitTime 0.01;
+                ENDIF
             ! executing
             ELSE
-                Socketsend commandClientSocket \Str := "executing";
-                SocketReceive commandClientSocket \Str :=  command_recv_msg;
-                Parsemsg(command_recv_msg);   
+                SendPrompt "executing";
+                ReceiveCommand;
+                ClkReset traj_timer;
+                ClkStart traj_timer;
             ENDIF
             ! parse condition
+            ! trajectory: setpoint for the current weight
+            IF traj_count > 0 THEN
+                ApplyTrajectory;
             ! data not stable
-            IF command{3}=100 or command{2}=1000 or command{4}=1000 THEN  ! the value can be changed just for noting the receieve data no stable
+            ELSEIF command{3}=100 or command{2}=1000 or command{4}=1000 THEN  ! the value can be changed just for noting the receieve data no stable
                 recv_stable:=false;
             ! data stable, get cmd info for ctrl
             ELSE
@@ -162,6 +246,13 @@ MODULE T_SOC_COM
         ELSE
             TPWrite "ServerStart without recovery";
         ENDIF
+        ! a new client has to subscribe and negotiate again
+        push_mode := FALSE;
+        proto_version := 1;
+        settle_publish := FALSE;
+        settled_count := 0;
+        settled_refresh := 0;
+        settled_last := -1;
         SocketCreate scaleServerSocket;
         SocketBind scaleServerSocket, "192.168.125.1", 1025;
         recv_reading := 0;
@@ -199,6 +290,281 @@ MODULE T_SOC_COM
             ENDIF
     ENDPROC
     
+    ! Procedure: SendScaleResult
+    ! Purpose: Sends the dispensing result, or 9 9 9 when it is not ready, via the scale socket
+    ! Format: precision difference target_weight time (v2: "@<target_seq> precision difference target_weight time\0A")
+    PROC SendScaleResult()
+        ! [send]if the dispensing process end, send result info by scaleclient
+        IF send_result AND proto_version >= 2 THEN
+            ! v2: tagged with the sequence of the target command and terminated by a newline
+            Socketsend scaleClientSocket \Str :="@"+ValToStr(target_seq)+" "+numToStr(result{1},5)+" " + numToStr(result{2},4)+" "+ ValToStr(result{3})+" "+numToStr(result{4},1)+"\0A";
+        ELSEIF send_result THEN 
+            Socketsend scaleClientSocket \Str :=numToStr(result{1},5)+" " + numToStr(result{2},4)+" "+ ValToStr(result{3})+" "+numToStr(result{4},1);                
+            TPWrite "result"+ ValToStr(result{1})+" " + ValToStr(result{2})+" "+ ValToStr(result{3})+" "+ValToStr(result{4})+" "+ValToStr(result{5});
+        ELSE 
+            Socketsend scaleClientSocket \Str :="9 9 9";   ! send_result false only trigger sending 9 9 9 which the pyhthon not save the unready result
+        ENDIF         
+    ENDPROC
+    
+    ! Function: ScaleSubscription
+    ! Purpose: Handles push subscription messages received on the scale socket
+    ! Parameters: msg - received message
+    ! Format: "subscribe <max rate Hz>" answered by "subscribed <rate>", "unsubscribe" answered by "unsubscribed"
+    ! Return: TRUE if msg was a subscription message, FALSE for a normal request
+    FUNC bool ScaleSubscription(string msg)
+        VAR num rate;
+        
+        IF StrLen(msg) >= 11 THEN
+            IF StrPart(msg,1,10) = "subscribe " THEN
+                IF StrToVal(StrPart(msg,11,StrLen(msg)-10),rate) = FALSE OR rate <= 0 THEN
+                    rate := 10;
+                ENDIF
+                push_interval := 1 / rate;
+                push_mode := TRUE;
+                result_pushed := FALSE;
+                Socketsend scaleClientSocket \Str := "subscribed " + ValToStr(rate) + "\0A";
+                TPWrite "scale push subscribed, rate " + ValToStr(rate);
+                RETURN TRUE;
+            ENDIF
+        ENDIF
+        IF StrLen(msg) >= 11 THEN
+            IF StrPart(msg,1,11) = "unsubscribe" THEN
+                push_mode := FALSE;
+                Socketsend scaleClientSocket \Str := "unsubscribed\0A";
+                TPWrite "scale push unsubscribed";
+                RETURN TRUE;
+            ENDIF
+        ENDIF
+        RETURN FALSE;
+    ENDFUNC
+    
+    ! Function: ProtocolRequest
+    ! Purpose: Handles command protocol negotiation messages received on the scale socket
+    ! Parameters: msg - received message
+    ! Format: "protocol <version>" answered by "protocol <accepted version>" (2 if requested, else 1)
+    ! Return: TRUE if msg was a negotiation message, FALSE for a normal request
+    FUNC bool ProtocolRequest(string msg)
+        VAR num version;
+        
+        IF StrLen(msg) >= 10 THEN
+            IF StrPart(msg,1,9) = "protocol " THEN
+                IF StrToVal(StrPart(msg,10,StrLen(msg)-9),version) = FALSE OR version < 2 THEN
+                    version := 1;
+                ELSE
+                    version := 2;
+                ENDIF
+                proto_version := version;
+                command_seq := 0;
+                Socketsend scaleClientSocket \Str := "protocol " + ValToStr(version) + "\0A";
+                TPWrite "command protocol v" + ValToStr(version);
+                RETURN TRUE;
+            ENDIF
+        ENDIF
+        RETURN FALSE;
+    ENDFUNC
+    
+    ! Procedure: SendPrompt
+    ! Purpose: Sends a request on the command socket
+    ! Format: v1 "new_target" / "executing", v2 "@<command_seq> new_target" / "@<command_seq> executing"
+    ! Usage: The echoed sequence lets the client drop stale or duplicated requests
+    PROC SendPrompt(string prompt)
+        IF proto_version >= 2 THEN
+            Socketsend commandClientSocket \Str := "@" + ValToStr(command_seq) + " " + prompt;
+        ELSE
+            Socketsend commandClientSocket \Str := prompt;
+        ENDIF
+    ENDPROC
+    
+    ! Procedure: ReceiveCommand
+    ! Purpose: Waits for the reply of the client to a prompt and stores it in command (or the trajectory)
+    ! Parameters: \Control - only a control packet is a reply (new_target), otherwise a trajectory is one as well
+    ! Format: v1 "target amplitude weight angle #" (see Parsemsg), v2 see ReceivePackets
+    ! Usage: Weight updates received while waiting are applied but do not end the wait
+    PROC ReceiveCommand(\switch Control)
+        IF proto_version < 2 THEN
+            SocketReceive commandClientSocket \Str := command_recv_msg;
+            Parsemsg(command_recv_msg);
+            RETURN;
+        ENDIF
+        got_reply := FALSE;
+        WHILE got_reply = FALSE DO
+            ReceivePackets \Control?Control;
+        ENDWHILE
+    ENDPROC
+    
+    ! Procedure: ReceivePackets
+    ! Purpose: Receives data from the command socket in v2 and handles every packet in it
+    ! Format: network byte order, the first byte is the packet type
+    !         type 2 control, 20 bytes: type (USINT), flags (USINT), sequence (UINT), 4 x Float4
+    !         type 3 trajectory, 12 + 12 x N bytes: type, N (USINT), sequence (UINT), weight, limit (Float4),
+    !                N x (start weight, shake, angle) (Float4); N = 0 is a weight update with sequence 0
+    !         type 4 settled weight, 12 bytes: type, flags (USINT), settle counter (UINT), weight, bound (Float4)
+    !                flags 1 = first after a disturbance, 2 = predicted by the client before the scale settled
+    ! Usage: An ASCII packet is still accepted, the first byte tells them apart. Packets sent without a
+    !        prompt (weight updates, new trajectories) may arrive together in one receive
+    PROC ReceivePackets(\switch Control)
+        VAR num msg_type;
+        VAR num count;
+        VAR num raw_len;
+        VAR num pkt_len;
+        VAR num offset := 1;
+        
+        SocketReceive commandClientSocket \RawData := command_raw;
+        raw_len := RawBytesLen(command_raw);
+        UnpackRawBytes command_raw, 1, msg_type \IntX := USINT;
+        IF msg_type <> 2 AND msg_type <> 3 AND msg_type <> 4 THEN
+            ! ASCII packet sent before the client switched to v2
+            IF raw_len > 80 THEN
+                raw_len := 80;
+            ENDIF
+            UnpackRawBytes command_raw, 1, command_recv_msg \ASCII := raw_len;
+            Parsemsg(command_recv_msg);
+            command_seq := 0;  ! no sequence to echo
+            traj_count := 0;
+            got_reply := TRUE;
+            RETURN;
+        ENDIF
+        WHILE offset <= raw_len DO
+            UnpackRawBytes command_raw, offset, msg_type \IntX := USINT;
+            IF msg_type = 2 THEN
+                pkt_len := 20;
+            ELSEIF msg_type = 3 THEN
+                ReceiveRest offset + 1;
+                UnpackRawBytes command_raw, offset + 1, count \IntX := USINT;
+                pkt_len := 12 + 12 * count;
+            ELSEIF msg_type = 4 THEN
+                pkt_len := 12;
+            ELSE
+                TPWrite "unknown command packet type " + ValToStr(msg_type);
+                RETURN;
+            ENDIF
+            ! the packet was split by TCP, read the remaining bytes
+            ReceiveRest offset + pkt_len - 1;
+            raw_len := RawBytesLen(command_raw);
+            IF msg_type = 2 THEN
+                UnpackControl offset;
+                got_reply := TRUE;
+            ELSEIF msg_type = 4 THEN
+                UnpackSettled offset;  ! sent without a prompt, never a reply
+            ELSE
+                UnpackTrajectory offset;
+                IF count > 0 AND NOT Present(Control) THEN
+                    got_reply := TRUE;
+                ENDIF
+            ENDIF
+            offset := offset + pkt_len;
+        ENDWHILE
+    ENDPROC
+    
+    ! Procedure: ReceiveRest
+    ! Purpose: Reads from the command socket until command_raw holds at least min_len bytes
+    PROC ReceiveRest(num min_len)
+        VAR rawbytes raw_rest;
+        VAR num raw_len;
+        
+        raw_len := RawBytesLen(command_raw);
+        IF raw_len < min_len THEN
+            SocketReceive commandClientSocket \RawData := raw_rest \ReadNoOfBytes := min_len - raw_len;
+            CopyRawBytes raw_rest, 1, command_raw, raw_len + 1;
+        ENDIF
+    ENDPROC
+    
+    ! Procedure: CheckSequence
+    ! Purpose: Reports a gap in the command sequence and stores the sequence to echo
+    PROC CheckSequence(num seq)
+        IF command_seq <> 0 AND seq <> command_seq MOD 65535 + 1 THEN
+            TPWrite "command sequence gap " + ValToStr(command_seq) + " -> " + ValToStr(seq);
+        ENDIF
+        command_seq := seq;
+    ENDPROC
+    
+    ! Procedure: UnpackControl
+    ! Purpose: Stores a control packet in command, a control packet ends the current trajectory
+    PROC UnpackControl(num offset)
+        VAR num seq;
+        
+        UnpackRawBytes command_raw \Network, offset + 2, seq \IntX := UINT;
+        CheckSequence seq;
+        UnpackRawBytes command_raw \Network, offset + 4, command{1} \Float4;
+        UnpackRawBytes command_raw \Network, offset + 8, command{2} \Float4;
+        UnpackRawBytes command_raw \Network, offset + 12, command{3} \Float4;
+        UnpackRawBytes command_raw \Network, offset + 16, command{4} \Float4;
+        traj_count := 0;
+    ENDPROC
+    
+    ! Procedure: UnpackTrajectory
+    ! Purpose: Stores the weight of a trajectory packet in recv_reading and its setpoints in the trajectory
+    PROC UnpackTrajectory(num offset)
+        VAR num count;
+        VAR num seq;
+        VAR num weight;
+        VAR num pos;
+        
+        UnpackRawBytes command_raw, offset + 1, count \IntX := USINT;
+        UnpackRawBytes command_raw \Network, offset + 4, weight \Float4;
+        recv_reading := weight;
+        IF count = 0 THEN
+            RETURN;  ! weight update
+        ENDIF
+        UnpackRawBytes command_raw \Network, offset + 2, seq \IntX := UINT;
+        CheckSequence seq;
+        UnpackRawBytes command_raw \Network, offset + 8, traj_limit \Float4;
+        IF count > 8 THEN
+            count := 8;
+        ENDIF
+        FOR i FROM 1 TO count DO
+            pos := offset + 12 * i;
+            UnpackRawBytes command_raw \Network, pos, traj_weight{i} \Float4;
+            UnpackRawBytes command_raw \Network, pos + 4, traj_shake{i} \Float4;
+            UnpackRawBytes command_raw \Network, pos + 8, traj_angle{i} \Float4;
+        ENDFOR
+        traj_count := count;
+    ENDPROC
+    
+    ! Procedure: UnpackSettled
+    ! Purpose: Stores the settled weight of a settled packet and signals T_ROB_R through settled_count
+    PROC UnpackSettled(num offset)
+        VAR num flags;
+        VAR num counter;
+        VAR num weight;
+        VAR num bound;
+        
+        UnpackRawBytes command_raw, offset + 1, flags \IntX := USINT;
+        UnpackRawBytes command_raw \Network, offset + 2, counter \IntX := UINT;
+        UnpackRawBytes command_raw \Network, offset + 4, weight \Float4;
+        UnpackRawBytes command_raw \Network, offset + 8, bound \Float4;
+        settled_weight := weight;
+        settled_bound := bound;
+        recv_reading := weight;
+        ! the client refreshes a settled weight every publish interval with the same counter and no flags,
+        ! such a refresh may still be the weight before the last shake
+        IF counter <> settled_last OR flags MOD 2 = 1 OR (flags DIV 2) MOD 2 = 1 THEN
+            settled_count := settled_count + 1;
+        ELSE
+            settled_refresh := settled_refresh + 1;
+        ENDIF
+        settled_last := counter;
+        settle_publish := TRUE;
+    ENDPROC
+    
+    ! Procedure: ApplyTrajectory
+    ! Purpose: Selects the last setpoint whose start weight is not above recv_reading
+    PROC ApplyTrajectory()
+        VAR num k := 1;
+        
+        ! FOR without STEP counts down when traj_count < 2 and would read a stale setpoint 2
+        IF traj_count >= 2 THEN
+            FOR i FROM 2 TO traj_count DO
+                IF recv_reading >= traj_weight{i} THEN
+                    k := i;
+                ENDIF
+            ENDFOR
+        ENDIF
+        shake := traj_shake{k};
+        a_smallspoon := traj_angle{k};
+        recv_stable := TRUE;
+    ENDPROC
+    
     ! Procedure: Parsemsg
     ! Purpose: Parses incoming command messages from socket
     ! Parameters: msg - string message to parse
@@ -45,7 +45,12 @@ def readtodict(item):
     result_d = dict(zip(title_list, read_list))
     return result_d
 
-def fuzzy_logic(x1,x2):
+_controller = None
+
+
+def build_fuzzy_logic(plot=False):
+    # build the domains, membership functions and rules once; plot=True draws the
+    # membership functions for inspection (plotting on every call made each inference slow)
 
     D = Domain("Difference", -0.1, 2, res=0.02)
     A = Domain('angele', 10, 40, res=0.02)
@@ -55,26 +60,21 @@ def fuzzy_logic(x1,x2):
     D.small = S(0.2, 0.4)
     D.large = R(0.6, 0.8)
     D.medium = trapezoid(0.2, 0.5, 0.6, 0.8, c_m=1)
-    D.small.plot()
-    D.medium.plot()
-    D.large.plot()
-
-    # plt.show()
 
     density.small = S(1.0, 2.5)
     density.large = R(3, 3.2)
     density.medium = trapezoid(2, 2.4, 2.8, 3.2, c_m=1)
-    density.small.plot()
-    density.medium.plot()
-    density.large.plot()
-    # plt.show()
+
     Sa.small = S(2, 4)
     Sa.large = R(10, 15)
     Sa.medium = trapezoid(2, 6, 10, 12, c_m=1)
-    Sa.small.plot()
-    Sa.medium.plot()
-    Sa.large.plot()
-    # plt.show()
+
+    if plot:
+        for domain in (D, density, Sa):
+            domain.small.plot()
+            domain.medium.plot()
+            domain.large.plot()
+            plt.show()
 
     R1 = Rule({(D.small, density.medium): Sa.small})
     R2 = Rule({(D.small, density.small): Sa.small})
@@ -87,6 +87,15 @@ def fuzzy_logic(x1,x2):
     R9 = Rule({(D.large, density.large): Sa.large})
 
     rules_shaking = sum([R1, R2, R3, R4, R5, R6, R7, R8, R9])
+    return D, density, rules_shaking
+
+
+def fuzzy_logic(x1,x2):
+    global _controller
+    if _controller is None:
+        _controller = build_fuzzy_logic()
+    D, density, rules_shaking = _controller
+
     X = {D: x1, density: x2} #differerence and density
 
     y = rules_shaking(X)